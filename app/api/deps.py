@@ -0,0 +1,254 @@
+from collections.abc import Awaitable, Callable
+from typing import Optional
+
+import jwt
+from fastapi import Depends, Header, HTTPException, Query, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import BaseModel
+
+from app.core.config import ENTIER_MAX, ENTIER_MIN, settings
+from app.core.roles import roles_cache
+from app.core.security import ACCESS_TOKEN, decode_token
+from app.models.users_et_roles import RoleEnum
+from app.schemas.user import UserToken
+
+# Schéma "Authorization: Bearer <jeton>" ; l'absence d'en-tête est traitée
+# par `current_user` pour renvoyer un 401 plutôt que le 403 par défaut.
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> UserToken:
+    """
+    Dépendance renvoyant l'utilisateur authentifié par le jeton d'accès.
+
+    Le jeton est vérifié localement (signature et expiration), sans requête en
+    base ni vérification du mot de passe.
+
+    Args:
+        credentials (HTTPAuthorizationCredentials | None): L'en-tête
+            `Authorization` (injecté par FastAPI).
+
+    Raises:
+        HTTPException: 401 UNAUTHORIZED si le jeton est absent, invalide
+            ou expiré.
+
+    Returns:
+        UserToken: L'utilisateur décrit par le jeton.
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentification requise",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        return decode_token(credentials.credentials, ACCESS_TOKEN)
+    except jwt.InvalidTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Jeton invalide ou expiré",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+async def current_user_optionnel(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> Optional[UserToken]:
+    """
+    Dépendance renvoyant l'utilisateur authentifié, ou None sans jeton.
+
+    Pour les endpoints ouverts aux anonymes (inscription) dont certaines
+    données sont réservées aux administrateurs.
+
+    Args:
+        credentials (HTTPAuthorizationCredentials | None): L'en-tête
+            `Authorization` (injecté par FastAPI).
+
+    Raises:
+        HTTPException: 401 UNAUTHORIZED si un jeton est fourni mais invalide
+            ou expiré.
+
+    Returns:
+        Optional[UserToken]: L'utilisateur décrit par le jeton, ou None.
+    """
+    if credentials is None:
+        return None
+    return await current_user(credentials)
+
+
+def est_admin(user: Optional[UserToken]) -> bool:
+    """Indique si l'utilisateur authentifié a le rôle administrateur."""
+    return user is not None and roles_cache.nom(user.role_id) == RoleEnum.admin
+
+
+def require_roles(*roles: RoleEnum) -> Callable[..., Awaitable[UserToken]]:
+    """
+    Crée une dépendance réservant un endpoint aux utilisateurs de certains rôles.
+
+    Le rôle est lu dans le jeton (`role_id`) et son nom dans le cache des
+    rôles du worker : la vérification ne fait aucune requête en base.
+
+    Exemple :
+        `@router.post("/", dependencies=[Depends(require_roles(RoleEnum.admin))])`
+
+    Args:
+        *roles (RoleEnum): Les rôles autorisés.
+
+    Returns:
+        Callable[..., Awaitable[UserToken]]: La dépendance, qui renvoie
+        l'utilisateur authentifié.
+    """
+
+    async def verifier_role(user: UserToken = Depends(current_user)) -> UserToken:
+        """
+        Vérifie que l'utilisateur authentifié a l'un des rôles autorisés.
+
+        Raises:
+            HTTPException: 401 UNAUTHORIZED sans jeton valide (voir
+                `current_user`), 403 FORBIDDEN si le rôle n'est pas autorisé.
+
+        Returns:
+            UserToken: L'utilisateur authentifié.
+        """
+        if roles_cache.nom(user.role_id) not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Droits insuffisants",
+            )
+        return user
+
+    return verifier_role
+
+
+def champs_demandes(
+    schema: type[BaseModel],
+) -> Callable[..., Optional[tuple[str, ...]]]:
+    """
+    Crée une dépendance lisant le paramètre `fields` (champs à renvoyer).
+
+    `?fields=id,statut` limite la réponse à ces champs du schéma de lecture ;
+    les fonctions CRUD `*_json` ne lisent alors que les colonnes correspondantes.
+
+    Exemple :
+        `champs: Optional[tuple[str, ...]] = Depends(champs_demandes(ProduitRead))`
+
+    Args:
+        schema (type[BaseModel]): Le schéma de réponse de l'endpoint.
+
+    Returns:
+        Callable[..., Optional[tuple[str, ...]]]: La dépendance, qui renvoie
+        les champs demandés dans l'ordre du schéma, ou None sans paramètre.
+    """
+    possibles = tuple(schema.model_fields)
+
+    def lire_champs(
+        fields: Optional[str] = Query(
+            None,
+            description="Champs à renvoyer, séparés par des virgules, parmi : "
+            + ", ".join(possibles),
+        ),
+    ) -> Optional[tuple[str, ...]]:
+        """
+        Valide les champs demandés contre le schéma.
+
+        Raises:
+            HTTPException: 400 BAD REQUEST si un champ n'existe pas dans le
+                schéma ou si aucun champ n'est demandé.
+
+        Returns:
+            Optional[tuple[str, ...]]: Les champs demandés, ou None.
+        """
+        if fields is None:
+            return None
+        demandes = {nom.strip() for nom in fields.split(",") if nom.strip()}
+        inconnus = sorted(demandes.difference(possibles))
+        if inconnus or not demandes:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Champs inconnus : {', '.join(inconnus) or '(aucun champ)'} "
+                f"(champs possibles : {', '.join(possibles)})",
+            )
+        return tuple(nom for nom in possibles if nom in demandes)
+
+    return lire_champs
+
+
+def ids_demandes(
+    ids: Optional[str] = Query(
+        None,
+        description="IDs à récupérer en une requête, séparés par des virgules "
+        f"({settings.MULTI_GET_IDS_MAX} au plus)",
+    ),
+) -> Optional[list[int]]:
+    """
+    Dépendance lisant le paramètre `ids` des requêtes groupées (`?ids=3,1,2`).
+
+    Raises:
+        HTTPException: 400 BAD REQUEST si un ID n'est pas un entier (ou sort
+            des bornes d'une colonne `integer`), si la liste est vide ou
+            dépasse `MULTI_GET_IDS_MAX`.
+
+    Returns:
+        Optional[list[int]]: Les IDs dans l'ordre demandé (doublons compris),
+        ou None sans paramètre.
+    """
+    if ids is None:
+        return None
+    try:
+        demandes = [int(valeur) for valeur in ids.split(",") if valeur.strip()]
+        if any(not ENTIER_MIN <= demande <= ENTIER_MAX for demande in demandes):
+            raise ValueError
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids : entiers séparés par des virgules attendus",
+        )
+    if not demandes or len(demandes) > settings.MULTI_GET_IDS_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"ids : de 1 à {settings.MULTI_GET_IDS_MAX} IDs attendus",
+        )
+    return demandes
+
+
+def etag_version(version: int) -> str:
+    """Renvoie l'ETag d'une ressource versionnée (commande, produit)."""
+    return f'"{version}"'
+
+
+def version_attendue(
+    if_match: Optional[str] = Header(
+        None, description="ETag de la ressource lue (`*` : toute version)"
+    ),
+) -> Optional[int]:
+    """
+    Dépendance exigeant l'en-tête `If-Match` des modifications de ressources.
+
+    Le client renvoie l'ETag reçu à la lecture : la modification n'est
+    appliquée que si la ressource n'a pas changé depuis. L'ETag faible
+    (`W/"3"`) des réponses compressées est accepté.
+
+    Raises:
+        HTTPException: 428 PRECONDITION REQUIRED sans `If-Match`,
+            412 PRECONDITION FAILED si l'ETag n'est pas une version.
+
+    Returns:
+        Optional[int]: La version attendue, ou None pour `If-Match: *`.
+    """
+    if if_match is None:
+        raise HTTPException(
+            status_code=status.HTTP_428_PRECONDITION_REQUIRED,
+            detail="En-tête If-Match requis (ETag de la ressource)",
+        )
+    valeur = if_match.strip()
+    if valeur == "*":
+        return None
+    try:
+        return int(valeur.removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="ETag inconnu",
+        )
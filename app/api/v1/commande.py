@@ -1,20 +1,38 @@
-from collections.abc import Sequence
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlmodel import Session
 
+from app.api.deps import (
+    champs_demandes,
+    etag_version,
+    ids_demandes,
+    version_attendue,
+)
 from app.crud.commande import (
     create_commande,
     delete_commande,
-    get_commande,
-    get_commandes,
+    get_commande_json,
+    get_commandes_json,
+    get_commandes_par_ids_json,
+    transition_commande,
+    transition_commandes,
     update_commande,
 )
+from app.crud.details import get_chiffre_affaires
 from app.db.session import get_session
 from app.models.commandes_et_produits import Commande, StatusEnum
-from app.schemas.commande import CommandeCreate, CommandeRead, CommandeUpdate
+from app.schemas.commande import (
+    CommandeCreate,
+    CommandeRead,
+    CommandeStatutRead,
+    CommandesTransition,
+    CommandesTransitionRead,
+    CommandeTransition,
+    CommandeUpdate,
+)
+from app.schemas.detail import ChiffreAffairesProduit
 
 # Router FastAPI pour gérer les commandes
 router = APIRouter(prefix="/commandes", tags=["Commandes"])
@@ -32,101 +50,226 @@ def create_commande_endpoint(
         session (Session): Session de base de données.
 
     Raises:
-        HTTPException: En cas d'erreur lors de la création.
+        HTTPException: 400 si un produit n'existe pas, 409 si le stock est
+        insuffisant, 500 en cas d'erreur lors de la création.
 
     Returns:
         Commande: La commande nouvellement créée.
     """
     try:
         return create_commande(session, commande_data)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/transitions", response_model=CommandesTransitionRead)
+def transition_commandes_endpoint(
+    transitions: CommandesTransition, session: Session = Depends(get_session)
+) -> CommandesTransitionRead:
+    """
+    Fait passer un lot de commandes au même statut (une table, des tickets).
+
+    Les transitions permises (en_attente -> en_preparation -> prete ->
+    servie) sont appliquées en une requête ; les commandes dont le statut ne
+    le permet pas sont laissées telles quelles et listées dans `rejetees`.
+    Le changement est signalé par une seule notification pour tout le lot.
+
+    Args:
+        transitions (CommandesTransition): Les IDs des commandes
+            (`MULTI_GET_IDS_MAX` au plus) et le nouveau statut.
+        session (Session): Session de base de données.
+
+    Returns:
+        CommandesTransitionRead: Les IDs passés au nouveau statut et les
+        commandes refusées, avec leur statut (null si elles n'existent pas).
+    """
+    transitionnees, rejetees = transition_commandes(
+        session, transitions.ids, StatusEnum(transitions.statut)
+    )
+    return CommandesTransitionRead(
+        statut=transitions.statut, transitionnees=transitionnees, rejetees=rejetees
+    )
+
+
+@router.get("/chiffre-affaires", response_model=list[ChiffreAffairesProduit])
+def chiffre_affaires_endpoint(
+    debut: Optional[datetime] = None,
+    fin: Optional[datetime] = None,
+    session: Session = Depends(get_session),
+) -> list[ChiffreAffairesProduit]:
+    """
+    Calcule le chiffre d'affaires par produit, au prix figé lors des commandes.
+
+    Args:
+        debut (Optional[datetime]): Date de commande minimale (incluse).
+        fin (Optional[datetime]): Date de commande maximale (exclue).
+        session (Session): Session de base de données.
+
+    Returns:
+        list[ChiffreAffairesProduit]: Quantités vendues et montant par produit.
+    """
+    return get_chiffre_affaires(session, debut, fin)
+
+
 @router.get("/{commande_id}", response_model=CommandeRead)
 def get_commande_endpoint(
-    commande_id: int, session: Session = Depends(get_session)
-) -> Commande:
+    commande_id: int,
+    champs: Optional[tuple[str, ...]] = Depends(champs_demandes(CommandeRead)),
+    session: Session = Depends(get_session),
+) -> Response:
     """
     Récupère une commande par son ID.
 
+    Le JSON est construit par la base (`get_commande_json`), limité aux
+    champs de `?fields=`. L'en-tête `ETag` porte la version de la commande, à
+    renvoyer dans `If-Match` pour la modifier.
+
     Args:
         commande_id (int): ID de la commande.
+        champs (Optional[tuple[str, ...]]): Les champs demandés (`?fields=`).
         session (Session): Session de base de données.
 
     Raises:
-        HTTPException: Si la commande n'existe pas.
+        HTTPException: 400 si un champ demandé n'existe pas, 404 si la
+        commande n'existe pas.
 
     Returns:
-        Commande: La commande trouvée.
+        Response: La commande trouvée.
     """
-    commande = get_commande(session, commande_id)
-    if not commande:
+    commande = get_commande_json(session, commande_id, champs)
+    if commande is None:
         raise HTTPException(status_code=404, detail="Commande non trouvée")
-    return commande
+    contenu, version = commande
+    return Response(
+        content=contenu,
+        media_type="application/json",
+        headers={"ETag": etag_version(version)},
+    )
 
 
-@router.get("/", response_model=list[CommandeRead])
+@router.get("/", response_model=list[Optional[CommandeRead]])
 def list_commandes_endpoint(
     client_id: Optional[int] = None,
     date_commande: Optional[datetime] = None,
     statut: Optional[StatusEnum] = None,
+    ids: Optional[list[int]] = Depends(ids_demandes),
+    champs: Optional[tuple[str, ...]] = Depends(champs_demandes(CommandeRead)),
     session: Session = Depends(get_session),
-) -> Sequence[Commande]:
+) -> Response:
     """
     Récupère la liste des commandes, éventuellement filtrées.
 
+    Le JSON est construit par la base (`get_commandes_json`) et renvoyé tel
+    quel : il respecte le schéma `list[CommandeRead]` sans passer par les
+    modèles, limité aux champs de `?fields=` (`?fields=id,statut,details`).
+    Avec `?ids=3,1,2`, les filtres sont ignorés : les commandes sont renvoyées
+    dans l'ordre demandé, avec `null` pour un ID inexistant.
+
     Args:
         client_id (Optional[int]): Filtre par ID du client.
         date_commande (Optional[datetime]): Filtre par date de commande.
         statut (Optional[StatusEnum]): Filtre par statut.
+        ids (Optional[list[int]]): Les IDs demandés (`?ids=`).
+        champs (Optional[tuple[str, ...]]): Les champs demandés (`?fields=`).
         session (Session): Session de base de données.
 
     Raises:
-        HTTPException: Si aucune commande ne correspond aux filtres.
+        HTTPException: 400 si un champ demandé n'existe pas ou si `ids` est
+        invalide, 404 si aucune commande ne correspond aux filtres.
 
     Returns:
-        Sequence[Commande]: Liste des commandes.
+        Response: Liste des commandes, triées par ID ou dans l'ordre de `ids`.
     """
-    commandes = get_commandes(session, client_id, date_commande, statut)
-    if not commandes:
+    if ids is not None:
+        return Response(
+            content=get_commandes_par_ids_json(session, ids, champs),
+            media_type="application/json",
+        )
+    commandes = get_commandes_json(session, client_id, date_commande, statut, champs)
+    if commandes is None:
         raise HTTPException(
             status_code=404,
             detail="Aucune commande trouvée avec ces conditions",
         )
-    return commandes
+    return Response(content=commandes, media_type="application/json")
 
 
 @router.patch("/{commande_id}", response_model=CommandeRead)
 def update_commande_endpoint(
     commande_id: int,
     commande_update: CommandeUpdate,
+    response: Response,
+    version: Optional[int] = Depends(version_attendue),
     session: Session = Depends(get_session),
 ) -> Commande:
     """
-    Met à jour une commande existante.
+    Met à jour une commande existante, si elle n'a pas changé depuis sa lecture.
+
+    L'en-tête `If-Match` doit porter l'ETag de la commande lue ; la réponse
+    porte l'ETag de la nouvelle version.
 
     Args:
         commande_id (int): ID de la commande à modifier.
         commande_update (CommandeUpdate): Données à mettre à jour.
+        response (Response): Réponse HTTP (en-tête `ETag`).
+        version (Optional[int]): La version attendue (`If-Match`).
         session (Session): Session de base de données.
 
     Raises:
-        HTTPException: Si la commande n'existe pas ou en cas d'erreur.
+        HTTPException: Si la commande n'existe pas ou en cas d'erreur, 412 si
+        elle a été modifiée depuis sa lecture, 428 sans `If-Match`.
 
     Returns:
         Commande: La commande mise à jour.
     """
     try:
-        commande = update_commande(session, commande_id, commande_update)
+        commande = update_commande(session, commande_id, commande_update, version)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
     if not commande:
         raise HTTPException(status_code=404, detail="Commande non trouvée")
+    response.headers["ETag"] = etag_version(commande.version)
     return commande
 
 
+@router.post("/{commande_id}/transition", response_model=CommandeStatutRead)
+def transition_commande_endpoint(
+    commande_id: int,
+    transition: CommandeTransition,
+    response: Response,
+    session: Session = Depends(get_session),
+) -> CommandeStatutRead:
+    """
+    Fait passer une commande au statut suivant.
+
+    Transitions permises : en_attente -> en_preparation -> prete -> servie.
+    Le changement est fait en une requête conditionnelle : de deux
+    transitions simultanées depuis le même statut, une seule réussit. La
+    réponse porte l'ETag de la nouvelle version de la commande.
+
+    Args:
+        commande_id (int): ID de la commande.
+        transition (CommandeTransition): Le nouveau statut.
+        response (Response): Réponse HTTP (en-tête `ETag`).
+        session (Session): Session de base de données.
+
+    Raises:
+        HTTPException: 404 si la commande n'existe pas, 409 si la transition
+        n'est pas permise depuis son statut actuel.
+
+    Returns:
+        CommandeStatutRead: L'ID et le nouveau statut de la commande.
+    """
+    version = transition_commande(session, commande_id, StatusEnum(transition.statut))
+    response.headers["ETag"] = etag_version(version)
+    return CommandeStatutRead(id=commande_id, statut=transition.statut)
+
+
 @router.delete("/{commande_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_commande_endpoint(
     commande_id: int, session: Session = Depends(get_session)
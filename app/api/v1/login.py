@@ -1,43 +1,160 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import jwt
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
 
-from app.core.security import password_checking
-from app.crud.user import get_user_by_email
+from app.core.rate_limit import (
+    Surcharge,
+    consommer_login,
+    retry_after,
+    verifications_login,
+)
+from app.core.security import (
+    REFRESH_TOKEN,
+    create_token_pair,
+    decode_token,
+    password_checking_and_update_async,
+)
+from app.crud.user import get_user_by_email, get_user_by_id, update_password_hash
 from app.db.session import get_session
-from app.schemas.user import UserLogin, UserLoginResponse, UserPublic
+from app.schemas.user import (
+    RefreshRequest,
+    TokenPair,
+    UserLogin,
+    UserLoginResponse,
+    UserPublic,
+    UserToken,
+)
 
 # Router pour les endpoints liés à l'authentification
 router = APIRouter(tags=["Logins"])
 
 
 @router.post("/login", response_model=UserLoginResponse)
-def login(
-    body: UserLogin, session: Session = Depends(get_session)
+async def login(
+    body: UserLogin, request: Request, session: Session = Depends(get_session)
 ) -> UserLoginResponse:
     """
     Authentifie un utilisateur avec son email et mot de passe.
 
+    Les tentatives sont limitées par adresse IP et par email avant toute
+    requête en base ou tout hashage. La vérification bcrypt est déléguée au
+    pool de processus de hashage : une vague de connexions n'occupe ni le
+    threadpool des autres endpoints, ni les connexions du pool de la base
+    pendant le hashage. Au-delà de `LOGIN_VERIFICATIONS_MAX` vérifications
+    en cours, les nouvelles tentatives sont rejetées plutôt que mises en
+    attente. Un hash stocké avec des paramètres obsolètes est recalculé et
+    enregistré au passage.
+
     Args:
         body (UserLogin): Les informations de connexion fournies
         par l'utilisateur (email et mot de passe).
+        request (Request): La requête HTTP, pour l'adresse IP du client.
         session (Session): Session de base de données (injectée par FastAPI).
 
     Raises:
         HTTPException:
             - 400 BAD REQUEST si l'email ou le mot de passe est incorrect.
+            - 429 TOO MANY REQUESTS si l'adresse IP ou l'email a épuisé ses
+              tentatives (en-tête `Retry-After`).
+            - 503 SERVICE UNAVAILABLE si le worker est saturé de
+              vérifications, ou si les seaux partagés restent verrouillés
+              (en-tête `Retry-After`).
 
     Returns:
-        UserLoginResponse: Un message de confirmation
-        et les informations publiques de l'utilisateur.
+        UserLoginResponse: Un message de confirmation, les informations
+        publiques de l'utilisateur et ses jetons d'accès et de rafraîchissement.
     """
-    user = get_user_by_email(session, body.email)
-
-    # Vérification des identifiants
-    if not user or not password_checking(body.mot_de_passe, user.mot_de_passe):
+    surcharge = HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Service surchargé, réessayez",
+        headers={"Retry-After": retry_after(1)},
+    )
+    ip = request.client.host if request.client else "inconnue"
+    try:
+        attente = await run_in_threadpool(consommer_login, ip, body.email)
+    except Surcharge:
+        raise surcharge
+    if attente:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="identifiant errone",
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Trop de tentatives de connexion",
+            headers={"Retry-After": retry_after(attente)},
         )
 
-    # Retourne la réponse avec les infos publiques de l'utilisateur
-    return UserLoginResponse(message="Login OK", user=UserPublic.model_validate(user))
+    erreur = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="identifiant errone",
+    )
+    try:
+        async with verifications_login.place():
+            user = await run_in_threadpool(get_user_by_email, session, body.email)
+            # Rend la connexion au pool avant la vérification, qui peut attendre
+            await run_in_threadpool(session.close)
+
+            # Vérification des identifiants
+            if not user:
+                raise erreur
+            valide, nouveau_hash = await password_checking_and_update_async(
+                body.mot_de_passe, user.mot_de_passe
+            )
+            if not valide:
+                raise erreur
+
+            # Hash obsolète (autre schéma ou autre coût) : remplacé dans la foulée
+            if nouveau_hash and user.id is not None:
+                await run_in_threadpool(
+                    update_password_hash,
+                    session,
+                    user.id,
+                    user.mot_de_passe,
+                    nouveau_hash,
+                )
+    except Surcharge:
+        raise surcharge
+
+    # Retourne la réponse avec les infos publiques de l'utilisateur et ses jetons
+    jetons = create_token_pair(UserToken.model_validate(user, from_attributes=True))
+    return UserLoginResponse(
+        message="Login OK",
+        user=UserPublic.model_validate(user),
+        **jetons.model_dump(),
+    )
+
+
+@router.post("/login/refresh", response_model=TokenPair)
+def refresh(body: RefreshRequest, session: Session = Depends(get_session)) -> TokenPair:
+    """
+    Échange un jeton de rafraîchissement contre une nouvelle paire de jetons.
+
+    L'utilisateur est relu en base : un compte supprimé ne peut plus obtenir
+    de jeton d'accès, et un changement de rôle ou d'email est repris dans les
+    nouveaux jetons.
+
+    Args:
+        body (RefreshRequest): Le jeton de rafraîchissement.
+        session (Session): Session de base de données (injectée par FastAPI).
+
+    Raises:
+        HTTPException:
+            - 401 UNAUTHORIZED si le jeton est invalide, expiré, ou si
+              l'utilisateur n'existe plus.
+
+    Returns:
+        TokenPair: Un nouveau jeton d'accès et un nouveau jeton de
+        rafraîchissement.
+    """
+    erreur = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Jeton invalide ou expiré",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        claims = decode_token(body.refresh_token, REFRESH_TOKEN)
+    except jwt.InvalidTokenError:
+        raise erreur
+
+    user = get_user_by_id(session, claims.id)
+    if not user:
+        raise erreur
+    return create_token_pair(UserToken.model_validate(user, from_attributes=True))
@@ -0,0 +1,121 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.api.deps import require_roles
+from app.core.config import settings
+from app.core.memoire import suivi_memoire
+from app.models.users_et_roles import RoleEnum
+from app.schemas.memoire import ComparaisonRead, InstantaneRead, SuiviMemoireRead
+
+# Router FastAPI du suivi des allocations mémoire du worker, réservé aux admins
+router = APIRouter(
+    prefix="/admin/memoire",
+    tags=["Supervision"],
+    dependencies=[Depends(require_roles(RoleEnum.admin))],
+)
+
+
+@router.get("/suivi", response_model=SuiviMemoireRead)
+def read_suivi_endpoint() -> SuiviMemoireRead:
+    """
+    Renvoie l'état du suivi des allocations du worker.
+
+    Returns:
+        SuiviMemoireRead: Le suivi (actif ou non) et la mémoire suivie.
+    """
+    return suivi_memoire.etat()
+
+
+@router.post("/suivi", response_model=SuiviMemoireRead)
+def start_suivi_endpoint(
+    cadres: int = Query(settings.MEMOIRE_CADRES, ge=1, le=100),
+) -> SuiviMemoireRead:
+    """
+    Démarre le suivi des allocations du worker (sans effet s'il est démarré).
+
+    Args:
+        cadres (int): Le nombre d'appels gardés par allocation.
+
+    Raises:
+        HTTPException: 401 ou 403 si l'utilisateur n'est pas administrateur.
+
+    Returns:
+        SuiviMemoireRead: L'état du suivi.
+    """
+    return suivi_memoire.demarrer(cadres)
+
+
+@router.delete("/suivi", response_model=SuiviMemoireRead)
+def stop_suivi_endpoint() -> SuiviMemoireRead:
+    """
+    Arrête le suivi des allocations et oublie les instantanés.
+
+    Raises:
+        HTTPException: 401 ou 403 si l'utilisateur n'est pas administrateur.
+
+    Returns:
+        SuiviMemoireRead: L'état du suivi.
+    """
+    return suivi_memoire.arreter()
+
+
+@router.post(
+    "/instantanes",
+    response_model=InstantaneRead,
+    status_code=status.HTTP_201_CREATED,
+)
+def create_instantane_endpoint() -> InstantaneRead:
+    """
+    Prend un instantané des allocations suivies.
+
+    Raises:
+        HTTPException: 409 si le suivi n'est pas démarré, 401 ou 403 si
+            l'utilisateur n'est pas administrateur.
+
+    Returns:
+        InstantaneRead: L'instantané (mémoire suivie, RSS du worker).
+    """
+    instantane = suivi_memoire.instantane()
+    if instantane is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Suivi mémoire arrêté"
+        )
+    return instantane
+
+
+@router.get("/instantanes", response_model=list[InstantaneRead])
+def list_instantanes_endpoint() -> list[InstantaneRead]:
+    """
+    Liste les instantanés gardés (`MEMOIRE_INSTANTANES_MAX` derniers).
+
+    Raises:
+        HTTPException: 401 ou 403 si l'utilisateur n'est pas administrateur.
+
+    Returns:
+        list[InstantaneRead]: Les instantanés, du plus ancien au plus récent.
+    """
+    return suivi_memoire.instantanes()
+
+
+@router.get("/comparaison", response_model=ComparaisonRead)
+def read_comparaison_endpoint(
+    avant: int, apres: int, limite: int = Query(20, ge=1, le=500)
+) -> ComparaisonRead:
+    """
+    Compare deux instantanés : croissance par module, par appelant et par site.
+
+    Args:
+        avant (int): L'ID de l'instantané de référence.
+        apres (int): L'ID de l'instantané comparé.
+        limite (int): Le nombre maximal de sites d'allocation rapportés.
+
+    Raises:
+        HTTPException: 404 si un des instantanés n'existe pas (ou plus),
+            401 ou 403 si l'utilisateur n'est pas administrateur.
+
+    Returns:
+        ComparaisonRead: La croissance entre les deux instantanés.
+    """
+    comparaison = suivi_memoire.comparer(avant, apres, limite)
+    if comparaison is None:
+        raise HTTPException(status_code=404, detail="Instantané non trouvé")
+    return comparaison
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from app.core.metriques import exporter_metriques
+
+# Router FastAPI de la supervision (lu par Prometheus, hors documentation)
+router = APIRouter(tags=["Supervision"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics_endpoint() -> Response:
+    """
+    Expose les métriques de l'API au format texte de Prometheus.
+
+    Returns:
+        Response: Les métriques agrégées de tous les workers.
+    """
+    return Response(content=exporter_metriques(), media_type=CONTENT_TYPE_LATEST)
@@ -1,18 +1,42 @@
-from collections.abc import Sequence
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
 from sqlmodel import Session
 
+from app.api.deps import (
+    champs_demandes,
+    etag_version,
+    ids_demandes,
+    require_roles,
+    version_attendue,
+)
+from app.core.config import settings
+from app.crud.disponibilite import get_disponibilites, get_produits_stock_bas
 from app.crud.produit import (
     create_produit,
     delete_produit,
-    get_all_produits,
-    get_produit_by_id,
+    get_produit_json,
+    get_produits_json,
+    get_produits_par_ids_json,
+    import_produits,
     update_produit,
+    update_stocks,
 )
 from app.db.session import get_session
 from app.models.commandes_et_produits import Produit
-from app.schemas.produit import ProduitCreate, ProduitRead, ProduitUpdate
+from app.models.users_et_roles import RoleEnum
+from app.schemas.import_donnees import FormatImport
+from app.schemas.produit import (
+    DisponibilitesRead,
+    ProduitCreate,
+    ProduitImportRapport,
+    ProduitRead,
+    ProduitStockBasRead,
+    ProduitUpdate,
+    StockAjustement,
+    StockRead,
+)
+from app.utils.helpers import lire_lignes
 
 # Router FastAPI pour la gestion des produits
 router = APIRouter(prefix="/produits", tags=["Produits"])
@@ -33,64 +57,222 @@ def create(data: ProduitCreate, session: Session = Depends(get_session)) -> Prod
     return create_produit(session, data)
 
 
-@router.get("/", response_model=list[ProduitRead])
-def read_all(session: Session = Depends(get_session)) -> Sequence[Produit]:
+@router.post(
+    "/import",
+    response_model=ProduitImportRapport,
+    dependencies=[Depends(require_roles(RoleEnum.admin))],
+)
+def import_all(
+    contenu: bytes = Body(..., media_type="text/csv"),
+    format_import: FormatImport = Query(FormatImport.csv, alias="format"),
+    session: Session = Depends(get_session),
+) -> ProduitImportRapport:
     """
-    Récupère tous les produits disponibles.
+    Importe ou met à jour des produits en masse depuis un fichier CSV ou JSON lines.
+
+    Le fichier est envoyé brut dans le corps de la requête. Les produits sont
+    identifiés par leur nom : un nom existant est mis à jour, sinon il est créé.
 
     Args:
+        contenu (bytes): Contenu du fichier (CSV avec en-tête ou JSON lines).
+        format_import (FormatImport): Format du fichier (`?format=csv|jsonl`).
         session (Session): Session de base de données (injectée par FastAPI).
 
+    Raises:
+        HTTPException: 400 si le fichier n'est pas encodé en UTF-8, 401 ou 403
+            si l'utilisateur n'est pas administrateur.
+
     Returns:
-        Sequence[Produit]: Liste des produits.
+        ProduitImportRapport: Insertions, mises à jour et erreurs ligne par ligne.
+    """
+    try:
+        texte = contenu.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Fichier non encodé en UTF-8")
+    return import_produits(session, lire_lignes(texte, format_import))
+
+
+@router.patch("/stock", response_model=list[StockRead])
+def update_stock(
+    ajustements: list[StockAjustement] = Body(
+        ..., min_length=1, max_length=settings.MULTI_GET_IDS_MAX
+    ),
+    session: Session = Depends(get_session),
+) -> list[StockRead]:
     """
-    return get_all_produits(session)
+    Ajuste le stock de plusieurs produits en une seule requête.
+
+    Chaque ajustement est relatif (`"mode": "relatif"`, valeur ajoutée ou retirée,
+    par défaut) ou absolu (`"mode": "absolu"`, stock inventorié). Le lot est
+    appliqué entièrement ou pas du tout, et limité à `MULTI_GET_IDS_MAX`
+    ajustements (422 au-delà).
+
+    Args:
+        ajustements (list[StockAjustement]): Ajustements à appliquer.
+        session (Session): Session de base de données (injectée par FastAPI).
+
+    Raises:
+        HTTPException: 400 si un produit apparaît plusieurs fois, 404 si des
+        produits n'existent pas, 409 si un stock deviendrait négatif.
+
+    Returns:
+        list[StockRead]: Les nouveaux niveaux de stock.
+    """
+    return update_stocks(session, ajustements)
+
+
+@router.get("/", response_model=list[Optional[ProduitRead]])
+def read_all(
+    ids: Optional[list[int]] = Depends(ids_demandes),
+    champs: Optional[tuple[str, ...]] = Depends(champs_demandes(ProduitRead)),
+    session: Session = Depends(get_session),
+) -> Response:
+    """
+    Récupère tous les produits disponibles, ou ceux d'une liste d'IDs.
+
+    Le JSON est construit par la base (`get_produits_json`) et renvoyé tel
+    quel, au format `list[ProduitRead]`, limité aux champs de `?fields=`.
+    Avec `?ids=3,1,2`, les produits sont renvoyés dans l'ordre demandé, avec
+    `null` pour un ID inexistant (`get_produits_par_ids_json`).
+
+    Args:
+        ids (Optional[list[int]]): Les IDs demandés (`?ids=`).
+        champs (Optional[tuple[str, ...]]): Les champs demandés (`?fields=`).
+        session (Session): Session de base de données (injectée par FastAPI).
+
+    Raises:
+        HTTPException: 400 si un champ demandé n'existe pas ou si `ids` est
+        invalide.
+
+    Returns:
+        Response: Liste des produits, triés par ID ou dans l'ordre de `ids`.
+    """
+    if ids is not None:
+        contenu = get_produits_par_ids_json(session, ids, champs)
+    else:
+        contenu = get_produits_json(session, champs)
+    return Response(content=contenu, media_type="application/json")
+
+
+@router.get("/availability", response_model=DisponibilitesRead)
+def read_disponibilites(
+    request: Request, response: Response, session: Session = Depends(get_session)
+) -> DisponibilitesRead | Response:
+    """
+    Récupère la carte compacte des disponibilités des produits.
+
+    Seuls les ID en rupture et en stock bas sont listés : tout autre produit
+    est disponible. La réponse porte un `ETag` et un `Cache-Control` ; un
+    client renvoyant l'ETag dans `If-None-Match` reçoit un 304 sans corps.
+
+    Args:
+        request (Request): Requête HTTP (lecture de `If-None-Match`).
+        response (Response): Réponse HTTP (en-têtes de cache).
+        session (Session): Session de base de données (injectée par FastAPI).
+
+    Returns:
+        DisponibilitesRead | Response: La carte des disponibilités,
+        ou une réponse 304 si elle n'a pas changé.
+    """
+    disponibilites, etag = get_disponibilites(session)
+    en_tetes = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": f"public, max-age={int(settings.DISPONIBILITES_TTL_SECONDES)}",
+    }
+    # Comparaison faible : l'ETag d'une réponse compressée est préfixé de "W/"
+    if request.headers.get("if-none-match", "").removeprefix("W/") == en_tetes["ETag"]:
+        return Response(status_code=304, headers=en_tetes)
+    response.headers.update(en_tetes)
+    return disponibilites
+
+
+@router.get("/low-stock", response_model=list[ProduitStockBasRead])
+def read_stock_bas(
+    threshold: int = Query(settings.STOCK_BAS_SEUIL, ge=0),
+    session: Session = Depends(get_session),
+) -> list[ProduitStockBasRead]:
+    """
+    Récupère les produits dont le stock est inférieur ou égal au seuil.
+
+    Args:
+        threshold (int): Seuil de stock (par défaut `STOCK_BAS_SEUIL`).
+        session (Session): Session de base de données (injectée par FastAPI).
+
+    Returns:
+        list[ProduitStockBasRead]: Les produits en stock bas, du plus bas au
+        plus haut.
+    """
+    return get_produits_stock_bas(session, threshold)
 
 
 @router.get("/{produit_id}", response_model=ProduitRead)
-def read_one(produit_id: int, session: Session = Depends(get_session)) -> Produit:
+def read_one(
+    produit_id: int,
+    champs: Optional[tuple[str, ...]] = Depends(champs_demandes(ProduitRead)),
+    session: Session = Depends(get_session),
+) -> Response:
     """
     Récupère un produit spécifique par son identifiant.
 
+    Le JSON est construit par la base (`get_produit_json`), limité aux champs
+    de `?fields=`. L'en-tête `ETag` porte la version du produit, à renvoyer
+    dans `If-Match` pour le modifier.
+
     Args:
         produit_id (int): Identifiant du produit recherché.
+        champs (Optional[tuple[str, ...]]): Les champs demandés (`?fields=`).
         session (Session): Session de base de données (injectée par FastAPI).
 
     Raises:
-        HTTPException: 404 si le produit n'existe pas.
+        HTTPException: 400 si un champ demandé n'existe pas, 404 si le
+        produit n'existe pas.
 
     Returns:
-        Produit: Le produit correspondant.
+        Response: Le produit correspondant.
     """
-    produit = get_produit_by_id(session, produit_id)
-    if not produit:
+    produit = get_produit_json(session, produit_id, champs)
+    if produit is None:
         raise HTTPException(status_code=404, detail="Produit introuvable")
-    return produit
+    contenu, version = produit
+    return Response(
+        content=contenu,
+        media_type="application/json",
+        headers={"ETag": etag_version(version)},
+    )
 
 
 @router.put("/{produit_id}", response_model=ProduitRead)
 def update(
     produit_id: int,
     data: ProduitUpdate,
+    response: Response,
+    version: Optional[int] = Depends(version_attendue),
     session: Session = Depends(get_session),
 ) -> Produit:
     """
-    Met à jour un produit existant.
+    Met à jour un produit existant, s'il n'a pas changé depuis sa lecture.
+
+    L'en-tête `If-Match` doit porter l'ETag du produit lu ; la réponse porte
+    l'ETag de la nouvelle version.
 
     Args:
         produit_id (int): Identifiant du produit à mettre à jour.
         data (ProduitUpdate): Données mises à jour du produit.
+        response (Response): Réponse HTTP (en-tête `ETag`).
+        version (Optional[int]): La version attendue (`If-Match`).
         session (Session): Session de base de données (injectée par FastAPI).
 
     Raises:
-        HTTPException: 404 si le produit n'existe pas.
+        HTTPException: 404 si le produit n'existe pas, 412 s'il a été modifié
+        depuis sa lecture, 428 sans `If-Match`.
 
     Returns:
         Produit: Le produit mis à jour.
     """
-    produit = update_produit(session, produit_id, data)
+    produit = update_produit(session, produit_id, data, version)
     if not produit:
         raise HTTPException(status_code=404, detail="Produit introuvable")
+    response.headers["ETag"] = etag_version(produit.version)
     return produit
 
 
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import require_roles
+from app.core.profilage import fusionner_fenetres, lire_profil, lister_profils
+from app.models.users_et_roles import RoleEnum
+from app.schemas.profil import ProfilRead
+
+# Router FastAPI des profils de requêtes (`X-Profilage: 1`), réservé aux admins
+router = APIRouter(
+    prefix="/admin/profils",
+    tags=["Supervision"],
+    dependencies=[Depends(require_roles(RoleEnum.admin))],
+)
+
+
+@router.get("/", response_model=list[ProfilRead])
+def list_profils_endpoint() -> list[ProfilRead]:
+    """
+    Liste les profils de requêtes enregistrés.
+
+    Raises:
+        HTTPException: 401 ou 403 si l'utilisateur n'est pas administrateur.
+
+    Returns:
+        list[ProfilRead]: Les profils, du plus récent au plus ancien.
+    """
+    return lister_profils()
+
+
+@router.get("/continu", response_class=PlainTextResponse)
+def read_profil_continu_endpoint(
+    debut: datetime, minutes: int = Query(5, gt=0, le=1440)
+) -> str:
+    """
+    Renvoie le profil continu des workers sur une période, en piles repliées.
+
+    Les fenêtres du profilage continu (`PROFILAGE_CONTINU_HZ`) commençant dans
+    la période sont fusionnées, tous workers confondus ; chaque pile commence
+    par le nom de son thread.
+
+    Args:
+        debut (datetime): Le début de la période (UTC si sans fuseau).
+        minutes (int): La durée de la période.
+
+    Raises:
+        HTTPException: 404 si aucune fenêtre n'a été enregistrée sur la
+            période, 401 ou 403 si l'utilisateur n'est pas administrateur.
+
+    Returns:
+        str: Les piles repliées de la période.
+    """
+    profil = fusionner_fenetres(debut, debut + timedelta(minutes=minutes))
+    if not profil:
+        raise HTTPException(status_code=404, detail="Aucune fenêtre sur la période")
+    return profil
+
+
+@router.get("/{profil_id}", response_class=PlainTextResponse)
+def read_profil_endpoint(profil_id: str) -> str:
+    """
+    Renvoie un profil au format des piles repliées.
+
+    Le texte se lit avec `flamegraph.pl`, speedscope ou tout outil acceptant
+    des lignes `appel;appel;appel nombre`.
+
+    Args:
+        profil_id (str): L'ID du profil (en-tête `X-Profil-Id` de la requête).
+
+    Raises:
+        HTTPException: 404 si le profil n'existe pas (ou a été supprimé),
+            401 ou 403 si l'utilisateur n'est pas administrateur.
+
+    Returns:
+        str: Les piles repliées du profil.
+    """
+    profil = lire_profil(profil_id)
+    if profil is None:
+        raise HTTPException(status_code=404, detail="Profil non trouvé")
+    return profil
@@ -4,6 +4,7 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import Session
 
+from app.api.deps import require_roles
 from app.crud.role import (
     delete_role,
     get_all_roles,
@@ -12,14 +13,19 @@ from app.crud.role import (
     update_role,
 )
 from app.db.session import get_session
-from app.models.users_et_roles import Role
+from app.models.users_et_roles import Role, RoleEnum
 from app.schemas.role import RoleCreate, RoleRead, RoleUpdate
 
 # Router FastAPI pour la gestion des rôles utilisateurs
 router = APIRouter(prefix="/roles", tags=["Roles"])
 
 
-@router.post("/", response_model=RoleRead, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=RoleRead,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(require_roles(RoleEnum.admin))],
+)
 def create_role_endpoint(
     role_data: RoleCreate, session: Session = Depends(get_session)
 ) -> Role:
@@ -30,6 +36,9 @@ def create_role_endpoint(
         role_data (RoleCreate): Données du rôle à créer.
         session (Session): Session de base de données (injectée par FastAPI).
 
+    Raises:
+        HTTPException: 401 ou 403 si l'utilisateur n'est pas administrateur.
+
     Returns:
         Role: Le rôle nouvellement créé.
     """
@@ -71,7 +80,11 @@ def read_role_endpoint(role_id: int, session: Session = Depends(get_session)) ->
     return role
 
 
-@router.put("/{role_id}", response_model=RoleRead)
+@router.put(
+    "/{role_id}",
+    response_model=RoleRead,
+    dependencies=[Depends(require_roles(RoleEnum.admin))],
+)
 def update_role_endpoint(
     role_id: int,
     role_data: RoleUpdate,
@@ -86,7 +99,8 @@ def update_role_endpoint(
         session (Session): Session de base de données (injectée par FastAPI).
 
     Raises:
-        HTTPException: 404 si le rôle n'existe pas.
+        HTTPException: 404 si le rôle n'existe pas, 401 ou 403 si l'utilisateur
+            n'est pas administrateur.
 
     Returns:
         Role: Le rôle mis à jour.
@@ -97,7 +111,11 @@ def update_role_endpoint(
     return updated_role
 
 
-@router.delete("/{role_id}", status_code=status.HTTP_200_OK)
+@router.delete(
+    "/{role_id}",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(require_roles(RoleEnum.admin))],
+)
 def delete_role_endpoint(
     role_id: int, session: Session = Depends(get_session)
 ) -> dict[str, object]:
@@ -112,7 +130,8 @@ def delete_role_endpoint(
         session (Session): Session de base de données (injectée par FastAPI).
 
     Raises:
-        HTTPException: 404 si le rôle n'existe pas.
+        HTTPException: 404 si le rôle n'existe pas, 401 ou 403 si l'utilisateur
+            n'est pas administrateur.
 
     Returns:
         dict[str, object]: Message de confirmation, liste des utilisateurs affectés,
@@ -1,53 +1,230 @@
 from collections.abc import Sequence
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
 
+from app.api.deps import (
+    current_user,
+    current_user_optionnel,
+    est_admin,
+    ids_demandes,
+    require_roles,
+)
+from app.core.config import settings
+from app.core.roles import roles_cache
+from app.core.security import hash_password_async
 from app.crud.user import (
     create_user,
     delete_user,
-    get_all_users,
+    get_user_by_email,
     get_user_by_id,
+    get_users,
+    get_users_par_ids,
+    import_users,
     update_user,
 )
 from app.db.session import get_session
-from app.models.users_et_roles import User
-from app.schemas.user import UserCreate, UserRead, UserUpdate
+from app.models.users_et_roles import RoleEnum, User
+from app.schemas.import_donnees import FormatImport
+from app.schemas.user import (
+    UserCreate,
+    UserImportRapport,
+    UserRead,
+    UserToken,
+    UserUpdate,
+)
+from app.utils.helpers import lire_lignes
 
 # Router FastAPI pour la gestion des utilisateurs
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
+def verifier_role_attribue(user: Optional[UserToken], role_id: Optional[int]) -> None:
+    """
+    Réserve aux administrateurs l'attribution d'un autre rôle que "client".
+
+    Sans cette vérification, un anonyme pourrait s'inscrire avec le rôle
+    administrateur, puis se connecter et recevoir un jeton d'administrateur.
+
+    Args:
+        user (Optional[UserToken]): L'utilisateur authentifié, ou None.
+        role_id (Optional[int]): Le rôle demandé (None : pas de rôle).
+
+    Raises:
+        HTTPException: 403 si le rôle demandé n'est pas "client" et que
+            l'utilisateur n'est pas administrateur.
+    """
+    if role_id is None or est_admin(user):
+        return
+    if roles_cache.nom(role_id) != RoleEnum.client:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Seul un administrateur peut attribuer ce rôle",
+        )
+
+
+def verifier_proprietaire(user: UserToken, user_id: int) -> None:
+    """
+    Réserve la modification d'un compte à son propriétaire et aux administrateurs.
+
+    Args:
+        user (UserToken): L'utilisateur authentifié.
+        user_id (int): L'ID du compte modifié.
+
+    Raises:
+        HTTPException: 403 si l'utilisateur n'est ni le propriétaire du
+            compte ni administrateur.
+    """
+    if user.id != user_id and not est_admin(user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Droits insuffisants"
+        )
+
+
 @router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def create_user_endpoint(
-    user_data: UserCreate, session: Session = Depends(get_session)
+async def create_user_endpoint(
+    user_data: UserCreate,
+    session: Session = Depends(get_session),
+    user: Optional[UserToken] = Depends(current_user_optionnel),
 ) -> User:
     """
     Crée un nouvel utilisateur.
 
+    L'inscription est ouverte à tous, avec le rôle "client" ou sans rôle :
+    les autres rôles ne sont attribués que par un administrateur. Le mot de
+    passe est hashé dans le pool de processus de hashage, une fois vérifié
+    que l'email (quelle que soit sa casse) n'est pas déjà pris.
+
     Args:
         user_data (UserCreate): Données nécessaires à la création d'un utilisateur.
         session (Session): Session de base de données (injectée par FastAPI).
+        user (Optional[UserToken]): L'utilisateur authentifié, s'il y en a un.
+
+    Raises:
+        HTTPException: 409 si l'email est déjà utilisé, 403 si un autre rôle
+            que "client" est demandé sans être administrateur, 401 si le
+            jeton fourni est invalide.
 
     Returns:
         User: L'utilisateur nouvellement créé.
     """
-    return create_user(session, user_data)
+    verifier_role_attribue(user, user_data.role_id)
+    if await run_in_threadpool(get_user_by_email, session, user_data.email):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Email déjà utilisé"
+        )
+    mot_de_passe_hash = await hash_password_async(user_data.mot_de_passe)
+    return await run_in_threadpool(create_user, session, user_data, mot_de_passe_hash)
+
+
+@router.post(
+    "/import",
+    response_model=UserImportRapport,
+    dependencies=[Depends(require_roles(RoleEnum.admin))],
+)
+def import_all(
+    contenu: bytes = Body(..., media_type="text/csv"),
+    format_import: FormatImport = Query(FormatImport.csv, alias="format"),
+    session: Session = Depends(get_session),
+) -> UserImportRapport:
+    """
+    Crée des utilisateurs en masse depuis un fichier CSV ou JSON lines.
+
+    Le fichier est envoyé brut dans le corps de la requête, avec les champs de
+    `UserCreate`. Les mots de passe sont hashés dans un pool réservé aux
+    imports, pour ne pas retarder les connexions, et le fichier est limité à
+    `IMPORT_USERS_LIGNES_MAX` lignes ; au-delà, utiliser la commande
+    `python -m app.db.scripts.import_users`, qui utilise tous les cœurs.
+
+    Args:
+        contenu (bytes): Contenu du fichier (CSV avec en-tête ou JSON lines).
+        format_import (FormatImport): Format du fichier (`?format=csv|jsonl`).
+        session (Session): Session de base de données (injectée par FastAPI).
+
+    Raises:
+        HTTPException: 400 si le fichier n'est pas encodé en UTF-8, 401 ou 403
+            si l'utilisateur n'est pas administrateur, 413 si le fichier
+            dépasse `IMPORT_USERS_LIGNES_MAX` lignes.
+
+    Returns:
+        UserImportRapport: Nombre d'utilisateurs créés et erreurs ligne par ligne.
+    """
+    try:
+        texte = contenu.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Fichier non encodé en UTF-8")
+    lignes = list(lire_lignes(texte, format_import))
+    if len(lignes) > settings.IMPORT_USERS_LIGNES_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Au plus {settings.IMPORT_USERS_LIGNES_MAX} lignes par import ; "
+            "utiliser python -m app.db.scripts.import_users",
+        )
+    return import_users(session, lignes)
 
 
-@router.get("/", response_model=List[UserRead])
-def read_users_endpoint(session: Session = Depends(get_session)) -> Sequence[User]:
+@router.get("/", response_model=List[Optional[UserRead]])
+def read_users_endpoint(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    apres_id: Optional[int] = Query(None, ge=0),
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    role_id: Optional[int] = None,
+    ids: Optional[list[int]] = Depends(ids_demandes),
+    session: Session = Depends(get_session),
+) -> Sequence[Optional[UserRead]]:
     """
-    Récupère la liste de tous les utilisateurs.
+    Récupère une page de l'annuaire des utilisateurs, triée par ID.
+
+    Quand d'autres utilisateurs suivent, l'en-tête `X-Next-Cursor` donne la
+    valeur de `apres_id` à passer pour obtenir la page suivante. Avec
+    `?ids=3,1,2`, la pagination et les filtres sont ignorés : les
+    utilisateurs sont renvoyés dans l'ordre demandé, avec `null` pour un ID
+    inexistant.
 
     Args:
+        response (Response): La réponse HTTP, pour l'en-tête `X-Next-Cursor`.
+        limit (int): Le nombre d'utilisateurs par page (1 à 500, 50 par défaut).
+        apres_id (Optional[int]): L'ID du dernier utilisateur de la page
+            précédente.
+        q (Optional[str]): Le début du nom, du prénom, de l'email ou du
+            téléphone recherché.
+        role_id (Optional[int]): Le rôle des utilisateurs recherchés.
+        ids (Optional[list[int]]): Les IDs demandés (`?ids=`).
         session (Session): Session de base de données (injectée par FastAPI).
 
+    Raises:
+        HTTPException: 400 si `ids` est invalide.
+
     Returns:
-        Sequence[User]: Liste des utilisateurs enregistrés.
+        Sequence[Optional[UserRead]]: Les utilisateurs de la page, ou ceux de
+        `ids`.
     """
-    return get_all_users(session)
+    if ids is not None:
+        return get_users_par_ids(session, ids)
+    users, curseur = get_users(session, limit, apres_id, q, role_id)
+    if curseur is not None:
+        response.headers["X-Next-Cursor"] = str(curseur)
+    return users
+
+
+@router.get("/me", response_model=UserToken)
+async def read_me_endpoint(user: UserToken = Depends(current_user)) -> UserToken:
+    """
+    Renvoie l'utilisateur authentifié par le jeton d'accès.
+
+    Args:
+        user (UserToken): L'utilisateur authentifié (injecté par FastAPI).
+
+    Raises:
+        HTTPException: 401 si le jeton est absent, invalide ou expiré.
+
+    Returns:
+        UserToken: L'identifiant, l'email et le rôle portés par le jeton.
+    """
+    return user
 
 
 @router.get("/{user_id}", response_model=UserRead)
@@ -72,46 +249,72 @@ def read_user_endpoint(user_id: int, session: Session = Depends(get_session)) ->
 
 
 @router.put("/{user_id}", response_model=UserRead)
-def update_user_endpoint(
+async def update_user_endpoint(
     user_id: int,
     user_data: UserUpdate,
     session: Session = Depends(get_session),
+    user: UserToken = Depends(current_user),
 ) -> User:
     """
     Met à jour les informations d'un utilisateur existant.
 
+    Réservé au propriétaire du compte et aux administrateurs ; seul un
+    administrateur peut attribuer un autre rôle que "client". Un nouveau mot
+    de passe éventuel est hashé dans le pool de processus de hashage.
+
     Args:
         user_id (int): Identifiant de l'utilisateur à modifier.
         user_data (UserUpdate): Nouvelles données de l'utilisateur.
         session (Session): Session de base de données (injectée par FastAPI).
+        user (UserToken): L'utilisateur authentifié (injecté par FastAPI).
 
     Raises:
-        HTTPException: 404 si l'utilisateur n'existe pas.
+        HTTPException: 404 si l'utilisateur n'existe pas, 409 si le nouvel
+            email est déjà utilisé, 401 sans jeton valide, 403 sur le compte
+            d'un autre ou pour un rôle réservé aux administrateurs.
 
     Returns:
         User: L'utilisateur mis à jour.
     """
-    updated_user = update_user(session, user_id, user_data)
+    verifier_proprietaire(user, user_id)
+    verifier_role_attribue(user, user_data.role_id)
+    mot_de_passe_hash = (
+        await hash_password_async(user_data.mot_de_passe)
+        if user_data.mot_de_passe
+        else None
+    )
+    updated_user = await run_in_threadpool(
+        update_user, session, user_id, user_data, mot_de_passe_hash
+    )
     if not updated_user:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     return updated_user
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user_endpoint(user_id: int, session: Session = Depends(get_session)) -> None:
+def delete_user_endpoint(
+    user_id: int,
+    session: Session = Depends(get_session),
+    user: UserToken = Depends(current_user),
+) -> None:
     """
     Supprime un utilisateur de la base de données.
 
+    Réservé au propriétaire du compte et aux administrateurs.
+
     Args:
         user_id (int): Identifiant de l'utilisateur à supprimer.
         session (Session): Session de base de données (injectée par FastAPI).
+        user (UserToken): L'utilisateur authentifié (injecté par FastAPI).
 
     Raises:
-        HTTPException: 404 si l'utilisateur n'existe pas.
+        HTTPException: 404 si l'utilisateur n'existe pas, 401 sans jeton
+            valide, 403 sur le compte d'un autre.
 
     Returns:
         None
     """
+    verifier_proprietaire(user, user_id)
     success = delete_user(session, user_id)
     if not success:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
@@ -0,0 +1,93 @@
+"""Calibre le coût bcrypt (`BCRYPT_ROUNDS`) sur la machine courante.
+
+Mesure le temps de hashage pour des coûts croissants et retient le plus élevé
+dont le temps médian reste sous la cible :
+
+    python -m app.core.calibrate_hash --cible-ms 250
+
+La valeur affichée est à reporter dans le `.env` du déploiement. Les hashs
+existants sont recalculés avec le nouveau coût à la connexion suivante de
+chaque utilisateur.
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+
+from app.core.config import settings
+from app.core.security import create_password_context
+
+# Bornes du facteur de coût acceptées par bcrypt
+BCRYPT_ROUNDS_MIN = 4
+BCRYPT_ROUNDS_MAX = 31
+
+
+def mesurer_hash(rounds: int, repetitions: int = 3) -> float:
+    """
+    Mesure le temps médian (en secondes) d'un hash bcrypt à un coût donné.
+
+    Args:
+        rounds (int): Le facteur de coût bcrypt.
+        repetitions (int): Le nombre de hashs mesurés.
+
+    Returns:
+        float: Le temps médian d'un hash.
+    """
+    contexte = create_password_context(["bcrypt"], rounds)
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        contexte.hash("mot-de-passe-de-calibration")
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees)
+
+
+def calibrer(
+    cible: float, mesurer: Callable[[int], float] = mesurer_hash
+) -> tuple[int, float]:
+    """
+    Détermine le coût bcrypt le plus élevé dont le hash tient dans la cible.
+
+    Chaque incrément double le temps de hashage : la mesure s'arrête au premier
+    coût qui dépasse la cible.
+
+    Args:
+        cible (float): Le temps de hashage maximal visé, en secondes.
+        mesurer (Callable[[int], float]): La fonction de mesure d'un coût.
+
+    Returns:
+        tuple[int, float]: Le coût retenu et son temps de hashage mesuré.
+        Si même le coût minimal dépasse la cible, c'est lui qui est renvoyé.
+    """
+    retenu = BCRYPT_ROUNDS_MIN
+    duree_retenue = mesurer(retenu)
+    for rounds in range(BCRYPT_ROUNDS_MIN + 1, BCRYPT_ROUNDS_MAX + 1):
+        duree = mesurer(rounds)
+        if duree > cible:
+            break
+        retenu, duree_retenue = rounds, duree
+    return retenu, duree_retenue
+
+
+def main() -> None:
+    """Point d'entrée de la commande de calibration."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--cible-ms",
+        type=float,
+        default=250.0,
+        help="temps de hashage maximal visé, en millisecondes (défaut : 250)",
+    )
+    args = parser.parse_args()
+
+    rounds, duree = calibrer(args.cible_ms / 1000)
+    print(f"Coût actuel : BCRYPT_ROUNDS={settings.BCRYPT_ROUNDS}")
+    print(
+        f"Coût retenu : {duree * 1000:.0f} ms par hash (cible {args.cible_ms:.0f} ms)"
+    )
+    print(f"BCRYPT_ROUNDS={rounds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import zlib
+from collections.abc import Iterable
+from typing import Optional, Protocol
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# Encodages proposés, par ordre de préférence à qualité égale côté client
+ENCODAGES = ("br", "gzip")
+
+
+class Compresseur(Protocol):
+    """Compression incrémentale d'un corps de réponse."""
+
+    def compresser(self, donnees: bytes) -> bytes:
+        """Compresse un morceau du corps ; peut renvoyer b"" (données en attente)."""
+        ...
+
+    def terminer(self) -> bytes:
+        """Renvoie la fin du flux compressé."""
+        ...
+
+
+class CompresseurGzip:
+    """Compression gzip incrémentale (`zlib` au format gzip)."""
+
+    def __init__(self, niveau: int) -> None:
+        self._flux = zlib.compressobj(niveau, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compresser(self, donnees: bytes) -> bytes:
+        """Compresse un morceau du corps."""
+        return self._flux.compress(donnees)
+
+    def terminer(self) -> bytes:
+        """Renvoie la fin du flux compressé."""
+        return self._flux.flush()
+
+
+class CompresseurBrotli:
+    """Compression brotli incrémentale."""
+
+    def __init__(self, qualite: int) -> None:
+        self._flux = brotli.Compressor(mode=brotli.MODE_TEXT, quality=qualite)
+
+    def compresser(self, donnees: bytes) -> bytes:
+        """Compresse un morceau du corps."""
+        return bytes(self._flux.process(donnees))
+
+    def terminer(self) -> bytes:
+        """Renvoie la fin du flux compressé."""
+        return bytes(self._flux.finish())
+
+
+def creer_compresseur(encodage: str) -> Compresseur:
+    """
+    Crée le compresseur d'un encodage, aux niveaux configurés.
+
+    Args:
+        encodage (str): "br" ou "gzip".
+
+    Returns:
+        Compresseur: Le compresseur (`COMPRESSION_BROTLI_QUALITE` ou
+        `COMPRESSION_GZIP_NIVEAU`).
+    """
+    if encodage == "br":
+        return CompresseurBrotli(settings.COMPRESSION_BROTLI_QUALITE)
+    return CompresseurGzip(settings.COMPRESSION_GZIP_NIVEAU)
+
+
+def choisir_encodage(
+    accept_encoding: Optional[str], disponibles: Iterable[str] = ENCODAGES
+) -> Optional[str]:
+    """
+    Choisit l'encodage d'une réponse selon l'en-tête `Accept-Encoding`.
+
+    Les valeurs `q` sont respectées (`q=0` exclut un encodage) ; `*` accepte
+    les encodages non cités. À qualité égale, l'ordre de `disponibles` décide.
+
+    Args:
+        accept_encoding (Optional[str]): L'en-tête de la requête.
+        disponibles (Iterable[str]): Les encodages possibles, préféré en premier.
+
+    Returns:
+        Optional[str]: L'encodage retenu, ou None pour une réponse non compressée.
+    """
+    if not accept_encoding:
+        return None
+    qualites: dict[str, float] = {}
+    for element in accept_encoding.lower().split(","):
+        nom, _, parametres = element.strip().partition(";")
+        qualite = 1.0
+        parametre = parametres.strip()
+        if parametre.startswith("q="):
+            try:
+                qualite = float(parametre[2:])
+            except ValueError:
+                qualite = 0.0
+        qualites[nom.strip()] = qualite
+    retenu, meilleure = None, 0.0
+    for encodage in disponibles:
+        qualite = qualites.get(encodage, qualites.get("*", 0.0))
+        if qualite > meilleure:
+            retenu, meilleure = encodage, qualite
+    return retenu
+
+
+def _est_json(content_type: str) -> bool:
+    """Indique si un type de contenu est du JSON (`application/json`, `+json`)."""
+    type_mime = content_type.split(";", 1)[0].strip().lower()
+    return type_mime == "application/json" or type_mime.endswith("+json")
+
+
+class CompressionMiddleware:
+    """
+    Compresse les réponses JSON en brotli ou gzip, selon `Accept-Encoding`.
+
+    Seules les réponses JSON d'au moins `COMPRESSION_TAILLE_MIN` octets sont
+    compressées : en deçà, le gain sur le réseau ne compense pas le coût CPU.
+    Les réponses en plusieurs morceaux (streaming) sont compressées au fil de
+    l'eau. Les réponses déjà encodées sont transmises telles quelles.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encodage = choisir_encodage(Headers(scope=scope).get("accept-encoding"))
+        if encodage is None:
+            await self.app(scope, receive, send)
+            return
+        await _ReponseCompressee(self.app, encodage)(scope, receive, send)
+
+
+class _ReponseCompressee:
+    """Compression d'une réponse, décidée à la réception de son début."""
+
+    def __init__(self, app: ASGIApp, encodage: str) -> None:
+        self.app = app
+        self.encodage = encodage
+        self.send: Send
+        self.debut: Optional[Message] = None
+        self.compresseur: Optional[Compresseur] = None
+        self.transmis = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.envoyer)
+
+    async def envoyer(self, message: Message) -> None:
+        """Intercepte les messages de la réponse."""
+        if self.transmis:
+            await self.send(message)
+        elif message["type"] == "http.response.start":
+            entetes = Headers(raw=message["headers"])
+            if "content-encoding" in entetes or not _est_json(
+                entetes.get("content-type", "")
+            ):
+                self.transmis = True
+                await self.send(message)
+            else:
+                # Le corps décidera : en attente du premier morceau
+                self.debut = message
+        elif message["type"] == "http.response.body":
+            await self.envoyer_corps(message)
+        else:
+            await self.send(message)
+
+    async def envoyer_corps(self, message: Message) -> None:
+        """Compresse (ou non) un morceau du corps et l'envoie."""
+        corps: bytes = message.get("body", b"")
+        suite: bool = message.get("more_body", False)
+        if self.compresseur is None:
+            assert self.debut is not None
+            entetes = MutableHeaders(raw=self.debut["headers"])
+            if not suite and len(corps) < settings.COMPRESSION_TAILLE_MIN:
+                # Réponse complète et trop petite : envoyée sans compression
+                entetes.add_vary_header("Accept-Encoding")
+                self.transmis = True
+                await self.send(self.debut)
+                await self.send(message)
+                return
+            self.compresseur = creer_compresseur(self.encodage)
+            entetes["Content-Encoding"] = self.encodage
+            entetes.add_vary_header("Accept-Encoding")
+            if suite:
+                del entetes["Content-Length"]
+                compresse = self.compresseur.compresser(corps)
+            else:
+                compresse = self.compresseur.compresser(corps)
+                compresse += self.compresseur.terminer()
+                entetes["Content-Length"] = str(len(compresse))
+            # Les validateurs portent sur le corps non compressé
+            if "etag" in entetes and not entetes["etag"].startswith("W/"):
+                entetes["ETag"] = "W/" + entetes["etag"]
+            await self.send(self.debut)
+            await self.send(
+                {"type": "http.response.body", "body": compresse, "more_body": suite}
+            )
+            return
+        compresse = self.compresseur.compresser(corps)
+        if not suite:
+            compresse += self.compresseur.terminer()
+        await self.send(
+            {"type": "http.response.body", "body": compresse, "more_body": suite}
+        )
@@ -1,6 +1,21 @@
+import os
+
+from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from sqlalchemy.engine import URL
 
+# Bornes des colonnes `integer` de Postgres (IDs) : une valeur hors bornes
+# fait échouer la requête (`CAST(:ids AS integer[])`)
+ENTIER_MIN = -(2**31)
+ENTIER_MAX = 2**31 - 1
+
+# Taille minimale de la clé de signature des jetons (HS256 : 256 bits)
+SECRET_KEY_TAILLE_MIN = 32
+
+# Clés publiées (anciennes valeurs par défaut, exemples) : quiconque les
+# connaît pourrait signer des jetons d'administrateur
+CLES_PUBLIQUES = {"changer-cette-cle-secrete-en-production", "<secret_key>"}
+
 
 class Settings(BaseSettings):
     POSTGRES_USER: str = "postgres"
@@ -9,6 +24,89 @@ class Settings(BaseSettings):
     POSTGRES_HOST: str = "localhost"
     POSTGRES_PORT: int = 5432
 
+    # Hashage des mots de passe (pool de processus dédié)
+    HASH_PROCESSUS: int = max(1, (os.cpu_count() or 1) // 2)
+    HASH_CONCURRENCE_MAX: int = 64
+    # Imports d'utilisateurs par l'API : pool séparé de celui des connexions et
+    # nombre de lignes borné (au-delà, passer par `app.db.scripts.import_users`)
+    IMPORT_HASH_PROCESSUS: int = 1
+    IMPORT_USERS_LIGNES_MAX: int = 500
+    # Le premier schéma sert aux nouveaux hashs ; les suivants restent vérifiés
+    # et sont migrés vers le premier à la connexion suivante.
+    HASH_SCHEMES: list[str] = ["bcrypt"]
+    # Coût bcrypt, à calibrer avec `python -m app.core.calibrate_hash`
+    BCRYPT_ROUNDS: int = 12
+
+    # Limitation des tentatives de connexion (seaux de jetons). Le backend
+    # "sqlite" partage les seaux entre les workers d'une même machine ;
+    # "memoire" ne convient qu'à un seul worker.
+    RATE_LIMIT_BACKEND: str = "sqlite"
+    RATE_LIMIT_SQLITE_CHEMIN: str = "/tmp/restau_rate_limit.sqlite3"
+    LOGIN_IP_RAFALE: int = 20
+    LOGIN_IP_PAR_MINUTE: float = 20.0
+    LOGIN_EMAIL_RAFALE: int = 5
+    LOGIN_EMAIL_PAR_MINUTE: float = 5.0
+    # Vérifications de mot de passe simultanées avant délestage (503), tous
+    # workers confondus avec le backend "sqlite"
+    LOGIN_VERIFICATIONS_MAX: int = 32
+
+    # Jetons d'authentification signés. La clé n'a pas de valeur par défaut :
+    # le démarrage échoue si elle manque ou est trop courte
+    # (`python -c "import secrets; print(secrets.token_hex(32))"`)
+    SECRET_KEY: str
+    JWT_ALGORITHM: str = "HS256"
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+
+    # Compression des réponses JSON (brotli ou gzip selon le client), à partir
+    # de cette taille en octets
+    COMPRESSION_TAILLE_MIN: int = 1024
+    COMPRESSION_GZIP_NIVEAU: int = 6
+    COMPRESSION_BROTLI_QUALITE: int = 4
+
+    # Nombre maximal d'IDs par requête groupée (`?ids=1,2,3`)
+    MULTI_GET_IDS_MAX: int = 100
+
+    # Disponibilité des produits
+    STOCK_BAS_SEUIL: int = 5
+    DISPONIBILITES_TTL_SECONDES: float = 5.0
+
+    # Traces des requêtes : part des requêtes tracées et destination des
+    # spans ("fichier" JSON lines, "collecteur" OTLP/HTTP local ou "aucun")
+    TRACES_ECHANTILLONNAGE: float = 0.01
+    TRACES_EXPORTEUR: str = "aucun"
+    TRACES_FICHIER: str = "/tmp/restau_traces.jsonl"
+    TRACES_COLLECTEUR_URL: str = "http://127.0.0.1:4318/v1/traces"
+
+    # Profilage à la demande des requêtes d'administrateurs (`X-Profilage: 1`) :
+    # sans PROFILAGE_ACTIF, l'en-tête est ignoré et rien n'est installé
+    PROFILAGE_ACTIF: bool = False
+    PROFILAGE_INTERVALLE_SECONDES: float = 0.001
+    PROFILAGE_DOSSIER: str = "/tmp/restau_profils"
+    PROFILAGE_PROFILS_MAX: int = 50
+    # Profilage continu de chaque worker (0 : désactivé ; 100 Hz au plus,
+    # voir `benchmarks/bench_profilage.py`), par fenêtres gardées un jour
+    PROFILAGE_CONTINU_HZ: float = 0.0
+    PROFILAGE_CONTINU_FENETRE_SECONDES: int = 60
+    PROFILAGE_CONTINU_FENETRES_MAX: int = 1440
+    PROFILAGE_CONTINU_DOSSIER: str = "/tmp/restau_profils_continus"
+
+    # Suivi des allocations mémoire (`/admin/memoire`) : appels gardés par
+    # allocation et instantanés gardés en mémoire
+    MEMOIRE_CADRES: int = 10
+    MEMOIRE_INSTANTANES_MAX: int = 5
+
+    @field_validator("SECRET_KEY")
+    @classmethod
+    def verifier_secret_key(cls, valeur: str) -> str:
+        """Refuse une clé de signature trop courte ou publiée."""
+        if valeur in CLES_PUBLIQUES or len(valeur.encode()) < SECRET_KEY_TAILLE_MIN:
+            raise ValueError(
+                f"SECRET_KEY : clé secrète de {SECRET_KEY_TAILLE_MIN} octets au "
+                "moins attendue (valeur d'exemple ou trop courte)"
+            )
+        return valeur
+
     @property
     def DATABASE_URL(self) -> URL:
         return URL.create(
@@ -23,4 +121,5 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env")
 
 
-settings = Settings()
+# SECRET_KEY est lue dans l'environnement ou le `.env`
+settings = Settings()  # type: ignore[call-arg]
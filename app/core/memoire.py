@@ -0,0 +1,248 @@
+"""Suivi des allocations mémoire d'un worker (tracemalloc), pour les fuites.
+
+Le suivi est démarré, photographié et comparé à la demande
+(`/admin/memoire`) : entre deux instantanés, la croissance est rapportée par
+module du site d'allocation (`app.crud`, `app.schemas`, `sqlalchemy`,
+`pydantic`...), par module de l'application à l'origine de l'appel (une
+liste de lignes allouée par sqlalchemy pour `app.crud.produit`) et par site.
+
+tracemalloc ralentit chaque allocation : le suivi est arrêté par défaut, et
+ne concerne que le worker qui reçoit la requête (à lancer avec un seul
+worker, ou sur un worker isolé).
+"""
+
+import gc
+import os
+import sysconfig
+import threading
+import tracemalloc
+from collections import OrderedDict
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+from app.schemas.memoire import (
+    AllocationsModule,
+    ComparaisonRead,
+    InstantaneRead,
+    SiteAllocation,
+    SuiviMemoireRead,
+)
+
+# Racine du projet : les fichiers qui s'y trouvent sont nommés par leur
+# module (`app.crud.produit`), regroupés par paquet (`app.crud`)
+_RACINE = Path(__file__).resolve().parents[2]
+_STDLIB = Path(sysconfig.get_paths()["stdlib"])
+
+# Module des allocations faites hors de l'application
+HORS_APP = "<hors app>"
+
+# Allocations du suivi lui-même, exclues des instantanés
+_FILTRES = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def _module(fichier: str) -> tuple[str, str]:
+    """
+    Renvoie le module d'un fichier source et son chemin court.
+
+    Args:
+        fichier (str): Le chemin du fichier (frame de tracemalloc).
+
+    Returns:
+        tuple[str, str]: Le paquet (`app.crud`, `sqlalchemy`, `<stdlib>`...)
+        et le module pointé (`app.crud.produit`, `sqlalchemy/orm/loading.py`).
+    """
+    chemin = Path(fichier)
+    for dossier in ("site-packages", "dist-packages"):
+        if dossier in chemin.parts:
+            relatif = chemin.parts[chemin.parts.index(dossier) + 1 :]
+            return relatif[0].removesuffix(".py"), "/".join(relatif)
+    if chemin.is_relative_to(_RACINE):
+        parties = chemin.relative_to(_RACINE).with_suffix("").parts
+        return ".".join(parties[:2]), ".".join(parties)
+    if chemin.is_relative_to(_STDLIB):
+        return "<stdlib>", str(chemin.relative_to(_STDLIB))
+    return "<autre>", fichier
+
+
+def rss_processus() -> Optional[int]:
+    """Renvoie la mémoire résidente du processus (octets), None hors Linux."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _regrouper(lignes: Iterable[tuple[str, int, int, int]]) -> list[AllocationsModule]:
+    """Additionne des lignes (module, taille, diff, blocs) ; croissance d'abord."""
+    groupes: dict[str, AllocationsModule] = {}
+    for module, taille, taille_diff, blocs_diff in lignes:
+        groupe = groupes.setdefault(
+            module,
+            AllocationsModule(module=module, taille=0, taille_diff=0, blocs_diff=0),
+        )
+        groupe.taille += taille
+        groupe.taille_diff += taille_diff
+        groupe.blocs_diff += blocs_diff
+    return sorted(groupes.values(), key=lambda g: g.taille_diff, reverse=True)
+
+
+class SuiviMemoire:
+    """
+    Suivi tracemalloc du worker et ses derniers instantanés.
+
+    Seuls les `MEMOIRE_INSTANTANES_MAX` derniers instantanés sont gardés :
+    chacun conserve une copie de toutes les allocations suivies.
+    """
+
+    def __init__(self) -> None:
+        self._instantanes: OrderedDict[
+            int, tuple[InstantaneRead, tracemalloc.Snapshot]
+        ] = OrderedDict()
+        self._dernier_id = 0
+        self._verrou = threading.Lock()
+
+    def etat(self) -> SuiviMemoireRead:
+        """Renvoie l'état du suivi et la mémoire suivie (octets)."""
+        actuelle, pic = tracemalloc.get_traced_memory()
+        return SuiviMemoireRead(
+            actif=tracemalloc.is_tracing(),
+            cadres=tracemalloc.get_traceback_limit(),
+            memoire_tracee=actuelle,
+            pic=pic,
+        )
+
+    def demarrer(self, cadres: int) -> SuiviMemoireRead:
+        """
+        Démarre le suivi des allocations, s'il ne l'est pas déjà.
+
+        Args:
+            cadres (int): Le nombre d'appels gardés par allocation (plus il
+                est grand, mieux l'appelant est retrouvé, plus le suivi coûte).
+
+        Returns:
+            SuiviMemoireRead: L'état du suivi.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(cadres)
+        return self.etat()
+
+    def arreter(self) -> SuiviMemoireRead:
+        """Arrête le suivi et oublie les instantanés."""
+        with self._verrou:
+            self._instantanes.clear()
+        tracemalloc.stop()
+        return self.etat()
+
+    def instantane(self) -> Optional[InstantaneRead]:
+        """
+        Prend un instantané des allocations suivies.
+
+        Un passage du ramasse-miettes le précède : seuls les objets encore
+        référencés y figurent.
+
+        Returns:
+            Optional[InstantaneRead]: L'instantané, ou None si le suivi n'est
+            pas démarré.
+        """
+        if not tracemalloc.is_tracing():
+            return None
+        gc.collect()
+        cliche = tracemalloc.take_snapshot().filter_traces(_FILTRES)
+        statistiques = cliche.statistics("filename")
+        with self._verrou:
+            self._dernier_id += 1
+            infos = InstantaneRead(
+                id=self._dernier_id,
+                date=datetime.now(timezone.utc),
+                memoire_tracee=sum(s.size for s in statistiques),
+                blocs=sum(s.count for s in statistiques),
+                rss=rss_processus(),
+            )
+            self._instantanes[infos.id] = (infos, cliche)
+            while len(self._instantanes) > settings.MEMOIRE_INSTANTANES_MAX:
+                self._instantanes.popitem(last=False)
+        return infos
+
+    def instantanes(self) -> list[InstantaneRead]:
+        """Renvoie les instantanés gardés, du plus ancien au plus récent."""
+        with self._verrou:
+            return [infos for infos, _ in self._instantanes.values()]
+
+    def comparer(
+        self, avant_id: int, apres_id: int, limite: int
+    ) -> Optional[ComparaisonRead]:
+        """
+        Compare deux instantanés : croissance par module, par appelant et par site.
+
+        Le site d'une allocation est la ligne qui l'a faite ; son appelant est
+        la dernière ligne de l'application dans la pile (`app.crud.produit:215`),
+        retrouvée si le suivi garde assez de cadres.
+
+        Args:
+            avant_id (int): L'ID de l'instantané de référence.
+            apres_id (int): L'ID de l'instantané comparé.
+            limite (int): Le nombre maximal de sites rapportés.
+
+        Returns:
+            Optional[ComparaisonRead]: La comparaison, triée par croissance,
+            ou None si un des instantanés n'existe pas (ou plus).
+        """
+        with self._verrou:
+            avant = self._instantanes.get(avant_id)
+            apres = self._instantanes.get(apres_id)
+        if avant is None or apres is None:
+            return None
+        sites: dict[tuple[str, Optional[str]], SiteAllocation] = {}
+        for diff in apres[1].compare_to(avant[1], "traceback"):
+            cadres = list(diff.traceback)
+            module, court = _module(cadres[-1].filename)
+            appelant = None
+            for cadre in reversed(cadres):
+                module_cadre, court_cadre = _module(cadre.filename)
+                if module_cadre.startswith("app."):
+                    appelant = f"{court_cadre}:{cadre.lineno}"
+                    break
+            site = f"{court}:{cadres[-1].lineno}"
+            allocation = sites.setdefault(
+                (site, appelant),
+                SiteAllocation(
+                    module=module,
+                    site=site,
+                    appelant=appelant,
+                    taille=0,
+                    taille_diff=0,
+                    blocs_diff=0,
+                ),
+            )
+            allocation.taille += diff.size
+            allocation.taille_diff += diff.size_diff
+            allocation.blocs_diff += diff.count_diff
+        par_site = sorted(sites.values(), key=lambda s: s.taille_diff, reverse=True)
+        return ComparaisonRead(
+            avant=avant[0],
+            apres=apres[0],
+            par_module=_regrouper(
+                (s.module, s.taille, s.taille_diff, s.blocs_diff) for s in par_site
+            ),
+            par_appelant=_regrouper(
+                (
+                    HORS_APP if s.appelant is None else s.appelant.split(":")[0],
+                    s.taille,
+                    s.taille_diff,
+                    s.blocs_diff,
+                )
+                for s in par_site
+            ),
+            sites=par_site[:limite],
+        )
+
+
+# Suivi mémoire du worker
+suivi_memoire = SuiviMemoire()
@@ -0,0 +1,208 @@
+"""Métriques de l'API au format Prometheus, exposées sur `/metrics`.
+
+- Durée des requêtes HTTP par méthode, modèle de route et statut, et requêtes
+  en cours par méthode (`MetriquesMiddleware`).
+- Connexions empruntées au pool, nombre et durée des requêtes SQL par route
+  (`instrumenter_engine`).
+- Accès aux caches en mémoire, trouvés ou non (`compter_cache`).
+
+Avec plusieurs workers uvicorn, chaque processus écrit ses valeurs dans le
+dossier désigné par la variable d'environnement `PROMETHEUS_MULTIPROC_DIR`
+(à vider au démarrage du serveur) : `/metrics` les agrège, quel que soit le
+worker qui répond. Sans cette variable, seul le worker courant est exposé.
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import Engine, event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Dossier des valeurs partagées entre workers (convention de prometheus_client)
+_DOSSIER_MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR"
+
+# Route d'une requête ne correspondant à aucune route : le chemin brut n'est
+# pas utilisé comme label (une série par URL inconnue)
+ROUTE_INCONNUE = "<inconnue>"
+
+# Route des requêtes SQL exécutées hors requête HTTP (threads, scripts)
+ROUTE_AUCUNE = "<aucune>"
+
+# Noms des métriques et labels en anglais, comme les tableaux de bord usuels
+DUREE_REQUETES = Histogram(
+    "http_request_duration_seconds",
+    "Durée des requêtes HTTP",
+    ["method", "route", "status"],
+)
+REQUETES_EN_COURS = Gauge(
+    "http_requests_in_progress",
+    "Requêtes HTTP en cours de traitement",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+CONNEXIONS_EMPRUNTEES = Gauge(
+    "db_pool_connections_checked_out",
+    "Connexions du pool empruntées par les requêtes",
+    multiprocess_mode="livesum",
+)
+DUREE_REQUETES_SQL = Histogram(
+    "db_query_duration_seconds",
+    "Durée des requêtes SQL, par route HTTP",
+    ["route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+ACCES_CACHE = Counter(
+    "cache_requests_total",
+    "Accès aux caches en mémoire (result : hit ou miss)",
+    ["cache", "result"],
+)
+
+# Scope ASGI de la requête en cours, pour attribuer les requêtes SQL à sa route
+_scope_courant: ContextVar[Optional[Scope]] = ContextVar("scope_courant", default=None)
+
+
+def compter_cache(cache: str, trouve: bool) -> None:
+    """
+    Compte un accès à un cache en mémoire.
+
+    Args:
+        cache (str): Le nom du cache ("roles", "disponibilites"...).
+        trouve (bool): True si la valeur a été servie par le cache.
+    """
+    ACCES_CACHE.labels(cache, "hit" if trouve else "miss").inc()
+
+
+def modele_route(scope: Scope, root_path: str = "") -> str:
+    """
+    Renvoie le modèle de chemin de la route d'une requête (`/commandes/{commande_id}`).
+
+    La route est celle notée dans le scope par le routeur de FastAPI : à
+    appeler une fois la requête routée (dans ou après l'endpoint).
+
+    Args:
+        scope (Scope): Le scope ASGI de la requête.
+        root_path (str): Le `root_path` du scope avant le routage.
+
+    Returns:
+        str: Le chemin de la route, le préfixe d'un montage (`/static`), ou
+        `ROUTE_INCONNUE` si aucune route ne correspond.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return str(route.path)
+    # Un montage (`app.mount`) ne note que son préfixe, dans `root_path`
+    prefixe: str = scope.get("root_path", "")
+    if prefixe != root_path:
+        return prefixe.removeprefix(root_path)
+    return ROUTE_INCONNUE
+
+
+class MetriquesMiddleware:
+    """
+    Mesure la durée des requêtes HTTP par route et le nombre de requêtes en cours.
+
+    La route n'est pas recherchée par le middleware (parcours de toutes les
+    routes à chaque requête) : elle est lue dans le scope, une fois la requête
+    routée. Le scope est aussi noté pour la durée de la requête (variable de
+    contexte) : les requêtes SQL exécutées lui sont attribuées.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        methode = scope["method"]
+        root_path = scope.get("root_path", "")
+        statut = 500
+
+        async def envoyer(message: Message) -> None:
+            nonlocal statut
+            if message["type"] == "http.response.start":
+                statut = message["status"]
+            await send(message)
+
+        en_cours = REQUETES_EN_COURS.labels(methode)
+        en_cours.inc()
+        jeton = _scope_courant.set(scope)
+        debut = time.perf_counter()
+        try:
+            await self.app(scope, receive, envoyer)
+        finally:
+            duree = time.perf_counter() - debut
+            route = modele_route(scope, root_path)
+            DUREE_REQUETES.labels(methode, route, str(statut)).observe(duree)
+            _scope_courant.reset(jeton)
+            en_cours.dec()
+
+
+def instrumenter_engine(engine: Engine) -> None:
+    """
+    Mesure les connexions empruntées au pool et les requêtes SQL d'un engine.
+
+    Args:
+        engine (Engine): L'engine de l'application.
+    """
+
+    @event.listens_for(engine, "checkout")
+    def _emprunt(*_: Any) -> None:
+        CONNEXIONS_EMPRUNTEES.inc()
+
+    # Une connexion détachée (écoute LISTEN) ne revient jamais au pool
+    @event.listens_for(engine, "checkin")
+    @event.listens_for(engine, "detach")
+    def _retour(*_: Any) -> None:
+        CONNEXIONS_EMPRUNTEES.dec()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _avant(connexion: Any, *_: Any) -> None:
+        connexion.info.setdefault("debuts_requetes", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _apres(connexion: Any, *_: Any) -> None:
+        duree = time.perf_counter() - connexion.info["debuts_requetes"].pop()
+        scope = _scope_courant.get()
+        route = ROUTE_AUCUNE if scope is None else modele_route(scope)
+        DUREE_REQUETES_SQL.labels(route).observe(duree)
+
+    @event.listens_for(engine, "handle_error")
+    def _erreur(contexte: Any) -> None:
+        # Requête en échec : pas de `after_cursor_execute`
+        if contexte.connection is not None:
+            debuts = contexte.connection.info.get("debuts_requetes")
+            if debuts:
+                debuts.pop()
+
+
+def exporter_metriques() -> bytes:
+    """
+    Renvoie les métriques au format texte de Prometheus.
+
+    Returns:
+        bytes: Les métriques de tous les workers (`PROMETHEUS_MULTIPROC_DIR`),
+        ou du seul worker courant sans dossier partagé.
+    """
+    if _DOSSIER_MULTIPROCESS not in os.environ:
+        return generate_latest(REGISTRY)
+    registre = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registre)  # type: ignore[no-untyped-call]
+    return generate_latest(registre)
+
+
+def arreter_worker() -> None:
+    """Retire les jauges du worker qui s'arrête des valeurs agrégées."""
+    if _DOSSIER_MULTIPROCESS in os.environ:
+        multiprocess.mark_process_dead(os.getpid())  # type: ignore[no-untyped-call]
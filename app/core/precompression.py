@@ -0,0 +1,83 @@
+"""Précompression des fichiers statiques, à l'étape de build de l'image.
+
+    python -m app.core.precompression static
+
+Chaque fichier compressible reçoit une copie `.br` et `.gz` à côté de
+l'original, servie par `app.core.static_files.StaticPrecompresses`. Le module
+ne lit pas la configuration (`settings`) : il s'exécute sans `.env` ni
+`SECRET_KEY`, comme dans `app/Dockerfile.api`.
+"""
+
+import argparse
+import gzip
+from pathlib import Path
+
+import brotli
+
+# Extension des copies précompressées, par encodage
+EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+# Formats déjà compressés : les recompresser ne réduit pas leur taille
+_DEJA_COMPRESSES = {
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".webp",
+    ".avif",
+    ".woff",
+    ".woff2",
+    ".gz",
+    ".br",
+    ".zip",
+}
+
+# Une copie compressée n'est gardée que si elle économise au moins 10 %
+_GAIN_MIN = 0.9
+
+
+def precompresser(dossier: Path) -> list[Path]:
+    """
+    Écrit les copies `.br` (qualité 11) et `.gz` (niveau 9) des fichiers statiques.
+
+    Les formats déjà compressés (images, polices...) et les fichiers dont la
+    compression ne fait pas gagner au moins 10 % sont ignorés ; une copie
+    obsolète d'un tel fichier est supprimée.
+
+    Args:
+        dossier (Path): Le dossier des fichiers statiques.
+
+    Returns:
+        list[Path]: Les copies compressées écrites.
+    """
+    ecrites = []
+    for chemin in sorted(dossier.rglob("*")):
+        if not chemin.is_file() or chemin.suffix.lower() in _DEJA_COMPRESSES:
+            continue
+        contenu = chemin.read_bytes()
+        copies = {
+            "br": bytes(brotli.compress(contenu, quality=11)),
+            "gzip": gzip.compress(contenu, compresslevel=9, mtime=0),
+        }
+        for encodage, compresse in copies.items():
+            copie = chemin.with_name(chemin.name + EXTENSIONS[encodage])
+            if len(compresse) <= len(contenu) * _GAIN_MIN:
+                copie.write_bytes(compresse)
+                ecrites.append(copie)
+            else:
+                copie.unlink(missing_ok=True)
+    return ecrites
+
+
+def main() -> None:
+    """Point d'entrée de la précompression des fichiers statiques."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dossier", type=Path, nargs="?", default=Path("static"))
+    args = parser.parse_args()
+
+    for copie in precompresser(args.dossier):
+        print(f"{copie} : {copie.stat().st_size} octets")
+
+
+if __name__ == "__main__":
+    main()
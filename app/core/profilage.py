@@ -0,0 +1,494 @@
+"""Profilage à la demande d'une requête, par échantillonnage des piles d'appels.
+
+Avec `PROFILAGE_ACTIF`, une requête d'administrateur portant l'en-tête
+`X-Profilage: 1` est exécutée sous un profileur statistique : un thread
+relève toutes les `PROFILAGE_INTERVALLE_SECONDES` la pile des threads qui
+travaillent pour elle, c'est-à-dire la boucle d'événements quand elle exécute
+la tâche de la requête, et les threads du pool d'anyio (endpoints et
+dépendances synchrones de FastAPI) marqués par `suivre_threads`. Les tâches
+filles créées par la requête ne sont pas suivies.
+Le profil est enregistré dans `PROFILAGE_DOSSIER` au format des piles
+repliées (`flamegraph.pl`, speedscope), sous l'ID renvoyé dans l'en-tête
+`X-Profil-Id` ; seuls les `PROFILAGE_PROFILS_MAX` derniers sont gardés.
+
+Sans `PROFILAGE_ACTIF`, le middleware n'est pas installé : aucun coût.
+
+Avec `PROFILAGE_CONTINU_HZ`, chaque worker relève aussi en continu les piles
+de tous ses threads (`EchantillonneurContinu`), comptées par fenêtre de
+`PROFILAGE_CONTINU_FENETRE_SECONDES` et écrites dans
+`PROFILAGE_CONTINU_DOSSIER` : les blocages intermittents restent visibles
+après coup, pour n'importe quelle période (`fusionner_fenetres`).
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Callable
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from types import FrameType
+from typing import Any, Optional, TypeVar
+
+import anyio
+import anyio.to_thread
+import jwt
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metriques import modele_route
+from app.core.roles import roles_cache
+from app.core.security import ACCESS_TOKEN, decode_token
+from app.models.users_et_roles import RoleEnum
+from app.schemas.profil import ProfilRead
+
+# En-têtes de déclenchement et de l'ID du profil enregistré
+ENTETE_PROFILAGE = "x-profilage"
+ENTETE_PROFIL_ID = "x-profil-id"
+
+# Format des ID de profils (et de leurs noms de fichiers)
+_FORMAT_ID = re.compile(r"[0-9a-f]{32}")
+
+T = TypeVar("T")
+
+
+class Profil:
+    """Les piles relevées pendant une requête, comptées par pile repliée."""
+
+    def __init__(self) -> None:
+        self.id = uuid.uuid4().hex
+        self.piles: Counter[str] = Counter()
+        self.echantillons = 0
+
+    def repliees(self) -> str:
+        """Renvoie le profil au format des piles repliées."""
+        return repliees(self.piles)
+
+
+def repliees(piles: Counter[str]) -> str:
+    """Renvoie des piles comptées au format des piles repliées (`pile compte`)."""
+    return "".join(f"{pile} {n}\n" for pile, n in piles.most_common())
+
+
+# Profil de la requête en cours, hérité par les threads qui travaillent pour elle
+_profil_courant: ContextVar[Optional[Profil]] = ContextVar(
+    "profil_courant", default=None
+)
+
+# Profils des requêtes en cours, par tâche de la boucle d'événements et par
+# ident des threads du pool qui travaillent pour elles : l'échantillonneur,
+# dans son propre thread, ne peut pas lire leurs contextes
+_profils_des_taches: dict["asyncio.Task[Any]", Profil] = {}
+_profils_des_threads: dict[int, Profil] = {}
+
+# `anyio.to_thread.run_sync` d'origine, avant `suivre_threads`
+_run_sync = anyio.to_thread.run_sync
+
+
+def _dans_thread(func: Callable[..., T], *args: Any) -> T:
+    """Exécute `func` en marquant le thread du profil de la requête appelante."""
+    profil = _profil_courant.get()
+    if profil is None:
+        return func(*args)
+    ident = threading.get_ident()
+    _profils_des_threads[ident] = profil
+    try:
+        return func(*args)
+    finally:
+        del _profils_des_threads[ident]
+
+
+async def _run_sync_suivi(func: Callable[..., T], *args: Any, **options: Any) -> T:
+    """`anyio.to_thread.run_sync`, le thread étant marqué pendant l'appel."""
+    return await _run_sync(partial(_dans_thread, func), *args, **options)
+
+
+def suivre_threads() -> None:
+    """
+    Marque les threads du pool d'anyio qui travaillent pour une requête profilée.
+
+    Starlette et FastAPI exécutent les endpoints et dépendances synchrones
+    par `anyio.to_thread.run_sync`, remplacée ici par une version qui
+    enregistre le profil de l'appelant (`_profil_courant`, hérité par le
+    thread) le temps de l'appel.
+    """
+    anyio.to_thread.run_sync = _run_sync_suivi  # type: ignore[assignment]
+
+
+def appels_du_profil(frame: FrameType) -> list[str]:
+    """
+    Renvoie les appels d'une pile faits pour la requête profilée.
+
+    Les appels sont ceux qui suivent le middleware de profilage (boucle
+    d'événements) ou le marquage du thread (`_dans_thread`) ; toute la pile
+    si elle n'en contient aucun.
+
+    Args:
+        frame (FrameType): La frame la plus récente d'un thread.
+
+    Returns:
+        list[str]: Les appels, du plus ancien au plus récent (`module:fonction`).
+    """
+    appels: list[str] = []
+    courante: Optional[FrameType] = frame
+    while courante is not None and courante.f_code not in _DEBUTS_DE_PILE:
+        appels.append(_appel(courante))
+        courante = courante.f_back
+    appels.reverse()
+    return appels
+
+
+def _appel(frame: FrameType) -> str:
+    """Renvoie le nom d'un appel dans une pile repliée (`module:fonction`)."""
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+
+
+class Echantillonneur:
+    """
+    Thread relevant périodiquement les piles des threads travaillant pour un profil.
+
+    Une pile est retenue si son thread travaille pour le profil : la boucle
+    d'événements quand elle exécute la tâche de la requête, ou un thread du
+    pool marqué pour elle. Les autres requêtes servies en même temps n'y
+    figurent pas. L'échantillonneur est créé dans la boucle d'événements.
+    """
+
+    def __init__(self, profil: Profil, intervalle: float) -> None:
+        self.profil = profil
+        self.intervalle = intervalle
+        self._boucle = asyncio.get_running_loop()
+        self._thread_boucle = threading.get_ident()
+        self._arret = threading.Event()
+        self._thread = threading.Thread(
+            target=self._echantillonner, name="profilage", daemon=True
+        )
+
+    def __enter__(self) -> "Echantillonneur":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self._arret.set()
+        self._thread.join()
+
+    def _echantillonner(self) -> None:
+        """Boucle du thread d'échantillonnage."""
+        moi = threading.get_ident()
+        while not self._arret.wait(self.intervalle):
+            tache = asyncio.current_task(self._boucle)
+            for ident, frame in sys._current_frames().items():
+                if ident == moi:
+                    continue
+                if ident == self._thread_boucle:
+                    profil = None if tache is None else _profils_des_taches.get(tache)
+                else:
+                    profil = _profils_des_threads.get(ident)
+                if profil is not self.profil:
+                    continue
+                self.profil.piles[";".join(appels_du_profil(frame))] += 1
+                self.profil.echantillons += 1
+
+
+async def _demande_par_un_admin(scope: Scope) -> bool:
+    """
+    Indique si la requête demande le profilage, avec un jeton d'administrateur.
+
+    Le rôle est lu hors de la boucle d'événements : le premier appel au cache
+    des rôles peut charger la table.
+    """
+    entetes = Headers(scope=scope)
+    if entetes.get(ENTETE_PROFILAGE) != "1":
+        return False
+    schema, _, jeton = entetes.get("authorization", "").partition(" ")
+    if schema.lower() != "bearer":
+        return False
+    try:
+        user = decode_token(jeton, ACCESS_TOKEN)
+    except jwt.InvalidTokenError:
+        return False
+    role = await anyio.to_thread.run_sync(roles_cache.nom, user.role_id)
+    return role == RoleEnum.admin
+
+
+class ProfilageMiddleware:
+    """
+    Profile les requêtes d'administrateurs portant `X-Profilage: 1`.
+
+    Les autres requêtes (sans l'en-tête, ou sans jeton d'administrateur)
+    sont servies normalement.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        suivre_threads()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not await _demande_par_un_admin(scope):
+            await self.app(scope, receive, send)
+            return
+        profil = Profil()
+        root_path = scope.get("root_path", "")
+        statut = 500
+
+        async def envoyer(message: Message) -> None:
+            nonlocal statut
+            if message["type"] == "http.response.start":
+                statut = message["status"]
+                entetes = [*message.get("headers", [])]
+                entetes.append((ENTETE_PROFIL_ID.encode(), profil.id.encode()))
+                message = {**message, "headers": entetes}
+            await send(message)
+
+        tache = asyncio.current_task()
+        if tache is not None:
+            _profils_des_taches[tache] = profil
+        jeton = _profil_courant.set(profil)
+        debut = time.perf_counter()
+        try:
+            with Echantillonneur(profil, settings.PROFILAGE_INTERVALLE_SECONDES):
+                await self.app(scope, receive, envoyer)
+        finally:
+            _profil_courant.reset(jeton)
+            if tache is not None:
+                del _profils_des_taches[tache]
+            infos = ProfilRead(
+                id=profil.id,
+                date=datetime.now(timezone.utc),
+                methode=scope["method"],
+                chemin=scope["path"],
+                route=modele_route(scope, root_path),
+                statut=statut,
+                duree_ms=(time.perf_counter() - debut) * 1000,
+                echantillons=profil.echantillons,
+            )
+            await anyio.to_thread.run_sync(enregistrer_profil, profil, infos)
+
+
+# Frames après lesquelles les appels sont faits pour la requête profilée
+_DEBUTS_DE_PILE = {ProfilageMiddleware.__call__.__code__, _dans_thread.__code__}
+
+
+def enregistrer_profil(profil: Profil, infos: ProfilRead) -> None:
+    """
+    Enregistre un profil et ses informations, puis supprime les plus anciens.
+
+    Args:
+        profil (Profil): Le profil (`<id>.folded`, piles repliées).
+        infos (ProfilRead): Ses informations (`<id>.json`).
+    """
+    dossier = Path(settings.PROFILAGE_DOSSIER)
+    dossier.mkdir(parents=True, exist_ok=True)
+    (dossier / f"{profil.id}.folded").write_text(profil.repliees())
+    (dossier / f"{profil.id}.json").write_text(infos.model_dump_json())
+    anciens = sorted(dossier.glob("*.json"), key=lambda chemin: chemin.stat().st_mtime)
+    for chemin in anciens[: -settings.PROFILAGE_PROFILS_MAX]:
+        chemin.unlink(missing_ok=True)
+        chemin.with_suffix(".folded").unlink(missing_ok=True)
+
+
+def lister_profils() -> list[ProfilRead]:
+    """
+    Liste les profils enregistrés.
+
+    Returns:
+        list[ProfilRead]: Les informations des profils, du plus récent au
+        plus ancien.
+    """
+    dossier = Path(settings.PROFILAGE_DOSSIER)
+    profils = []
+    for chemin in dossier.glob("*.json"):
+        try:
+            profils.append(ProfilRead.model_validate(json.loads(chemin.read_text())))
+        except (OSError, ValueError):
+            # Profil supprimé ou en cours d'écriture
+            continue
+    return sorted(profils, key=lambda profil: profil.date, reverse=True)
+
+
+def lire_profil(profil_id: str) -> Optional[str]:
+    """
+    Lit un profil enregistré.
+
+    Args:
+        profil_id (str): L'ID du profil (`X-Profil-Id`).
+
+    Returns:
+        Optional[str]: Les piles repliées du profil, ou None s'il n'existe pas.
+    """
+    if not _FORMAT_ID.fullmatch(profil_id):
+        return None
+    chemin = os.path.join(settings.PROFILAGE_DOSSIER, f"{profil_id}.folded")
+    try:
+        with open(chemin, encoding="utf-8") as fichier:
+            return fichier.read()
+    except FileNotFoundError:
+        return None
+
+
+# Format des dates de début de fenêtre dans les noms de fichiers (UTC) : l'ordre
+# alphabétique des fichiers est leur ordre chronologique
+_FORMAT_FENETRE = "%Y%m%dT%H%M%SZ"
+
+
+def _nom_fenetre(debut: float) -> str:
+    """Renvoie le nom du fichier d'une fenêtre pour le worker courant."""
+    date = datetime.fromtimestamp(debut, timezone.utc).strftime(_FORMAT_FENETRE)
+    return f"{date}-{os.getpid()}.folded"
+
+
+def _debut_fichier(chemin: Path) -> Optional[datetime]:
+    """Renvoie le début de la fenêtre d'un fichier, ou None s'il n'en est pas une."""
+    try:
+        date = datetime.strptime(chemin.name.split("-")[0], _FORMAT_FENETRE)
+    except ValueError:
+        return None
+    return date.replace(tzinfo=timezone.utc)
+
+
+def releve_complet(piles: Counter[str], moi: int, noms: dict[int, str]) -> None:
+    """
+    Compte la pile de chaque thread du processus, préfixée du nom du thread.
+
+    Args:
+        piles (Counter[str]): Les piles repliées de la fenêtre en cours.
+        moi (int): L'ident du thread d'échantillonnage, exclu du relevé.
+        noms (dict[int, str]): Les noms des threads par ident, complétés au
+            premier relevé d'un nouveau thread.
+    """
+    for ident, frame in sys._current_frames().items():
+        if ident == moi:
+            continue
+        if ident not in noms:
+            noms.clear()
+            noms.update((t.ident or 0, t.name) for t in threading.enumerate())
+        appels = [noms.get(ident, "?")]
+        courante: Optional[FrameType] = frame
+        pile: list[str] = []
+        while courante is not None:
+            pile.append(_appel(courante))
+            courante = courante.f_back
+        appels.extend(reversed(pile))
+        piles[";".join(appels)] += 1
+
+
+class EchantillonneurContinu:
+    """
+    Thread relevant les piles de tous les threads du worker, en continu.
+
+    Les piles sont comptées par fenêtre de `PROFILAGE_CONTINU_FENETRE_SECONDES`,
+    alignée sur l'horloge (les fenêtres des workers coïncident), puis écrites
+    dans `PROFILAGE_CONTINU_DOSSIER` (`<début>-<pid>.folded`). Les fenêtres
+    plus anciennes que `PROFILAGE_CONTINU_FENETRES_MAX` fenêtres sont
+    supprimées.
+    """
+
+    def __init__(self) -> None:
+        self._arret = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def demarrer(self) -> None:
+        """Démarre le thread d'échantillonnage si `PROFILAGE_CONTINU_HZ` est positif."""
+        if self._thread is not None or settings.PROFILAGE_CONTINU_HZ <= 0:
+            return
+        self._arret.clear()
+        self._thread = threading.Thread(
+            target=self._echantillonner, name="profilage-continu", daemon=True
+        )
+        self._thread.start()
+
+    def arreter(self) -> None:
+        """Arrête le thread d'échantillonnage et écrit la fenêtre en cours."""
+        if self._thread is None:
+            return
+        self._arret.set()
+        self._thread.join()
+        self._thread = None
+
+    def _echantillonner(self) -> None:
+        """Boucle du thread d'échantillonnage."""
+        moi = threading.get_ident()
+        noms: dict[int, str] = {}
+        intervalle = 1 / settings.PROFILAGE_CONTINU_HZ
+        duree = settings.PROFILAGE_CONTINU_FENETRE_SECONDES
+        piles: Counter[str] = Counter()
+        debut = time.time() // duree * duree
+        # Relevés à intervalles réguliers, quelle que soit leur propre durée
+        prochain = time.monotonic()
+        while True:
+            prochain += intervalle
+            if self._arret.wait(max(0.0, prochain - time.monotonic())):
+                break
+            maintenant = time.time()
+            if maintenant >= debut + duree:
+                enregistrer_fenetre(debut, piles)
+                piles = Counter()
+                debut = maintenant // duree * duree
+            releve_complet(piles, moi, noms)
+        enregistrer_fenetre(debut, piles)
+
+
+def enregistrer_fenetre(debut: float, piles: Counter[str]) -> None:
+    """
+    Écrit les piles d'une fenêtre du worker, puis supprime les fenêtres expirées.
+
+    Args:
+        debut (float): Le début de la fenêtre (timestamp).
+        piles (Counter[str]): Les piles repliées relevées pendant la fenêtre.
+    """
+    dossier = Path(settings.PROFILAGE_CONTINU_DOSSIER)
+    dossier.mkdir(parents=True, exist_ok=True)
+    if piles:
+        (dossier / _nom_fenetre(debut)).write_text(repliees(piles))
+    retention = (
+        settings.PROFILAGE_CONTINU_FENETRES_MAX
+        * settings.PROFILAGE_CONTINU_FENETRE_SECONDES
+    )
+    limite = datetime.fromtimestamp(debut - retention, timezone.utc)
+    for chemin in dossier.glob("*.folded"):
+        date = _debut_fichier(chemin)
+        if date is not None and date <= limite:
+            chemin.unlink(missing_ok=True)
+
+
+def fusionner_fenetres(debut: datetime, fin: datetime) -> str:
+    """
+    Fusionne les fenêtres de tous les workers commençant dans une période.
+
+    Args:
+        debut (datetime): Le début de la période (inclus, UTC si sans fuseau).
+        fin (datetime): La fin de la période (exclue, UTC si sans fuseau).
+
+    Returns:
+        str: Les piles repliées de la période, comptes additionnés ; vide si
+        aucune fenêtre n'y commence.
+    """
+    if debut.tzinfo is None:
+        debut = debut.replace(tzinfo=timezone.utc)
+    if fin.tzinfo is None:
+        fin = fin.replace(tzinfo=timezone.utc)
+    piles: Counter[str] = Counter()
+    for chemin in Path(settings.PROFILAGE_CONTINU_DOSSIER).glob("*.folded"):
+        date = _debut_fichier(chemin)
+        if date is None or not debut <= date < fin:
+            continue
+        try:
+            lignes = chemin.read_text().splitlines()
+        except FileNotFoundError:
+            # Fenêtre expirée entre-temps
+            continue
+        for ligne in lignes:
+            pile, _, nombre = ligne.rpartition(" ")
+            piles[pile] += int(nombre)
+    return repliees(piles)
+
+
+# Échantillonneur continu du worker (démarré avec l'application)
+echantillonneur_continu = EchantillonneurContinu()
@@ -0,0 +1,448 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional, Protocol
+
+import anyio
+
+from app.core.config import settings
+
+# Nombre de seaux au-delà duquel les seaux pleins (inactifs) sont purgés
+_SEAUX_MAX = 10_000
+
+
+class Surcharge(Exception):
+    """
+    Levée quand une demande ne peut pas être servie tout de suite : toutes les
+    places de `LimiteConcurrence` sont occupées, ou le fichier des seaux de
+    `SqliteBackend` est resté verrouillé au-delà de son délai.
+    """
+
+
+def _remplir(
+    jetons: float, maj: float, capacite: int, par_seconde: float, maintenant: float
+) -> float:
+    """Renvoie le nombre de jetons d'un seau après remplissage depuis `maj`."""
+    return min(float(capacite), jetons + (maintenant - maj) * par_seconde)
+
+
+def _prefixe(cle: str) -> str:
+    """Renvoie le préfixe (nom du limiteur) d'une clé de seau."""
+    return cle.split(":", 1)[0]
+
+
+def _processus_vivant(pid: int) -> bool:
+    """Indique si le processus `pid` existe encore sur la machine."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class BackendDebit(Protocol):
+    """Stockage des seaux de jetons et des compteurs de places occupées."""
+
+    def consommer(self, cle: str, capacite: int, par_seconde: float) -> float:
+        """Retire un jeton du seau `cle` ; renvoie 0 ou l'attente avant le prochain."""
+        ...
+
+    def occuper(self, cle: str, maximum: int) -> bool:
+        """Occupe une place du compteur `cle` ; False si les `maximum` sont prises."""
+        ...
+
+    def liberer(self, cle: str) -> None:
+        """Libère une place occupée par `occuper`."""
+        ...
+
+    def vider(self) -> None:
+        """Supprime tous les seaux."""
+        ...
+
+
+class MemoireBackend:
+    """
+    Seaux de jetons en mémoire, propres au worker.
+
+    Adapté à un seul worker ; avec plusieurs workers, chaque worker applique
+    la limite de son côté (voir `SqliteBackend`).
+    """
+
+    def __init__(self) -> None:
+        self._verrou = threading.Lock()
+        self._seaux: dict[str, tuple[float, float]] = {}
+        self._places: dict[str, int] = {}
+
+    def consommer(self, cle: str, capacite: int, par_seconde: float) -> float:
+        """Retire un jeton du seau `cle` ; renvoie 0 ou l'attente avant le prochain."""
+        maintenant = time.time()
+        with self._verrou:
+            jetons, maj = self._seaux.get(cle, (float(capacite), maintenant))
+            jetons = _remplir(jetons, maj, capacite, par_seconde, maintenant)
+            if jetons < 1:
+                self._seaux[cle] = (jetons, maintenant)
+                return (1 - jetons) / par_seconde
+            self._seaux[cle] = (jetons - 1, maintenant)
+            if len(self._seaux) > _SEAUX_MAX:
+                self._purger(_prefixe(cle), capacite, par_seconde, maintenant)
+            return 0.0
+
+    def occuper(self, cle: str, maximum: int) -> bool:
+        """Occupe une place du compteur `cle` ; False si les `maximum` sont prises."""
+        with self._verrou:
+            if self._places.get(cle, 0) >= maximum:
+                return False
+            self._places[cle] = self._places.get(cle, 0) + 1
+            return True
+
+    def liberer(self, cle: str) -> None:
+        """Libère une place occupée par `occuper`."""
+        with self._verrou:
+            self._places[cle] -= 1
+
+    def vider(self) -> None:
+        """Supprime tous les seaux."""
+        with self._verrou:
+            self._seaux.clear()
+
+    def _purger(
+        self, prefixe: str, capacite: int, par_seconde: float, maintenant: float
+    ) -> None:
+        """Supprime les seaux pleins du limiteur `prefixe` (équivalents à absents)."""
+        self._seaux = {
+            cle: (jetons, maj)
+            for cle, (jetons, maj) in self._seaux.items()
+            if _prefixe(cle) != prefixe
+            or _remplir(jetons, maj, capacite, par_seconde, maintenant) < capacite
+        }
+
+
+class SqliteBackend:
+    """
+    Seaux de jetons dans un fichier SQLite local, partagés par les workers.
+
+    Chaque consommation est une transaction `BEGIN IMMEDIATE` : les workers
+    d'une même machine voient et décrémentent les mêmes seaux. Si le fichier
+    reste verrouillé plus de `timeout` secondes, la consommation lève
+    `Surcharge` plutôt que d'attendre davantage.
+
+    Les places occupées sont comptées par processus (table `places`) : le
+    total est partagé par les workers, et les places d'un worker arrêté sans
+    les libérer sont récupérées quand le maximum est atteint.
+    """
+
+    def __init__(self, chemin: str) -> None:
+        self._chemin = chemin
+        self._local = threading.local()
+        # Libérations qui n'ont pas pu être écrites (fichier verrouillé),
+        # reportées sur la transaction suivante du même compteur
+        self._a_liberer: dict[str, int] = {}
+        self._verrou = threading.Lock()
+        with self._connexion() as connexion:
+            connexion.execute(
+                "CREATE TABLE IF NOT EXISTS seaux "
+                "(cle TEXT PRIMARY KEY, jetons REAL NOT NULL, maj REAL NOT NULL)"
+            )
+            connexion.execute(
+                "CREATE TABLE IF NOT EXISTS places (cle TEXT NOT NULL, "
+                "pid INTEGER NOT NULL, en_cours INTEGER NOT NULL, "
+                "PRIMARY KEY (cle, pid))"
+            )
+            # Places laissées par un processus arrêté qui avait le même PID
+            connexion.execute("DELETE FROM places WHERE pid = ?", (os.getpid(),))
+
+    def _connexion(self) -> sqlite3.Connection:
+        """Renvoie la connexion SQLite du thread courant."""
+        connexion: Optional[sqlite3.Connection] = getattr(
+            self._local, "connexion", None
+        )
+        if connexion is None:
+            connexion = sqlite3.connect(self._chemin, timeout=1.0, isolation_level=None)
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.execute("PRAGMA synchronous=OFF")
+            self._local.connexion = connexion
+        return connexion
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Ouvre une transaction d'écriture, validée à la fin du bloc `with`.
+
+        Raises:
+            Surcharge: Si le fichier est verrouillé par d'autres workers.
+        """
+        connexion = self._connexion()
+        try:
+            connexion.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            raise Surcharge from e
+        try:
+            yield connexion
+            connexion.execute("COMMIT")
+        except BaseException as e:
+            if connexion.in_transaction:
+                connexion.execute("ROLLBACK")
+            if isinstance(e, sqlite3.OperationalError):
+                raise Surcharge from e
+            raise
+
+    def consommer(self, cle: str, capacite: int, par_seconde: float) -> float:
+        """
+        Retire un jeton du seau `cle` ; renvoie 0 ou l'attente avant le prochain.
+
+        Raises:
+            Surcharge: Si le fichier des seaux est verrouillé par d'autres workers.
+        """
+        maintenant = time.time()
+        with self._transaction() as connexion:
+            ligne = connexion.execute(
+                "SELECT jetons, maj FROM seaux WHERE cle = ?", (cle,)
+            ).fetchone()
+            jetons, maj = ligne if ligne else (float(capacite), maintenant)
+            jetons = _remplir(jetons, maj, capacite, par_seconde, maintenant)
+            attente = 0.0 if jetons >= 1 else (1 - jetons) / par_seconde
+            if not attente:
+                jetons -= 1
+            connexion.execute(
+                "INSERT INTO seaux (cle, jetons, maj) VALUES (?, ?, ?) "
+                "ON CONFLICT (cle) DO UPDATE SET jetons = excluded.jetons, "
+                "maj = excluded.maj",
+                (cle, jetons, maintenant),
+            )
+            # Purge occasionnelle des seaux redevenus pleins
+            if not ligne and hash(cle) % 1000 == 0:
+                connexion.execute(
+                    "DELETE FROM seaux WHERE substr(cle, 1, ?) = ? "
+                    "AND jetons + (? - maj) * ? >= ?",
+                    (
+                        len(_prefixe(cle)) + 1,
+                        f"{_prefixe(cle)}:",
+                        maintenant,
+                        par_seconde,
+                        capacite,
+                    ),
+                )
+        return attente
+
+    def occuper(self, cle: str, maximum: int) -> bool:
+        """
+        Occupe une place du compteur `cle` ; False si les `maximum` sont prises.
+
+        Le total compte les places de tous les workers. S'il atteint
+        `maximum`, les places des processus qui n'existent plus sont
+        supprimées avant de conclure.
+
+        Raises:
+            Surcharge: Si le fichier est verrouillé par d'autres workers.
+        """
+        pid = os.getpid()
+        liberees = 0
+        try:
+            with self._transaction() as connexion:
+                liberees = self._ecrire_liberations(connexion, cle, pid)
+                total = self._total(connexion, cle)
+                if total >= maximum:
+                    for (autre,) in connexion.execute(
+                        "SELECT pid FROM places WHERE cle = ? AND pid != ?",
+                        (cle, pid),
+                    ).fetchall():
+                        if not _processus_vivant(autre):
+                            connexion.execute(
+                                "DELETE FROM places WHERE cle = ? AND pid = ?",
+                                (cle, autre),
+                            )
+                    total = self._total(connexion, cle)
+                libre = total < maximum
+                if libre:
+                    connexion.execute(
+                        "INSERT INTO places (cle, pid, en_cours) VALUES (?, ?, 1) "
+                        "ON CONFLICT (cle, pid) DO UPDATE SET en_cours = en_cours + 1",
+                        (cle, pid),
+                    )
+        except BaseException:
+            self._reporter_liberations(cle, liberees)
+            raise
+        return libre
+
+    def liberer(self, cle: str) -> None:
+        """
+        Libère une place occupée par `occuper`.
+
+        Si le fichier est verrouillé, la libération est reportée sur la
+        transaction suivante du compteur plutôt que perdue.
+        """
+        self._reporter_liberations(cle, 1)
+        liberees = 0
+        try:
+            with self._transaction() as connexion:
+                liberees = self._ecrire_liberations(connexion, cle, os.getpid())
+        except Surcharge:
+            self._reporter_liberations(cle, liberees)
+
+    def _reporter_liberations(self, cle: str, nombre: int) -> None:
+        """Ajoute `nombre` libérations à écrire pour le compteur `cle`."""
+        if nombre:
+            with self._verrou:
+                self._a_liberer[cle] = self._a_liberer.get(cle, 0) + nombre
+
+    def _ecrire_liberations(
+        self, connexion: sqlite3.Connection, cle: str, pid: int
+    ) -> int:
+        """
+        Écrit les libérations en attente du compteur `cle` pour ce processus.
+
+        Returns:
+            int: Le nombre de libérations écrites, à reporter de nouveau si la
+            transaction n'aboutit pas.
+        """
+        with self._verrou:
+            nombre = self._a_liberer.pop(cle, 0)
+        if nombre:
+            try:
+                connexion.execute(
+                    "UPDATE places SET en_cours = max(0, en_cours - ?) "
+                    "WHERE cle = ? AND pid = ?",
+                    (nombre, cle, pid),
+                )
+            except BaseException:
+                self._reporter_liberations(cle, nombre)
+                raise
+        return nombre
+
+    @staticmethod
+    def _total(connexion: sqlite3.Connection, cle: str) -> int:
+        """Renvoie le nombre de places occupées du compteur `cle`."""
+        ligne = connexion.execute(
+            "SELECT coalesce(sum(en_cours), 0) FROM places WHERE cle = ?", (cle,)
+        ).fetchone()
+        return int(ligne[0])
+
+    def vider(self) -> None:
+        """Supprime tous les seaux."""
+        self._connexion().execute("DELETE FROM seaux")
+
+
+class LimiteurDebit:
+    """
+    Limiteur à seau de jetons : `capacite` tentatives en rafale, puis
+    `par_minute` tentatives par minute.
+    """
+
+    def __init__(
+        self, backend: BackendDebit, prefixe: str, capacite: int, par_minute: float
+    ) -> None:
+        self.backend = backend
+        self.prefixe = prefixe
+        self.capacite = capacite
+        self.par_seconde = par_minute / 60
+
+    def consommer(self, cle: str) -> float:
+        """
+        Décompte une tentative pour `cle`.
+
+        Args:
+            cle (str): La clé limitée (adresse IP, email...).
+
+        Returns:
+            float: 0 si la tentative est autorisée, sinon le délai en secondes
+            avant la prochaine tentative autorisée.
+        """
+        return self.backend.consommer(
+            f"{self.prefixe}:{cle}", self.capacite, self.par_seconde
+        )
+
+
+class LimiteConcurrence:
+    """
+    Nombre maximal de traitements simultanés, partagé par les workers.
+
+    Contrairement à un sémaphore, une demande au-delà de la limite n'attend
+    pas : elle est rejetée immédiatement (délestage). Le compteur est tenu
+    par le backend : avec `SqliteBackend`, la limite vaut pour l'ensemble des
+    workers de la machine ; avec `MemoireBackend`, pour un seul worker.
+    """
+
+    def __init__(self, backend: BackendDebit, cle: str, maximum: int) -> None:
+        self.backend = backend
+        self.cle = cle
+        self.maximum = maximum
+
+    @asynccontextmanager
+    async def place(self) -> AsyncIterator[None]:
+        """
+        Occupe une place pendant le bloc `async with`.
+
+        Les accès au backend ont lieu dans un thread, hors de la boucle
+        d'événements ; la libération a lieu même si la requête est annulée.
+
+        Raises:
+            Surcharge: Si toutes les places sont occupées, ou si le backend
+            est verrouillé par d'autres workers.
+        """
+        if not await anyio.to_thread.run_sync(
+            self.backend.occuper, self.cle, self.maximum
+        ):
+            raise Surcharge
+        try:
+            yield
+        finally:
+            with anyio.CancelScope(shield=True):
+                await anyio.to_thread.run_sync(self.backend.liberer, self.cle)
+
+
+def create_backend() -> BackendDebit:
+    """
+    Crée le backend de limitation configuré par `RATE_LIMIT_BACKEND`.
+
+    Returns:
+        BackendDebit: `SqliteBackend` si "sqlite" (par défaut), sinon
+        `MemoireBackend`.
+    """
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        return SqliteBackend(settings.RATE_LIMIT_SQLITE_CHEMIN)
+    return MemoireBackend()
+
+
+def consommer_login(ip: str, email: str) -> float:
+    """
+    Décompte une tentative de connexion pour l'adresse IP puis pour l'email.
+
+    Args:
+        ip (str): L'adresse IP du client.
+        email (str): L'email saisi (insensible à la casse).
+
+    Raises:
+        Surcharge: Si les seaux partagés sont verrouillés (`SqliteBackend`).
+
+    Returns:
+        float: 0 si la tentative est autorisée, sinon le délai en secondes
+        avant la prochaine tentative autorisée.
+    """
+    return login_par_ip.consommer(ip) or login_par_email.consommer(email.lower())
+
+
+def retry_after(attente: float) -> str:
+    """Formate un délai en secondes pour l'en-tête `Retry-After`."""
+    return str(max(1, math.ceil(attente)))
+
+
+# Limites de /login, appliquées avant toute requête en base ou tout hashage
+backend_debit = create_backend()
+login_par_ip = LimiteurDebit(
+    backend_debit, "login-ip", settings.LOGIN_IP_RAFALE, settings.LOGIN_IP_PAR_MINUTE
+)
+login_par_email = LimiteurDebit(
+    backend_debit,
+    "login-email",
+    settings.LOGIN_EMAIL_RAFALE,
+    settings.LOGIN_EMAIL_PAR_MINUTE,
+)
+verifications_login = LimiteConcurrence(
+    backend_debit, "login-verifications", settings.LOGIN_VERIFICATIONS_MAX
+)
@@ -0,0 +1,138 @@
+import select
+import threading
+from typing import Optional
+
+import psycopg2
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.core.metriques import compter_cache
+from app.db.session import engine
+from app.models.users_et_roles import RoleEnum
+
+# Canal Postgres (LISTEN / NOTIFY) signalant une modification de la table roles
+CANAL_ROLES = "roles"
+
+# Délai (en secondes) entre deux vérifications de l'arrêt par le thread
+# d'écoute, et avant une reconnexion après une erreur
+_ATTENTE_ECOUTE = 1.0
+
+
+class CacheRoles:
+    """
+    Correspondance ID de rôle → nom, gardée en mémoire par chaque worker.
+
+    La table des rôles ne compte que quelques lignes et change rarement : les
+    vérifications d'autorisation la lisent en mémoire, sans requête. Les
+    fonctions CRUD des rôles mettent à jour le cache du worker qui les exécute
+    et émettent une notification `CANAL_ROLES` ; les autres workers la
+    reçoivent par le thread d'écoute (`demarrer`) et rechargent la table.
+    """
+
+    def __init__(self) -> None:
+        self._noms: Optional[dict[int, RoleEnum]] = None
+        self._verrou = threading.Lock()
+        self._arret = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def charger(self) -> None:
+        """Recharge toute la table des rôles depuis la base."""
+        # Requête SQL directe : appelée depuis le thread d'écoute, elle ne
+        # dépend pas de la configuration des modèles SQLModel
+        with engine.connect() as connexion:
+            lignes = connexion.execute(text("SELECT id, nom FROM roles")).all()
+        with self._verrou:
+            self._noms = {role_id: RoleEnum[nom] for role_id, nom in lignes}
+
+    def nom(self, role_id: Optional[int]) -> Optional[RoleEnum]:
+        """
+        Renvoie le nom d'un rôle.
+
+        La table est chargée au premier appel si le thread d'écoute ne l'a pas
+        déjà fait ; les appels suivants ne font aucune requête.
+
+        Args:
+            role_id (Optional[int]): L'ID du rôle.
+
+        Returns:
+            Optional[RoleEnum]: Le nom du rôle, ou None s'il n'existe pas.
+        """
+        if role_id is None:
+            return None
+        noms = self._noms
+        compter_cache("roles", noms is not None)
+        if noms is None:
+            self.charger()
+            noms = self._noms or {}
+        return noms.get(role_id)
+
+    def definir(self, role_id: int, nom: RoleEnum) -> None:
+        """Enregistre un rôle créé ou modifié dans le cache du worker."""
+        with self._verrou:
+            if self._noms is not None:
+                self._noms = {**self._noms, role_id: nom}
+
+    def retirer(self, role_id: int) -> None:
+        """Retire un rôle supprimé du cache du worker."""
+        with self._verrou:
+            if self._noms is not None:
+                self._noms = {
+                    cle: nom for cle, nom in self._noms.items() if cle != role_id
+                }
+
+    def demarrer(self) -> None:
+        """Démarre le thread d'écoute des notifications `CANAL_ROLES`."""
+        if self._thread is not None:
+            return
+        self._arret.clear()
+        self._thread = threading.Thread(
+            target=self._ecouter, name="cache-roles", daemon=True
+        )
+        self._thread.start()
+
+    def arreter(self) -> None:
+        """Arrête le thread d'écoute et attend sa fin."""
+        if self._thread is None:
+            return
+        self._arret.set()
+        self._thread.join()
+        self._thread = None
+
+    def _ecouter(self) -> None:
+        """
+        Boucle du thread d'écoute.
+
+        La table est rechargée après chaque `LISTEN` (démarrage ou reconnexion) :
+        une modification faite pendant une coupure n'est pas perdue.
+        """
+        while not self._arret.is_set():
+            try:
+                self._ecouter_connexion()
+            except (DBAPIError, psycopg2.Error, OSError):
+                self._arret.wait(_ATTENTE_ECOUTE)
+
+    def _ecouter_connexion(self) -> None:
+        """Écoute les notifications sur une connexion dédiée jusqu'à l'arrêt."""
+        brute = engine.raw_connection()
+        connexion = brute.driver_connection
+        assert connexion is not None
+        # Connexion retirée du pool : son mode autocommit ne doit pas en ressortir
+        brute.detach()
+        try:
+            connexion.autocommit = True
+            with connexion.cursor() as curseur:
+                curseur.execute(f"LISTEN {CANAL_ROLES}")
+            self.charger()
+            while not self._arret.is_set():
+                prets, _, _ = select.select([connexion], [], [], _ATTENTE_ECOUTE)
+                if not prets:
+                    continue
+                connexion.poll()
+                if connexion.notifies:
+                    connexion.notifies.clear()
+                    self.charger()
+        finally:
+            brute.close()
+
+
+roles_cache = CacheRoles()
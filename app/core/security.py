@@ -1,6 +1,60 @@
+import asyncio
+import multiprocessing
+from collections.abc import Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import jwt
 from passlib.context import CryptContext
 
-password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.config import settings
+from app.core.traces import executer_dans_la_trace
+from app.schemas.user import TokenPair, UserToken
+
+
+def create_password_context(schemes: list[str], bcrypt_rounds: int) -> CryptContext:
+    """
+    Construit le contexte de hashage des mots de passe.
+
+    Les hashs d'un autre schéma que le premier, ou d'un coût bcrypt différent
+    de `bcrypt_rounds`, sont signalés comme à mettre à jour par
+    `needs_update` / `verify_and_update`.
+
+    Args:
+        schemes (list[str]): Les schémas acceptés, celui des nouveaux hashs
+            en premier.
+        bcrypt_rounds (int): Le facteur de coût bcrypt (log2 des itérations).
+
+    Returns:
+        CryptContext: Le contexte passlib correspondant.
+    """
+    return CryptContext(
+        schemes=schemes, deprecated="auto", bcrypt__rounds=bcrypt_rounds
+    )
+
+
+password_context = create_password_context(
+    settings.HASH_SCHEMES, settings.BCRYPT_ROUNDS
+)
+
+# Pool de processus réservé au hashage : bcrypt y tourne hors du GIL et hors du
+# threadpool partagé par les endpoints synchrones. Créés à la première
+# utilisation (voir `_get_pool` et `_get_limiteur`). Les imports en masse ont
+# leur propre pool (`_get_pool_import`) pour ne pas retarder les connexions.
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_import: Optional[ProcessPoolExecutor] = None
+_limiteur: Optional[asyncio.Semaphore] = None
+_limiteur_boucle: Optional[asyncio.AbstractEventLoop] = None
+
+# Taille des lots de hashage en masse : entre deux lots, les vérifications de
+# connexion en attente dans le pool passent
+_LOT_HASH = 64
+
+# Types de jetons (claim `type`) : un jeton de rafraîchissement ne doit pas
+# pouvoir servir d'accès, et inversement.
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
 
 
 def hash_password(pwd: str) -> str:
@@ -16,6 +70,32 @@ def hash_password(pwd: str) -> str:
     return str(password_context.hash(pwd))
 
 
+def hash_passwords(
+    mots_de_passe: Sequence[str], pool: Optional[Executor] = None
+) -> list[str]:
+    """
+    Hash plusieurs mots de passe en parallèle.
+
+    Les hashs sont répartis sur les processus du pool, par lots de `_LOT_HASH`.
+    Fonction bloquante : à appeler hors de la boucle d'événements.
+
+    Args:
+        mots_de_passe (Sequence[str]): Les mots de passe en clair.
+        pool (Optional[Executor]): Le pool à utiliser ; par défaut le pool
+            réservé aux imports (`IMPORT_HASH_PROCESSUS` processus), distinct
+            de celui des connexions.
+
+    Returns:
+        list[str]: Les hashs, dans l'ordre des mots de passe.
+    """
+    executeur = pool or _get_pool_import()
+    hashs: list[str] = []
+    for debut in range(0, len(mots_de_passe), _LOT_HASH):
+        lot = mots_de_passe[debut : debut + _LOT_HASH]
+        hashs.extend(executeur.map(hash_password, lot))
+    return hashs
+
+
 def password_checking(pwd: str, hashed_pwd: str) -> bool:
     """
     Vérifie si un mot de passe correspond à un hash stocké.
@@ -28,3 +108,223 @@ def password_checking(pwd: str, hashed_pwd: str) -> bool:
         bool: True si le mot de passe correspond au hash, False sinon.
     """
     return bool(password_context.verify(pwd, hashed_pwd))
+
+
+def password_checking_and_update(
+    pwd: str, hashed_pwd: str
+) -> tuple[bool, Optional[str]]:
+    """
+    Vérifie un mot de passe et le rehash si son hash est obsolète.
+
+    Un hash est obsolète s'il a été produit par un autre schéma que celui par
+    défaut ou avec un autre coût que `BCRYPT_ROUNDS`. Le mot de passe en clair
+    n'étant disponible qu'au moment de la vérification, c'est là que le
+    nouveau hash est calculé.
+
+    Args:
+        pwd (str): Le mot de passe en clair saisi par l’utilisateur.
+        hashed_pwd (str): Le hash du mot de passe stocké en base.
+
+    Returns:
+        tuple[bool, Optional[str]]: Si le mot de passe correspond, et le
+        nouveau hash à enregistrer (None s'il est à jour ou incorrect).
+    """
+    valide, nouveau_hash = password_context.verify_and_update(pwd, hashed_pwd)
+    return bool(valide), nouveau_hash
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Renvoie le pool de processus de hashage, créé au premier appel.
+
+    Les processus sont démarrés en mode `spawn` : ils ne recopient pas l'état
+    du worker (threads, connexions à la base) comme le ferait un `fork`.
+
+    Returns:
+        ProcessPoolExecutor: Le pool de `HASH_PROCESSUS` processus.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.HASH_PROCESSUS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def _get_pool_import() -> ProcessPoolExecutor:
+    """
+    Renvoie le pool de processus des imports en masse, créé au premier appel.
+
+    Returns:
+        ProcessPoolExecutor: Le pool de `IMPORT_HASH_PROCESSUS` processus.
+    """
+    global _pool_import
+    if _pool_import is None:
+        _pool_import = ProcessPoolExecutor(
+            max_workers=settings.IMPORT_HASH_PROCESSUS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool_import
+
+
+def _get_limiteur() -> asyncio.Semaphore:
+    """
+    Renvoie le sémaphore limitant les hashages en cours pour la boucle courante.
+
+    Returns:
+        asyncio.Semaphore: Un sémaphore de `HASH_CONCURRENCE_MAX` places.
+    """
+    global _limiteur, _limiteur_boucle
+    boucle = asyncio.get_running_loop()
+    if _limiteur is None or _limiteur_boucle is not boucle:
+        _limiteur = asyncio.Semaphore(settings.HASH_CONCURRENCE_MAX)
+        _limiteur_boucle = boucle
+    return _limiteur
+
+
+async def hash_password_async(pwd: str) -> str:
+    """
+    Hash un mot de passe dans le pool de processus dédié.
+
+    Au-delà de `HASH_CONCURRENCE_MAX` hashages en cours, l'appel attend
+    qu'une place se libère sans bloquer la boucle d'événements.
+
+    Args:
+        pwd (str): Le mot de passe en clair à hasher.
+
+    Returns:
+        str: Le mot de passe hashé.
+    """
+    async with _get_limiteur():
+        return await executer_dans_la_trace(_get_pool(), hash_password, pwd)
+
+
+async def password_checking_async(pwd: str, hashed_pwd: str) -> bool:
+    """
+    Vérifie un mot de passe dans le pool de processus dédié.
+
+    Args:
+        pwd (str): Le mot de passe en clair saisi par l’utilisateur.
+        hashed_pwd (str): Le hash du mot de passe stocké en base.
+
+    Returns:
+        bool: True si le mot de passe correspond au hash, False sinon.
+    """
+    async with _get_limiteur():
+        return await executer_dans_la_trace(
+            _get_pool(), password_checking, pwd, hashed_pwd
+        )
+
+
+async def password_checking_and_update_async(
+    pwd: str, hashed_pwd: str
+) -> tuple[bool, Optional[str]]:
+    """
+    Vérifie un mot de passe, et le rehash si besoin, dans le pool dédié.
+
+    Args:
+        pwd (str): Le mot de passe en clair saisi par l’utilisateur.
+        hashed_pwd (str): Le hash du mot de passe stocké en base.
+
+    Returns:
+        tuple[bool, Optional[str]]: Voir `password_checking_and_update`.
+    """
+    async with _get_limiteur():
+        return await executer_dans_la_trace(
+            _get_pool(), password_checking_and_update, pwd, hashed_pwd
+        )
+
+
+def shutdown_pool() -> None:
+    """
+    Arrête les pools de processus de hashage qui ont été démarrés.
+
+    Returns:
+        None
+    """
+    global _pool, _pool_import
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+    if _pool_import is not None:
+        _pool_import.shutdown(wait=True, cancel_futures=True)
+        _pool_import = None
+
+
+def create_token(user: UserToken, type_jeton: str, duree: timedelta) -> str:
+    """
+    Crée un jeton signé décrivant un utilisateur.
+
+    Args:
+        user (UserToken): L'utilisateur authentifié.
+        type_jeton (str): `ACCESS_TOKEN` ou `REFRESH_TOKEN`.
+        duree (timedelta): La durée de validité du jeton.
+
+    Returns:
+        str: Le jeton encodé.
+    """
+    claims = {
+        "sub": str(user.id),
+        "email": user.email,
+        "role_id": user.role_id,
+        "type": type_jeton,
+        "exp": datetime.now(timezone.utc) + duree,
+    }
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def create_token_pair(user: UserToken) -> TokenPair:
+    """
+    Crée le jeton d'accès et le jeton de rafraîchissement d'un utilisateur.
+
+    Args:
+        user (UserToken): L'utilisateur authentifié.
+
+    Returns:
+        TokenPair: Les deux jetons, de durées `ACCESS_TOKEN_EXPIRE_MINUTES`
+        et `REFRESH_TOKEN_EXPIRE_DAYS`.
+    """
+    return TokenPair(
+        access_token=create_token(
+            user,
+            ACCESS_TOKEN,
+            timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        ),
+        refresh_token=create_token(
+            user,
+            REFRESH_TOKEN,
+            timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        ),
+    )
+
+
+def decode_token(token: str, type_attendu: str) -> UserToken:
+    """
+    Vérifie la signature et l'expiration d'un jeton et en extrait l'utilisateur.
+
+    La vérification est purement locale (HMAC), sans accès à la base.
+
+    Args:
+        token (str): Le jeton encodé.
+        type_attendu (str): Le type de jeton attendu (`ACCESS_TOKEN`
+            ou `REFRESH_TOKEN`).
+
+    Raises:
+        jwt.InvalidTokenError: Si le jeton est mal formé, mal signé, expiré
+            ou d'un autre type.
+
+    Returns:
+        UserToken: L'utilisateur décrit par le jeton.
+    """
+    claims = jwt.decode(
+        token,
+        settings.SECRET_KEY,
+        algorithms=[settings.JWT_ALGORITHM],
+        options={"require": ["sub", "type", "exp"]},
+    )
+    if claims["type"] != type_attendu:
+        raise jwt.InvalidTokenError("type de jeton inattendu")
+    return UserToken(
+        id=int(claims["sub"]), email=claims["email"], role_id=claims.get("role_id")
+    )
@@ -0,0 +1,139 @@
+"""Fichiers statiques précompressés et servis avec des en-têtes de cache.
+
+Les copies `.br` et `.gz` écrites au build (`app.core.precompression`) sont
+servies par `StaticPrecompresses` selon le client.
+"""
+
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+from typing import Optional
+
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.core.compression import ENCODAGES, choisir_encodage
+from app.core.metriques import compter_cache
+from app.core.precompression import EXTENSIONS
+
+# Cache d'un fichier appelé avec sa version (`?v=`) : son contenu ne changera
+# jamais sous cette URL. Sans version, le client revalide à chaque usage.
+CACHE_IMMUABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDE = "no-cache"
+
+
+class StaticPrecompresses(StaticFiles):
+    """
+    `StaticFiles` servant les copies précompressées et des en-têtes de cache.
+
+    - Si le client accepte brotli ou gzip et qu'une copie à jour existe
+      (`app.core.precompression`), elle est servie avec `Content-Encoding`.
+    - Un fichier demandé avec sa version (`?v=`, voir `url_statique`) est
+      mis en cache sans revalidation (`immutable`) ; sinon, il est revalidé
+      à chaque usage (ETag / Last-Modified, réponse 304).
+    """
+
+    def __init__(self, *, directory: str, prefixe_url: str = "/static") -> None:
+        super().__init__(directory=directory)
+        self.prefixe_url = prefixe_url
+        self._versions: dict[str, tuple[int, int, str]] = {}
+
+    def version(self, chemin_complet: str, stat_result: os.stat_result) -> str:
+        """
+        Renvoie la version d'un fichier : le début de l'empreinte de son contenu.
+
+        L'empreinte est recalculée seulement si le fichier a changé.
+
+        Args:
+            chemin_complet (str): Le chemin du fichier.
+            stat_result (os.stat_result): Son `stat`.
+
+        Returns:
+            str: Les 12 premiers caractères du SHA-256 du contenu.
+        """
+        cle = (stat_result.st_mtime_ns, stat_result.st_size)
+        connue = self._versions.get(chemin_complet)
+        if connue is not None and connue[:2] == cle:
+            compter_cache("versions_statiques", True)
+            return connue[2]
+        compter_cache("versions_statiques", False)
+        empreinte = hashlib.sha256(Path(chemin_complet).read_bytes()).hexdigest()[:12]
+        self._versions[chemin_complet] = (*cle, empreinte)
+        return empreinte
+
+    def url_statique(self, chemin: str) -> str:
+        """
+        Renvoie l'URL versionnée d'un fichier statique, à utiliser dans les pages.
+
+        Args:
+            chemin (str): Le chemin du fichier dans le dossier statique.
+
+        Returns:
+            str: L'URL avec `?v=<version>` (sans version si le fichier manque).
+        """
+        chemin_complet, stat_result = self.lookup_path(chemin)
+        if stat_result is None:
+            return f"{self.prefixe_url}/{chemin}"
+        return (
+            f"{self.prefixe_url}/{chemin}?v={self.version(chemin_complet, stat_result)}"
+        )
+
+    def file_response(
+        self,
+        full_path: "os.PathLike[str] | str",
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        """Sert le fichier, ou sa copie précompressée, avec ses en-têtes de cache."""
+        entetes_requete = Headers(scope=scope)
+        chemin = os.fspath(full_path)
+        version = QueryParams(scope["query_string"]).get("v")
+        immuable = version is not None and version == self.version(chemin, stat_result)
+
+        copie = self._copie_acceptee(chemin, stat_result, entetes_requete)
+        if copie is None:
+            reponse = FileResponse(
+                chemin, status_code=status_code, stat_result=stat_result
+            )
+        else:
+            encodage, chemin_copie, stat_copie = copie
+            reponse = FileResponse(
+                chemin_copie,
+                status_code=status_code,
+                stat_result=stat_copie,
+                media_type=mimetypes.guess_type(chemin)[0] or "text/plain",
+            )
+            reponse.headers["Content-Encoding"] = encodage
+        reponse.headers["Vary"] = "Accept-Encoding"
+        reponse.headers["Cache-Control"] = (
+            CACHE_IMMUABLE if immuable else CACHE_REVALIDE
+        )
+        if self.is_not_modified(reponse.headers, entetes_requete):
+            return NotModifiedResponse(reponse.headers)
+        return reponse
+
+    @staticmethod
+    def _copie_acceptee(
+        chemin: str, stat_result: os.stat_result, entetes_requete: Headers
+    ) -> Optional[tuple[str, str, os.stat_result]]:
+        """Renvoie l'encodage, le chemin et le `stat` de la copie à servir, ou None."""
+        disponibles = []
+        for encodage in ENCODAGES:
+            try:
+                stat_copie = os.stat(chemin + EXTENSIONS[encodage])
+            except OSError:
+                continue
+            # Une copie plus ancienne que l'original est obsolète
+            if stat_copie.st_mtime_ns >= stat_result.st_mtime_ns:
+                disponibles.append((encodage, stat_copie))
+        encodage_retenu = choisir_encodage(
+            entetes_requete.get("accept-encoding"), [e for e, _ in disponibles]
+        )
+        for encodage, stat_copie in disponibles:
+            if encodage == encodage_retenu:
+                return encodage, chemin + EXTENSIONS[encodage], stat_copie
+        return None
@@ -0,0 +1,527 @@
+"""Traces des requêtes : spans de la requête HTTP, des fonctions CRUD et du SQL.
+
+Une requête sur `TRACES_ECHANTILLONNAGE` (ou toute requête dont l'en-tête
+`traceparent` demande la trace) est tracée :
+
+- `TracesMiddleware` ouvre le span de la requête (méthode, route, statut) ;
+- les fonctions publiques des modules `app.crud` (`tracer_module`) et
+  chaque requête SQL (`instrumenter_engine`) y ajoutent leurs spans ;
+- `executer_dans_la_trace` emporte la trace dans une tâche exécutée par un
+  pool (processus de hashage, threads) ; ses spans reviennent avec son
+  résultat.
+
+Les spans d'une trace sont exportés ensemble à la fin de la requête, par un
+thread d'arrière-plan, vers l'exporteur `TRACES_EXPORTEUR` : un fichier JSON
+lines (`TRACES_FICHIER`) ou un collecteur OpenTelemetry local, en OTLP/HTTP
+JSON (`TRACES_COLLECTEUR_URL`). Hors trace, chaque point instrumenté ne coûte
+que la lecture d'une variable de contexte.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import urllib.request
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Generic, Optional, ParamSpec, Protocol, TypeVar
+
+from sqlalchemy import Engine, event
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metriques import modele_route
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+# Longueur maximale du texte SQL gardé dans un span
+_SQL_LONGUEUR_MAX = 500
+
+# Traces en attente d'export au-delà desquelles les nouvelles sont abandonnées
+_FILE_EXPORT_MAX = 1000
+
+
+class Span:
+    """Une opération chronométrée d'une trace."""
+
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "nom",
+        "debut_ns",
+        "fin_ns",
+        "attributs",
+        "erreur",
+        "_termines",
+    )
+
+    def __init__(
+        self,
+        nom: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        termines: list["Span"],
+    ) -> None:
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.nom = nom
+        self.debut_ns = time.time_ns()
+        self.fin_ns = 0
+        self.attributs: dict[str, Any] = {}
+        self.erreur: Optional[str] = None
+        # Spans terminés de la trace dans ce processus, exportés avec la racine
+        self._termines = termines
+
+    def enfant(self, nom: str) -> "Span":
+        """Ouvre un span enfant, dans la même trace."""
+        return Span(nom, self.trace_id, self.span_id, self._termines)
+
+    def terminer(self) -> None:
+        """Termine le span et le range parmi les spans terminés de sa trace."""
+        self.fin_ns = time.time_ns()
+        self._termines.append(self)
+
+    def en_dict(self) -> dict[str, Any]:
+        """Renvoie le span sous forme de dictionnaire (export JSON lines)."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "nom": self.nom,
+            "debut_ns": self.debut_ns,
+            "duree_ns": self.fin_ns - self.debut_ns,
+            "attributs": self.attributs,
+            "erreur": self.erreur,
+        }
+
+
+class Exporteur(Protocol):
+    """Destination des spans terminés."""
+
+    def exporter(self, spans: Sequence[Span]) -> None:
+        """Exporte les spans d'une trace."""
+        ...
+
+
+class ExporteurFichier:
+    """
+    Écrit les spans dans un fichier JSON lines, un span par ligne.
+
+    Le fichier est ouvert en ajout : plusieurs workers peuvent y écrire.
+    """
+
+    def __init__(self, chemin: str) -> None:
+        self.chemin = chemin
+
+    def exporter(self, spans: Sequence[Span]) -> None:
+        """Ajoute les spans à la fin du fichier."""
+        lignes = "".join(json.dumps(s.en_dict(), default=str) + "\n" for s in spans)
+        with open(self.chemin, "a", encoding="utf-8") as fichier:
+            fichier.write(lignes)
+
+
+class ExporteurCollecteur:
+    """Envoie les spans à un collecteur OpenTelemetry local (OTLP/HTTP JSON)."""
+
+    def __init__(self, url: str, delai: float = 2.0) -> None:
+        self.url = url
+        self.delai = delai
+
+    def exporter(self, spans: Sequence[Span]) -> None:
+        """Envoie les spans en une requête ; un collecteur absent est ignoré."""
+        corps = json.dumps(
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [_attribut_otlp("service.name", "restau-api")]
+                        },
+                        "scopeSpans": [
+                            {
+                                "scope": {"name": "app.core.traces"},
+                                "spans": [_span_otlp(s) for s in spans],
+                            }
+                        ],
+                    }
+                ]
+            }
+        ).encode()
+        requete = urllib.request.Request(
+            self.url, data=corps, headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(requete, timeout=self.delai):
+                pass
+        except OSError:
+            pass
+
+
+def _attribut_otlp(cle: str, valeur: Any) -> dict[str, Any]:
+    """Convertit un attribut au format OTLP JSON."""
+    if isinstance(valeur, bool):
+        return {"key": cle, "value": {"boolValue": valeur}}
+    if isinstance(valeur, int):
+        return {"key": cle, "value": {"intValue": str(valeur)}}
+    return {"key": cle, "value": {"stringValue": str(valeur)}}
+
+
+def _span_otlp(span: Span) -> dict[str, Any]:
+    """Convertit un span au format OTLP JSON."""
+    otlp: dict[str, Any] = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.nom,
+        "startTimeUnixNano": str(span.debut_ns),
+        "endTimeUnixNano": str(span.fin_ns),
+        "attributes": [_attribut_otlp(c, v) for c, v in span.attributs.items()],
+    }
+    if span.parent_id:
+        otlp["parentSpanId"] = span.parent_id
+    if span.erreur:
+        otlp["status"] = {"code": 2, "message": span.erreur}
+    return otlp
+
+
+class ExportEnArrierePlan:
+    """
+    Exporte les traces depuis un thread dédié : les requêtes n'attendent pas.
+
+    Au-delà de `_FILE_EXPORT_MAX` traces en attente, les nouvelles traces sont
+    abandonnées plutôt que de ralentir l'API.
+    """
+
+    def __init__(self, exporteur: Exporteur) -> None:
+        self.exporteur = exporteur
+        self._file: queue.Queue[Sequence[Span]] = queue.Queue(_FILE_EXPORT_MAX)
+        self.abandonnees = 0
+        self._thread = threading.Thread(
+            target=self._exporter, name="export-traces", daemon=True
+        )
+        self._thread.start()
+
+    def exporter(self, spans: Sequence[Span]) -> None:
+        """Met les spans d'une trace en attente d'export."""
+        try:
+            self._file.put_nowait(spans)
+        except queue.Full:
+            self.abandonnees += 1
+
+    def vider(self) -> None:
+        """Attend l'export des traces en attente."""
+        self._file.join()
+
+    def _exporter(self) -> None:
+        """Boucle du thread d'export."""
+        while True:
+            spans = self._file.get()
+            try:
+                self.exporteur.exporter(spans)
+            except Exception:
+                pass
+            finally:
+                self._file.task_done()
+
+
+def creer_exporteur() -> Optional[Exporteur]:
+    """
+    Crée l'exporteur configuré par `TRACES_EXPORTEUR`.
+
+    Returns:
+        Optional[Exporteur]: L'exporteur "fichier" ou "collecteur", ou None
+        ("aucun") : les requêtes ne sont alors jamais tracées.
+    """
+    if settings.TRACES_EXPORTEUR == "fichier":
+        return ExporteurFichier(settings.TRACES_FICHIER)
+    if settings.TRACES_EXPORTEUR == "collecteur":
+        return ExporteurCollecteur(settings.TRACES_COLLECTEUR_URL)
+    return None
+
+
+_exporteur = creer_exporteur()
+exporteur: Optional[Exporteur] = (
+    None if _exporteur is None else ExportEnArrierePlan(_exporteur)
+)
+
+# Span en cours : None hors trace (requête non échantillonnée)
+_span_courant: ContextVar[Optional[Span]] = ContextVar("span_courant", default=None)
+
+
+def span_courant() -> Optional[Span]:
+    """Renvoie le span en cours, ou None hors trace."""
+    return _span_courant.get()
+
+
+def _lire_traceparent(valeur: Optional[str]) -> Optional[tuple[str, str, bool]]:
+    """Lit un en-tête W3C `traceparent` : trace, span parent, échantillonnage."""
+    if valeur is None:
+        return None
+    morceaux = valeur.strip().split("-")
+    if len(morceaux) != 4 or len(morceaux[1]) != 32 or len(morceaux[2]) != 16:
+        return None
+    try:
+        drapeaux = int(morceaux[3], 16)
+        int(morceaux[1], 16), int(morceaux[2], 16)
+    except ValueError:
+        return None
+    return morceaux[1], morceaux[2], bool(drapeaux & 1)
+
+
+@contextmanager
+def _ouvrir(span: Span) -> Iterator[Span]:
+    """Rend un span courant le temps du bloc, puis le termine."""
+    jeton = _span_courant.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.erreur = type(e).__name__
+        raise
+    finally:
+        _span_courant.reset(jeton)
+        span.terminer()
+
+
+@contextmanager
+def racine(
+    nom: str, traceparent: Optional[str] = None, echantillonner: Optional[bool] = None
+) -> Iterator[Optional[Span]]:
+    """
+    Ouvre la trace d'une requête, si elle est échantillonnée.
+
+    Args:
+        nom (str): Le nom du span racine.
+        traceparent (Optional[str]): L'en-tête W3C `traceparent` reçu : la
+            trace le prolonge et suit sa décision d'échantillonnage.
+        echantillonner (Optional[bool]): Force la décision (tests, benchmarks).
+
+    Yields:
+        Optional[Span]: Le span racine, ou None si la requête n'est pas tracée.
+        Ses spans sont exportés à la fin du bloc.
+    """
+    parent = _lire_traceparent(traceparent)
+    if echantillonner is None:
+        echantillonner = (
+            parent[2]
+            if parent is not None
+            else random.random() < settings.TRACES_ECHANTILLONNAGE
+        )
+    if exporteur is None or not echantillonner:
+        yield None
+        return
+    termines: list[Span] = []
+    trace_id = parent[0] if parent is not None else os.urandom(16).hex()
+    debut = Span(nom, trace_id, parent[1] if parent else None, termines)
+    try:
+        with _ouvrir(debut) as span:
+            yield span
+    finally:
+        exporteur.exporter(termines)
+
+
+@contextmanager
+def span(nom: str) -> Iterator[Optional[Span]]:
+    """
+    Ouvre un span enfant du span en cours, s'il y en a un.
+
+    Args:
+        nom (str): Le nom du span.
+
+    Yields:
+        Optional[Span]: Le span, ou None hors trace.
+    """
+    parent = _span_courant.get()
+    if parent is None:
+        yield None
+        return
+    with _ouvrir(parent.enfant(nom)) as enfant:
+        yield enfant
+
+
+def tracer(fonction: Callable[P, R]) -> Callable[P, R]:
+    """
+    Entoure une fonction d'un span à son nom (`crud.commande.create_commande`).
+
+    Args:
+        fonction (Callable[P, R]): La fonction à tracer.
+
+    Returns:
+        Callable[P, R]: La fonction, tracée quand elle est appelée dans une trace.
+    """
+    nom = f"{fonction.__module__.removeprefix('app.')}.{fonction.__qualname__}"
+
+    @functools.wraps(fonction)
+    def tracee(*args: P.args, **kwargs: P.kwargs) -> R:
+        parent = _span_courant.get()
+        if parent is None:
+            return fonction(*args, **kwargs)
+        with _ouvrir(parent.enfant(nom)):
+            return fonction(*args, **kwargs)
+
+    return tracee
+
+
+def tracer_module(nom_module: str) -> None:
+    """
+    Trace les fonctions publiques définies dans un module (`tracer`).
+
+    À appeler à la fin du module, avant que d'autres modules importent ses
+    fonctions.
+
+    Args:
+        nom_module (str): Le nom du module (`__name__`).
+    """
+    module = sys.modules[nom_module]
+    for nom, objet in list(vars(module).items()):
+        if (
+            inspect.isfunction(objet)
+            and objet.__module__ == nom_module
+            and not nom.startswith("_")
+            and not inspect.iscoroutinefunction(objet)
+        ):
+            setattr(module, nom, tracer(objet))
+
+
+class TacheTracee(Generic[P, R]):
+    """
+    Une fonction exécutée ailleurs (processus, thread) dans la trace d'origine.
+
+    L'objet est picklable si la fonction l'est (fonction de module) : il peut
+    être passé à un `ProcessPoolExecutor`. Il n'exporte rien lui-même (un
+    collecteur injoignable bloquerait le pool) : les spans de la tâche sont
+    renvoyés avec son résultat.
+    """
+
+    def __init__(self, fonction: Callable[P, R], parent: tuple[str, str]) -> None:
+        self.fonction = fonction
+        self.parent = parent
+
+    def __call__(self, *args: P.args, **kwargs: P.kwargs) -> tuple[R, list[Span]]:
+        trace_id, parent_id = self.parent
+        termines: list[Span] = []
+        tache = Span(
+            f"tache.{self.fonction.__qualname__}", trace_id, parent_id, termines
+        )
+        tache.attributs["pid"] = os.getpid()
+        with _ouvrir(tache):
+            resultat = self.fonction(*args, **kwargs)
+        return resultat, termines
+
+
+async def executer_dans_la_trace(
+    executeur: Executor, fonction: Callable[..., R], *args: Any
+) -> R:
+    """
+    Exécute une fonction dans un pool, dans la trace en cours s'il y en a une.
+
+    La tâche ouvre son span comme enfant du span en cours ; ses spans sont
+    ajoutés à ceux de la trace, exportés avec eux à la fin de la requête.
+
+    Args:
+        executeur (Executor): Le pool (processus ou threads).
+        fonction (Callable[..., R]): La fonction de la tâche (picklable pour
+            un pool de processus).
+        *args (Any): Les arguments de la fonction.
+
+    Returns:
+        R: Le résultat de la fonction.
+    """
+    boucle = asyncio.get_running_loop()
+    parent = _span_courant.get()
+    if parent is None:
+        return await boucle.run_in_executor(executeur, fonction, *args)
+    tache = TacheTracee(fonction, (parent.trace_id, parent.span_id))
+    resultat, spans = await boucle.run_in_executor(executeur, tache, *args)
+    parent._termines.extend(spans)
+    return resultat
+
+
+class TracesMiddleware:
+    """
+    Ouvre la trace des requêtes HTTP échantillonnées.
+
+    Le span racine porte la méthode, la route et le statut ; la réponse
+    d'une requête tracée porte l'en-tête `traceparent` de la trace.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        root_path = scope.get("root_path", "")
+        with racine(
+            f"HTTP {scope['method']}", Headers(scope=scope).get("traceparent")
+        ) as requete:
+            if requete is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def envoyer(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    requete.attributs["http.status_code"] = message["status"]
+                    entetes = list(message.get("headers", []))
+                    entetes.append(
+                        (
+                            b"traceparent",
+                            f"00-{requete.trace_id}-{requete.span_id}-01".encode(),
+                        )
+                    )
+                    message = {**message, "headers": entetes}
+                await send(message)
+
+            requete.attributs["http.method"] = scope["method"]
+            try:
+                await self.app(scope, receive, envoyer)
+            finally:
+                route = modele_route(scope, root_path)
+                requete.attributs["http.route"] = route
+                requete.nom = f"{scope['method']} {route}"
+
+
+def instrumenter_engine(engine: Engine) -> None:
+    """
+    Ajoute un span par requête SQL d'un engine, dans les requêtes tracées.
+
+    Args:
+        engine (Engine): L'engine de l'application.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _avant(connexion: Any, curseur: Any, statement: str, *_: Any) -> None:
+        parent = _span_courant.get()
+        if parent is None:
+            return
+        requete = parent.enfant("sql")
+        requete.attributs["db.statement"] = statement[:_SQL_LONGUEUR_MAX]
+        connexion.info.setdefault("spans_sql", []).append(requete)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _apres(connexion: Any, curseur: Any, *_: Any) -> None:
+        spans = connexion.info.get("spans_sql")
+        if spans:
+            requete = spans.pop()
+            requete.attributs["db.rows"] = curseur.rowcount
+            requete.terminer()
+
+    @event.listens_for(engine, "handle_error")
+    def _erreur(contexte: Any) -> None:
+        if contexte.connection is None:
+            return
+        spans = contexte.connection.info.get("spans_sql")
+        if spans:
+            requete = spans.pop()
+            requete.erreur = type(contexte.original_exception).__name__
+            requete.terminer()
@@ -2,6 +2,7 @@ from collections.abc import Sequence
 
 from sqlmodel import Session, select
 
+from app.core.traces import tracer_module
 from app.models.commandes_et_produits import Categorie
 from app.schemas.categorie import CategorieCreate, CategorieUpdate
 
@@ -107,3 +108,7 @@ def delete_categorie(session: Session, categorie_id: int) -> bool:
     session.delete(categorie)
     session.commit()
     return True
+
+
+# Spans de traces autour des fonctions publiques du module
+tracer_module(__name__)
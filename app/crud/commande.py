@@ -1,24 +1,135 @@
+import json
+from collections import Counter
 from collections.abc import Sequence
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
+from fastapi import HTTPException
+from sqlalchemy import (
+    ColumnClause,
+    ColumnElement,
+    String,
+    TextClause,
+    literal_column,
+    text,
+    update,
+)
 from sqlalchemy.exc import SQLAlchemyError
-from sqlmodel import Session, select
-
-from app.crud.details import update_details_commande
-from app.models.commandes_et_produits import (
-    Commande,
-    DetailCommande,
-    Produit,
-    StatusEnum,
+from sqlmodel import Session, col, select
+
+from app.core.traces import tracer_module
+from app.crud.details import compute_montant_total, update_details_commande
+from app.crud.produit import apply_stocks, lock_produits, verifier_stocks
+from app.db.json_sql import objet_json, tableau_json, tableau_json_par_ids
+from app.db.versions import incrementer_version
+from app.models.commandes_et_produits import Commande, DetailCommande, StatusEnum
+from app.schemas.commande import (
+    CommandeCreate,
+    CommandeRead,
+    CommandeRejetee,
+    CommandeUpdate,
+)
+from app.schemas.detail import DetailsRead
+
+# Statut que doit avoir une commande pour passer à chaque statut
+# (en_attente -> en_preparation -> prete -> servie)
+STATUT_PRECEDENT = {
+    StatusEnum.en_preparation: StatusEnum.en_attente,
+    StatusEnum.prete: StatusEnum.en_preparation,
+    StatusEnum.servie: StatusEnum.prete,
+}
+
+# Canal Postgres (LISTEN / NOTIFY) signalant les changements de statut des
+# commandes ; charge utile : {"statut": ..., "ids": [...]}
+CANAL_COMMANDES = "commandes"
+
+# Transitions groupées en une requête : la mise à jour (CTE `maj`) et le
+# compte rendu de chaque ID demandé. La requête principale voit les commandes
+# telles qu'avant la mise à jour : le statut renvoyé pour un refus est le
+# statut qui l'a causé.
+_TRANSITIONS_GROUPEES = text(
+    "WITH demandes AS (SELECT DISTINCT unnest(CAST(:ids AS integer[])) AS id), "
+    "maj AS (UPDATE commandes SET statut = :statut, version = version + 1 "
+    "WHERE id IN (SELECT id FROM demandes) AND statut = :precedent "
+    "RETURNING id) "
+    "SELECT demandes.id, maj.id IS NOT NULL, commandes.statut FROM demandes "
+    "LEFT JOIN maj ON maj.id = demandes.id "
+    "LEFT JOIN commandes ON commandes.id = demandes.id "
+    "ORDER BY demandes.id"
+)
+
+# Texte JSON des détails d'une commande, construit par Postgres (voir
+# `get_commandes_json`) ; la sous-requête n'est lue que si "details" est demandé
+_DETAILS_JSON = (
+    "(SELECT coalesce("
+    + tableau_json(objet_json(DetailsRead, "d"), "d.produit_id")
+    + ", '[]') FROM details_commandes AS d WHERE d.commande_id = commandes.id)"
 )
-from app.schemas.commande import CommandeCreate, CommandeUpdate
+
+
+@lru_cache
+def _commande_json(champs: Optional[tuple[str, ...]]) -> ColumnClause[str]:
+    """Texte JSON d'une commande au format `CommandeRead`, limité à `champs`."""
+    return literal_column(
+        objet_json(CommandeRead, "commandes", {"details": _DETAILS_JSON}, champs),
+        String,
+    )
+
+
+@lru_cache
+def _liste_commandes_json(champs: Optional[tuple[str, ...]]) -> ColumnClause[str]:
+    """Texte JSON de la liste des commandes au format `list[CommandeRead]`."""
+    return literal_column(
+        tableau_json(
+            objet_json(CommandeRead, "commandes", {"details": _DETAILS_JSON}, champs),
+            "commandes.id",
+        ),
+        String,
+    )
+
+
+@lru_cache
+def _commandes_par_ids_json(champs: Optional[tuple[str, ...]]) -> TextClause:
+    """Texte JSON des commandes d'une liste d'IDs (`get_commandes_par_ids_json`)."""
+    return text(
+        tableau_json_par_ids(
+            objet_json(CommandeRead, "commandes", {"details": _DETAILS_JSON}, champs),
+            "commandes",
+        )
+    )
+
+
+def _notifier_transitions(
+    session: Session, ids: Sequence[int], statut: StatusEnum
+) -> None:
+    """Signale des changements de statut sur `CANAL_COMMANDES`, en un message.
+
+    La notification part avec le commit de la transaction (et pas du tout en
+    cas d'annulation).
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        ids (Sequence[int]): Les commandes passées à `statut`.
+        statut (StatusEnum): Le nouveau statut.
+    """
+    session.execute(
+        text("SELECT pg_notify(:canal, :message)"),
+        {
+            "canal": CANAL_COMMANDES,
+            "message": json.dumps({"statut": statut.value, "ids": list(ids)}),
+        },
+    )
 
 
 # --- Create ---
 def create_commande(session: Session, commande_data: CommandeCreate) -> Commande:
     """Crée une nouvelle commande avec ses détails et calcule le montant total.
 
+    Les produits commandés sont verrouillés (`lock_produits`) puis leur stock
+    est décrémenté dans la même transaction que la création de la commande.
+    Le prix de chaque produit est figé sur le détail (`prix_unitaire`).
+
     Args:
         session (Session): La session SQLModel utilisée pour la transaction.
         commande_data (CommandeCreate): Les données de la commande à créer,
@@ -28,10 +139,17 @@ def create_commande(session: Session, commande_data: CommandeCreate) -> Commande
         Commande: La commande créée et persistée en base.
 
     Raises:
+        HTTPException: 400 si un produit n'existe pas,
+        409 si le stock d'un produit est insuffisant.
         SQLAlchemyError: En cas d'erreur lors de la transaction,
         celle-ci est rollbackée.
     """
     try:
+        produits = lock_produits(session, (d.produit_id for d in commande_data.details))
+        verifier_stocks(
+            produits, {d.produit_id: -d.quantite for d in commande_data.details}
+        )
+
         commande = Commande(
             client_id=commande_data.client_id,
             date_commande=commande_data.date_commande,
@@ -41,25 +159,27 @@ def create_commande(session: Session, commande_data: CommandeCreate) -> Commande
         session.add(commande)
         session.flush()
 
-        montant_total = 0.0
-        for det in commande_data.details:
-            detail = DetailCommande(
+        details = [
+            DetailCommande(
                 commande_id=commande.id,
                 produit_id=det.produit_id,
                 quantite=det.quantite,
+                prix_unitaire=produits[det.produit_id][0],
             )
-            session.add(detail)
+            for det in commande_data.details
+        ]
+        session.add_all(details)
 
-            produit = session.get(Produit, det.produit_id)
-            if produit:
-                montant_total += produit.prix * det.quantite
-
-        commande.montant_total = round(montant_total, 2)
+        apply_stocks(
+            session,
+            [(d.produit_id, -d.quantite, False) for d in commande_data.details],
+        )
+        commande.montant_total = compute_montant_total(details)
         session.commit()
         session.refresh(commande)
         return commande
 
-    except SQLAlchemyError as e:
+    except (SQLAlchemyError, HTTPException) as e:
         session.rollback()
         raise e
 
@@ -80,24 +200,96 @@ def get_commandes(
         statut (Optional[StatusEnum]): Filtre par statut de commande.
 
     Returns:
-        Sequence[Commande]: Une liste de commandes correspondant aux filtres.
+        Sequence[Commande]: Les commandes correspondant aux filtres, triées
+        par ID.
     """
-    statement = select(Commande)
+    statement = (
+        select(Commande)
+        .where(*_filtres_commandes(client_id, date_commande, statut))
+        .order_by(col(Commande.id))
+    )
+
+    result = session.exec(statement)
+    return result.all()
+
+
+def get_commandes_json(
+    session: Session,
+    client_id: Optional[int] = None,
+    date_commande: Optional[datetime] = None,
+    statut: Optional[StatusEnum] = None,
+    champs: Optional[tuple[str, ...]] = None,
+) -> Optional[str]:
+    """Récupère les commandes filtrées, directement sous forme de texte JSON.
+
+    Mêmes filtres et même ordre que `get_commandes`, mais le JSON (détails
+    compris) est assemblé par Postgres en une requête : aucun objet SQLModel
+    ni modèle pydantic n'est instancié. Le texte est identique, octet pour
+    octet, à la réponse `list[CommandeRead]` de FastAPI.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la requête.
+        client_id (Optional[int]): Filtre par identifiant de client.
+        date_commande (Optional[datetime]): Filtre par date de commande.
+        statut (Optional[StatusEnum]): Filtre par statut de commande.
+        champs (Optional[tuple[str, ...]]): Les champs de `CommandeRead` à
+            renvoyer (tous par défaut) ; sans "details", les détails ne sont
+            pas lus.
+
+    Returns:
+        Optional[str]: Le tableau JSON des commandes, ou None si aucune
+        commande ne correspond aux filtres.
+    """
+    statement = (
+        select(_liste_commandes_json(champs))
+        .select_from(Commande)
+        .where(*_filtres_commandes(client_id, date_commande, statut))
+    )
+    return session.exec(statement).one()
+
+
+def get_commandes_par_ids_json(
+    session: Session, ids: list[int], champs: Optional[tuple[str, ...]] = None
+) -> str:
+    """Récupère les commandes d'une liste d'IDs, en une requête, sous forme de JSON.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la requête.
+        ids (list[int]): Les IDs demandés (non vide).
+        champs (Optional[tuple[str, ...]]): Les champs de `CommandeRead` à
+            renvoyer (tous par défaut).
 
+    Returns:
+        str: Le tableau JSON des commandes, détails compris, dans l'ordre de
+        `ids`, avec `null` pour un ID inexistant.
+    """
+    texte: str = session.execute(
+        _commandes_par_ids_json(champs), {"ids": ids}
+    ).scalar_one()
+    return texte
+
+
+def _filtres_commandes(
+    client_id: Optional[int],
+    date_commande: Optional[datetime],
+    statut: Optional[StatusEnum],
+) -> list[ColumnElement[bool]]:
+    """Construit les conditions de filtrage des listes de commandes."""
+    filtres: list[ColumnElement[bool]] = []
     if client_id is not None:
-        statement = statement.where(Commande.client_id == client_id)
+        filtres.append(col(Commande.client_id) == client_id)
     if date_commande is not None:
-        statement = statement.where(
-            Commande.date_commande
-            >= datetime.combine(date_commande, datetime.min.time()),
-            Commande.date_commande
-            < datetime.combine(date_commande, datetime.max.time()),
+        filtres.append(
+            col(Commande.date_commande)
+            >= datetime.combine(date_commande, datetime.min.time())
+        )
+        filtres.append(
+            col(Commande.date_commande)
+            < datetime.combine(date_commande, datetime.max.time())
         )
     if statut is not None:
-        statement = statement.where(Commande.statut == statut)
-
-    result = session.exec(statement)
-    return result.all()
+        filtres.append(col(Commande.statut) == statut)
+    return filtres
 
 
 # --- Read (par id)---
@@ -116,21 +308,57 @@ def get_commande(session: Session, commande_id: int) -> Optional[Commande]:
     return result.one_or_none()
 
 
+def get_commande_json(
+    session: Session, commande_id: int, champs: Optional[tuple[str, ...]] = None
+) -> Optional[tuple[str, int]]:
+    """Récupère une commande par son identifiant, directement sous forme de texte JSON.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la requête.
+        commande_id (int): L'identifiant de la commande à récupérer.
+        champs (Optional[tuple[str, ...]]): Les champs de `CommandeRead` à
+            renvoyer (tous par défaut).
+
+    Returns:
+        Optional[tuple[str, int]]: L'objet JSON de la commande, détails
+        compris, et sa version (ETag), ou None si elle n'existe pas.
+    """
+    statement = select(_commande_json(champs), col(Commande.version)).where(
+        col(Commande.id) == commande_id
+    )
+    ligne = session.exec(statement).one_or_none()
+    return None if ligne is None else (ligne[0], ligne[1])
+
+
 # --- Update ---
 def update_commande(
-    session: Session, commande_id: int, commande_data: CommandeUpdate
+    session: Session,
+    commande_id: int,
+    commande_data: CommandeUpdate,
+    version: Optional[int] = None,
 ) -> Optional[Commande]:
     """Met à jour une commande existante avec de nouvelles informations.
 
+    La version de la commande est vérifiée et incrémentée avant la
+    modification (`incrementer_version`) : une mise à jour partie d'une
+    version périmée échoue au lieu d'écraser la précédente.
+
     Args:
         session (Session): La session SQLModel utilisée pour la transaction.
         commande_id (int): L'identifiant de la commande à mettre à jour.
         commande_data (CommandeUpdate): Les nouvelles données à appliquer,
         y compris éventuellement les détails.
+        version (Optional[int]): La version lue par le client (`If-Match`),
+            None pour ne pas la vérifier.
+
+    Raises:
+        HTTPException: 412 si la commande n'est plus à cette version.
 
     Returns:
         Optional[Commande]: La commande mise à jour ou None si elle n'existe pas.
     """
+    if incrementer_version(session, Commande, commande_id, version) is None:
+        return None
     commande = session.get(Commande, commande_id)
     if not commande:
         return None
@@ -148,10 +376,105 @@ def update_commande(
     return commande
 
 
+def transition_commande(session: Session, commande_id: int, statut: StatusEnum) -> int:
+    """Fait passer une commande au statut suivant, en une seule requête.
+
+    Seules les transitions de `STATUT_PRECEDENT` sont permises. Le changement
+    est un `UPDATE ... WHERE id = :id AND statut = :precedent RETURNING` :
+    deux transitions concurrentes depuis le même statut ne peuvent pas
+    réussir toutes les deux, sans charger la commande ni ses détails. La
+    version de la commande est incrémentée (ETag) et le changement est
+    signalé sur `CANAL_COMMANDES`.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        commande_id (int): L'identifiant de la commande.
+        statut (StatusEnum): Le nouveau statut.
+
+    Raises:
+        HTTPException: 404 si la commande n'existe pas, 409 si elle n'est
+        pas au statut précédant `statut`.
+
+    Returns:
+        int: La nouvelle version de la commande.
+    """
+    precedent = STATUT_PRECEDENT.get(statut)
+    if precedent is not None:
+        statement = (
+            update(Commande)
+            .where(col(Commande.id) == commande_id, col(Commande.statut) == precedent)
+            .values(statut=statut, version=col(Commande.version) + 1)
+            .returning(col(Commande.version))
+            .execution_options(synchronize_session=False)
+        )
+        version: Optional[int] = session.execute(statement).scalar_one_or_none()
+        if version is not None:
+            _notifier_transitions(session, [commande_id], statut)
+            session.commit()
+            return version
+
+    # Échec : lecture du statut actuel pour expliquer le refus
+    actuel = session.exec(
+        select(Commande.statut).where(col(Commande.id) == commande_id)
+    ).one_or_none()
+    if actuel is None:
+        raise HTTPException(status_code=404, detail="Commande non trouvée")
+    raise HTTPException(
+        status_code=409,
+        detail=f"Transition impossible : {StatusEnum(actuel).value} -> {statut.value}"
+        + (f" (statut attendu : {precedent.value})" if precedent else ""),
+    )
+
+
+def transition_commandes(
+    session: Session, ids: Sequence[int], statut: StatusEnum
+) -> tuple[list[int], list[CommandeRejetee]]:
+    """Fait passer un lot de commandes au statut `statut`, en une seule requête.
+
+    Chaque commande n'est changée que si la transition est permise depuis son
+    statut (`STATUT_PRECEDENT`), comme pour `transition_commande` ; les autres
+    sont laissées telles quelles et signalées comme refusées. Le lot entier
+    donne lieu à une seule notification sur `CANAL_COMMANDES`.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        ids (Sequence[int]): Les identifiants des commandes (doublons ignorés).
+        statut (StatusEnum): Le nouveau statut.
+
+    Returns:
+        tuple[list[int], list[CommandeRejetee]]: Les IDs des commandes
+        passées à `statut` et les refus, avec le statut qui les a causés
+        (None : commande inexistante), triés par ID.
+    """
+    precedent = STATUT_PRECEDENT.get(statut)
+    lignes = session.execute(
+        _TRANSITIONS_GROUPEES,
+        {
+            "ids": list(ids),
+            "statut": statut.value,
+            "precedent": precedent.value if precedent else None,
+        },
+    ).all()
+    transitionnees = [commande_id for commande_id, changee, _ in lignes if changee]
+    if transitionnees:
+        _notifier_transitions(session, transitionnees, statut)
+    session.commit()
+    rejetees = [
+        CommandeRejetee(id=commande_id, statut=actuel)
+        for commande_id, changee, actuel in lignes
+        if not changee
+    ]
+    return transitionnees, rejetees
+
+
 # --- Delete ---
 def delete_commande(session: Session, commande_id: int) -> bool:
     """Supprime une commande existante par son identifiant.
 
+    Les quantités commandées sont rendues au stock des produits, verrouillés
+    au préalable (`lock_produits`), dans la même transaction que la
+    suppression.
+
     Args:
         session (Session): La session SQLModel utilisée pour la transaction.
         commande_id (int): L'identifiant de la commande à supprimer.
@@ -169,9 +492,18 @@ def delete_commande(session: Session, commande_id: int) -> bool:
         return False
 
     try:
+        rendus: Counter[int] = Counter()
+        for detail in commande.details:
+            rendus[detail.produit_id] += detail.quantite
+        lock_produits(session, rendus)
+        apply_stocks(session, [(i, quantite, False) for i, quantite in rendus.items()])
         session.delete(commande)
         session.commit()
         return True
     except SQLAlchemyError:
         session.rollback()
         raise
+
+
+# Spans de traces autour des fonctions publiques du module
+tracer_module(__name__)
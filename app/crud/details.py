@@ -1,9 +1,27 @@
-from typing import Sequence
+from collections.abc import Iterable
+from datetime import datetime
+from typing import Optional, Sequence
 
-from sqlmodel import Session
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlmodel import Session, col, select
 
-from app.models.commandes_et_produits import Commande, DetailCommande, Produit
-from app.schemas.detail import DetailsUpdate
+from app.core.traces import tracer_module
+from app.crud.produit import apply_stocks, lock_produits, verifier_stocks
+from app.models.commandes_et_produits import Commande, DetailCommande
+from app.schemas.detail import ChiffreAffairesProduit, DetailsUpdate
+
+
+def compute_montant_total(details: Iterable[DetailCommande]) -> float:
+    """Calcule le montant total d'une commande à partir de ses seuls détails.
+
+    Args:
+        details (Iterable[DetailCommande]): Les détails de la commande.
+
+    Returns:
+        float: La somme des `prix_unitaire * quantite`, arrondie au centime.
+    """
+    return round(sum(d.prix_unitaire * d.quantite for d in details), 2)
 
 
 # --- Update ---
@@ -14,7 +32,10 @@ def update_details_commande(
 
     Cette fonction supprime les détails existants de la commande,
     ajoute les nouveaux détails fournis et met à jour le montant total
-    de la commande en fonction des prix des produits.
+    de la commande. Les produits déjà présents conservent le prix figé lors
+    de la commande, les nouveaux prennent leur prix actuel. Les stocks sont
+    corrigés de la différence entre anciennes et nouvelles quantités, après
+    verrouillage des produits concernés (`lock_produits`).
 
     Args:
         session (Session): La session SQLModel utilisée pour la transaction.
@@ -22,9 +43,35 @@ def update_details_commande(
         details_data (Sequence[DetailsUpdate]): Une séquence d'objets DetailsUpdate
             représentant les nouveaux détails de la commande.
 
+    Raises:
+        HTTPException: 400 si un détail est incomplet ou si un produit n'existe
+        pas, 409 si le stock d'un produit est insuffisant.
+
     Returns:
         None
     """
+    lignes = [
+        (det.produit_id, det.quantite)
+        for det in details_data
+        if det.produit_id is not None and det.quantite is not None
+    ]
+    if len(lignes) != len(details_data):
+        raise HTTPException(
+            status_code=400,
+            detail="Chaque détail doit préciser produit_id et quantite",
+        )
+
+    # Variation de stock : anciennes quantités rendues, nouvelles consommées
+    variations: dict[int, int] = {}
+    for detail in commande.details:
+        variations[detail.produit_id] = detail.quantite
+    for produit_id, quantite in lignes:
+        variations[produit_id] = variations.get(produit_id, 0) - quantite
+    produits = lock_produits(session, variations)
+    verifier_stocks(produits, variations)
+
+    prix_figes = {d.produit_id: d.prix_unitaire for d in commande.details}
+
     # Supprimer les détails existants
     for detail in list(commande.details):
         session.delete(detail)
@@ -32,23 +79,75 @@ def update_details_commande(
 
     # Ajouter les nouveaux détails
     new_details = []
-    for det in details_data:
+    for produit_id, quantite in lignes:
         detail_instance = DetailCommande(
             commande_id=commande.id,
-            produit_id=det.produit_id,
-            quantite=det.quantite,
+            produit_id=produit_id,
+            quantite=quantite,
+            prix_unitaire=prix_figes.get(produit_id, produits[produit_id][0]),
         )
         session.add(detail_instance)
         new_details.append(detail_instance)
 
     commande.details = new_details
 
-    # Recalculer le montant total
-    montant_total = 0.0
-    for detail in new_details:
-        produit = session.get(Produit, detail.produit_id)
-        if produit:
-            montant_total += produit.prix * detail.quantite
+    apply_stocks(
+        session,
+        [(i, variation, False) for i, variation in variations.items() if variation],
+    )
 
-    commande.montant_total = round(montant_total, 2)
+    # Recalculer le montant total
+    commande.montant_total = compute_montant_total(new_details)
     session.add(commande)
+
+
+# --- Read (chiffre d'affaires) ---
+def get_chiffre_affaires(
+    session: Session,
+    debut: Optional[datetime] = None,
+    fin: Optional[datetime] = None,
+) -> list[ChiffreAffairesProduit]:
+    """Calcule le chiffre d'affaires par produit sur une période.
+
+    Les montants sont agrégés depuis `details_commandes` (prix figé à la
+    commande), sans jointure sur `produits` : les chiffres passés ne bougent
+    pas quand un prix change. La table `commandes` n'est lue que pour filtrer
+    sur la date.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la requête.
+        debut (Optional[datetime]): Date de commande minimale (incluse).
+        fin (Optional[datetime]): Date de commande maximale (exclue).
+
+    Returns:
+        list[ChiffreAffairesProduit]: Quantités vendues et montant par produit,
+        du montant le plus élevé au plus faible.
+    """
+    montant = func.sum(col(DetailCommande.prix_unitaire) * col(DetailCommande.quantite))
+    statement = select(
+        DetailCommande.produit_id,
+        func.sum(col(DetailCommande.quantite)),
+        montant,
+    ).group_by(col(DetailCommande.produit_id))
+
+    if debut is not None or fin is not None:
+        statement = statement.join(
+            Commande, col(Commande.id) == col(DetailCommande.commande_id)
+        )
+        if debut is not None:
+            statement = statement.where(col(Commande.date_commande) >= debut)
+        if fin is not None:
+            statement = statement.where(col(Commande.date_commande) < fin)
+
+    return [
+        ChiffreAffairesProduit(
+            produit_id=produit_id, quantite=quantite, montant=round(total, 2)
+        )
+        for produit_id, quantite, total in session.exec(
+            statement.order_by(montant.desc())
+        ).all()
+    ]
+
+
+# Spans de traces autour des fonctions publiques du module
+tracer_module(__name__)
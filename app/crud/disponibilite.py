@@ -0,0 +1,187 @@
+import hashlib
+import threading
+import time
+from collections.abc import Mapping, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.core.metriques import compter_cache
+from app.core.traces import tracer_module
+from app.models.commandes_et_produits import Produit
+from app.schemas.produit import DisponibilitesRead, ProduitStockBasRead
+
+# Clé de `session.info` où sont notés les stocks modifiés en attente de commit
+_STOCKS_MODIFIES = "stocks_modifies"
+
+
+class _CarteDisponibilites:
+    """
+    Carte des disponibilités (produit_id → en rupture / stock bas) du worker.
+
+    Les produits absents de la carte sont disponibles. La carte est construite
+    à partir des index `ix_produits_rupture` et `ix_produits_stock`, puis tenue
+    à jour à chaque commit modifiant un stock. Les écritures faites par les
+    autres workers sont prises en compte au plus tard après
+    `DISPONIBILITES_TTL_SECONDES`, lors de la reconstruction.
+    """
+
+    def __init__(self) -> None:
+        self._verrou = threading.Lock()
+        self._rupture: set[int] = set()
+        self._stock_bas: set[int] = set()
+        self._seuil = settings.STOCK_BAS_SEUIL
+        self._etag = ""
+        self._expire_a = 0.0
+
+    def est_valide(self) -> bool:
+        """Indique si la carte peut être servie sans reconstruction."""
+        return time.monotonic() < self._expire_a
+
+    def charger(self, rupture: Sequence[int], stock_bas: Sequence[int]) -> None:
+        """Remplace la carte par les ID lus en base et relance le TTL."""
+        with self._verrou:
+            self._rupture = set(rupture)
+            self._stock_bas = set(stock_bas)
+            self._seuil = settings.STOCK_BAS_SEUIL
+            self._calculer_etag()
+            self._expire_a = time.monotonic() + settings.DISPONIBILITES_TTL_SECONDES
+
+    def mettre_a_jour(self, stocks: Mapping[int, int]) -> None:
+        """Reclasse les produits dont le stock vient de changer."""
+        with self._verrou:
+            for produit_id, stock in stocks.items():
+                self._rupture.discard(produit_id)
+                self._stock_bas.discard(produit_id)
+                if stock <= 0:
+                    self._rupture.add(produit_id)
+                elif stock <= self._seuil:
+                    self._stock_bas.add(produit_id)
+            self._calculer_etag()
+
+    def invalider(self) -> None:
+        """Force la reconstruction au prochain accès."""
+        self._expire_a = 0.0
+
+    def lire(self) -> tuple[DisponibilitesRead, str]:
+        """Renvoie une copie de la carte et son ETag."""
+        with self._verrou:
+            return (
+                DisponibilitesRead(
+                    seuil=self._seuil,
+                    rupture=sorted(self._rupture),
+                    stock_bas=sorted(self._stock_bas),
+                ),
+                self._etag,
+            )
+
+    def _calculer_etag(self) -> None:
+        """Recalcule l'ETag à partir du contenu de la carte."""
+        empreinte = f"{self._seuil}|{sorted(self._rupture)}|{sorted(self._stock_bas)}"
+        self._etag = hashlib.sha1(empreinte.encode()).hexdigest()[:16]
+
+
+_carte = _CarteDisponibilites()
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _appliquer_stocks_commites(session: OrmSession) -> None:
+    """Reporte dans la carte les stocks modifiés par la transaction commitée."""
+    stocks = session.info.pop(_STOCKS_MODIFIES, None)
+    if stocks:
+        _carte.mettre_a_jour(stocks)
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _oublier_stocks_annules(session: OrmSession) -> None:
+    """Oublie les stocks modifiés par une transaction annulée."""
+    session.info.pop(_STOCKS_MODIFIES, None)
+
+
+# --- Update ---
+def note_stocks(session: Session, stocks: Mapping[int, int]) -> None:
+    """Note des nouveaux stocks à reporter dans la carte au commit de la session.
+
+    Args:
+        session (Session): La session dont la transaction a modifié les stocks.
+        stocks (Mapping[int, int]): Le nouveau stock de chaque produit modifié.
+
+    Returns:
+        None
+    """
+    session.info.setdefault(_STOCKS_MODIFIES, {}).update(stocks)
+
+
+def invalidate_disponibilites() -> None:
+    """Force la reconstruction de la carte au prochain accès.
+
+    À appeler après une création, suppression ou modification de produit qui ne
+    passe pas par `apply_stocks`.
+
+    Returns:
+        None
+    """
+    _carte.invalider()
+
+
+# --- Read ---
+def get_disponibilites(session: Session) -> tuple[DisponibilitesRead, str]:
+    """Récupère la carte des disponibilités et son ETag.
+
+    La carte n'est reconstruite depuis la base que si elle a expiré ; la
+    reconstruction lit uniquement les produits en rupture et en stock bas via
+    les index partiels, sans parcourir la table.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la requête.
+
+    Returns:
+        tuple[DisponibilitesRead, str]: Les ID en rupture et en stock bas,
+        et l'ETag de cette carte.
+    """
+    valide = _carte.est_valide()
+    compter_cache("disponibilites", valide)
+    if not valide:
+        rupture = session.exec(select(Produit.id).where(col(Produit.stock) <= 0)).all()
+        stock_bas = session.exec(
+            select(Produit.id).where(
+                col(Produit.stock) > 0,
+                col(Produit.stock) <= settings.STOCK_BAS_SEUIL,
+            )
+        ).all()
+        _carte.charger(
+            [i for i in rupture if i is not None],
+            [i for i in stock_bas if i is not None],
+        )
+    return _carte.lire()
+
+
+def get_produits_stock_bas(session: Session, seuil: int) -> list[ProduitStockBasRead]:
+    """Récupère les produits dont le stock est inférieur ou égal à un seuil.
+
+    La requête est servie par un parcours de l'index `ix_produits_stock`.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la requête.
+        seuil (int): Le stock maximal des produits à remonter.
+
+    Returns:
+        list[ProduitStockBasRead]: Les produits concernés, du stock le plus bas
+        au plus haut.
+    """
+    statement = (
+        select(Produit.id, Produit.nom, Produit.stock)
+        .where(col(Produit.stock) <= seuil)
+        .order_by(col(Produit.stock), col(Produit.id))
+    )
+    return [
+        ProduitStockBasRead(id=produit_id, nom=nom, stock=stock)
+        for produit_id, nom, stock in session.exec(statement).all()
+        if produit_id is not None
+    ]
+
+
+# Spans de traces autour des fonctions publiques du module
+tracer_module(__name__)
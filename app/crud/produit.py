@@ -1,10 +1,87 @@
-from collections.abc import Sequence
+import csv
+import io
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from functools import lru_cache
+from typing import Optional
 
 from fastapi import HTTPException
-from sqlmodel import Session, select
+from pydantic import ValidationError
+from sqlalchemy import (
+    Boolean,
+    ColumnClause,
+    Integer,
+    String,
+    TextClause,
+    case,
+    column,
+    literal_column,
+    text,
+    update,
+    values,
+)
+from sqlmodel import Session, col, select
 
+from app.core.traces import tracer_module
+from app.crud.disponibilite import invalidate_disponibilites, note_stocks
+from app.db.json_sql import objet_json, tableau_json, tableau_json_par_ids
+from app.db.versions import incrementer_version
 from app.models.commandes_et_produits import Categorie, Produit
-from app.schemas.produit import ProduitCreate, ProduitUpdate
+from app.schemas.import_donnees import ImportErreur
+from app.schemas.produit import (
+    ProduitCreate,
+    ProduitImportRapport,
+    ProduitRead,
+    ProduitUpdate,
+    StockAjustement,
+    StockMode,
+    StockRead,
+)
+from app.utils.helpers import LigneImport, resumer_erreur_validation
+
+# Upsert des lignes chargées par COPY dans la table temporaire, sur le nom du produit
+UPSERT_PRODUITS_IMPORT = text("""
+    WITH upsert AS (
+        INSERT INTO produits (nom, description, prix, categorie_id, stock)
+        SELECT nom, description, prix, categorie_id, stock FROM pg_temp.produits_import
+        ON CONFLICT (nom) DO UPDATE SET
+            description = EXCLUDED.description,
+            prix = EXCLUDED.prix,
+            categorie_id = EXCLUDED.categorie_id,
+            stock = EXCLUDED.stock,
+            version = produits.version + 1
+        RETURNING (xmax = 0) AS insere
+    )
+    SELECT
+        count(*) FILTER (WHERE insere) AS inseres,
+        count(*) FILTER (WHERE NOT insere) AS mis_a_jour
+    FROM upsert
+    """)
+
+
+@lru_cache
+def _produit_json(champs: Optional[tuple[str, ...]]) -> ColumnClause[str]:
+    """Texte JSON d'un produit au format `ProduitRead`, limité à `champs`."""
+    return literal_column(objet_json(ProduitRead, "produits", champs=champs), String)
+
+
+@lru_cache
+def _liste_produits_json(champs: Optional[tuple[str, ...]]) -> ColumnClause[str]:
+    """Texte JSON de la liste des produits au format `list[ProduitRead]`."""
+    return literal_column(
+        tableau_json(objet_json(ProduitRead, "produits", champs=champs), "produits.id"),
+        String,
+    )
+
+
+@lru_cache
+def _produits_par_ids_json(champs: Optional[tuple[str, ...]]) -> TextClause:
+    """Texte JSON des produits d'une liste d'IDs (`get_produits_par_ids_json`)."""
+    return text(
+        tableau_json_par_ids(
+            objet_json(ProduitRead, "produits", champs=champs), "produits"
+        )
+    )
 
 
 # --- Create ---
@@ -41,9 +118,96 @@ def create_produit(session: Session, data: ProduitCreate) -> Produit:
     session.add(produit)
     session.commit()
     session.refresh(produit)
+    invalidate_disponibilites()
     return produit
 
 
+# --- Create (import en masse) ---
+def import_produits(
+    session: Session, lignes: Iterable[LigneImport]
+) -> ProduitImportRapport:
+    """Importe ou met à jour des produits en masse.
+
+    Les lignes sont validées en mémoire (schéma `ProduitCreate` et catégories
+    préchargées en une seule requête), puis les lignes valides sont chargées
+    par `COPY` dans une table temporaire et fusionnées dans `produits` par un
+    unique `INSERT ... ON CONFLICT (nom) DO UPDATE`.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        lignes (Iterable[LigneImport]): Les lignes lues depuis le fichier d'import.
+
+    Returns:
+        ProduitImportRapport: Le nombre de produits insérés et mis à jour, et les
+        erreurs ligne par ligne (les lignes en erreur ne sont pas importées).
+    """
+    categories = set(session.exec(select(Categorie.id)).all())
+    valides: dict[str, ProduitCreate] = {}
+    lignes_par_nom: dict[str, int] = {}
+    erreurs: list[ImportErreur] = []
+
+    for ligne in lignes:
+        if ligne.donnees is None:
+            erreurs.append(ImportErreur(ligne=ligne.numero, erreur=str(ligne.erreur)))
+            continue
+        try:
+            data = ProduitCreate.model_validate(ligne.donnees)
+        except ValidationError as e:
+            erreurs.append(
+                ImportErreur(ligne=ligne.numero, erreur=resumer_erreur_validation(e))
+            )
+            continue
+        if data.categorie_id is not None and data.categorie_id not in categories:
+            erreurs.append(
+                ImportErreur(
+                    ligne=ligne.numero,
+                    erreur=f"Catégorie ID {data.categorie_id} introuvable",
+                )
+            )
+            continue
+        if data.nom in valides:
+            erreurs.append(
+                ImportErreur(
+                    ligne=ligne.numero,
+                    erreur=(
+                        f"Produit '{data.nom}' déjà présent "
+                        f"ligne {lignes_par_nom[data.nom]}"
+                    ),
+                )
+            )
+            continue
+        valides[data.nom] = data
+        lignes_par_nom[data.nom] = ligne.numero
+
+    if not valides:
+        return ProduitImportRapport(inseres=0, mis_a_jour=0, erreurs=erreurs)
+
+    tampon = io.StringIO()
+    ecrivain = csv.writer(tampon)
+    for data in valides.values():
+        ecrivain.writerow(
+            [data.nom, data.description, data.prix, data.categorie_id, data.stock]
+        )
+    tampon.seek(0)
+
+    connexion = session.connection().connection.driver_connection
+    assert connexion is not None
+    with connexion.cursor() as curseur:
+        curseur.execute(
+            "DROP TABLE IF EXISTS pg_temp.produits_import;"
+            "CREATE TEMP TABLE produits_import ("
+            " nom text, description text, prix double precision,"
+            " categorie_id integer, stock integer"
+            ") ON COMMIT DROP"
+        )
+        curseur.copy_expert("COPY produits_import FROM STDIN WITH (FORMAT csv)", tampon)
+
+    inseres, mis_a_jour = session.execute(UPSERT_PRODUITS_IMPORT).one()
+    session.commit()
+    invalidate_disponibilites()
+    return ProduitImportRapport(inseres=inseres, mis_a_jour=mis_a_jour, erreurs=erreurs)
+
+
 # --- Read ---
 def get_all_produits(session: Session) -> Sequence[Produit]:
     """Récupère tous les produits de la base de données.
@@ -52,9 +216,51 @@ def get_all_produits(session: Session) -> Sequence[Produit]:
         session (Session): La session SQLModel utilisée pour la transaction.
 
     Returns:
-        Sequence[Produit]: Une séquence contenant tous les produits.
+        Sequence[Produit]: Tous les produits, triés par ID.
     """
-    return session.exec(select(Produit)).all()
+    return session.exec(select(Produit).order_by(col(Produit.id))).all()
+
+
+def get_produits_json(
+    session: Session, champs: Optional[tuple[str, ...]] = None
+) -> str:
+    """Récupère tous les produits, directement sous forme de texte JSON.
+
+    Le JSON est assemblé par Postgres, sans instancier d'objets : le texte est
+    identique, octet pour octet, à la réponse `list[ProduitRead]` de FastAPI
+    pour `get_all_produits`.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        champs (Optional[tuple[str, ...]]): Les champs de `ProduitRead` à
+            renvoyer (tous par défaut) ; seules leurs colonnes sont lues.
+
+    Returns:
+        str: Le tableau JSON des produits, triés par ID.
+    """
+    statement = select(_liste_produits_json(champs)).select_from(Produit)
+    return session.exec(statement).one() or "[]"
+
+
+def get_produits_par_ids_json(
+    session: Session, ids: list[int], champs: Optional[tuple[str, ...]] = None
+) -> str:
+    """Récupère les produits d'une liste d'IDs, en une requête, sous forme de JSON.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        ids (list[int]): Les IDs demandés (non vide).
+        champs (Optional[tuple[str, ...]]): Les champs de `ProduitRead` à
+            renvoyer (tous par défaut).
+
+    Returns:
+        str: Le tableau JSON des produits, dans l'ordre de `ids`, avec `null`
+        pour un ID inexistant.
+    """
+    texte: str = session.execute(
+        _produits_par_ids_json(champs), {"ids": ids}
+    ).scalar_one()
+    return texte
 
 
 # --- Read (par id) ---
@@ -71,30 +277,244 @@ def get_produit_by_id(session: Session, produit_id: int) -> Produit | None:
     return session.get(Produit, produit_id)
 
 
+def get_produit_json(
+    session: Session, produit_id: int, champs: Optional[tuple[str, ...]] = None
+) -> Optional[tuple[str, int]]:
+    """Récupère un produit par son ID, directement sous forme de texte JSON.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        produit_id (int): L'ID du produit à récupérer.
+        champs (Optional[tuple[str, ...]]): Les champs de `ProduitRead` à
+            renvoyer (tous par défaut) ; seules leurs colonnes sont lues.
+
+    Returns:
+        Optional[tuple[str, int]]: L'objet JSON du produit et sa version
+        (ETag), ou None s'il n'existe pas.
+    """
+    statement = select(_produit_json(champs), col(Produit.version)).where(
+        col(Produit.id) == produit_id
+    )
+    ligne = session.exec(statement).one_or_none()
+    return None if ligne is None else (ligne[0], ligne[1])
+
+
 # --- Update ---
 def update_produit(
-    session: Session, produit_id: int, data: ProduitUpdate
+    session: Session,
+    produit_id: int,
+    data: ProduitUpdate,
+    version: Optional[int] = None,
 ) -> Produit | None:
     """Met à jour un produit existant.
 
+    La version du produit est vérifiée et incrémentée avant la modification
+    (`incrementer_version`) : une mise à jour partie d'une version périmée
+    échoue au lieu d'écraser la précédente.
+
     Args:
         session (Session): La session SQLModel utilisée pour la transaction.
         produit_id (int): L'ID du produit à mettre à jour.
         data (ProduitUpdate): Les données à mettre à jour.
+        version (Optional[int]): La version lue par le client (`If-Match`),
+            None pour ne pas la vérifier.
+
+    Raises:
+        HTTPException: 412 si le produit n'est plus à cette version.
 
     Returns:
         Produit | None: L'instance du produit mise à jour si elle existe, sinon None.
     """
+    if incrementer_version(session, Produit, produit_id, version) is None:
+        return None
     produit = session.get(Produit, produit_id)
     if not produit:
         return None
     for key, value in data.model_dump(exclude_unset=True).items():
         setattr(produit, key, value)
+    if produit.id is not None and data.stock is not None:
+        note_stocks(session, {produit.id: data.stock})
     session.commit()
     session.refresh(produit)
     return produit
 
 
+# --- Verrouillage des stocks ---
+def lock_produits(
+    session: Session, produit_ids: Iterable[int]
+) -> dict[int, tuple[float, int]]:
+    """Verrouille les lignes produits avant une modification de stock.
+
+    Toute écriture sur `produits.stock` (passage de commande, ajustement
+    d'inventaire) commence par cet appel : les lignes sont verrouillées avec
+    `SELECT ... FOR UPDATE` dans l'ordre croissant des ID, ce qui sérialise les
+    écritures concurrentes sur un même produit sans risque d'interblocage.
+    Les verrous sont libérés au commit ou au rollback de la transaction.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        produit_ids (Iterable[int]): Les ID des produits à verrouiller.
+
+    Returns:
+        dict[int, tuple[float, int]]: Le prix et le stock de chaque produit
+        trouvé, indexés par ID. Les ID inexistants sont absents du dictionnaire.
+    """
+    ids = sorted(set(produit_ids))
+    if not ids:
+        return {}
+    statement = (
+        select(Produit.id, Produit.prix, Produit.stock)
+        .where(col(Produit.id).in_(ids))
+        .order_by(col(Produit.id))
+        .with_for_update()
+    )
+    return {
+        produit_id: (prix, stock)
+        for produit_id, prix, stock in session.exec(statement).all()
+        if produit_id is not None
+    }
+
+
+def apply_stocks(
+    session: Session, ajustements: Sequence[tuple[int, int, bool]]
+) -> dict[int, int]:
+    """Applique des modifications de stock en une seule requête ensembliste.
+
+    Exécute un `UPDATE produits ... FROM (VALUES ...)`. Les lignes doivent
+    avoir été verrouillées au préalable avec `lock_produits`. Les nouveaux
+    stocks sont reportés dans la carte des disponibilités au commit.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        ajustements (Sequence[tuple[int, int, bool]]): Triplets
+            (produit_id, valeur, absolu). Si `absolu` est vrai le stock prend
+            la valeur donnée, sinon la valeur est ajoutée au stock actuel.
+
+    Returns:
+        dict[int, int]: Le nouveau stock de chaque produit modifié.
+    """
+    if not ajustements:
+        return {}
+    lignes = values(
+        column("produit_id", Integer),
+        column("valeur", Integer),
+        column("absolu", Boolean),
+        name="ajustements",
+    ).data(list(ajustements))
+    statement = (
+        update(Produit)
+        .where(col(Produit.id) == lignes.c.produit_id)
+        .values(
+            stock=case(
+                (lignes.c.absolu, lignes.c.valeur),
+                else_=col(Produit.stock) + lignes.c.valeur,
+            ),
+            version=col(Produit.version) + 1,
+        )
+        .returning(col(Produit.id), col(Produit.stock))
+        .execution_options(synchronize_session="fetch")
+    )
+    stocks = {produit_id: stock for produit_id, stock in session.execute(statement)}
+    note_stocks(session, stocks)
+    return stocks
+
+
+def verifier_stocks(
+    produits: dict[int, tuple[float, int]], variations: dict[int, int]
+) -> None:
+    """Vérifie qu'une variation de stock est possible sur des produits verrouillés.
+
+    Args:
+        produits (dict[int, tuple[float, int]]): Prix et stock des produits,
+            tels que renvoyés par `lock_produits`.
+        variations (dict[int, int]): Variation de stock souhaitée par produit
+            (négative pour une consommation).
+
+    Raises:
+        HTTPException: 400 si un produit n'existe pas,
+        409 si le stock d'un produit deviendrait négatif.
+    """
+    introuvables = sorted(i for i in variations if i not in produits)
+    if introuvables:
+        raise HTTPException(
+            status_code=400, detail=f"Produits introuvables : {introuvables}"
+        )
+    insuffisants = sorted(
+        i for i, variation in variations.items() if produits[i][1] + variation < 0
+    )
+    if insuffisants:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Stock insuffisant pour les produits : {insuffisants}",
+        )
+
+
+# --- Update (stocks en masse) ---
+def update_stocks(
+    session: Session, ajustements: Sequence[StockAjustement]
+) -> list[StockRead]:
+    """Ajuste le stock de plusieurs produits en une seule transaction.
+
+    Chaque ajustement est relatif (ajout ou retrait) ou absolu (inventaire).
+    Les produits sont verrouillés comme lors d'un passage de commande, puis
+    modifiés par une seule requête `UPDATE ... FROM (VALUES ...)`. Le lot est
+    appliqué entièrement ou pas du tout.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        ajustements (Sequence[StockAjustement]): Les ajustements à appliquer.
+
+    Raises:
+        HTTPException: 400 si un produit apparaît plusieurs fois dans le lot,
+            404 si des produits n'existent pas, 409 si un stock deviendrait négatif.
+
+    Returns:
+        list[StockRead]: Les nouveaux niveaux de stock, dans l'ordre du lot.
+    """
+    ids = [a.produit_id for a in ajustements]
+    doublons = sorted(i for i, n in Counter(ids).items() if n > 1)
+    if doublons:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Produits présents plusieurs fois dans le lot : {doublons}",
+        )
+
+    try:
+        stocks = lock_produits(session, ids)
+        introuvables = [i for i in ids if i not in stocks]
+        if introuvables:
+            raise HTTPException(
+                status_code=404, detail=f"Produits introuvables : {introuvables}"
+            )
+        negatifs = [
+            a.produit_id
+            for a in ajustements
+            if _nouveau_stock(stocks[a.produit_id][1], a) < 0
+        ]
+        if negatifs:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Stock négatif refusé pour les produits : {negatifs}",
+            )
+
+        nouveaux = apply_stocks(
+            session,
+            [(a.produit_id, a.valeur, a.mode == StockMode.absolu) for a in ajustements],
+        )
+        session.commit()
+    except HTTPException:
+        session.rollback()
+        raise
+    return [StockRead(id=i, stock=nouveaux[i]) for i in ids]
+
+
+def _nouveau_stock(stock: int, ajustement: StockAjustement) -> int:
+    """Calcule le stock obtenu après un ajustement."""
+    if ajustement.mode == StockMode.absolu:
+        return ajustement.valeur
+    return stock + ajustement.valeur
+
+
 # --- Delete ---
 def delete_produit(session: Session, produit_id: int) -> bool:
     """Supprime un produit par son ID.
@@ -111,4 +531,9 @@ def delete_produit(session: Session, produit_id: int) -> bool:
         return False
     session.delete(produit)
     session.commit()
+    invalidate_disponibilites()
     return True
+
+
+# Spans de traces autour des fonctions publiques du module
+tracer_module(__name__)
@@ -1,12 +1,27 @@
 from collections.abc import Sequence
 from typing import Optional
 
+from sqlalchemy import text
 from sqlmodel import Session, select
 
+from app.core.roles import CANAL_ROLES, roles_cache
+from app.core.traces import tracer_module
 from app.models.users_et_roles import Role, User
 from app.schemas.role import RoleCreate, RoleUpdate
 
 
+def _notifier_roles(session: Session) -> None:
+    """Signale aux autres workers une modification des rôles.
+
+    La notification part avec le commit de la transaction (et pas du tout en
+    cas d'annulation) : les autres workers rechargent alors leur cache.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+    """
+    session.execute(text("SELECT pg_notify(:canal, '')"), {"canal": CANAL_ROLES})
+
+
 # --- Create ---
 def role_creation(session: Session, role_data: RoleCreate) -> Role:
     """Crée un nouveau rôle dans la base de données.
@@ -20,8 +35,12 @@ def role_creation(session: Session, role_data: RoleCreate) -> Role:
     """
     role = Role(nom=role_data.nom)
     session.add(role)
+    session.flush()
+    _notifier_roles(session)
     session.commit()
     session.refresh(role)
+    if role.id is not None:
+        roles_cache.definir(role.id, role.nom)
     return role
 
 
@@ -75,8 +94,11 @@ def update_role(
         setattr(role, key, value)
 
     session.add(role)
+    session.flush()
+    _notifier_roles(session)
     session.commit()
     session.refresh(role)
+    roles_cache.definir(role_id, role.nom)
     return role
 
 
@@ -107,6 +129,12 @@ def delete_role(session: Session, role_id: int) -> list[int | None]:
         u.role_id = None
 
     session.delete(role)
+    _notifier_roles(session)
     session.commit()
+    roles_cache.retirer(role_id)
 
     return users_affected
+
+
+# Spans de traces autour des fonctions publiques du module
+tracer_module(__name__)
@@ -1,23 +1,82 @@
-from collections.abc import Sequence
+import csv
+import io
+from collections.abc import Iterable
+from concurrent.futures import Executor
 from typing import Optional
 
-from sqlmodel import Session, select
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy import func, or_, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
+from sqlmodel import Session, col, select
 
-from app.core.security import hash_password
+from app.core.security import hash_password, hash_passwords
+from app.core.traces import tracer_module
 from app.models.commandes_et_produits import Commande, DetailCommande
-from app.models.users_et_roles import User
-from app.schemas.user import UserCreate, UserUpdate
+from app.models.users_et_roles import Role, User
+from app.schemas.import_donnees import ImportErreur
+from app.schemas.user import (
+    UserCreate,
+    UserImportRapport,
+    UserRead,
+    UserUpdate,
+    normalize_email,
+)
+from app.utils.helpers import LigneImport, resumer_erreur_validation
+
+# Colonnes lues par l'annuaire, celles de `UserRead` : le hash du mot de passe
+# n'est jamais chargé
+_COLONNES_ANNUAIRE = tuple(getattr(User, champ) for champ in UserRead.model_fields)
+
+# Insertion des lignes chargées par COPY dans la table temporaire ; un email
+# créé entre-temps par une autre transaction est ignoré (et signalé)
+INSERT_USERS_IMPORT = text("""
+    INSERT INTO users
+        (nom, prenom, email, adresse, telephone, role_id, mot_de_passe, date_creation)
+    SELECT nom, prenom, email, adresse, telephone, role_id, mot_de_passe, now()
+    FROM pg_temp.users_import
+    ON CONFLICT (lower(email)) DO NOTHING
+    RETURNING email
+    """)
+
+
+def _commit_email_unique(session: Session) -> None:
+    """Valide la transaction, en traduisant un email déjà pris en erreur 409.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+
+    Raises:
+        HTTPException: 409 si l'email est déjà utilisé par un autre compte
+            (index unique `ix_users_email_lower`).
+    """
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Email déjà utilisé"
+        )
 
 
 # --- Create ---
-def create_user(session: Session, user_data: UserCreate) -> User:
+def create_user(
+    session: Session, user_data: UserCreate, mot_de_passe_hash: Optional[str] = None
+) -> User:
     """Crée un nouvel utilisateur dans la base de données.
 
-    Le mot de passe est automatiquement haché avant insertion.
+    Le mot de passe est automatiquement haché avant insertion, sauf si son hash
+    est fourni (calculé en amont, par exemple dans le pool de hashage).
 
     Args:
         session (Session): La session SQLModel utilisée pour la transaction.
         user_data (UserCreate): Les données de l'utilisateur à créer.
+        mot_de_passe_hash (Optional[str]): Le hash du mot de passe, s'il est
+            déjà calculé.
+
+    Raises:
+        HTTPException: 409 si l'email est déjà utilisé.
 
     Returns:
         User: L'instance de l'utilisateur créé.
@@ -29,26 +88,219 @@ def create_user(session: Session, user_data: UserCreate) -> User:
         adresse=user_data.adresse,
         telephone=user_data.telephone,
         role_id=user_data.role_id,
-        mot_de_passe=hash_password(user_data.mot_de_passe),
+        mot_de_passe=mot_de_passe_hash or hash_password(user_data.mot_de_passe),
     )
 
     session.add(user)
-    session.commit()
+    _commit_email_unique(session)
     session.refresh(user)
     return user
 
 
+# --- Create (import en masse) ---
+def import_users(
+    session: Session, lignes: Iterable[LigneImport], pool: Optional[Executor] = None
+) -> UserImportRapport:
+    """Crée des utilisateurs en masse.
+
+    Les lignes sont validées en mémoire (schéma `UserCreate`, rôles préchargés),
+    les emails déjà pris sont recherchés en une seule requête, puis les mots de
+    passe des lignes restantes sont hashés en parallèle. Les lignes valides
+    sont chargées par `COPY` dans une table temporaire et insérées par un
+    unique `INSERT ... ON CONFLICT DO NOTHING`.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        lignes (Iterable[LigneImport]): Les lignes lues depuis le fichier d'import.
+        pool (Optional[Executor]): Le pool de hashage ; par défaut celui des
+            imports de l'application (voir `hash_passwords`).
+
+    Returns:
+        UserImportRapport: Le nombre d'utilisateurs créés et les erreurs ligne
+        par ligne (les lignes en erreur ne sont pas importées).
+    """
+    roles = set(session.exec(select(Role.id)).all())
+    valides: dict[str, tuple[int, UserCreate]] = {}
+    erreurs: list[ImportErreur] = []
+
+    for ligne in lignes:
+        if ligne.donnees is None:
+            erreurs.append(ImportErreur(ligne=ligne.numero, erreur=str(ligne.erreur)))
+            continue
+        try:
+            data = UserCreate.model_validate(ligne.donnees)
+        except ValidationError as e:
+            erreurs.append(
+                ImportErreur(ligne=ligne.numero, erreur=resumer_erreur_validation(e))
+            )
+            continue
+        if data.role_id is not None and data.role_id not in roles:
+            erreurs.append(
+                ImportErreur(
+                    ligne=ligne.numero, erreur=f"Rôle ID {data.role_id} introuvable"
+                )
+            )
+            continue
+        if data.email in valides:
+            erreurs.append(
+                ImportErreur(
+                    ligne=ligne.numero,
+                    erreur=(
+                        f"Email '{data.email}' déjà présent "
+                        f"ligne {valides[data.email][0]}"
+                    ),
+                )
+            )
+            continue
+        valides[data.email] = (ligne.numero, data)
+
+    if valides:
+        existants = session.exec(
+            select(func.lower(col(User.email))).where(
+                func.lower(col(User.email)).in_(list(valides))
+            )
+        ).all()
+        for email in existants:
+            numero, _ = valides.pop(email)
+            erreurs.append(
+                ImportErreur(ligne=numero, erreur=f"Email '{email}' déjà utilisé")
+            )
+    # Libère la connexion pendant le hashage, qui peut durer
+    session.commit()
+
+    if not valides:
+        erreurs.sort(key=lambda erreur: erreur.ligne)
+        return UserImportRapport(inseres=0, erreurs=erreurs)
+
+    hashs = hash_passwords([data.mot_de_passe for _, data in valides.values()], pool)
+
+    tampon = io.StringIO()
+    ecrivain = csv.writer(tampon)
+    for (_, data), mot_de_passe_hash in zip(valides.values(), hashs):
+        ecrivain.writerow(
+            [
+                data.nom,
+                data.prenom,
+                data.email,
+                data.adresse,
+                data.telephone,
+                data.role_id,
+                mot_de_passe_hash,
+            ]
+        )
+    tampon.seek(0)
+
+    connexion = session.connection().connection.driver_connection
+    assert connexion is not None
+    with connexion.cursor() as curseur:
+        curseur.execute(
+            "DROP TABLE IF EXISTS pg_temp.users_import;"
+            "CREATE TEMP TABLE users_import ("
+            " nom text, prenom text, email text, adresse text, telephone text,"
+            " role_id integer, mot_de_passe text"
+            ") ON COMMIT DROP"
+        )
+        curseur.copy_expert("COPY users_import FROM STDIN WITH (FORMAT csv)", tampon)
+
+    inseres = set(session.execute(INSERT_USERS_IMPORT).scalars().all())
+    session.commit()
+
+    for email, (numero, _) in valides.items():
+        if email not in inseres:
+            erreurs.append(
+                ImportErreur(ligne=numero, erreur=f"Email '{email}' déjà utilisé")
+            )
+    erreurs.sort(key=lambda erreur: erreur.ligne)
+    return UserImportRapport(inseres=len(inseres), erreurs=erreurs)
+
+
 # --- Read ---
-def get_all_users(session: Session) -> Sequence[User]:
-    """Récupère tous les utilisateurs de la base de données.
+def get_users(
+    session: Session,
+    limit: int,
+    apres_id: Optional[int] = None,
+    q: Optional[str] = None,
+    role_id: Optional[int] = None,
+) -> tuple[list[UserRead], Optional[int]]:
+    """Récupère une page de l'annuaire des utilisateurs, triée par ID.
+
+    La pagination se fait par clé (`id > apres_id`) : le coût d'une page ne
+    dépend pas de sa position. La recherche par préfixe porte sur le nom, le
+    prénom, l'email et le téléphone (index trigrammes `ix_users_*_trgm`).
+    Seules les colonnes publiques sont lues.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        limit (int): Le nombre maximal d'utilisateurs renvoyés.
+        apres_id (Optional[int]): Le curseur : ID du dernier utilisateur de la
+            page précédente.
+        q (Optional[str]): Le début du nom, du prénom, de l'email ou du
+            téléphone recherché, sans tenir compte de la casse.
+        role_id (Optional[int]): Le rôle des utilisateurs recherchés.
+
+    Returns:
+        tuple[list[UserRead], Optional[int]]: Les utilisateurs de la page, et
+        le curseur de la page suivante (None s'il n'y en a pas).
+    """
+    statement = (
+        select(User)
+        .options(load_only(*_COLONNES_ANNUAIRE))
+        .order_by(col(User.id))
+        .limit(limit + 1)
+    )
+    if apres_id is not None:
+        statement = statement.where(col(User.id) > apres_id)
+    if role_id is not None:
+        statement = statement.where(col(User.role_id) == role_id)
+    if q:
+        motif = _echapper_like(q.strip()) + "%"
+        statement = statement.where(
+            or_(
+                col(User.nom).ilike(motif, escape="\\"),
+                col(User.prenom).ilike(motif, escape="\\"),
+                col(User.email).ilike(motif, escape="\\"),
+                col(User.telephone).ilike(motif, escape="\\"),
+            )
+        )
+
+    users = [
+        UserRead.model_validate(user, from_attributes=True)
+        for user in session.exec(statement).all()
+    ]
+    if len(users) > limit:
+        users = users[:limit]
+        return users, users[-1].id
+    return users, None
+
+
+def _echapper_like(texte: str) -> str:
+    """Échappe les caractères spéciaux de LIKE pour une recherche littérale."""
+    return texte.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def get_users_par_ids(session: Session, ids: list[int]) -> list[Optional[UserRead]]:
+    """Récupère les utilisateurs d'une liste d'IDs, en une requête.
+
+    Seules les colonnes publiques sont lues, comme pour `get_users`.
 
     Args:
         session (Session): La session SQLModel utilisée pour la transaction.
+        ids (list[int]): Les IDs demandés.
 
     Returns:
-        Sequence[User]: Une séquence contenant tous les utilisateurs.
+        list[Optional[UserRead]]: Les utilisateurs dans l'ordre de `ids`,
+        None pour un ID inexistant.
     """
-    return session.exec(select(User)).all()
+    statement = (
+        select(User)
+        .options(load_only(*_COLONNES_ANNUAIRE))
+        .where(col(User.id).in_(set(ids)))
+    )
+    trouves = {
+        user.id: UserRead.model_validate(user, from_attributes=True)
+        for user in session.exec(statement).all()
+    }
+    return [trouves.get(user_id) for user_id in ids]
 
 
 # --- Read (par id) ---
@@ -67,7 +319,10 @@ def get_user_by_id(session: Session, user_id: int) -> User | None:
 
 # --- Read (par email) ---
 def get_user_by_email(session: Session, email: str) -> Optional[User]:
-    """Récupère un utilisateur par son adresse e-mail.
+    """Récupère un utilisateur par son adresse e-mail, sans tenir compte de la casse.
+
+    La requête porte sur `lower(email)` et est servie par l'index unique
+    `ix_users_email_lower`.
 
     Args:
         session (Session): La session SQLModel utilisée pour la transaction.
@@ -76,19 +331,32 @@ def get_user_by_email(session: Session, email: str) -> Optional[User]:
     Returns:
         Optional[User]: L'utilisateur si trouvé, sinon None.
     """
-    return session.exec(select(User).where(User.email == email)).first()
+    return session.exec(
+        select(User).where(func.lower(col(User.email)) == normalize_email(email))
+    ).first()
 
 
 # --- Update ---
-def update_user(session: Session, user_id: int, user_data: UserUpdate) -> User | None:
+def update_user(
+    session: Session,
+    user_id: int,
+    user_data: UserUpdate,
+    mot_de_passe_hash: Optional[str] = None,
+) -> User | None:
     """Met à jour les informations d'un utilisateur existant.
 
-    Le mot de passe est automatiquement haché si fourni dans les données.
+    Le mot de passe est automatiquement haché si fourni dans les données, sauf
+    si son hash est fourni (calculé en amont, par exemple dans le pool de hashage).
 
     Args:
         session (Session): La session SQLModel utilisée pour la transaction.
         user_id (int): L'ID de l'utilisateur à mettre à jour.
         user_data (UserUpdate): Les données à mettre à jour.
+        mot_de_passe_hash (Optional[str]): Le hash du nouveau mot de passe, s'il
+            est déjà calculé.
+
+    Raises:
+        HTTPException: 409 si le nouvel email est déjà utilisé.
 
     Returns:
         User | None: L'utilisateur mis à jour si trouvé, sinon None.
@@ -99,18 +367,48 @@ def update_user(session: Session, user_id: int, user_data: UserUpdate) -> User |
 
     update_data = user_data.model_dump(exclude_unset=True)
 
-    if "mot_de_passe" in update_data and update_data["mot_de_passe"]:
-        update_data["mot_de_passe"] = hash_password(update_data["mot_de_passe"])
+    # `mot_de_passe` est exclu de `model_dump` (Field(exclude=True)) : lu à part
+    if user_data.mot_de_passe:
+        update_data["mot_de_passe"] = mot_de_passe_hash or hash_password(
+            user_data.mot_de_passe
+        )
 
     for key, value in update_data.items():
         setattr(user, key, value)
 
     session.add(user)
-    session.commit()
+    _commit_email_unique(session)
     session.refresh(user)
     return user
 
 
+def update_password_hash(
+    session: Session, user_id: int, ancien_hash: str, nouveau_hash: str
+) -> bool:
+    """Remplace le hash du mot de passe d'un utilisateur (rehash à la connexion).
+
+    La mise à jour est une seule requête conditionnée à l'ancien hash : si le
+    mot de passe a été changé entre-temps, le nouveau mot de passe est conservé.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        user_id (int): L'ID de l'utilisateur.
+        ancien_hash (str): Le hash lu lors de la vérification du mot de passe.
+        nouveau_hash (str): Le hash recalculé avec les paramètres actuels.
+
+    Returns:
+        bool: True si le hash a été remplacé, False sinon.
+    """
+    remplace = session.execute(
+        update(User)
+        .where(col(User.id) == user_id, col(User.mot_de_passe) == ancien_hash)
+        .values(mot_de_passe=nouveau_hash)
+        .returning(col(User.id))
+    ).first()
+    session.commit()
+    return remplace is not None
+
+
 # --- Delete ---
 def delete_user(session: Session, user_id: int) -> bool:
     """Supprime un utilisateur et toutes ses commandes associées.
@@ -142,3 +440,7 @@ def delete_user(session: Session, user_id: int) -> bool:
     session.delete(user)
     session.commit()
     return True
+
+
+# Spans de traces autour des fonctions publiques du module
+tracer_module(__name__)
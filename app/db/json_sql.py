@@ -0,0 +1,151 @@
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, Optional, get_args
+
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+from sqlalchemy import Engine, event
+
+# Nombres à virgule au format d'orjson. Postgres et orjson écrivent les mêmes
+# chiffres (l'écriture la plus courte, si `extra_float_digits` >= 1 : voir
+# `_fixer_extra_float_digits`),
+# mais pas au même format :
+# - Postgres passe en notation exponentielle hors de [1e-4, 1e15[, orjson
+#   hors de [1e-5, 1e16[ : les puissances -5 et 15 sont réécrites en décimal ;
+# - orjson écrit "e16" / "e-7" là où Postgres écrit "e+16" / "e-07" ;
+# - orjson écrit les entiers avec ".0" ("12.0" pour "12"), NaN et les
+#   infinis (invalides en JSON) en null.
+# Seule exception : au-delà de 2^53 (9e15), Postgres écrit les valeurs entières
+# avec tous leurs chiffres, là où orjson peut en écrire moins.
+_FLOAT_JSON = (
+    "CASE WHEN {c} IN ('NaN', 'Infinity', '-Infinity') THEN 'null' "
+    "WHEN strpos({c}::text, 'e') = 0 THEN {c}::text "
+    "|| CASE WHEN strpos({c}::text, '.') = 0 THEN '.0' ELSE '' END "
+    "WHEN split_part({c}::text, 'e', 2)::int = -5 THEN "
+    "CASE WHEN {c} < 0 THEN '-' ELSE '' END || '0.0000' "
+    "|| translate(split_part({c}::text, 'e', 1), '-.', '') "
+    "WHEN split_part({c}::text, 'e', 2)::int = 15 THEN "
+    "CASE WHEN {c} < 0 THEN '-' ELSE '' END "
+    "|| CASE WHEN length(translate(split_part({c}::text, 'e', 1), '-.', '')) <= 16 "
+    "THEN rpad(translate(split_part({c}::text, 'e', 1), '-.', ''), 16, '0') || '.0' "
+    "ELSE overlay(translate(split_part({c}::text, 'e', 1), '-.', '') "
+    "PLACING '.' FROM 17 FOR 0) END "
+    "ELSE split_part({c}::text, 'e', 1) || 'e' "
+    "|| split_part({c}::text, 'e', 2)::int::text END"
+)
+
+# Dates sans fuseau au format ISO de pydantic : microsecondes sur six chiffres,
+# omises quand elles sont nulles. Les ":" du format sont entre guillemets pour
+# ne pas être pris pour des paramètres par `sqlalchemy.text`.
+_DATETIME_JSON = (
+    '\'"\' || to_char({c}, \'YYYY-MM-DD"T"HH24":"MI":"SS\') || '
+    "CASE WHEN date_part('microseconds', {c})::bigint % 1000000 <> 0 "
+    "THEN to_char({c}, '.US') ELSE '' END || '\"'"
+)
+
+
+@event.listens_for(Engine, "connect")
+def _fixer_extra_float_digits(connexion_dbapi: Any, _enregistrement: Any) -> None:
+    """
+    Fixe `extra_float_digits` à 1 sur chaque nouvelle connexion.
+
+    C'est la valeur par défaut de Postgres, mais un rôle, une base ou un
+    proxy peut la changer : à 0 ou moins, `float8::text` arrondit (0.3 au lieu
+    de 0.30000000000000004) et `_FLOAT_JSON` ne correspond plus à orjson.
+    """
+    curseur = connexion_dbapi.cursor()
+    try:
+        curseur.execute("SET extra_float_digits = 1")
+    finally:
+        curseur.close()
+    # Hors transaction, sans quoi le rollback du pool annulerait le SET
+    connexion_dbapi.commit()
+
+
+def _valeur_json(champ: FieldInfo, colonne: str) -> str:
+    """Renvoie l'expression SQL du texte JSON d'une colonne, selon le type du champ."""
+    types = {champ.annotation, *get_args(champ.annotation)}
+    if float in types:
+        expression = _FLOAT_JSON.format(c=colonne)
+    elif datetime in types:
+        expression = _DATETIME_JSON.format(c=colonne)
+    else:
+        # Chaînes échappées comme par orjson, énumérations par leur valeur
+        expression = f"to_json({colonne})::text"
+    return f"coalesce({expression}, 'null')"
+
+
+def objet_json(
+    schema: type[BaseModel],
+    alias: str,
+    json_brut: Optional[dict[str, str]] = None,
+    champs: Optional[Sequence[str]] = None,
+) -> str:
+    """
+    Construit l'expression SQL du texte JSON d'une ligne, au format d'un schéma.
+
+    Les champs sont écrits dans l'ordre du schéma, sans espaces, comme dans la
+    réponse que produirait FastAPI avec ce schéma en `response_model` et
+    `ORJSONResponse` : l'API peut renvoyer ce texte tel quel, sans instancier
+    de modèle. Avec `champs`, seuls ces champs sont écrits : les autres
+    colonnes (et sous-requêtes de `json_brut`) ne sont pas lues.
+
+    Args:
+        schema (type[BaseModel]): Le schéma de lecture reproduit.
+        alias (str): L'alias SQL de la table, dont les colonnes portent le
+            nom des champs.
+        json_brut (Optional[dict[str, str]]): Pour les champs qui ne sont pas
+            des colonnes (listes imbriquées...), l'expression SQL de leur
+            texte JSON.
+        champs (Optional[Sequence[str]]): Les champs à écrire (tous par
+            défaut), toujours dans l'ordre du schéma.
+
+    Returns:
+        str: L'expression SQL, de type text.
+    """
+    json_brut = json_brut or {}
+    morceaux: list[str] = []
+    for nom, champ in schema.model_fields.items():
+        if champs is not None and nom not in champs:
+            continue
+        valeur = json_brut.get(nom) or _valeur_json(champ, f"{alias}.{nom}")
+        separateur = "{" if not morceaux else ","
+        morceaux.append(f"'{separateur}\"{nom}\":' || {valeur}")
+    return "(" + " || ".join(morceaux) + " || '}')"
+
+
+def tableau_json(objet: str, ordre: str) -> str:
+    """
+    Construit l'expression SQL agrégée du tableau JSON des lignes d'une requête.
+
+    Args:
+        objet (str): L'expression du texte JSON d'une ligne (`objet_json`).
+        ordre (str): L'ordre des éléments du tableau (clause ORDER BY).
+
+    Returns:
+        str: L'expression SQL, de type text, NULL s'il n'y a aucune ligne.
+    """
+    return f"'[' || string_agg({objet}, ',' ORDER BY {ordre}) || ']'"
+
+
+def tableau_json_par_ids(objet: str, table: str) -> str:
+    """
+    Construit la requête SQL du tableau JSON des lignes d'une liste d'IDs.
+
+    Les IDs (paramètre `:ids`, tableau d'entiers) sont résolus en une requête
+    sur la clé primaire ; le tableau suit leur ordre, avec `null` pour un ID
+    sans ligne.
+
+    Args:
+        objet (str): L'expression du texte JSON d'une ligne (`objet_json`).
+        table (str): La table, dont la clé primaire est `id`.
+
+    Returns:
+        str: La requête SQL, renvoyant une valeur de type text.
+    """
+    return (
+        f"SELECT '[' || string_agg(CASE WHEN {table}.id IS NULL THEN 'null' "
+        f"ELSE {objet} END, ',' ORDER BY demandes.rang) || ']' "
+        "FROM unnest(CAST(:ids AS integer[])) WITH ORDINALITY AS demandes(id, rang) "
+        f"LEFT JOIN {table} ON {table}.id = demandes.id"
+    )
@@ -79,7 +79,7 @@ def create_fake_data(session: Session) -> None:
     for cat in categories:
         for _ in range(5):
             produit = Produit(
-                nom=fake.word().capitalize(),
+                nom=fake.unique.word().capitalize(),
                 description=fake.sentence(),
                 prix=round(random.uniform(1, 35), 2),
                 categorie_id=cat.id,
@@ -110,6 +110,7 @@ def create_fake_data(session: Session) -> None:
                 commande_id=commande.id,
                 produit_id=prod.id,
                 quantite=quantite,
+                prix_unitaire=prod.prix,
             )
             montant_total += prod.prix * quantite
             session.add(detail)
@@ -0,0 +1,49 @@
+import argparse
+from pathlib import Path
+
+from sqlmodel import Session, create_engine
+
+from app.core.config import settings
+from app.crud.produit import import_produits
+from app.models.users_et_roles import User  # noqa: F401
+from app.schemas.import_donnees import FormatImport
+from app.utils.helpers import lire_lignes
+
+
+def main() -> None:
+    """
+    Importe ou met à jour des produits en masse depuis un fichier CSV ou JSON lines.
+
+    Le format est déduit de l'extension du fichier (`.csv`, `.jsonl`) sauf s'il
+    est précisé avec `--format`. Le rapport (insertions, mises à jour, erreurs
+    ligne par ligne) est affiché à la fin.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Import en masse de produits")
+    parser.add_argument("fichier", type=Path, help="Fichier CSV ou JSON lines")
+    parser.add_argument(
+        "--format",
+        choices=[f.value for f in FormatImport],
+        help="Format du fichier (déduit de l'extension par défaut)",
+    )
+    args = parser.parse_args()
+
+    format_import = FormatImport(
+        args.format or ("jsonl" if args.fichier.suffix == ".jsonl" else "csv")
+    )
+    contenu = args.fichier.read_text(encoding="utf-8-sig")
+
+    engine = create_engine(settings.DATABASE_URL, echo=False)
+    with Session(engine) as session:
+        rapport = import_produits(session, lire_lignes(contenu, format_import))
+
+    print(f"Produits insérés : {rapport.inseres}")
+    print(f"Produits mis à jour : {rapport.mis_a_jour}")
+    for erreur in rapport.erreurs:
+        print(f"Ligne {erreur.ligne} : {erreur.erreur}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from sqlmodel import Session, create_engine
+
+from app.core.config import settings
+from app.crud.user import import_users
+from app.schemas.import_donnees import FormatImport
+from app.utils.helpers import lire_lignes
+
+
+def main() -> None:
+    """
+    Crée des utilisateurs en masse depuis un fichier CSV ou JSON lines.
+
+    Le format est déduit de l'extension du fichier (`.csv`, `.jsonl`) sauf s'il
+    est précisé avec `--format`. Les mots de passe sont hashés sur tous les
+    cœurs de la machine (ou `--processus`). Le rapport (créations, erreurs
+    ligne par ligne) est affiché à la fin.
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(description="Import en masse d'utilisateurs")
+    parser.add_argument("fichier", type=Path, help="Fichier CSV ou JSON lines")
+    parser.add_argument(
+        "--format",
+        choices=[f.value for f in FormatImport],
+        help="Format du fichier (déduit de l'extension par défaut)",
+    )
+    parser.add_argument(
+        "--processus",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Nombre de processus de hashage (par défaut : nombre de cœurs)",
+    )
+    args = parser.parse_args()
+
+    format_import = FormatImport(
+        args.format or ("jsonl" if args.fichier.suffix == ".jsonl" else "csv")
+    )
+    contenu = args.fichier.read_text(encoding="utf-8-sig")
+
+    engine = create_engine(settings.DATABASE_URL, echo=False)
+    with (
+        ProcessPoolExecutor(
+            max_workers=args.processus,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool,
+        Session(engine) as session,
+    ):
+        rapport = import_users(session, lire_lignes(contenu, format_import), pool)
+
+    print(f"Utilisateurs créés : {rapport.inseres}")
+    for erreur in rapport.erreurs:
+        print(f"Ligne {erreur.ligne} : {erreur.erreur}")
+
+
+if __name__ == "__main__":
+    main()
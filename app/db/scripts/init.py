@@ -5,6 +5,7 @@ from sqlalchemy.exc import OperationalError
 from sqlmodel import SQLModel, create_engine
 
 from app.core.config import settings
+from app.db.scripts.migrations import run_migrations
 from app.models.commandes_et_produits import (  # noqa: F401
     Categorie,
     Commande,
@@ -47,6 +48,9 @@ def init_db(engine: Optional[Engine] = None) -> Engine:
 
     # Crée toutes les tables définies dans les modèles SQLModel
     SQLModel.metadata.create_all(engine)
+
+    # Met à niveau les tables déjà existantes (colonnes, index ajoutés depuis)
+    run_migrations(engine)
     return engine
 
 
@@ -0,0 +1,144 @@
+from typing import Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import create_engine
+
+from app.core.config import settings
+
+# Migrations idempotentes à appliquer sur une base existante, dans l'ordre.
+# Les index déclarés dans les modèles SQLModel sont repris ici sous le même nom
+# afin que `create_all` (base neuve) et ces migrations (base existante)
+# aboutissent au même schéma.
+MIGRATIONS: list[tuple[str, list[str]]] = [
+    (
+        "Nom de produit unique (clé de l'import en masse)",
+        [
+            # Les produits en double sont référencés par des commandes : le
+            # plus ancien garde son nom, les autres sont renommés « nom #id »
+            "UPDATE produits AS p SET nom = p.nom || ' #' || p.id "
+            "FROM (SELECT id, min(id) OVER (PARTITION BY nom) AS garde "
+            "FROM produits) AS d "
+            "WHERE p.id = d.id AND d.id <> d.garde",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_produits_nom ON produits (nom)",
+        ],
+    ),
+    (
+        "Index de disponibilité des produits (stock bas, rupture)",
+        [
+            "CREATE INDEX IF NOT EXISTS ix_produits_stock "
+            "ON produits (stock, id) INCLUDE (nom)",
+            "CREATE INDEX IF NOT EXISTS ix_produits_rupture "
+            "ON produits (id) WHERE stock <= 0",
+        ],
+    ),
+    (
+        "Prix unitaire figé sur les détails de commande",
+        [
+            "ALTER TABLE details_commandes "
+            "ADD COLUMN IF NOT EXISTS prix_unitaire double precision",
+            "UPDATE details_commandes AS d SET prix_unitaire = p.prix "
+            "FROM produits AS p "
+            "WHERE p.id = d.produit_id AND d.prix_unitaire IS NULL",
+            "ALTER TABLE details_commandes ALTER COLUMN prix_unitaire SET NOT NULL",
+            "CREATE INDEX IF NOT EXISTS ix_commandes_date_commande "
+            "ON commandes (date_commande)",
+        ],
+    ),
+    (
+        "Emails insensibles à la casse (fusion des doublons, index sur lower)",
+        [
+            # Pour chaque email en double à la casse près, le compte le plus
+            # ancien est conservé et récupère les commandes des autres
+            "CREATE TEMP TABLE users_doublons ON COMMIT DROP AS "
+            "SELECT id, min(id) OVER (PARTITION BY lower(email)) AS garde "
+            "FROM users",
+            "UPDATE commandes AS c SET client_id = d.garde "
+            "FROM users_doublons AS d "
+            "WHERE c.client_id = d.id AND d.id <> d.garde",
+            "DELETE FROM users AS u USING users_doublons AS d "
+            "WHERE u.id = d.id AND d.id <> d.garde",
+            "UPDATE users SET email = lower(email) WHERE email <> lower(email)",
+            "DROP INDEX IF EXISTS ix_users_email",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email_lower "
+            "ON users (lower(email))",
+        ],
+    ),
+    (
+        "Filtre des utilisateurs par rôle (pagination par ID)",
+        ["CREATE INDEX IF NOT EXISTS ix_users_role_id ON users (role_id, id)"],
+    ),
+    (
+        "Version des commandes et des produits (ETag, If-Match)",
+        [
+            "ALTER TABLE commandes "
+            "ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 1",
+            "ALTER TABLE produits "
+            "ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 1",
+        ],
+    ),
+]
+
+# Migrations dépendant d'une extension qui peut manquer sur le serveur (les
+# images Docker officielles de Postgres la fournissent). Chacune est appliquée
+# dans un point de sauvegarde et ignorée en cas d'échec : les fonctionnalités
+# concernées restent correctes, seulement moins rapides.
+MIGRATIONS_OPTIONNELLES: list[tuple[str, list[str]]] = [
+    (
+        "Index trigrammes de la recherche d'utilisateurs (pg_trgm)",
+        [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX IF NOT EXISTS ix_users_nom_trgm "
+            "ON users USING gin (nom gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS ix_users_prenom_trgm "
+            "ON users USING gin (prenom gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS ix_users_email_trgm "
+            "ON users USING gin (email gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS ix_users_telephone_trgm "
+            "ON users USING gin (telephone gin_trgm_ops)",
+        ],
+    ),
+]
+
+
+def run_migrations(engine: Optional[Engine] = None) -> Engine:
+    """
+    Applique les migrations de schéma sur une base existante.
+
+    Chaque migration est idempotente (`IF NOT EXISTS`, mises à jour
+    conditionnelles) : le script peut être relancé sans effet de bord.
+    L'ensemble est exécuté dans une seule transaction ; une migration
+    optionnelle en échec est annulée seule et signalée.
+
+    Args:
+        engine (Optional[Engine]): Moteur SQLAlchemy à utiliser pour la connexion.
+            Si None, un moteur est créé avec l'URL définie dans `settings`.
+
+    Returns:
+        Engine: L'objet Engine SQLAlchemy utilisé pour la connexion à la base.
+    """
+    if engine is None:
+        engine = create_engine(settings.DATABASE_URL, echo=True)
+
+    with engine.begin() as conn:
+        for description, instructions in MIGRATIONS:
+            print("Migration :", description)
+            for instruction in instructions:
+                conn.exec_driver_sql(instruction)
+        for description, instructions in MIGRATIONS_OPTIONNELLES:
+            print("Migration optionnelle :", description)
+            try:
+                with conn.begin_nested():
+                    for instruction in instructions:
+                        conn.exec_driver_sql(instruction)
+            except DBAPIError as e:
+                print("  ignorée :", str(e.orig).splitlines()[0])
+    return engine
+
+
+if __name__ == "__main__":
+    """
+    Point d'entrée pour exécuter le script directement.
+    Applique les migrations sur la base définie dans `settings`.
+    """
+    run_migrations()
@@ -0,0 +1,59 @@
+from typing import Optional, Union
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlmodel import Session, col, select
+
+from app.models.commandes_et_produits import Commande, Produit
+
+# Tables à version (contrôle de concurrence optimiste, ETag des ressources)
+ModeleVersionne = Union[type[Commande], type[Produit]]
+
+
+def incrementer_version(
+    session: Session,
+    modele: ModeleVersionne,
+    id_: int,
+    version_attendue: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Passe une ligne à la version suivante, si elle est encore à la version attendue.
+
+    Première instruction de toute modification d'une ressource versionnée :
+    `UPDATE ... SET version = version + 1 WHERE id = :id AND version = :attendue`.
+    La vérification et l'incrément sont atomiques, et la ligne reste
+    verrouillée jusqu'à la fin de la transaction : deux écritures parties de
+    la même version ne peuvent pas réussir toutes les deux, sans verrou pris
+    pendant la lecture.
+
+    Args:
+        session (Session): La session SQLModel utilisée pour la transaction.
+        modele (ModeleVersionne): `Commande` ou `Produit`.
+        id_ (int): L'ID de la ligne.
+        version_attendue (Optional[int]): La version lue par le client
+            (`If-Match`) ; None pour ne pas la vérifier.
+
+    Raises:
+        HTTPException: 412 PRECONDITION FAILED si la ligne a changé de version.
+
+    Returns:
+        Optional[int]: La nouvelle version, ou None si la ligne n'existe pas.
+    """
+    statement = (
+        update(modele)
+        .where(col(modele.id) == id_)
+        .values(version=col(modele.version) + 1)
+        .returning(col(modele.version))
+        .execution_options(synchronize_session="fetch")
+    )
+    if version_attendue is not None:
+        statement = statement.where(col(modele.version) == version_attendue)
+    version: Optional[int] = session.execute(statement).scalar_one_or_none()
+    if version is None and version_attendue is not None:
+        existe = session.exec(select(modele.id).where(col(modele.id) == id_)).first()
+        if existe is not None:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="La ressource a été modifiée entre-temps (ETag périmé)",
+            )
+    return version
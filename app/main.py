@@ -1,12 +1,70 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, ORJSONResponse
 
-from app.api.v1 import categorie, commande, login, produit, role, user
+from app.api.v1 import (
+    categorie,
+    commande,
+    login,
+    memoire,
+    metriques,
+    produit,
+    profil,
+    role,
+    user,
+)
+from app.core import traces
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.metriques import MetriquesMiddleware, arreter_worker, instrumenter_engine
+from app.core.profilage import ProfilageMiddleware, echantillonneur_continu
+from app.core.roles import roles_cache
+from app.core.security import shutdown_pool
+from app.core.static_files import StaticPrecompresses
+from app.db.session import engine
 
-app = FastAPI(title="API RESTau Simplon 🍽️")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Démarre et arrête les ressources partagées par les requêtes du worker."""
+    # Charge les rôles et suit leurs modifications faites par les autres workers
+    roles_cache.demarrer()
+    # Relève en continu les piles du worker (si PROFILAGE_CONTINU_HZ)
+    echantillonneur_continu.demarrer()
+    yield
+    echantillonneur_continu.arreter()
+    roles_cache.arreter()
+    # Arrête les processus de hashage des mots de passe
+    shutdown_pool()
+    arreter_worker()
+
+
+# Réponses JSON encodées par orjson, plus rapide que `json` sur les grandes
+# listes (voir `benchmarks/bench_serialisation.py`)
+app = FastAPI(
+    title="API RESTau Simplon 🍽️",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+# Compression brotli / gzip des réponses JSON au-delà de COMPRESSION_TAILLE_MIN
+app.add_middleware(CompressionMiddleware)
+
+# Durée des requêtes par route, compression comprise, et requêtes SQL (/metrics)
+app.add_middleware(MetriquesMiddleware)
+instrumenter_engine(engine)
+
+# Traces d'une partie des requêtes (TRACES_ECHANTILLONNAGE) : requête, CRUD, SQL
+app.add_middleware(traces.TracesMiddleware)
+traces.instrumenter_engine(engine)
+
+# Profilage à la demande (`X-Profilage: 1`, administrateurs) : le middleware
+# n'est installé qu'avec PROFILAGE_ACTIF, sans coût pour les autres requêtes
+if settings.PROFILAGE_ACTIF:
+    app.add_middleware(ProfilageMiddleware)
 
 # Inclusion des routes de l'API v1
 app.include_router(categorie.router)
@@ -15,10 +73,15 @@ app.include_router(user.router)
 app.include_router(commande.router)
 app.include_router(role.router)
 app.include_router(login.router)
+app.include_router(metriques.router)
+app.include_router(profil.router)
+app.include_router(memoire.router)
 
 
-# Montre le dossier static à l'URL /static
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Montre le dossier static à l'URL /static (copies précompressées par
+# `python -m app.core.precompression`, URL versionnées par `url_statique`)
+static = StaticPrecompresses(directory="static", prefixe_url="/static")
+app.mount("/static", static, name="static")
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -67,7 +130,7 @@ def read_root() -> str:
         </head>
         <body>
             <div class="card">
-                <img src="/static/logo.png" alt="Logo RESTAU_SIMPLON"/>
+                <img src="{static.url_statique('logo.png')}" alt="Logo RESTAU_SIMPLON"/>
                 <h1>Bienvenue sur l'API RESTau Simplon 🍽️</h1>
                 <p><strong>Version :</strong> 1.0</p>
                 <p><strong>Auteur :</strong> Izak | Anatole | Harley</p>
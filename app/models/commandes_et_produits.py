@@ -2,6 +2,7 @@ from datetime import datetime, timezone
 from enum import Enum
 from typing import TYPE_CHECKING, List, Optional
 
+from sqlalchemy import Index, text
 from sqlmodel import Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
@@ -37,13 +38,23 @@ class Produit(SQLModel, table=True):
     """
 
     __tablename__ = "produits"
+    __table_args__ = (
+        # Produits en stock bas pour n'importe quel seuil (parcours d'index seul)
+        Index("ix_produits_stock", "stock", "id", postgresql_include=["nom"]),
+        # Produits en rupture, lus à chaque reconstruction des disponibilités
+        Index("ix_produits_rupture", "id", postgresql_where=text("stock <= 0")),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    nom: str
+    nom: str = Field(
+        index=True, sa_column_kwargs={"unique": True}
+    )  # Nom unique, sert de clé pour l'import en masse
     description: Optional[str] = None
     prix: float
     categorie_id: Optional[int] = Field(default=None, foreign_key="categories.id")
     stock: int
+    # Incrémentée à chaque modification (ETag, contrôle de concurrence optimiste)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
     # Relations
     categorie: Optional[Categorie] = Relationship(back_populates="produits")
@@ -59,17 +70,24 @@ class Commande(SQLModel, table=True):
 
     id: Optional[int] = Field(default=None, primary_key=True)
     client_id: int = Field(foreign_key="users.id")
-    date_commande: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    date_commande: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc), index=True
+    )
     statut: StatusEnum = Field(default=StatusEnum.en_attente)
     montant_total: float = Field(default=0.0)
+    # Incrémentée à chaque modification (ETag, contrôle de concurrence optimiste)
+    version: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
 
     # Relations
     client: "User" = Relationship(back_populates="commandes")
     details: List["DetailCommande"] = Relationship(
         back_populates="commande",
         sa_relationship_kwargs={
-            "cascade": "all, delete-orphan"
-        },  # Supprime les détails liés lors de la suppression de la commande
+            # Supprime les détails liés lors de la suppression de la commande
+            "cascade": "all, delete-orphan",
+            # Ordre stable des détails dans les réponses
+            "order_by": "DetailCommande.produit_id",
+        },
     )
 
 
@@ -84,6 +102,7 @@ class DetailCommande(SQLModel, table=True):
     commande_id: int = Field(foreign_key="commandes.id", primary_key=True)
     produit_id: int = Field(foreign_key="produits.id", primary_key=True)
     quantite: int
+    prix_unitaire: float  # Prix du produit au moment de la commande
 
     # Relations
     commande: Commande = Relationship(back_populates="details")
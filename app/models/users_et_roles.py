@@ -2,6 +2,7 @@ from datetime import datetime, timezone
 from enum import Enum
 from typing import TYPE_CHECKING, List, Optional
 
+from sqlalchemy import Index, text
 from sqlmodel import Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
@@ -38,13 +39,20 @@ class User(SQLModel, table=True):
     """
 
     __tablename__ = "users"
+    __table_args__ = (
+        # Email unique sans tenir compte de la casse, et index des recherches
+        # par email (`lower(email) = ...`)
+        Index("ix_users_email_lower", text("lower(email)"), unique=True),
+        # Filtre par rôle de l'annuaire, paginé par ID
+        Index("ix_users_role_id", "role_id", "id"),
+        # Les index trigrammes de la recherche (pg_trgm) sont créés par
+        # `app.db.scripts.migrations`, l'extension pouvant manquer
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     nom: str
     prenom: str
-    email: str = Field(
-        index=True, sa_column_kwargs={"unique": True}
-    )  # Email unique pour chaque utilisateur
+    email: str  # Enregistré en minuscules (voir `app.schemas.user`)
     adresse: Optional[str] = None
     telephone: Optional[str] = None
     mot_de_passe: str
@@ -1,8 +1,10 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Annotated, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.core.config import ENTIER_MAX, settings
 
 from .detail import DetailsCreate, DetailsRead, DetailsUpdate
 
@@ -33,7 +35,39 @@ class CommandeRead(CommandeBase):
 
 
 class CommandeUpdate(BaseModel):
+    # Pas de statut : il ne change que par `CommandeTransition`, qui vérifie
+    # l'ordre des statuts et notifie le changement (422 s'il est envoyé ici)
     client_id: Optional[int] = None
     date_commande: Optional[datetime] = None
-    statut: Optional[StatusEnum] = None
     details: Optional[list[DetailsUpdate]] = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class CommandeTransition(BaseModel):
+    statut: StatusEnum
+
+
+class CommandeStatutRead(BaseModel):
+    id: int
+    statut: StatusEnum
+
+
+class CommandesTransition(BaseModel):
+    # IDs bornés à une colonne `integer` (422 plutôt qu'une erreur en base)
+    ids: list[Annotated[int, Field(ge=1, le=ENTIER_MAX)]] = Field(
+        min_length=1, max_length=settings.MULTI_GET_IDS_MAX
+    )
+    statut: StatusEnum
+
+
+class CommandeRejetee(BaseModel):
+    id: int
+    # Statut ayant empêché la transition, None si la commande n'existe pas
+    statut: Optional[StatusEnum]
+
+
+class CommandesTransitionRead(BaseModel):
+    statut: StatusEnum
+    transitionnees: list[int]
+    rejetees: list[CommandeRejetee]
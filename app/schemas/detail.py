@@ -13,7 +13,7 @@ class DetailsCreate(DetailsBase):
 
 
 class DetailsRead(DetailsBase):
-    pass
+    prix_unitaire: Optional[float] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -21,3 +21,9 @@ class DetailsRead(DetailsBase):
 class DetailsUpdate(BaseModel):
     produit_id: Optional[int]
     quantite: Optional[int] = Field(gt=0)
+
+
+class ChiffreAffairesProduit(BaseModel):
+    produit_id: int
+    quantite: int
+    montant: float
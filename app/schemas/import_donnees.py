@@ -0,0 +1,13 @@
+from enum import Enum
+
+from pydantic import BaseModel
+
+
+class FormatImport(str, Enum):
+    csv = "csv"
+    jsonl = "jsonl"
+
+
+class ImportErreur(BaseModel):
+    ligne: int
+    erreur: str
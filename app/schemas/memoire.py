@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class SuiviMemoireRead(BaseModel):
+    actif: bool
+    cadres: int
+    memoire_tracee: int
+    pic: int
+
+
+class InstantaneRead(BaseModel):
+    id: int
+    date: datetime
+    memoire_tracee: int
+    blocs: int
+    rss: Optional[int] = None
+
+
+class AllocationsModule(BaseModel):
+    module: str
+    taille: int
+    taille_diff: int
+    blocs_diff: int
+
+
+class SiteAllocation(AllocationsModule):
+    site: str
+    appelant: Optional[str] = None
+
+
+class ComparaisonRead(BaseModel):
+    avant: InstantaneRead
+    apres: InstantaneRead
+    par_module: list[AllocationsModule]
+    par_appelant: list[AllocationsModule]
+    sites: list[SiteAllocation]
@@ -1,7 +1,10 @@
+from enum import Enum
 from typing import Optional
 
 from pydantic import BaseModel
 
+from .import_donnees import ImportErreur
+
 
 class ProduitCreate(BaseModel):
     nom: str
@@ -26,3 +29,37 @@ class ProduitUpdate(BaseModel):
     prix: Optional[float] = None
     categorie_id: Optional[int] = None
     stock: Optional[int] = None
+
+
+class ProduitImportRapport(BaseModel):
+    inseres: int
+    mis_a_jour: int
+    erreurs: list[ImportErreur]
+
+
+class StockMode(str, Enum):
+    relatif = "relatif"
+    absolu = "absolu"
+
+
+class StockAjustement(BaseModel):
+    produit_id: int
+    valeur: int
+    mode: StockMode = StockMode.relatif
+
+
+class StockRead(BaseModel):
+    id: int
+    stock: int
+
+
+class DisponibilitesRead(BaseModel):
+    seuil: int
+    rupture: list[int]
+    stock_bas: list[int]
+
+
+class ProduitStockBasRead(BaseModel):
+    id: int
+    nom: str
+    stock: int
@@ -0,0 +1,14 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class ProfilRead(BaseModel):
+    id: str
+    date: datetime
+    methode: str
+    chemin: str
+    route: str
+    statut: int
+    duree_ms: float
+    echantillons: int
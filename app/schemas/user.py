@@ -1,11 +1,22 @@
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, Optional
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from pydantic import AfterValidator, BaseModel, ConfigDict, EmailStr, Field
+
+from app.schemas.import_donnees import ImportErreur
+
+
+def normalize_email(email: str) -> str:
+    """Met un email en minuscules : deux casses désignent le même compte."""
+    return email.strip().lower()
+
+
+# Email validé puis normalisé, pour toutes les données reçues des clients
+EmailNormalise = Annotated[EmailStr, AfterValidator(normalize_email)]
 
 
 class UserBase(BaseModel):
-    email: EmailStr
+    email: EmailNormalise
     nom: str
     prenom: str
     adresse: Optional[str] = None
@@ -23,11 +34,29 @@ class UserPublic(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
-class UserLoginResponse(BaseModel):
+class TokenPair(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+
+
+class UserLoginResponse(TokenPair):
     message: str
     user: UserPublic
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class UserToken(BaseModel):
+    """Utilisateur authentifié, tel que décrit par les claims de son jeton."""
+
+    id: int
+    email: EmailStr
+    role_id: Optional[int]
+
+
 class UserCreate(UserBase):
     mot_de_passe: str = Field(..., min_length=10)
 
@@ -38,7 +67,7 @@ class UserRead(UserBase):
 
 
 class UserLogin(BaseModel):
-    email: EmailStr
+    email: EmailNormalise
     mot_de_passe: str
 
 
@@ -49,4 +78,9 @@ class UserUpdate(BaseModel):
     telephone: Optional[str] = None
     role_id: Optional[int] = None
     mot_de_passe: Optional[str] = Field(None, min_length=10, exclude=True)
-    email: Optional[EmailStr] = None
+    email: Optional[EmailNormalise] = None
+
+
+class UserImportRapport(BaseModel):
+    inseres: int
+    erreurs: list[ImportErreur]
@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+from collections.abc import Iterator
+from typing import Any, NamedTuple
+
+from pydantic import ValidationError
+
+from app.schemas.import_donnees import FormatImport
+
+
+class LigneImport(NamedTuple):
+    """
+    Ligne lue depuis un fichier d'import : son numéro, ses données brutes
+    ou le message d'erreur si elle n'a pas pu être décodée.
+    """
+
+    numero: int
+    donnees: dict[str, Any] | None
+    erreur: str | None = None
+
+
+def lire_lignes(contenu: str, format_import: FormatImport) -> Iterator[LigneImport]:
+    """Lit un fichier d'import CSV (avec en-tête) ou JSON lines ligne par ligne.
+
+    Les cellules CSV vides sont converties en None. Une ligne JSON invalide
+    ne stoppe pas la lecture : elle est renvoyée avec son message d'erreur.
+
+    Args:
+        contenu (str): Le contenu texte du fichier.
+        format_import (FormatImport): Le format du fichier (csv ou jsonl).
+
+    Yields:
+        LigneImport: Les lignes lues, numérotées à partir de 1 (hors en-tête).
+    """
+    if format_import == FormatImport.csv:
+        lecteur = csv.DictReader(io.StringIO(contenu))
+        for numero, cellules in enumerate(lecteur, start=1):
+            yield LigneImport(
+                numero,
+                {
+                    cle.strip(): (valeur if valeur != "" else None)
+                    for cle, valeur in cellules.items()
+                    if cle is not None
+                },
+            )
+        return
+
+    for numero, ligne in enumerate(contenu.splitlines(), start=1):
+        if not ligne.strip():
+            continue
+        try:
+            donnees = json.loads(ligne)
+        except json.JSONDecodeError as e:
+            yield LigneImport(numero, None, f"JSON invalide : {e.msg}")
+            continue
+        if not isinstance(donnees, dict):
+            yield LigneImport(numero, None, "Objet JSON attendu")
+            continue
+        yield LigneImport(numero, donnees)
+
+
+def resumer_erreur_validation(erreur: ValidationError) -> str:
+    """Résume une erreur de validation Pydantic en une ligne lisible.
+
+    Args:
+        erreur (ValidationError): L'erreur levée par Pydantic.
+
+    Returns:
+        str: Les champs en erreur et leurs messages, séparés par des `;`.
+    """
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in e['loc'])} : {e['msg']}"
+        for e in erreur.errors()
+    )
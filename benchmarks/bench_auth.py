@@ -0,0 +1,85 @@
+"""Benchmark : requêtes authentifiées par jeton contre vérification du mot de passe.
+
+Compare le débit d'une route protégée selon le mode d'authentification :
+
+- `jeton` : `GET /users/me` avec le jeton d'accès (vérification HMAC locale) ;
+- `mot_de_passe` : `POST /login` à chaque requête, c'est-à-dire ce que coûterait
+  une route qui revérifierait le mot de passe bcrypt à chaque appel.
+
+Le script s'exécute contre une API déjà démarrée, avec des limites de
+tentatives de connexion relevées (toutes les connexions viennent de la même IP
+et du même email) :
+
+    LOGIN_IP_RAFALE=1000000 LOGIN_EMAIL_RAFALE=1000000 uvicorn app.main:app --port 8000
+    python -m benchmarks.bench_auth --url http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.bench_login_menu import (
+    MOT_DE_PASSE,
+    afficher,
+    boucle,
+    creer_utilisateur,
+)
+
+
+async def mesurer(
+    client: httpx.AsyncClient,
+    concurrence: int,
+    duree: float,
+    methode: str,
+    url: str,
+    json: dict[str, str] | None = None,
+    headers: dict[str, str] | None = None,
+) -> list[float]:
+    """Lance `concurrence` boucles de la même requête et renvoie les latences."""
+    latences: list[float] = []
+    fin = time.perf_counter() + duree
+    await asyncio.gather(
+        *(
+            boucle(client, fin, latences, methode, url, json, headers)
+            for _ in range(concurrence)
+        )
+    )
+    return latences
+
+
+async def main() -> None:
+    """Lance les deux scénarios l'un après l'autre et affiche les résultats."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrence", type=int, default=20)
+    parser.add_argument("--duree", type=float, default=10.0)
+    args = parser.parse_args()
+
+    limites = httpx.Limits(max_connections=args.concurrence + 1)
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limites, timeout=60
+    ) as client:
+        email = await creer_utilisateur(client)
+        identifiants = {"email": email, "mot_de_passe": MOT_DE_PASSE}
+        resp = await client.post("/login", json=identifiants)
+        resp.raise_for_status()
+        entetes = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+        latences_jeton = await mesurer(
+            client, args.concurrence, args.duree, "GET", "/users/me", headers=entetes
+        )
+        latences_mdp = await mesurer(
+            client, args.concurrence, args.duree, "POST", "/login", json=identifiants
+        )
+
+    print(
+        f"{'requête':<16} {'nombre':>8} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    )
+    afficher("jeton", latences_jeton, args.duree)
+    afficher("mdp", latences_mdp, args.duree)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""Benchmark : octets transmis et coût CPU de la compression des réponses JSON.
+
+Encode des listes de produits (au format de `GET /produits/`) de tailles
+croissantes, puis mesure pour chaque encodage du middleware (brotli et gzip aux
+niveaux configurés) la taille compressée et le temps de compression médian,
+comparé au temps de transfert du corps sur un lien lent :
+
+    python -m benchmarks.bench_compression
+"""
+
+import argparse
+import statistics
+import time
+
+from fastapi.responses import ORJSONResponse
+
+from app.core.compression import ENCODAGES, creer_compresseur
+from app.core.config import settings
+
+
+def corps_produits(taille: int) -> bytes:
+    """Renvoie le corps JSON d'une liste de `taille` produits."""
+    return bytes(
+        ORJSONResponse(
+            [
+                {
+                    "id": i,
+                    "nom": f"Produit {i}",
+                    "description": "Plat du jour, servi avec sa garniture de saison",
+                    "prix": 12.5 + i % 17 * 0.35,
+                    "categorie_id": i % 5 + 1,
+                    "stock": i % 40,
+                }
+                for i in range(1, taille + 1)
+            ]
+        ).body
+    )
+
+
+def compresser(encodage: str, corps: bytes, repetitions: int) -> tuple[int, float]:
+    """Renvoie la taille compressée et le temps médian (en secondes)."""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        compresseur = creer_compresseur(encodage)
+        compresse = compresseur.compresser(corps) + compresseur.terminer()
+        durees.append(time.perf_counter() - debut)
+    return len(compresse), statistics.median(durees)
+
+
+def main() -> None:
+    """Lance les mesures pour chaque taille de liste et chaque encodage."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tailles", type=int, nargs="+", default=[1, 5, 50, 1000])
+    parser.add_argument(
+        "--debit", type=float, default=1.6, help="Débit du lien, en Mbit/s"
+    )
+    args = parser.parse_args()
+    octets_par_ms = args.debit * 1e6 / 8 / 1000
+
+    print(
+        f"seuil : {settings.COMPRESSION_TAILLE_MIN} octets, brotli "
+        f"{settings.COMPRESSION_BROTLI_QUALITE}, gzip "
+        f"{settings.COMPRESSION_GZIP_NIVEAU}, lien {args.debit} Mbit/s"
+    )
+    print(
+        f"{'produits':>8} {'encodage':>8} {'octets':>9} {'ratio':>6} "
+        f"{'cpu':>9} {'transfert':>10} {'gain':>9}"
+    )
+    for taille in args.tailles:
+        corps = corps_produits(taille)
+        brut = len(corps) / octets_par_ms
+        print(
+            f"{taille:>8} {'aucun':>8} {len(corps):>9} {1:>6.2f} "
+            f"{0:>7.3f}ms {brut:>8.2f}ms {0:>7.2f}ms"
+        )
+        for encodage in ENCODAGES:
+            octets, cpu = compresser(
+                encodage, corps, max(5, min(500, 2_000_000 // len(corps)))
+            )
+            transfert = octets / octets_par_ms
+            # Temps gagné par réponse : transfert évité moins le CPU dépensé
+            print(
+                f"{'':>8} {encodage:>8} {octets:>9} {octets / len(corps):>6.2f} "
+                f"{cpu * 1000:>7.3f}ms {transfert:>8.2f}ms "
+                f"{brut - transfert - cpu * 1000:>7.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
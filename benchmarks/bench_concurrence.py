@@ -0,0 +1,186 @@
+"""Benchmark : contrôle de concurrence optimiste contre `SELECT ... FOR UPDATE`.
+
+Des serveurs concurrents modifient des commandes par lecture-modification-
+écriture, avec un temps de traitement entre la lecture et l'écriture (aller-
+retour client, calculs). Deux stratégies sont comparées :
+
+- `verrou` : la ligne est verrouillée dès la lecture (`FOR UPDATE`) et le
+  reste pendant le traitement ;
+- `version` : lecture sans verrou, puis écriture conditionnée à la version
+  lue (`incrementer_version`), recommencée en cas de conflit (412).
+
+Deux niveaux de contention : tous les serveurs sur une seule commande, puis
+chacun sur la commande d'une table différente. Le total final vérifie
+qu'aucune modification n'est perdue. Les commandes créées sont supprimées à
+la fin. Le script s'exécute directement contre la base configurée dans
+`.env` :
+
+    python -m benchmarks.bench_concurrence
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from collections.abc import Callable
+
+from fastapi import HTTPException
+from sqlalchemy import Engine, text, update
+from sqlmodel import Session, col, create_engine, select
+
+from app.core.config import settings
+from app.db.versions import incrementer_version
+from app.main import app  # noqa: F401  (configure les relations des modèles)
+from app.models.commandes_et_produits import Commande
+
+Strategie = Callable[[Engine, int, float], int]
+
+
+def ecrire(session: Session, commande_id: int, montant: float) -> None:
+    """Écrit le montant calculé et valide la transaction."""
+    session.execute(
+        update(Commande)
+        .where(col(Commande.id) == commande_id)
+        .values(montant_total=montant)
+    )
+    session.commit()
+
+
+def par_verrou(engine: Engine, commande_id: int, traitement: float) -> int:
+    """Lecture verrouillée, traitement, écriture ; renvoie 0 (aucun conflit)."""
+    with Session(engine) as session:
+        montant = session.exec(
+            select(Commande.montant_total)
+            .where(col(Commande.id) == commande_id)
+            .with_for_update()
+        ).one()
+        time.sleep(traitement)
+        ecrire(session, commande_id, montant + 1)
+    return 0
+
+
+def par_version(engine: Engine, commande_id: int, traitement: float) -> int:
+    """Lecture libre, traitement, écriture conditionnée ; renvoie les conflits."""
+    conflits = 0
+    with Session(engine) as session:
+        while True:
+            version, montant = session.exec(
+                select(Commande.version, Commande.montant_total).where(
+                    col(Commande.id) == commande_id
+                )
+            ).one()
+            session.rollback()
+            time.sleep(traitement)
+            try:
+                incrementer_version(session, Commande, commande_id, version)
+            except HTTPException:
+                conflits += 1
+                session.rollback()
+                continue
+            ecrire(session, commande_id, montant + 1)
+            return conflits
+
+
+def mesurer(
+    engine: Engine,
+    strategie: Strategie,
+    commande_ids: list[int],
+    modifications: int,
+    traitement: float,
+) -> tuple[float, list[float], int]:
+    """
+    Lance un serveur (thread) par commande de `commande_ids`.
+
+    Returns:
+        La durée totale (s), les latences de chaque modification (s) et le
+        nombre de conflits.
+    """
+    latences: list[float] = []
+    conflits = [0]
+    verrou = threading.Lock()
+
+    def serveur(commande_id: int) -> None:
+        for _ in range(modifications):
+            debut = time.perf_counter()
+            n = strategie(engine, commande_id, traitement)
+            with verrou:
+                latences.append(time.perf_counter() - debut)
+                conflits[0] += n
+
+    threads = [threading.Thread(target=serveur, args=(i,)) for i in commande_ids]
+    debut = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - debut, latences, conflits[0]
+
+
+def main() -> None:
+    """Crée les commandes, lance les scénarios et supprime les commandes."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--serveurs", type=int, default=8)
+    parser.add_argument("--modifications", type=int, default=25)
+    parser.add_argument("--traitement-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    traitement = args.traitement_ms / 1000
+
+    engine = create_engine(settings.DATABASE_URL, pool_size=args.serveurs + 2)
+    with engine.begin() as connexion:
+        ids = list(
+            connexion.execute(
+                text(
+                    "INSERT INTO commandes (client_id, date_commande, statut, "
+                    "montant_total) SELECT (SELECT min(id) FROM users), now(), "
+                    "'en_attente', 0 FROM generate_series(1, :n) RETURNING id"
+                ),
+                {"n": args.serveurs},
+            ).scalars()
+        )
+
+    print(
+        f"{'contention':<10} {'stratégie':<9} {'modif/s':>8} {'p50':>9} "
+        f"{'p99':>9} {'conflits':>9} {'total':>7}"
+    )
+    try:
+        for contention, commande_ids in (
+            ("une ligne", [ids[0]] * args.serveurs),
+            ("une/table", ids),
+        ):
+            for nom, strategie in (("verrou", par_verrou), ("version", par_version)):
+                with engine.begin() as connexion:
+                    connexion.execute(
+                        text(
+                            "UPDATE commandes SET montant_total = 0 "
+                            "WHERE id = ANY(:ids)"
+                        ),
+                        {"ids": ids},
+                    )
+                duree, latences, conflits = mesurer(
+                    engine, strategie, commande_ids, args.modifications, traitement
+                )
+                with engine.connect() as connexion:
+                    total = connexion.execute(
+                        text(
+                            "SELECT sum(montant_total) FROM commandes "
+                            "WHERE id = ANY(:ids)"
+                        ),
+                        {"ids": ids},
+                    ).scalar_one()
+                # Aucune modification perdue : le total compte chacune d'elles
+                assert total == len(latences)
+                p99 = statistics.quantiles(latences, n=100)[98]
+                print(
+                    f"{contention:<10} {nom:<9} {len(latences) / duree:>8.0f} "
+                    f"{statistics.median(latences) * 1000:>7.1f}ms "
+                    f"{p99 * 1000:>7.1f}ms {conflits:>9} {total:>7.0f}"
+                )
+    finally:
+        with engine.begin() as connexion:
+            connexion.execute(
+                text("DELETE FROM commandes WHERE id = ANY(:ids)"), {"ids": ids}
+            )
+
+
+if __name__ == "__main__":
+    main()
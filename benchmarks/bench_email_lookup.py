@@ -0,0 +1,95 @@
+"""Benchmark : recherche d'un utilisateur par email parmi un million de lignes.
+
+Insère les utilisateurs dans une transaction annulée à la fin (la base n'est
+pas modifiée), puis mesure `get_user_by_email` avec des emails en casse mixte :
+d'abord avec l'index `ix_users_email_lower`, puis sans (parcours de la table).
+Le script s'exécute directement contre la base configurée dans `.env` :
+
+    python -m benchmarks.bench_email_lookup --utilisateurs 1000000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from app.core.config import settings
+from app.crud.user import get_user_by_email
+
+
+def mesurer(session: Session, emails: list[str]) -> list[float]:
+    """Renvoie la durée (en secondes) de chaque recherche, en vérifiant le résultat."""
+    durees = []
+    for email in emails:
+        debut = time.perf_counter()
+        user = get_user_by_email(session, email)
+        durees.append(time.perf_counter() - debut)
+        assert user is not None and user.email == email.lower()
+        session.expunge_all()
+    return durees
+
+
+def afficher(nom: str, durees: list[float]) -> None:
+    """Affiche le nombre de recherches et les percentiles de latence (ms)."""
+    centiles = statistics.quantiles(durees, n=100)
+    print(
+        f"{nom:<12} {len(durees):>8} {centiles[49] * 1000:>8.3f} "
+        f"{centiles[94] * 1000:>8.3f} {centiles[98] * 1000:>8.3f}"
+    )
+
+
+def main() -> None:
+    """Remplit la table, lance les mesures et annule la transaction."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--utilisateurs", type=int, default=1_000_000)
+    parser.add_argument("--recherches", type=int, default=2000)
+    parser.add_argument("--recherches-sans-index", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(settings.DATABASE_URL)
+    with engine.connect() as connexion:
+        transaction = connexion.begin()
+        debut = time.perf_counter()
+        connexion.execute(
+            text(
+                "INSERT INTO users (nom, prenom, email, mot_de_passe, date_creation) "
+                "SELECT 'Bench', 'Email', 'bench' || i || '@example.com', 'x', now() "
+                "FROM generate_series(1, :n) AS i"
+            ),
+            {"n": args.utilisateurs},
+        )
+        connexion.execute(text("ANALYZE users"))
+        print(
+            f"{args.utilisateurs} utilisateurs insérés en "
+            f"{time.perf_counter() - debut:.1f} s"
+        )
+
+        def emails(nombre: int) -> list[str]:
+            return [
+                f"Bench{random.randint(1, args.utilisateurs)}@EXAMPLE.com"
+                for _ in range(nombre)
+            ]
+
+        requete = (
+            "EXPLAIN SELECT * FROM users WHERE lower(email) = 'bench1@example.com'"
+        )
+        with Session(bind=connexion) as session:
+            print(connexion.execute(text(requete)).scalars().first())
+            avec_index = mesurer(session, emails(args.recherches))
+
+            connexion.execute(text("DROP INDEX ix_users_email_lower"))
+            print(connexion.execute(text(requete)).scalars().first())
+            sans_index = mesurer(session, emails(args.recherches_sans_index))
+
+        transaction.rollback()
+
+    print(f"{'index':<12} {'nombre':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    afficher("avec", avec_index)
+    afficher("sans", sans_index)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark : taille et latence des listes limitées par `?fields=`.
+
+Insère 5 000 produits et 20 000 commandes de trois lignes dans une transaction
+annulée à la fin, puis mesure, pour les sous-ensembles de champs typiques des
+clients (sélecteur de produits, écran de cuisine), la taille du JSON et le
+temps médian de `get_produits_json` / `get_commandes_json`, comparés à la
+réponse complète. Le script s'exécute directement contre la base configurée
+dans `.env` :
+
+    python -m benchmarks.bench_fields
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+from typing import Optional
+
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from app.core.compression import creer_compresseur
+from app.core.config import settings
+from app.crud.commande import get_commandes_json
+from app.crud.produit import get_produits_json
+
+Champs = Optional[tuple[str, ...]]
+
+CAS: list[tuple[str, Champs]] = [
+    ("/produits/", None),
+    ("/produits/", ("id", "nom", "prix")),
+    ("/commandes/", None),
+    ("/commandes/", ("statut", "id", "details")),
+    ("/commandes/", ("statut", "id")),
+]
+
+
+def mesurer(lire: Callable[[], str], repetitions: int) -> tuple[float, bytes]:
+    """Renvoie le temps médian (en secondes) d'une lecture et son corps."""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        corps = lire().encode()
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees), corps
+
+
+def main() -> None:
+    """Remplit les tables, lance les mesures et annule la transaction."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--produits", type=int, default=5000)
+    parser.add_argument("--commandes", type=int, default=20_000)
+    parser.add_argument("--repetitions", type=int, default=10)
+    args = parser.parse_args()
+
+    engine = create_engine(settings.DATABASE_URL)
+    with engine.connect() as connexion:
+        transaction = connexion.begin()
+        connexion.execute(
+            text(
+                "INSERT INTO produits (nom, description, prix, stock) "
+                "SELECT 'Bench fields ' || i, "
+                "'Plat du jour, servi avec sa garniture de saison', "
+                "12.5 + i % 17 * 0.35, i % 40 FROM generate_series(1, :n) AS i"
+            ),
+            {"n": args.produits},
+        )
+        client_id = connexion.execute(
+            text(
+                "INSERT INTO users (nom, prenom, email, mot_de_passe, date_creation) "
+                "VALUES ('Bench', 'Fields', 'bench_fields@example.com', 'x', now()) "
+                "RETURNING id"
+            )
+        ).scalar_one()
+        connexion.execute(
+            text(
+                "WITH c AS (INSERT INTO commandes "
+                "(client_id, date_commande, statut, montant_total) "
+                "SELECT :client_id, now() - i * interval '1 minute', "
+                "'en_preparation', 37.5 FROM generate_series(1, :n) AS i "
+                "RETURNING id) "
+                "INSERT INTO details_commandes "
+                "(commande_id, produit_id, quantite, prix_unitaire) "
+                "SELECT c.id, p, 1 + p % 3, 12.5 FROM c, generate_series(1, 3) AS p"
+            ),
+            {"client_id": client_id, "n": args.commandes},
+        )
+        connexion.execute(text("ANALYZE produits, commandes, details_commandes"))
+
+        print(
+            f"{'endpoint':<12} {'fields':<20} {'octets':>10} {'gzip':>9} "
+            f"{'latence':>10} {'taille':>7} {'temps':>7}"
+        )
+        with Session(bind=connexion) as session:
+            lectures: dict[str, Callable[[Champs], str]] = {
+                "/produits/": lambda champs: get_produits_json(session, champs),
+                "/commandes/": lambda champs: (
+                    get_commandes_json(session, client_id=client_id, champs=champs)
+                    or "[]"
+                ),
+            }
+            reference: dict[str, tuple[float, int]] = {}
+            for endpoint, champs in CAS:
+                duree, corps = mesurer(
+                    lambda: lectures[endpoint](champs), args.repetitions
+                )
+                compresseur = creer_compresseur("gzip")
+                gzip = len(compresseur.compresser(corps) + compresseur.terminer())
+                duree_ref, taille_ref = reference.setdefault(
+                    endpoint, (duree, len(corps))
+                )
+                # Taille et temps relatifs à la réponse complète
+                print(
+                    f"{endpoint:<12} {','.join(champs or ('(tous)',)):<20} "
+                    f"{len(corps):>10} {gzip:>9} {duree * 1000:>8.1f}ms "
+                    f"{len(corps) / taille_ref:>6.0%} {duree / duree_ref:>6.0%}"
+                )
+        transaction.rollback()
+
+
+if __name__ == "__main__":
+    main()
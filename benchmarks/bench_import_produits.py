@@ -0,0 +1,71 @@
+"""Benchmark : import en masse de produits avec `import_produits`.
+
+Importe `--produits` lignes nouvelles (validation, COPY dans une table
+temporaire et `INSERT ... ON CONFLICT`), puis les mêmes lignes une seconde
+fois, qui deviennent des mises à jour. Les produits créés sont supprimés à la
+fin. Le script s'exécute directement contre la base configurée dans `.env` :
+
+    python -m benchmarks.bench_import_produits --produits 100000
+"""
+
+import argparse
+import time
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from app.core.config import settings
+from app.crud.produit import import_produits
+from app.models.users_et_roles import User  # noqa: F401
+from app.utils.helpers import LigneImport
+
+
+def main() -> None:
+    """Mesure l'insertion puis la mise à jour, et supprime les produits créés."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--produits", type=int, default=100_000)
+    args = parser.parse_args()
+
+    prefixe = f"bench_{uuid4().hex[:8]}"
+    lignes = [
+        LigneImport(
+            i,
+            {
+                "nom": f"{prefixe}_{i}",
+                "description": "Produit de benchmark",
+                "prix": i % 50 + 0.5,
+                "stock": i % 100,
+            },
+        )
+        for i in range(1, args.produits + 1)
+    ]
+
+    engine = create_engine(settings.DATABASE_URL)
+    with Session(engine) as session:
+        durees = []
+        rapports = []
+        for _ in range(2):
+            debut = time.perf_counter()
+            rapports.append(import_produits(session, lignes))
+            durees.append(time.perf_counter() - debut)
+
+        session.execute(
+            text("DELETE FROM produits WHERE nom LIKE :motif"),
+            {"motif": f"{prefixe}\\_%"},
+        )
+        session.commit()
+
+    insertion, mise_a_jour = rapports
+    print(
+        f"insertion de {insertion.inseres} produits : {durees[0]:.2f} s "
+        f"({args.produits / durees[0]:,.0f} lignes/s, {len(insertion.erreurs)} erreurs)"
+    )
+    print(
+        f"mise à jour de {mise_a_jour.mis_a_jour} produits : {durees[1]:.2f} s "
+        f"({args.produits / durees[1]:,.0f} lignes/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark : création de milliers d'utilisateurs avec `import_users`.
+
+Compare la durée de l'import (validation, recherche des emails existants,
+hashage parallèle sur N processus, COPY et insertion) à la cible : le temps
+qu'un seul cœur met à hasher n/N mots de passe. Les utilisateurs créés sont
+supprimés à la fin. Le script s'exécute directement contre la base configurée
+dans `.env` ; `BCRYPT_ROUNDS` permet de raccourcir la mesure :
+
+    BCRYPT_ROUNDS=8 python -m benchmarks.bench_import_users --utilisateurs 10000
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from app.core.config import settings
+from app.core.security import hash_password
+from app.crud.user import import_users
+from app.utils.helpers import LigneImport
+
+
+def main() -> None:
+    """Mesure la cible puis l'import, et supprime les utilisateurs créés."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--utilisateurs", type=int, default=10_000)
+    parser.add_argument("--processus", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    for _ in range(args.utilisateurs // args.processus):
+        hash_password("mot-de-passe-import")
+    cible = time.perf_counter() - debut
+
+    prefixe = f"bench_{uuid4().hex[:8]}"
+    lignes = [
+        LigneImport(
+            i,
+            {
+                "nom": "Bench",
+                "prenom": "Import",
+                "email": f"{prefixe}_{i}@example.com",
+                "mot_de_passe": "mot-de-passe-import",
+            },
+        )
+        for i in range(1, args.utilisateurs + 1)
+    ]
+
+    engine = create_engine(settings.DATABASE_URL)
+    with (
+        ProcessPoolExecutor(
+            max_workers=args.processus,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool,
+        Session(engine) as session,
+    ):
+        # Démarre les processus avant la mesure
+        list(pool.map(hash_password, ["amorce"] * args.processus))
+        debut = time.perf_counter()
+        rapport = import_users(session, lignes, pool)
+        duree = time.perf_counter() - debut
+
+        session.execute(
+            text("DELETE FROM users WHERE email LIKE :motif"),
+            {"motif": f"{prefixe}\\_%"},
+        )
+        session.commit()
+
+    print(f"BCRYPT_ROUNDS={settings.BCRYPT_ROUNDS}, {args.processus} processus")
+    print(
+        f"cible ({args.utilisateurs // args.processus} hashs, 1 cœur) : {cible:.1f} s"
+    )
+    print(
+        f"import de {rapport.inseres} utilisateurs : {duree:.1f} s "
+        f"({duree / cible:.2f} × la cible, {len(rapport.erreurs)} erreurs)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Benchmark : liste des commandes construite par les modèles ou par Postgres.
+
+Insère des commandes de trois lignes pour trois clients (10, 1 000 et 50 000
+commandes) dans une transaction annulée à la fin, puis mesure, pour chaque
+client, les deux chemins de `GET /commandes/?client_id=...` :
+- modèles : `get_commandes`, objets SQLModel (détails chargés à la demande),
+  validation `list[CommandeRead]` puis encodage `ORJSONResponse` ;
+- Postgres : `get_commandes_json`, texte JSON renvoyé tel quel.
+Le script s'exécute directement contre la base configurée dans `.env` :
+
+    python -m benchmarks.bench_json_sql
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from app.core.config import settings
+from app.crud.commande import get_commandes, get_commandes_json
+from app.main import app  # noqa: F401  (configure les relations des modèles)
+from app.schemas.commande import CommandeRead
+
+ADAPTATEUR = TypeAdapter(list[CommandeRead])
+
+
+def par_modeles(session: Session, client_id: int) -> bytes:
+    """Construit la réponse comme FastAPI avec `response_model`."""
+    commandes = ADAPTATEUR.validate_python(
+        get_commandes(session, client_id=client_id), from_attributes=True
+    )
+    return bytes(ORJSONResponse(ADAPTATEUR.dump_python(commandes, mode="json")).body)
+
+
+def par_postgres(session: Session, client_id: int) -> bytes:
+    """Construit la réponse à partir du JSON assemblé par Postgres."""
+    return (get_commandes_json(session, client_id=client_id) or "[]").encode()
+
+
+def mesurer(
+    session: Session,
+    chemin: Callable[[Session, int], bytes],
+    client_id: int,
+    repetitions: int,
+) -> tuple[float, bytes]:
+    """Renvoie le temps médian (en secondes) d'un chemin et sa dernière réponse."""
+    durees = []
+    for _ in range(repetitions):
+        session.expunge_all()
+        debut = time.perf_counter()
+        corps = chemin(session, client_id)
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees), corps
+
+
+def main() -> None:
+    """Remplit les tables, lance les mesures et annule la transaction."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tailles", type=int, nargs="+", default=[10, 1000, 50_000])
+    args = parser.parse_args()
+
+    engine = create_engine(settings.DATABASE_URL)
+    with engine.connect() as connexion:
+        transaction = connexion.begin()
+        produits = connexion.execute(
+            text("SELECT id FROM produits ORDER BY id LIMIT 3")
+        ).scalars()
+        produit_ids = list(produits)
+        clients = []
+        for taille in args.tailles:
+            client_id = connexion.execute(
+                text(
+                    "INSERT INTO users (nom, prenom, email, mot_de_passe, "
+                    "date_creation) VALUES ('Bench', 'Json', "
+                    "'bench_json_' || :taille || '@example.com', 'x', now()) "
+                    "RETURNING id"
+                ),
+                {"taille": taille},
+            ).scalar_one()
+            connexion.execute(
+                text(
+                    "WITH c AS (INSERT INTO commandes "
+                    "(client_id, date_commande, statut, montant_total) "
+                    "SELECT :client_id, now() - i * interval '1 minute', "
+                    "'servie', 37.5 FROM generate_series(1, :n) AS i "
+                    "RETURNING id) "
+                    "INSERT INTO details_commandes "
+                    "(commande_id, produit_id, quantite, prix_unitaire) "
+                    "SELECT c.id, p, 1 + p % 3, 12.5 FROM c, unnest(:produits) AS p"
+                ),
+                {"client_id": client_id, "n": taille, "produits": produit_ids},
+            )
+            clients.append((taille, client_id))
+        connexion.execute(text("ANALYZE commandes, details_commandes"))
+
+        print(f"{'commandes':>10} {'modèles':>12} {'postgres':>12} {'gain':>7}")
+        with Session(bind=connexion) as session:
+            for taille, client_id in clients:
+                repetitions = max(3, min(50, 20_000 // taille))
+                modeles, attendu = mesurer(session, par_modeles, client_id, repetitions)
+                postgres, corps = mesurer(session, par_postgres, client_id, repetitions)
+                assert corps == attendu
+                print(
+                    f"{taille:>10} {modeles * 1000:>10.1f}ms "
+                    f"{postgres * 1000:>10.1f}ms {modeles / postgres:>6.1f}x"
+                )
+        transaction.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Benchmark : latence des utilisateurs légitimes pendant une attaque sur /login.
+
+Mesure la latence des connexions légitimes et de la consultation du menu
+(`GET /produits/`), d'abord sans attaque, puis pendant un bourrage
+d'identifiants (emails aléatoires, mauvais mots de passe) réparti sur plusieurs
+adresses IP. Chaque client se connecte depuis sa propre adresse de
+127.0.0.0/8, ce qui permet de simuler plusieurs IP sur la machine locale :
+
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.bench_login_attaque --url http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+from uuid import uuid4
+
+import httpx
+
+from benchmarks.bench_login_menu import MOT_DE_PASSE, afficher, boucle
+
+
+def client_depuis(url: str, ip: str) -> httpx.AsyncClient:
+    """Crée un client HTTP dont les connexions partent de l'adresse `ip`."""
+    return httpx.AsyncClient(
+        base_url=url,
+        timeout=60,
+        transport=httpx.AsyncHTTPTransport(local_address=ip),
+    )
+
+
+async def creer_utilisateurs(url: str, nombre: int) -> list[str]:
+    """Crée `nombre` utilisateurs et renvoie leurs emails."""
+    emails = [f"bench_{uuid4().hex}@example.com" for _ in range(nombre)]
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        for email in emails:
+            resp = await client.post(
+                "/users/",
+                json={
+                    "nom": "Bench",
+                    "prenom": "Attaque",
+                    "email": email,
+                    "mot_de_passe": MOT_DE_PASSE,
+                },
+            )
+            resp.raise_for_status()
+    return emails
+
+
+async def utilisateur_legitime(
+    url: str,
+    ip: str,
+    emails: list[str],
+    fin: float,
+    latences: list[float],
+    statuts: Counter[int],
+) -> None:
+    """Connecte tour à tour ses utilisateurs, une connexion par seconde environ.
+
+    Seules les connexions réussies comptent dans les latences ; les refus
+    (429, 503) sont comptés à part.
+    """
+    async with client_depuis(url, ip) as client:
+        i = 0
+        while time.perf_counter() < fin:
+            debut = time.perf_counter()
+            resp = await client.post(
+                "/login", json={"email": emails[i], "mot_de_passe": MOT_DE_PASSE}
+            )
+            statuts[resp.status_code] += 1
+            if resp.status_code == 200:
+                latences.append(time.perf_counter() - debut)
+            i = (i + 1) % len(emails)
+            await asyncio.sleep(1.0)
+
+
+async def attaquant(url: str, ip: str, fin: float, statuts: Counter[int]) -> None:
+    """Enchaîne les tentatives avec des emails aléatoires, sans pause."""
+    async with client_depuis(url, ip) as client:
+        while time.perf_counter() < fin:
+            resp = await client.post(
+                "/login",
+                json={
+                    "email": f"victime_{uuid4().hex}@example.com",
+                    "mot_de_passe": "mauvais-mot-de-passe",
+                },
+            )
+            statuts[resp.status_code] += 1
+
+
+async def scenario(
+    args: argparse.Namespace, emails: list[str], attaque: bool
+) -> tuple[list[float], list[float], Counter[int], Counter[int]]:
+    """Lance un scénario.
+
+    Returns:
+        Les latences des connexions légitimes réussies, celles du menu, et les
+        statuts renvoyés aux clients légitimes et aux attaquants.
+    """
+    latences_login: list[float] = []
+    latences_menu: list[float] = []
+    statuts_legitimes: Counter[int] = Counter()
+    statuts_attaque: Counter[int] = Counter()
+    fin = time.perf_counter() + args.duree
+    # Chaque client légitime se connecte depuis sa propre IP avec ses propres
+    # utilisateurs ; chaque scénario a ses IP, pour partir de seaux pleins.
+    reseau = 2 if attaque else 1
+    taille = max(1, len(emails) // args.legitimes)
+    taches = [
+        utilisateur_legitime(
+            args.url,
+            f"127.0.{reseau}.{i + 1}",
+            emails[i * taille : (i + 1) * taille],
+            fin,
+            latences_login,
+            statuts_legitimes,
+        )
+        for i in range(args.legitimes)
+    ]
+    menu = client_depuis(args.url, "127.0.0.1")
+    taches += [
+        boucle(menu, fin, latences_menu, "GET", "/produits/") for _ in range(args.menu)
+    ]
+    if attaque:
+        taches += [
+            attaquant(
+                args.url, f"127.0.3.{i % args.ips_attaque + 1}", fin, statuts_attaque
+            )
+            for i in range(args.attaquants)
+        ]
+    await asyncio.gather(*taches)
+    await menu.aclose()
+    return latences_login, latences_menu, statuts_legitimes, statuts_attaque
+
+
+async def main() -> None:
+    """Lance les scénarios sans puis avec attaque et affiche les résultats."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--utilisateurs", type=int, default=20)
+    parser.add_argument("--legitimes", type=int, default=4)
+    parser.add_argument("--menu", type=int, default=3)
+    parser.add_argument("--attaquants", type=int, default=60)
+    parser.add_argument("--ips-attaque", type=int, default=30)
+    parser.add_argument("--duree", type=float, default=15.0)
+    args = parser.parse_args()
+
+    emails = await creer_utilisateurs(args.url, 2 * args.utilisateurs)
+    resultats = [
+        await scenario(args, emails[: args.utilisateurs], attaque=False),
+        await scenario(args, emails[args.utilisateurs :], attaque=True),
+    ]
+
+    print(
+        f"{'requête':<16} {'nombre':>8} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    )
+    for nom, (login, menu, _, _) in zip(("normal", "attaque"), resultats):
+        afficher(f"login {nom}", login, args.duree)
+        afficher(f"menu {nom}", menu, args.duree)
+    for nom, (_, _, legitimes, _) in zip(("normal", "attaque"), resultats):
+        print(f"statuts légitimes ({nom}) :", dict(sorted(legitimes.items())))
+    print("statuts attaquants :", dict(sorted(resultats[1][3].items())))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+"""Benchmark : trafic mixte de connexions (/login) et de consultation du menu.
+
+Simule une vague de connexions (prise de service) pendant que d'autres clients
+consultent le menu (`GET /produits/`), et mesure la latence de chaque type de
+requête. Le script s'exécute contre une API déjà démarrée, avec des limites
+de tentatives de connexion relevées (toutes les connexions viennent de la même
+IP et du même email) :
+
+    LOGIN_IP_RAFALE=1000000 LOGIN_EMAIL_RAFALE=1000000 uvicorn app.main:app --port 8000
+    python -m benchmarks.bench_login_menu --url http://127.0.0.1:8000
+
+Pour comparer deux versions, lancer le même scénario sur chacune.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import uuid4
+
+import httpx
+
+MOT_DE_PASSE = "benchmark-password"
+
+
+async def creer_utilisateur(client: httpx.AsyncClient) -> str:
+    """Crée l'utilisateur utilisé pour les connexions et renvoie son email."""
+    email = f"bench_{uuid4().hex}@example.com"
+    resp = await client.post(
+        "/users/",
+        json={
+            "nom": "Bench",
+            "prenom": "Login",
+            "email": email,
+            "mot_de_passe": MOT_DE_PASSE,
+        },
+    )
+    resp.raise_for_status()
+    return email
+
+
+async def boucle(
+    client: httpx.AsyncClient,
+    fin: float,
+    latences: list[float],
+    methode: str,
+    url: str,
+    json: dict[str, str] | None = None,
+    headers: dict[str, str] | None = None,
+) -> None:
+    """Enchaîne la même requête jusqu'à l'échéance en notant chaque latence."""
+    while time.perf_counter() < fin:
+        debut = time.perf_counter()
+        resp = await client.request(methode, url, json=json, headers=headers)
+        resp.raise_for_status()
+        latences.append(time.perf_counter() - debut)
+
+
+def afficher(nom: str, latences: list[float], duree: float) -> None:
+    """Affiche le débit et les percentiles de latence (ms) d'un type de requête."""
+    if len(latences) < 2:
+        print(f"{nom:<16} {len(latences):>8}  (pas assez de mesures)")
+        return
+    centiles = statistics.quantiles(latences, n=100)
+    print(
+        f"{nom:<16} {len(latences):>8} {len(latences) / duree:>8.1f} "
+        f"{centiles[49] * 1000:>8.1f} {centiles[94] * 1000:>8.1f} "
+        f"{centiles[98] * 1000:>8.1f}"
+    )
+
+
+async def main() -> None:
+    """Lance le scénario et affiche les résultats."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--connexions", type=int, default=40)
+    parser.add_argument("--menu", type=int, default=5)
+    parser.add_argument("--duree", type=float, default=15.0)
+    args = parser.parse_args()
+
+    limites = httpx.Limits(max_connections=args.connexions + args.menu + 1)
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limites, timeout=60
+    ) as client:
+        email = await creer_utilisateur(client)
+        identifiants = {"email": email, "mot_de_passe": MOT_DE_PASSE}
+        latences_login: list[float] = []
+        latences_menu: list[float] = []
+        fin = time.perf_counter() + args.duree
+        await asyncio.gather(
+            *(
+                boucle(client, fin, latences_login, "POST", "/login", identifiants)
+                for _ in range(args.connexions)
+            ),
+            *(
+                boucle(client, fin, latences_menu, "GET", "/produits/")
+                for _ in range(args.menu)
+            ),
+        )
+
+    print(
+        f"{'requête':<16} {'nombre':>8} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    )
+    afficher("login", latences_login, args.duree)
+    afficher("menu", latences_menu, args.duree)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""Benchmark : surcoût des métriques par requête HTTP.
+
+Appelle directement, sans serveur ni base, une application ASGI minimale
+(réponse JSON vide, routée comme par FastAPI vers `/commandes/{commande_id}`)
+avec et sans `MetriquesMiddleware`, et mesure le temps par requête :
+
+    python -m benchmarks.bench_metriques
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metriques import MetriquesMiddleware
+from app.main import app
+
+ROUTE = next(
+    r for r in app.routes if getattr(r, "path", "") == "/commandes/{commande_id}"
+)
+
+
+async def application_vide(scope: Scope, receive: Receive, send: Send) -> None:
+    """Application ASGI routant la requête et renvoyant une réponse JSON vide."""
+    scope["route"] = ROUTE
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def recevoir() -> Message:
+    """Corps de requête vide."""
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def envoyer(message: Message) -> None:
+    """Ignore les messages de la réponse."""
+
+
+async def mesurer(application: ASGIApp, requetes: int) -> float:
+    """Renvoie le temps moyen (en secondes) d'une requête."""
+    scope: Scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/commandes/42",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+    }
+    debut = time.perf_counter()
+    for _ in range(requetes):
+        await application(dict(scope), recevoir, envoyer)
+    return (time.perf_counter() - debut) / requetes
+
+
+def main() -> None:
+    """Lance les mesures avec et sans métriques."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requetes", type=int, default=20_000)
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args()
+
+    boucle = asyncio.new_event_loop()
+    resultats = {}
+    for nom, application in (
+        ("sans", application_vide),
+        ("avec", MetriquesMiddleware(application_vide)),
+    ):
+        resultats[nom] = statistics.median(
+            boucle.run_until_complete(mesurer(application, args.requetes))
+            for _ in range(args.repetitions)
+        )
+    boucle.close()
+
+    sans, avec = resultats["sans"], resultats["avec"]
+    print(f"{'sans':>10} {'avec':>10} {'surcoût':>10}")
+    print(f"{sans * 1e6:>8.1f}µs {avec * 1e6:>8.1f}µs {(avec - sans) * 1e6:>8.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark : N requêtes par ID contre une requête groupée `?ids=`.
+
+Reproduit l'affichage d'une commande de N lignes par un client : un
+`GET /produits/{id}` par ligne, puis un seul `GET /produits/?ids=...` ; de
+même pour les noms des clients (`/users/`) et pour les commandes. Mesure le
+temps médian de chaque variante, requêtes enchaînées sur une connexion.
+
+Le script s'exécute contre une API déjà démarrée, avec des données
+(`fake_data`) :
+
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.bench_multi_get --url http://127.0.0.1:8000
+"""
+
+import argparse
+import statistics
+import time
+
+import httpx
+
+RESSOURCES = ["/produits/", "/users/", "/commandes/"]
+
+
+def par_id(client: httpx.Client, ressource: str, ids: list[int]) -> list[object]:
+    """Une requête par ID, comme les clients actuels."""
+    resultats: list[object] = []
+    for id_ in ids:
+        resp = client.get(f"{ressource}{id_}")
+        resultats.append(resp.json() if resp.status_code == 200 else None)
+    return resultats
+
+
+def groupe(client: httpx.Client, ressource: str, ids: list[int]) -> list[object]:
+    """Une seule requête `?ids=`."""
+    resp = client.get(ressource, params={"ids": ",".join(map(str, ids))})
+    resp.raise_for_status()
+    resultats: list[object] = resp.json()
+    return resultats
+
+
+def main() -> None:
+    """Lance les mesures pour chaque ressource et chaque nombre d'IDs."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--tailles", type=int, nargs="+", default=[5, 20, 100])
+    parser.add_argument("--repetitions", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'ressource':<12} {'ids':>5} {'par id':>10} {'groupée':>10} {'gain':>7}")
+    with httpx.Client(base_url=args.url) as client:
+        for ressource in RESSOURCES:
+            for taille in args.tailles:
+                ids = list(range(1, taille + 1))
+                durees: dict[str, list[float]] = {"par_id": [], "groupe": []}
+                for _ in range(args.repetitions):
+                    debut = time.perf_counter()
+                    attendu = par_id(client, ressource, ids)
+                    durees["par_id"].append(time.perf_counter() - debut)
+                    debut = time.perf_counter()
+                    obtenu = groupe(client, ressource, ids)
+                    durees["groupe"].append(time.perf_counter() - debut)
+                    assert obtenu == attendu
+                n, g = (statistics.median(d) for d in durees.values())
+                print(
+                    f"{ressource:<12} {taille:>5} {n * 1000:>8.1f}ms "
+                    f"{g * 1000:>8.1f}ms {n / g:>6.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Benchmark : surcoût du profilage continu sur le passage de commande.
+
+Envoie, sans serveur (client ASGI en mémoire), des requêtes POST /commandes/
+de deux lignes contre la base configurée dans `.env`, sans profilage continu
+puis avec l'échantillonneur du worker à 50, 100 et 1000 Hz. Les
+configurations sont alternées à chaque tour pour répartir le bruit :
+
+    python -m benchmarks.bench_profilage
+
+Mesure aussi la durée d'un relevé des piles de tous les threads du worker
+(boucle d'événements, threads du pool). Les commandes créées sont supprimées
+et les stocks restaurés à la fin.
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.core import profilage
+from app.core.config import settings
+from app.db.session import engine
+from app.main import app
+
+PRODUITS = [1, 2]
+
+
+def mesurer(
+    client: TestClient, client_id: int, requetes: int, crees: list[int]
+) -> float:
+    """Passe des commandes ; renvoie le temps moyen (en secondes) d'une requête."""
+    commande = {
+        "client_id": client_id,
+        "details": [{"produit_id": p, "quantite": 1} for p in PRODUITS],
+    }
+    debut = time.perf_counter()
+    for _ in range(requetes):
+        crees.append(client.post("/commandes/", json=commande).json()["id"])
+    return (time.perf_counter() - debut) / requetes
+
+
+def duree_releve() -> tuple[float, int]:
+    """Renvoie la durée médiane (en secondes) d'un relevé, et le nombre de threads."""
+    piles: Counter[str] = Counter()
+    noms: dict[int, str] = {}
+    durees = []
+    for _ in range(1000):
+        debut = time.perf_counter()
+        profilage.releve_complet(piles, threading.get_ident(), noms)
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees), len(sys._current_frames()) - 1
+
+
+def main() -> None:
+    """Lance les mesures pour chaque fréquence d'échantillonnage."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requetes", type=int, default=200)
+    parser.add_argument("--tours", type=int, default=10)
+    args = parser.parse_args()
+
+    engine.echo = False
+    settings.PROFILAGE_CONTINU_DOSSIER = tempfile.mkdtemp()
+    frequences = [0.0, 50.0, 100.0, 1000.0]
+    durees: dict[float, list[float]] = {hz: [] for hz in frequences}
+    crees: list[int] = []
+    with engine.begin() as connexion:
+        stocks = connexion.execute(
+            text("SELECT id, stock FROM produits WHERE id = ANY(:ids)"),
+            {"ids": PRODUITS},
+        ).all()
+        connexion.execute(
+            text("UPDATE produits SET stock = 1000000 WHERE id = ANY(:ids)"),
+            {"ids": PRODUITS},
+        )
+        client_id = connexion.execute(text("SELECT min(id) FROM users")).scalar_one()
+    try:
+        with TestClient(app) as client:
+            mesurer(client, client_id, args.requetes, crees)
+            for _ in range(args.tours):
+                for hz in frequences:
+                    settings.PROFILAGE_CONTINU_HZ = hz
+                    echantillonneur = profilage.EchantillonneurContinu()
+                    echantillonneur.demarrer()
+                    durees[hz].append(mesurer(client, client_id, args.requetes, crees))
+                    echantillonneur.arreter()
+            releve, threads = duree_releve()
+    finally:
+        with engine.begin() as connexion:
+            connexion.execute(
+                text("DELETE FROM details_commandes WHERE commande_id = ANY(:ids)"),
+                {"ids": crees},
+            )
+            connexion.execute(
+                text("DELETE FROM commandes WHERE id = ANY(:ids)"), {"ids": crees}
+            )
+            for produit_id, stock in stocks:
+                connexion.execute(
+                    text("UPDATE produits SET stock = :stock WHERE id = :id"),
+                    {"stock": stock, "id": produit_id},
+                )
+
+    reference = statistics.median(durees[0.0])
+    print(f"{'profilage':>10} {'commande':>10} {'surcoût':>9}")
+    for hz in frequences:
+        duree = statistics.median(durees[hz])
+        nom = f"{hz:.0f} Hz" if hz else "désactivé"
+        print(f"{nom:>10} {duree * 1e6:>8.0f}µs {(duree / reference - 1) * 100:>8.2f}%")
+    print(
+        f"relevé de {threads} threads : {releve * 1e6:.0f}µs, "
+        f"soit {releve * 100 * 100:.2f} % d'un cœur à 100 Hz"
+    )
+
+
+if __name__ == "__main__":
+    main()
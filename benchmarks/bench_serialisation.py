@@ -0,0 +1,154 @@
+"""Benchmark : coût de sérialisation des listes renvoyées par l'API.
+
+Reproduit, sans serveur ni base, le chemin d'une réponse de liste FastAPI : les
+objets SQLModel sont validés et convertis par le `response_model`
+(`serialize_response`), puis encodés en JSON par la classe de réponse. Compare
+l'encodage par `json` (`JSONResponse`) et par orjson (`ORJSONResponse`, classe
+par défaut de l'application) pour des listes de 10, 1 000 et 50 000 éléments :
+
+    python -m benchmarks.bench_serialisation
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlmodel import SQLModel
+
+from app.main import app  # noqa: F401  (configure les relations des modèles)
+from app.models.commandes_et_produits import Commande, DetailCommande, Produit
+from app.models.users_et_roles import User
+from app.schemas.commande import CommandeRead, StatusEnum
+from app.schemas.produit import ProduitRead
+from app.schemas.user import UserRead
+
+DEBUT = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def produit(i: int) -> Produit:
+    """Crée un produit de test."""
+    return Produit(
+        id=i,
+        nom=f"Produit {i}",
+        description="Plat du jour, servi avec sa garniture de saison",
+        prix=12.5 + i % 17 * 0.35,
+        categorie_id=i % 5 + 1,
+        stock=i % 40,
+    )
+
+
+def user(i: int) -> User:
+    """Crée un utilisateur de test."""
+    return User(
+        id=i,
+        nom="Dupont",
+        prenom="Camille",
+        email=f"camille.dupont{i}@example.com",
+        adresse="12 rue de la République, 69002 Lyon",
+        telephone="0601020304",
+        mot_de_passe="x",
+        role_id=2,
+        date_creation=DEBUT + timedelta(minutes=i),
+    )
+
+
+def commande(i: int) -> Commande:
+    """Crée une commande de test de trois lignes."""
+    details = [
+        DetailCommande(
+            commande_id=i, produit_id=p, quantite=1 + p % 3, prix_unitaire=9.9 + p
+        )
+        for p in range(1, 4)
+    ]
+    return Commande(
+        id=i,
+        client_id=i % 100 + 1,
+        date_commande=DEBUT + timedelta(minutes=i),
+        statut=StatusEnum.servie,
+        montant_total=sum(d.quantite * d.prix_unitaire for d in details),
+        details=details,
+    )
+
+
+ENDPOINTS: list[tuple[str, Callable[[int], SQLModel], Any]] = [
+    ("/produits/", produit, list[ProduitRead]),
+    ("/users/", user, list[UserRead]),
+    ("/commandes/", commande, list[CommandeRead]),
+]
+
+
+def mesurer(
+    boucle: asyncio.AbstractEventLoop,
+    objets: list[SQLModel],
+    modele: Any,
+    repetitions: int,
+) -> tuple[float, float, float]:
+    """
+    Mesure les étapes d'une réponse de liste.
+
+    Returns:
+        Les temps médians (en secondes) de la conversion par le
+        `response_model`, de l'encodage `json` et de l'encodage orjson.
+    """
+    champ = create_model_field("Response", modele, mode="serialization")
+    conversion, encodage_json, encodage_orjson = [], [], []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        contenu = boucle.run_until_complete(
+            serialize_response(field=champ, response_content=objets)
+        )
+        conversion.append(time.perf_counter() - debut)
+
+        debut = time.perf_counter()
+        corps_json = JSONResponse(contenu).body
+        encodage_json.append(time.perf_counter() - debut)
+
+        debut = time.perf_counter()
+        corps_orjson = ORJSONResponse(contenu).body
+        encodage_orjson.append(time.perf_counter() - debut)
+
+    assert json.loads(bytes(corps_json)) == json.loads(bytes(corps_orjson))
+    return (
+        statistics.median(conversion),
+        statistics.median(encodage_json),
+        statistics.median(encodage_orjson),
+    )
+
+
+def main() -> None:
+    """Lance les mesures pour chaque endpoint et chaque taille de liste."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tailles", type=int, nargs="+", default=[10, 1000, 50_000])
+    args = parser.parse_args()
+
+    print(
+        f"{'endpoint':<12} {'taille':>7} {'modèle':>10} {'json':>10} "
+        f"{'orjson':>10} {'gain':>7} {'total':>7}"
+    )
+    boucle = asyncio.new_event_loop()
+    for nom, fabrique, modele in ENDPOINTS:
+        for taille in args.tailles:
+            objets = [fabrique(i) for i in range(1, taille + 1)]
+            conversion, json_, orjson_ = mesurer(
+                boucle, objets, modele, max(3, min(200, 20_000 // taille))
+            )
+            # Gain sur l'encodage seul, puis sur la réponse complète
+            print(
+                f"{nom:<12} {taille:>7} {conversion * 1000:>8.2f}ms "
+                f"{json_ * 1000:>8.2f}ms {orjson_ * 1000:>8.2f}ms "
+                f"{json_ / orjson_:>6.1f}x "
+                f"{(conversion + json_) / (conversion + orjson_):>6.2f}x"
+            )
+    boucle.close()
+
+
+if __name__ == "__main__":
+    main()
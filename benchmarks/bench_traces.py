@@ -0,0 +1,90 @@
+"""Benchmark : surcoût des traces sur les requêtes de l'API.
+
+Envoie, sans serveur (client ASGI en mémoire), des requêtes GET
+/commandes/{id} et GET /produits/ contre la base configurée dans `.env`, avec
+les traces désactivées (exporteur "aucun"), échantillonnées à 1 % puis à
+100 %, spans exportés dans un fichier JSON lines temporaire. Les
+configurations sont alternées à chaque tour pour répartir le bruit :
+
+    python -m benchmarks.bench_traces
+
+Mesure aussi le coût, hors trace, d'un appel à une fonction CRUD tracée.
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from typing import Optional
+
+from fastapi.testclient import TestClient
+
+from app.core import traces
+from app.core.config import settings
+from app.db.session import engine
+from app.main import app
+
+CHEMINS = ["/commandes/1", "/commandes/2", "/produits/"]
+
+
+def mesurer(client: TestClient, requetes: int) -> float:
+    """Renvoie le temps moyen (en secondes) d'une requête."""
+    debut = time.perf_counter()
+    for i in range(requetes):
+        client.get(CHEMINS[i % len(CHEMINS)])
+    return (time.perf_counter() - debut) / requetes
+
+
+def appel_hors_trace() -> tuple[float, float]:
+    """Renvoie le coût (en secondes) d'un appel direct et d'un appel tracé."""
+
+    def fonction() -> None:
+        pass
+
+    tracee = traces.tracer(fonction)
+    nombre = 1_000_000
+    return (
+        min(timeit.repeat(fonction, number=nombre, repeat=5)) / nombre,
+        min(timeit.repeat(tracee, number=nombre, repeat=5)) / nombre,
+    )
+
+
+def main() -> None:
+    """Lance les mesures pour chaque configuration."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requetes", type=int, default=300)
+    parser.add_argument("--tours", type=int, default=15)
+    args = parser.parse_args()
+
+    engine.echo = False
+    fichier = Path(tempfile.mkdtemp()) / "traces.jsonl"
+    export = traces.ExportEnArrierePlan(traces.ExporteurFichier(str(fichier)))
+    configurations: list[tuple[str, Optional[traces.Exporteur], float]] = [
+        ("désactivées", None, 0.0),
+        ("1 %", export, 0.01),
+        ("100 %", export, 1.0),
+    ]
+    durees: dict[str, list[float]] = {nom: [] for nom, _, _ in configurations}
+    with TestClient(app) as client:
+        mesurer(client, args.requetes)
+        for _ in range(args.tours):
+            for nom, exporteur, taux in configurations:
+                traces.exporteur = exporteur
+                settings.TRACES_ECHANTILLONNAGE = taux
+                durees[nom].append(mesurer(client, args.requetes))
+                export.vider()
+
+    reference = statistics.median(durees["désactivées"])
+    print(f"{'traces':>12} {'requête':>10} {'surcoût':>9}")
+    for nom, _, _ in configurations:
+        duree = statistics.median(durees[nom])
+        print(f"{nom:>12} {duree * 1e6:>8.0f}µs {(duree / reference - 1) * 100:>8.2f}%")
+    direct, tracee = appel_hors_trace()
+    print(f"appel CRUD hors trace : +{(tracee - direct) * 1e9:.0f}ns")
+    print(f"spans exportés : {sum(1 for _ in fichier.open())}")
+
+
+if __name__ == "__main__":
+    main()
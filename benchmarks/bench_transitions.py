@@ -0,0 +1,147 @@
+"""Benchmark : transitions de statut, une à une ou par lots.
+
+Crée des commandes de trois lignes, puis les fait passer par tous leurs statuts
+(en_attente -> en_preparation -> prete -> servie) :
+
+- ORM : chargement de la commande, `setattr`, commit puis rechargement
+  (chemin générique de mise à jour, sans contrôle de la transition) ;
+- `transition_commande` : un seul `UPDATE ... WHERE statut = :precedent
+  RETURNING` (chemin de POST /commandes/{id}/transition) ;
+- `transition_commandes` : un `UPDATE` par lot de commandes (12 par défaut,
+  une table ou une série de tickets), une notification par lot (chemin de
+  POST /commandes/transitions).
+
+Mesure le débit de transitions avec un ou plusieurs serveurs (threads) en
+parallèle. Les commandes créées sont supprimées à la fin. Le script s'exécute
+directement contre la base configurée dans `.env` :
+
+    python -m benchmarks.bench_transitions
+"""
+
+import argparse
+import threading
+import time
+from collections.abc import Callable
+
+from sqlalchemy import Engine, text
+from sqlmodel import Session, create_engine
+
+from app.core.config import settings
+from app.crud.commande import (
+    STATUT_PRECEDENT,
+    transition_commande,
+    transition_commandes,
+)
+from app.main import app  # noqa: F401  (configure les relations des modèles)
+from app.models.commandes_et_produits import Commande, StatusEnum
+
+Transition = Callable[[Session, list[int], StatusEnum], object]
+
+
+def par_orm(session: Session, ids: list[int], statut: StatusEnum) -> object:
+    """Transitions une à une par l'ORM (chargement, `setattr`, commit)."""
+    for commande_id in ids:
+        commande = session.get(Commande, commande_id)
+        assert commande is not None
+        commande.statut = statut
+        session.commit()
+        session.refresh(commande)
+    return None
+
+
+def par_transition(session: Session, ids: list[int], statut: StatusEnum) -> object:
+    """Transitions une à une par l'UPDATE conditionnel."""
+    return [transition_commande(session, commande_id, statut) for commande_id in ids]
+
+
+def creer_commandes(engine: Engine, nombre: int) -> list[int]:
+    """Crée `nombre` commandes en attente, de trois lignes chacune."""
+    with engine.begin() as connexion:
+        return list(
+            connexion.execute(
+                text(
+                    "WITH c AS (INSERT INTO commandes "
+                    "(client_id, date_commande, statut, montant_total) "
+                    "SELECT (SELECT min(id) FROM users), now(), 'en_attente', 37.5 "
+                    "FROM generate_series(1, :n) RETURNING id), "
+                    "d AS (INSERT INTO details_commandes "
+                    "(commande_id, produit_id, quantite, prix_unitaire) "
+                    "SELECT c.id, p.id, 1, 12.5 FROM c, "
+                    "(SELECT id FROM produits ORDER BY id LIMIT 3) AS p) "
+                    "SELECT id FROM c"
+                ),
+                {"n": nombre},
+            ).scalars()
+        )
+
+
+def mesurer(
+    engine: Engine,
+    transition: Transition,
+    commande_ids: list[int],
+    serveurs: int,
+    lot: int,
+) -> float:
+    """Fait passer les commandes par tous les statuts ; renvoie le débit (/s)."""
+
+    def serveur(ids: list[int]) -> None:
+        with Session(engine) as session:
+            for debut in range(0, len(ids), lot):
+                for statut in STATUT_PRECEDENT:
+                    transition(session, ids[debut : debut + lot], statut)
+
+    threads = [
+        threading.Thread(target=serveur, args=(commande_ids[i::serveurs],))
+        for i in range(serveurs)
+    ]
+    debut = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(commande_ids) * len(STATUT_PRECEDENT) / (time.perf_counter() - debut)
+
+
+def main() -> None:
+    """Lance les mesures et supprime les commandes créées."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commandes", type=int, default=1000)
+    parser.add_argument("--serveurs", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--lot", type=int, default=12)
+    args = parser.parse_args()
+
+    engine = create_engine(settings.DATABASE_URL, pool_size=max(args.serveurs) + 2)
+    crees: list[int] = []
+    print(
+        f"{'serveurs':>8} {'ORM':>16} {'transition':>12} "
+        f"{'par lots':>12} {'gain':>7}"
+    )
+    try:
+        for serveurs in args.serveurs:
+            debits = []
+            for transition, lot in (
+                (par_orm, 1),
+                (par_transition, 1),
+                (transition_commandes, args.lot),
+            ):
+                commande_ids = creer_commandes(engine, args.commandes)
+                crees += commande_ids
+                debits.append(mesurer(engine, transition, commande_ids, serveurs, lot))
+            # Gain des lots sur l'UPDATE conditionnel une à une
+            print(
+                f"{serveurs:>8} {debits[0]:>14.0f}/s {debits[1]:>10.0f}/s "
+                f"{debits[2]:>10.0f}/s {debits[2] / debits[1]:>6.1f}x"
+            )
+    finally:
+        with engine.begin() as connexion:
+            connexion.execute(
+                text("DELETE FROM details_commandes WHERE commande_id = ANY(:ids)"),
+                {"ids": crees},
+            )
+            connexion.execute(
+                text("DELETE FROM commandes WHERE id = ANY(:ids)"), {"ids": crees}
+            )
+
+
+if __name__ == "__main__":
+    main()
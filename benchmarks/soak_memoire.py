@@ -0,0 +1,203 @@
+"""Test d'endurance : croissance de la mémoire du worker sous charge continue.
+
+Enchaîne pendant `--minutes`, sans serveur (client ASGI en mémoire), les
+requêtes principales de l'API contre la base configurée dans `.env` : menu,
+disponibilités, catégories, annuaire, passage de commande et transitions,
+lecture des commandes. Après `--echauffement` secondes (caches, pools et
+imports remplis), la RSS du processus est relevée toutes les `--releve`
+secondes ; le test échoue (code de sortie 1) si elle a crû de plus de
+`--croissance-max` Mo :
+
+    python -m benchmarks.soak_memoire --minutes 30
+
+Avec `--tracemalloc`, les allocations sont suivies depuis la fin de
+l'échauffement et celles qui ont le plus crû sont affichées, par module et
+par site : les requêtes sont alors plus lentes et le suivi lui-même fait
+croître la RSS (vérifier le seuil sans cette option). Chaque réponse doit avoir
+le statut attendu, sans quoi le test s'arrête. Les commandes créées sont
+supprimées et les stocks restaurés à la fin.
+"""
+
+import argparse
+import sys
+import time
+from collections import deque
+from collections.abc import Callable
+
+from fastapi.testclient import TestClient
+from httpx import Response
+from sqlalchemy import text
+
+from app.core.memoire import rss_processus, suivi_memoire
+from app.db.session import engine
+from app.main import app
+from app.models.commandes_et_produits import StatusEnum
+
+PRODUITS = [1, 2]
+MO = 1024 * 1024
+
+
+def verifier(reponse: Response, attendu: int = 200) -> Response:
+    """Renvoie la réponse si elle a le statut attendu ; arrête le test sinon."""
+    if reponse.status_code != attendu:
+        sys.exit(
+            f"ÉCHEC : {reponse.request.method} {reponse.request.url.path} a "
+            f"répondu {reponse.status_code} au lieu de {attendu} : {reponse.text[:200]}"
+        )
+    return reponse
+
+
+def scenario(
+    client: TestClient, client_id: int, premiere: list[int]
+) -> Callable[[], None]:
+    """
+    Renvoie un cycle de requêtes représentatif du service.
+
+    Seul l'ID de la première commande créée est gardé (dans `premiere`) : une
+    liste de toutes les commandes croîtrait avec la durée du test et
+    fausserait la mesure de la RSS.
+    """
+    commande = {
+        "client_id": client_id,
+        "details": [{"produit_id": p, "quantite": 1} for p in PRODUITS],
+    }
+    recentes: deque[int] = deque(maxlen=20)
+
+    def cycle() -> None:
+        verifier(client.get("/produits/"))
+        verifier(client.get(f"/produits/{PRODUITS[0]}"))
+        verifier(client.get("/produits/availability"))
+        verifier(client.get("/produits/low-stock"))
+        verifier(client.get("/categories/"))
+        verifier(client.get("/users/", params={"limit": 50}))
+        commande_id = verifier(client.post("/commandes/", json=commande)).json()["id"]
+        if not premiere:
+            premiere.append(commande_id)
+        recentes.append(commande_id)
+        for statut in (StatusEnum.en_preparation, StatusEnum.prete):
+            verifier(
+                client.post(
+                    f"/commandes/{commande_id}/transition",
+                    json={"statut": statut.value},
+                )
+            )
+        verifier(client.get(f"/commandes/{commande_id}"))
+        verifier(
+            client.get("/commandes/", params={"ids": ",".join(map(str, recentes))})
+        )
+
+    return cycle
+
+
+def afficher_croissance(avant_id: int, apres_id: int) -> None:
+    """Affiche les modules et les sites dont les allocations ont le plus crû."""
+    comparaison = suivi_memoire.comparer(avant_id, apres_id, 10)
+    if comparaison is None:
+        return
+    print(f"\n{'module':<28} {'croissance':>12} {'blocs':>9}")
+    for groupe in comparaison.par_module[:10]:
+        print(
+            f"{groupe.module:<28} {groupe.taille_diff / 1024:>10.0f}Ko "
+            f"{groupe.blocs_diff:>9}"
+        )
+    print(f"\n{'site':<50} {'appelant':<30} {'croissance':>12}")
+    for site in comparaison.sites:
+        print(
+            f"{site.site:<50} {site.appelant or '-':<30} "
+            f"{site.taille_diff / 1024:>10.0f}Ko"
+        )
+
+
+def main() -> None:
+    """Lance la charge, relève la RSS et vérifie sa croissance."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=10.0)
+    parser.add_argument("--echauffement", type=float, default=30.0)
+    parser.add_argument("--releve", type=float, default=30.0)
+    parser.add_argument("--croissance-max", type=float, default=20.0)
+    parser.add_argument("--tracemalloc", action="store_true")
+    args = parser.parse_args()
+
+    if rss_processus() is None:
+        sys.exit("RSS illisible : /proc/self/statm est requis (Linux)")
+    engine.echo = False
+    premiere: list[int] = []
+    with engine.begin() as connexion:
+        stocks = connexion.execute(
+            text("SELECT id, stock FROM produits WHERE id = ANY(:ids)"),
+            {"ids": PRODUITS},
+        ).all()
+        connexion.execute(
+            text("UPDATE produits SET stock = 1000000 WHERE id = ANY(:ids)"),
+            {"ids": PRODUITS},
+        )
+        client_id = connexion.execute(text("SELECT min(id) FROM users")).scalar_one()
+    try:
+        with TestClient(app) as client:
+            cycle = scenario(client, client_id, premiere)
+            fin_echauffement = time.monotonic() + args.echauffement
+            while time.monotonic() < fin_echauffement:
+                cycle()
+
+            instantane = None
+            if args.tracemalloc:
+                suivi_memoire.demarrer(cadres=25)
+                instantane = suivi_memoire.instantane()
+            debut = time.monotonic()
+            reference = rss = rss_processus() or 0
+            cycles = 0
+            print(f"{'minutes':>8} {'cycles':>8} {'RSS':>10} {'croissance':>11}")
+            while time.monotonic() - debut < args.minutes * 60:
+                prochain_releve = time.monotonic() + args.releve
+                while time.monotonic() < prochain_releve:
+                    cycle()
+                    cycles += 1
+                rss = rss_processus() or 0
+                print(
+                    f"{(time.monotonic() - debut) / 60:>8.1f} {cycles:>8} "
+                    f"{rss / MO:>8.1f}Mo {(rss - reference) / MO:>+9.1f}Mo"
+                )
+            if instantane is not None:
+                final = suivi_memoire.instantane()
+                if final is not None:
+                    afficher_croissance(instantane.id, final.id)
+                suivi_memoire.arreter()
+    finally:
+        with engine.begin() as connexion:
+            # Commandes du client créées depuis la première du test
+            creees = {
+                "premiere": premiere[0] if premiere else None,
+                "client": client_id,
+            }
+            connexion.execute(
+                text(
+                    "DELETE FROM details_commandes WHERE commande_id IN "
+                    "(SELECT id FROM commandes WHERE id >= :premiere "
+                    "AND client_id = :client)"
+                ),
+                creees,
+            )
+            connexion.execute(
+                text(
+                    "DELETE FROM commandes "
+                    "WHERE id >= :premiere AND client_id = :client"
+                ),
+                creees,
+            )
+            for produit_id, stock in stocks:
+                connexion.execute(
+                    text("UPDATE produits SET stock = :stock WHERE id = :id"),
+                    {"stock": stock, "id": produit_id},
+                )
+
+    croissance = (rss - reference) / MO
+    if croissance > args.croissance_max:
+        sys.exit(
+            f"ÉCHEC : la RSS a crû de {croissance:.1f} Mo "
+            f"(maximum {args.croissance_max:.1f} Mo)"
+        )
+    print(f"OK : croissance de {croissance:.1f} Mo (maximum {args.croissance_max} Mo)")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,12 +13,16 @@ Notes :
 pour que les tests passent.
 """
 
+import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session, select
 
+from app.crud.commande import CANAL_COMMANDES
+from app.db.session import engine
 from app.main import app
 from app.models.commandes_et_produits import Commande, StatusEnum
 
@@ -90,31 +94,201 @@ def test_list_commandes(session: Session) -> None:
     assert len(data) > 0
 
 
+def test_list_commandes_fields(session: Session) -> None:
+    """Liste les commandes limitées aux champs d'un écran de cuisine.
+
+    Assertions:
+        - Seuls `id`, `statut` et `details` sont renvoyés, dans l'ordre du schéma.
+        - Un champ inconnu renvoie 400.
+    """
+    response = client.get("/commandes/", params={"fields": "details,id,statut"})
+
+    assert response.status_code == 200
+    assert {tuple(c) for c in response.json()} == {("statut", "id", "details")}
+
+    response = client.get("/commandes/", params={"fields": "id,total"})
+    assert response.status_code == 400
+
+
+def test_list_commandes_ids(session: Session) -> None:
+    """Récupère plusieurs commandes par leurs IDs en une requête.
+
+    Assertions:
+        - Les commandes suivent l'ordre demandé, `null` pour un ID inexistant.
+        - Chaque commande est identique à celle de GET /commandes/{id}.
+    """
+    ids = [c["id"] for c in client.get("/commandes/").json()[:2]]
+
+    response = client.get("/commandes/", params={"ids": f"{ids[1]},-1,{ids[0]}"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data[1] is None
+    assert data[0] == client.get(f"/commandes/{ids[1]}").json()
+    assert data[2] == client.get(f"/commandes/{ids[0]}").json()
+
+
 def test_update_commande(session: Session) -> None:
-    """Met à jour partiellement une commande (changement de statut).
+    """Met à jour partiellement une commande (changement de date).
 
     Préconditions:
         - Au moins une commande existe en base.
 
-    Remarque:
-        - Si la validation exige une chaîne plutôt que l'Enum,
-        utilisez `StatusEnum.servie.value`.
-
     Assertions:
-        - Réponse HTTP 200.
-        - Le `statut` retourné correspond à la valeur demandée.
+        - Réponse HTTP 200 avec l'ETag lu dans `If-Match`.
+        - La `date_commande` retournée correspond à la valeur demandée.
+        - Une nouvelle version est annoncée dans l'ETag de la réponse.
     """
     commande = session.exec(select(Commande)).first()
     assert commande is not None
+    etag = client.get(f"/commandes/{commande.id}").headers["etag"]
 
-    payload = {"statut": StatusEnum.servie}
+    payload = {"date_commande": "2024-03-01T09:30:00"}
 
-    response = client.patch(f"/commandes/{commande.id}", json=payload)
+    response = client.patch(
+        f"/commandes/{commande.id}", json=payload, headers={"If-Match": etag}
+    )
 
     assert response.status_code == 200
     data = response.json()
-    # Si vous utilisez .value dans le payload, adaptez également cette assertion.
-    assert data["statut"] == StatusEnum.servie
+    assert data["date_commande"] == payload["date_commande"]
+    assert response.headers["etag"] != etag
+
+
+def test_update_commande_if_match(session: Session) -> None:
+    """Vérifie le contrôle de concurrence optimiste de PATCH /commandes/{id}.
+
+    Assertions:
+        - Sans `If-Match` : 428.
+        - Deux modifications parties du même ETag : la seconde reçoit 412.
+        - `If-Match: *` modifie la commande quelle que soit sa version.
+        - Le statut ne se modifie pas par PATCH (422), seulement par transition.
+    """
+    commande = session.exec(select(Commande)).first()
+    assert commande is not None
+    url = f"/commandes/{commande.id}"
+    etag = client.get(url).headers["etag"]
+    premiere_date = {"date_commande": "2024-01-01T12:00:00"}
+    seconde_date = {"date_commande": "2024-01-02T12:00:00"}
+
+    assert client.patch(url, json=premiere_date).status_code == 428
+    premiere = client.patch(url, json=premiere_date, headers={"If-Match": etag})
+    assert premiere.status_code == 200
+    seconde = client.patch(url, json=seconde_date, headers={"If-Match": etag})
+    assert seconde.status_code == 412
+    assert client.get(url).json()["date_commande"] == "2024-01-01T12:00:00"
+
+    resp = client.patch(url, json=seconde_date, headers={"If-Match": "*"})
+    assert resp.status_code == 200
+
+    statut = client.get(url).json()["statut"]
+    resp = client.patch(url, json={"statut": "servie"}, headers={"If-Match": "*"})
+    assert resp.status_code == 422
+    assert client.get(url).json()["statut"] == statut
+
+
+def test_transition_commande() -> None:
+    """Fait passer une commande par tous ses statuts via POST /{id}/transition.
+
+    Assertions:
+        - Chaque transition permise renvoie 200, le nouveau statut et un ETag.
+        - Un retour en arrière ou un saut de statut renvoie 409.
+        - Une commande inexistante renvoie 404.
+    """
+    payload = {"client_id": 1, "details": []}
+    commande_id = client.post("/commandes/", json=payload).json()["id"]
+    url = f"/commandes/{commande_id}/transition"
+
+    assert client.post(url, json={"statut": "prete"}).status_code == 409
+    for statut in ("en_preparation", "prete", "servie"):
+        response = client.post(url, json={"statut": statut})
+        assert response.status_code == 200
+        assert response.json() == {"id": commande_id, "statut": statut}
+        assert (
+            response.headers["etag"]
+            == client.get(f"/commandes/{commande_id}").headers["etag"]
+        )
+    assert client.post(url, json={"statut": "en_attente"}).status_code == 409
+
+    response = client.post("/commandes/999999/transition", json={"statut": "prete"})
+    assert response.status_code == 404
+
+
+def test_transition_commande_concurrente() -> None:
+    """Lance deux fois la même transition en parallèle.
+
+    Assertions:
+        - Une seule réussit (200), l'autre est refusée (409).
+    """
+    payload = {"client_id": 1, "details": []}
+    commande_id = client.post("/commandes/", json=payload).json()["id"]
+    url = f"/commandes/{commande_id}/transition"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        codes = list(
+            executor.map(
+                lambda _: client.post(
+                    url, json={"statut": "en_preparation"}
+                ).status_code,
+                range(2),
+            )
+        )
+
+    assert sorted(codes) == [200, 409]
+
+
+def test_transition_commandes() -> None:
+    """Fait passer un lot de commandes au statut suivant via POST /transitions.
+
+    Assertions:
+        - Les commandes au statut précédent sont passées au nouveau statut.
+        - Les autres sont refusées avec leur statut, null si elles n'existent
+          pas ; les doublons sont ignorés.
+        - Une seule notification est émise pour tout le lot.
+    """
+    payload = {"client_id": 1, "details": []}
+    ids = [client.post("/commandes/", json=payload).json()["id"] for _ in range(3)]
+    client.post(f"/commandes/{ids[2]}/transition", json={"statut": "en_preparation"})
+
+    brute = engine.raw_connection()
+    connexion = brute.driver_connection
+    assert connexion is not None
+    brute.detach()
+    try:
+        connexion.autocommit = True
+        connexion.cursor().execute(f"LISTEN {CANAL_COMMANDES}")
+        response = client.post(
+            "/commandes/transitions",
+            json={
+                "ids": [ids[1], 999999, ids[0], ids[2], ids[0]],
+                "statut": "en_preparation",
+            },
+        )
+        connexion.poll()
+        messages = [json.loads(n.payload) for n in connexion.notifies]
+    finally:
+        brute.close()
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "statut": "en_preparation",
+        "transitionnees": [ids[0], ids[1]],
+        "rejetees": [
+            {"id": ids[2], "statut": "en_preparation"},
+            {"id": 999999, "statut": None},
+        ],
+    }
+    assert messages == [{"statut": "en_preparation", "ids": [ids[0], ids[1]]}]
+    for commande_id in ids:
+        assert client.get(f"/commandes/{commande_id}").json()["statut"] == (
+            "en_preparation"
+        )
+
+    for invalides in ([], [0], [2**31]):
+        response = client.post(
+            "/commandes/transitions", json={"ids": invalides, "statut": "prete"}
+        )
+        assert response.status_code == 422
 
 
 def test_delete_commande(session: Session) -> None:
@@ -1,13 +1,41 @@
+import sqlite3
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
 from uuid import uuid4
 
+import pytest
 from fastapi.testclient import TestClient
+from sqlmodel import Session
 
+from app.core.config import settings
+from app.core.rate_limit import (
+    SqliteBackend,
+    backend_debit,
+    login_par_ip,
+    verifications_login,
+)
+from app.core.security import create_password_context
+from app.crud.user import get_user_by_id, update_password_hash
+from app.db.session import engine
 from app.main import app
 
 client = TestClient(app)
 
 
-def test_login_success() -> None:
+@pytest.fixture(autouse=True)
+def seaux_vides() -> Iterator[None]:
+    """Fixture pytest repartant de seaux de jetons pleins pour chaque test de login.
+
+    Tous les tests se connectent depuis la même adresse IP (celle du client de
+    test) : sans remise à zéro, la limite par IP dépendrait de l'ordre des tests.
+    """
+    backend_debit.vider()
+    yield
+    backend_debit.vider()
+
+
+def test_login_success(admin_headers: dict[str, str]) -> None:
     """Teste la connexion réussie d'un utilisateur avec des identifiants valides.
 
     - Crée un rôle temporaire "client".
@@ -15,7 +43,7 @@ def test_login_success() -> None:
     - Tente de se connecter avec le mot de passe correct.
     - Vérifie que le code HTTP est 200 et que l'email renvoyé est correct.
     """
-    role_resp = client.post("/roles/", json={"nom": "client"})
+    role_resp = client.post("/roles/", json={"nom": "client"}, headers=admin_headers)
     role_id = role_resp.json()["id"]
 
     unique_email = f"alice_{uuid4().hex}@example.com"
@@ -40,9 +68,11 @@ def test_login_success() -> None:
     data = resp.json()
     assert data["message"] == "Login OK"
     assert data["user"]["email"] == unique_email
+    assert data["token_type"] == "bearer"
+    assert data["access_token"] and data["refresh_token"]
 
 
-def test_login_invalid_password() -> None:
+def test_login_invalid_password(admin_headers: dict[str, str]) -> None:
     """Teste la connexion avec un mot de passe incorrect.
 
     - Crée un rôle temporaire "client".
@@ -50,7 +80,7 @@ def test_login_invalid_password() -> None:
     - Tente de se connecter avec un mot de passe erroné.
     - Vérifie que le code HTTP est 400 et le message d'erreur correct.
     """
-    role_resp = client.post("/roles/", json={"nom": "client"})
+    role_resp = client.post("/roles/", json={"nom": "client"}, headers=admin_headers)
     role_id = role_resp.json()["id"]
 
     unique_email = f"bob_{uuid4().hex}@example.com"
@@ -92,3 +122,161 @@ def test_login_nonexistent_email() -> None:
     assert resp.status_code == 400
     data = resp.json()
     assert data["detail"] == "identifiant errone"
+
+
+def creer_et_connecter(prefix: str) -> dict[str, Any]:
+    """Crée un utilisateur unique, le connecte et renvoie la réponse de /login."""
+    unique_email = f"{prefix}_{uuid4().hex}@example.com"
+    client.post(
+        "/users/",
+        json={
+            "nom": "Token",
+            "prenom": "Tester",
+            "email": unique_email,
+            "mot_de_passe": "securepass123",
+        },
+    )
+    resp = client.post(
+        "/login",
+        json={"email": unique_email, "mot_de_passe": "securepass123"},
+    )
+    assert resp.status_code == 200
+    data: dict[str, Any] = resp.json()
+    return data
+
+
+def test_access_token_authenticates_users_me() -> None:
+    """Teste l'accès à GET /users/me avec le jeton d'accès.
+
+    - Vérifie que le jeton d'accès identifie l'utilisateur connecté.
+    - Vérifie que l'absence de jeton, un jeton invalide ou un jeton de
+      rafraîchissement renvoient 401.
+    """
+    data = creer_et_connecter("carol")
+
+    resp = client.get(
+        "/users/me", headers={"Authorization": f"Bearer {data['access_token']}"}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["id"] == data["user"]["id"]
+    assert resp.json()["email"] == data["user"]["email"]
+
+    assert client.get("/users/me").status_code == 401
+    resp = client.get("/users/me", headers={"Authorization": "Bearer pas-un-jeton"})
+    assert resp.status_code == 401
+    resp = client.get(
+        "/users/me", headers={"Authorization": f"Bearer {data['refresh_token']}"}
+    )
+    assert resp.status_code == 401
+
+
+def test_refresh_token() -> None:
+    """Teste l'échange d'un jeton de rafraîchissement via POST /login/refresh.
+
+    - Vérifie que le jeton de rafraîchissement donne une nouvelle paire valide.
+    - Vérifie qu'un jeton d'accès est refusé (401).
+    - Vérifie qu'un utilisateur supprimé ne peut plus rafraîchir ses jetons.
+    """
+    data = creer_et_connecter("dave")
+
+    resp = client.post("/login/refresh", json={"refresh_token": data["refresh_token"]})
+    assert resp.status_code == 200
+    jetons = resp.json()
+    me = client.get(
+        "/users/me", headers={"Authorization": f"Bearer {jetons['access_token']}"}
+    )
+    assert me.json()["id"] == data["user"]["id"]
+
+    resp = client.post("/login/refresh", json={"refresh_token": data["access_token"]})
+    assert resp.status_code == 401
+
+    proprietaire = {"Authorization": f"Bearer {data['access_token']}"}
+    assert (
+        client.delete(f"/users/{data['user']['id']}", headers=proprietaire).status_code
+        == 204
+    )
+    resp = client.post("/login/refresh", json={"refresh_token": data["refresh_token"]})
+    assert resp.status_code == 401
+
+
+def test_login_rehashes_outdated_hash() -> None:
+    """Teste le rehash transparent d'un hash obsolète à la connexion.
+
+    - Remplace le hash d'un utilisateur par un hash bcrypt de coût 4.
+    - Vérifie que la connexion réussit et que le hash stocké est désormais
+      au coût configuré.
+    """
+    data = creer_et_connecter("erin")
+    user_id = data["user"]["id"]
+
+    with Session(engine) as session:
+        user = get_user_by_id(session, user_id)
+        assert user is not None
+        ancien = create_password_context(["bcrypt"], 4).hash("securepass123")
+        assert update_password_hash(session, user_id, user.mot_de_passe, ancien)
+
+    resp = client.post(
+        "/login",
+        json={"email": data["user"]["email"], "mot_de_passe": "securepass123"},
+    )
+    assert resp.status_code == 200
+
+    with Session(engine) as session:
+        user = get_user_by_id(session, user_id)
+        assert user is not None
+        assert user.mot_de_passe.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+
+
+def test_login_rate_limited_by_email() -> None:
+    """Teste la limitation des tentatives par email.
+
+    - Épuise les tentatives autorisées en rafale pour un email.
+    - Vérifie que la tentative suivante est refusée en 429 avec `Retry-After`,
+      y compris avec une casse différente.
+    """
+    unique_email = f"frank_{uuid4().hex}@example.com"
+    identifiants = {"email": unique_email, "mot_de_passe": "whatever123"}
+    for _ in range(settings.LOGIN_EMAIL_RAFALE):
+        assert client.post("/login", json=identifiants).status_code == 400
+
+    resp = client.post("/login", json={**identifiants, "email": unique_email.upper()})
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+
+def test_login_sheds_load_when_saturated(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Teste le délestage quand toutes les places de vérification sont occupées.
+
+    - Vérifie qu'une tentative est rejetée en 503 avec `Retry-After`.
+    """
+    monkeypatch.setattr(verifications_login, "maximum", 0)
+
+    resp = client.post(
+        "/login",
+        json={"email": f"gina_{uuid4().hex}@example.com", "mot_de_passe": "x" * 10},
+    )
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
+
+
+def test_login_seaux_verrouilles(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Teste le rejet en 503 quand le fichier des seaux partagés reste verrouillé.
+
+    - Un autre worker garde le verrou d'écriture au-delà du délai d'attente.
+    - Vérifie une réponse 503 avec `Retry-After` plutôt qu'une erreur 500.
+    """
+    chemin = str(tmp_path / "seaux.sqlite3")
+    monkeypatch.setattr(login_par_ip, "backend", SqliteBackend(chemin))
+    autre_worker = sqlite3.connect(chemin, isolation_level=None)
+    autre_worker.execute("BEGIN IMMEDIATE")
+    try:
+        resp = client.post(
+            "/login",
+            json={"email": f"hugo_{uuid4().hex}@example.com", "mot_de_passe": "x" * 10},
+        )
+    finally:
+        autre_worker.execute("ROLLBACK")
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
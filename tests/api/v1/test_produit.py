@@ -0,0 +1,155 @@
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_update_stock_endpoint() -> None:
+    """Teste l'ajustement de stock en masse via PATCH /produits/stock.
+
+    - Ajoute une unité au produit 3 puis la retire.
+    - Vérifie les niveaux renvoyés, le refus d'un produit en double (400) et
+      d'un lot vide ou de plus de `MULTI_GET_IDS_MAX` ajustements (422).
+    """
+    stock_initial = client.get("/produits/3").json()["stock"]
+
+    resp = client.patch("/produits/stock", json=[{"produit_id": 3, "valeur": 1}])
+    assert resp.status_code == 200
+    assert resp.json() == [{"id": 3, "stock": stock_initial + 1}]
+
+    resp = client.patch("/produits/stock", json=[{"produit_id": 3, "valeur": -1}])
+    assert resp.json() == [{"id": 3, "stock": stock_initial}]
+
+    resp = client.patch(
+        "/produits/stock",
+        json=[{"produit_id": 3, "valeur": 1}, {"produit_id": 3, "valeur": 2}],
+    )
+    assert resp.status_code == 400
+
+    assert client.patch("/produits/stock", json=[]).status_code == 422
+    trop = [
+        {"produit_id": i, "valeur": 0} for i in range(1, settings.MULTI_GET_IDS_MAX + 2)
+    ]
+    assert client.patch("/produits/stock", json=trop).status_code == 422
+
+
+def test_read_disponibilites_endpoint() -> None:
+    """Teste GET /produits/availability et sa revalidation par ETag.
+
+    - Vérifie la présence des en-têtes ETag et Cache-Control.
+    - Vérifie qu'un If-None-Match avec le même ETag renvoie 304.
+    """
+    resp = client.get("/produits/availability")
+    assert resp.status_code == 200
+    assert set(resp.json()) == {"seuil", "rupture", "stock_bas"}
+    etag = resp.headers["etag"]
+    assert "max-age" in resp.headers["cache-control"]
+
+    resp = client.get("/produits/availability", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+
+def test_read_stock_bas_endpoint() -> None:
+    """Teste GET /produits/low-stock avec un seuil explicite."""
+    resp = client.get("/produits/low-stock", params={"threshold": 10})
+    assert resp.status_code == 200
+    assert all(p["stock"] <= 10 for p in resp.json())
+
+    assert client.get("/produits/low-stock?threshold=-1").status_code == 422
+
+
+def test_read_produits_fields() -> None:
+    """Teste le paramètre `fields` de GET /produits/ et GET /produits/{id}.
+
+    - Vérifie que seuls les champs demandés sont renvoyés.
+    - Vérifie le refus d'un champ absent du schéma (400).
+    """
+    resp = client.get("/produits/", params={"fields": "id,nom,prix"})
+    assert resp.status_code == 200
+    assert {tuple(p) for p in resp.json()} == {("id", "nom", "prix")}
+
+    resp = client.get("/produits/1", params={"fields": "prix, id"})
+    assert resp.status_code == 200
+    assert list(resp.json()) == ["id", "prix"]
+
+    resp = client.get("/produits/", params={"fields": "id,mot_de_passe"})
+    assert resp.status_code == 400
+    assert "mot_de_passe" in resp.json()["detail"]
+    assert client.get("/produits/", params={"fields": ""}).status_code == 400
+
+
+def test_read_produits_ids() -> None:
+    """Teste la récupération groupée GET /produits/?ids=.
+
+    - Vérifie l'ordre de la requête et `null` pour un ID inexistant.
+    - Vérifie la combinaison avec `fields`.
+    """
+    resp = client.get("/produits/", params={"ids": "2,-5,1"})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data[1] is None
+    assert [data[0]["id"], data[2]["id"]] == [2, 1]
+    assert data[0] == client.get("/produits/2").json()
+
+    resp = client.get("/produits/", params={"ids": "1", "fields": "id,nom"})
+    assert list(resp.json()[0]) == ["id", "nom"]
+
+
+def test_update_produit_if_match() -> None:
+    """Teste le contrôle de concurrence optimiste de PUT /produits/{id}.
+
+    - Vérifie l'ETag de GET /produits/{id} et le 428 sans `If-Match`.
+    - Vérifie que la seconde de deux modifications parties du même ETag
+      reçoit 412, et qu'un ajustement de stock change aussi la version.
+    """
+    resp = client.get("/produits/3")
+    etag, prix = resp.headers["etag"], resp.json()["prix"]
+
+    assert client.put("/produits/3", json={"prix": prix}).status_code == 428
+    resp = client.put("/produits/3", json={"prix": prix}, headers={"If-Match": etag})
+    assert resp.status_code == 200
+    nouvel_etag = resp.headers["etag"]
+    assert nouvel_etag != etag
+    resp = client.put("/produits/3", json={"prix": prix}, headers={"If-Match": etag})
+    assert resp.status_code == 412
+
+    client.patch("/produits/stock", json=[{"produit_id": 3, "valeur": 0}])
+    resp = client.put(
+        "/produits/3", json={"prix": prix}, headers={"If-Match": nouvel_etag}
+    )
+    assert resp.status_code == 412
+    assert client.get("/produits/3").headers["etag"] != nouvel_etag
+
+
+def test_import_produits_endpoint(admin_headers: dict[str, str]) -> None:
+    """Teste l'import en masse via POST /produits/import.
+
+    - Vérifie le rapport d'un import CSV puis la mise à jour par le même nom.
+    - Vérifie le refus d'un fichier non UTF-8 (400) et sans jeton admin (401).
+    """
+    nom = f"Produit {uuid4().hex}"
+    url = "/produits/import"
+    headers = {**admin_headers, "Content-Type": "text/csv"}
+    contenu = f"nom,prix,stock\n{nom},2.5,4\n,1,1\n"
+    resp = client.post(url, content=contenu, headers=headers)
+    assert resp.status_code == 200
+    rapport = resp.json()
+    assert (rapport["inseres"], rapport["mis_a_jour"]) == (1, 0)
+    assert [e["ligne"] for e in rapport["erreurs"]] == [2]
+
+    contenu = f'{{"nom": "{nom}", "prix": 3.0, "stock": 7}}'
+    resp = client.post(
+        url, params={"format": "jsonl"}, content=contenu, headers=headers
+    )
+    assert (resp.json()["inseres"], resp.json()["mis_a_jour"]) == (0, 1)
+    produits = client.get("/produits/").json()
+    assert [(p["prix"], p["stock"]) for p in produits if p["nom"] == nom] == [(3.0, 7)]
+
+    resp = client.post(url, content="nom\n\xe9".encode("latin-1"), headers=headers)
+    assert resp.status_code == 400
+    resp = client.post(url, content=contenu, headers={"Content-Type": "text/csv"})
+    assert resp.status_code == 401
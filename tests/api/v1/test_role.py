@@ -1,31 +1,35 @@
 from fastapi.testclient import TestClient
 
+from app.core.security import create_token_pair
 from app.main import app
+from app.schemas.user import UserToken
 
 client = TestClient(app)
 
 
-def test_create_role_endpoint() -> None:
+def test_create_role_endpoint(admin_headers: dict[str, str]) -> None:
     """Teste la création d'un rôle via l'endpoint POST /roles/.
 
+    - Vérifie que la création est réservée aux administrateurs (401).
     - Vérifie que le code HTTP est 200 ou 201.
     - Vérifie que le rôle créé possède un nom et un ID.
     """
-    resp = client.post("/roles/", json={"nom": "client"})
+    assert client.post("/roles/", json={"nom": "client"}).status_code == 401
+    resp = client.post("/roles/", json={"nom": "client"}, headers=admin_headers)
     assert resp.status_code in (200, 201)
     data = resp.json()
     assert data["nom"] == "client"
     assert "id" in data
 
 
-def test_read_roles_endpoint() -> None:
+def test_read_roles_endpoint(admin_headers: dict[str, str]) -> None:
     """Teste la récupération de tous les rôles via l'endpoint GET /roles/.
 
     - Crée plusieurs rôles.
     - Vérifie que la réponse est une liste et contient tous les rôles.
     """
-    client.post("/roles/", json={"nom": "admin"})
-    client.post("/roles/", json={"nom": "serveur"})
+    client.post("/roles/", json={"nom": "admin"}, headers=admin_headers)
+    client.post("/roles/", json={"nom": "serveur"}, headers=admin_headers)
 
     resp = client.get("/roles/")
     assert resp.status_code == 200
@@ -35,13 +39,13 @@ def test_read_roles_endpoint() -> None:
     assert {"admin", "serveur", "client"} <= noms
 
 
-def test_read_role_endpoint() -> None:
+def test_read_role_endpoint(admin_headers: dict[str, str]) -> None:
     """Teste la récupération d'un rôle spécifique via GET /roles/{id}.
 
     - Vérifie le succès pour un rôle existant.
     - Vérifie que l'accès à un rôle inexistant renvoie 404.
     """
-    created = client.post("/roles/", json={"nom": "serveur"})
+    created = client.post("/roles/", json={"nom": "serveur"}, headers=admin_headers)
     assert created.status_code in (200, 201)
     role_id = created.json()["id"]
 
@@ -55,38 +59,40 @@ def test_read_role_endpoint() -> None:
     assert resp_404.status_code == 404
 
 
-def test_update_role_endpoint() -> None:
+def test_update_role_endpoint(admin_headers: dict[str, str]) -> None:
     """Teste la mise à jour d'un rôle via PUT /roles/{id}.
 
     - Vérifie que la mise à jour d'un rôle existant fonctionne.
     - Vérifie que la mise à jour d'un rôle inexistant renvoie 404.
     """
-    created = client.post("/roles/", json={"nom": "client"})
+    created = client.post("/roles/", json={"nom": "client"}, headers=admin_headers)
     assert created.status_code in (200, 201)
     role_id = created.json()["id"]
 
-    resp = client.put(f"/roles/{role_id}", json={"nom": "admin"})
+    resp = client.put(f"/roles/{role_id}", json={"nom": "admin"}, headers=admin_headers)
     assert resp.status_code == 200
     data = resp.json()
     assert data["id"] == role_id
     assert data["nom"] == "admin"
 
-    resp_404 = client.put("/roles/999999", json={"nom": "serveur"})
+    resp_404 = client.put(
+        "/roles/999999", json={"nom": "serveur"}, headers=admin_headers
+    )
     assert resp_404.status_code == 404
 
 
-def test_delete_role_endpoint() -> None:
+def test_delete_role_endpoint(admin_headers: dict[str, str]) -> None:
     """Teste la suppression d'un rôle via DELETE /roles/{id}.
 
     - Vérifie que la suppression renvoie 200 ou 204 selon l'API.
     - Si 200, vérifie le message et la liste des utilisateurs affectés.
     - Vérifie que le rôle n'existe plus après suppression.
     """
-    created = client.post("/roles/", json={"nom": "serveur"})
+    created = client.post("/roles/", json={"nom": "serveur"}, headers=admin_headers)
     assert created.status_code in (200, 201)
     role_id = created.json()["id"]
 
-    resp = client.delete(f"/roles/{role_id}")
+    resp = client.delete(f"/roles/{role_id}", headers=admin_headers)
     assert resp.status_code in (200, 204)
     if resp.status_code == 200:
         payload = resp.json()
@@ -96,3 +102,31 @@ def test_delete_role_endpoint() -> None:
 
     get_again = client.get(f"/roles/{role_id}")
     assert get_again.status_code == 404
+
+
+def test_role_endpoints_require_admin(admin_headers: dict[str, str]) -> None:
+    """Teste la restriction des modifications de rôles aux administrateurs.
+
+    - Vérifie le refus sans jeton (401) et avec un rôle non autorisé (403).
+    - Vérifie qu'un rôle renommé "admin" donne aussitôt accès, et qu'un rôle
+      supprimé le retire : le cache des rôles suit les modifications.
+    """
+    created = client.post("/roles/", json={"nom": "serveur"}, headers=admin_headers)
+    role_id = created.json()["id"]
+    jeton = create_token_pair(
+        UserToken(id=0, email="serveur@example.com", role_id=role_id)
+    ).access_token
+    headers = {"Authorization": f"Bearer {jeton}"}
+
+    assert client.put(f"/roles/{role_id}", json={"nom": "admin"}).status_code == 401
+    resp = client.put(f"/roles/{role_id}", json={"nom": "admin"}, headers=headers)
+    assert resp.status_code == 403
+
+    resp = client.put(f"/roles/{role_id}", json={"nom": "admin"}, headers=admin_headers)
+    assert resp.status_code == 200
+    resp = client.put(f"/roles/{role_id}", json={"nom": "admin"}, headers=headers)
+    assert resp.status_code == 200
+
+    assert client.delete(f"/roles/{role_id}", headers=admin_headers).status_code == 200
+    resp = client.put(f"/roles/{role_id}", json={"nom": "admin"}, headers=headers)
+    assert resp.status_code == 403
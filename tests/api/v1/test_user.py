@@ -2,6 +2,7 @@ from uuid import uuid4
 
 from fastapi.testclient import TestClient
 
+from app.core.config import settings
 from app.main import app
 
 client = TestClient(app)
@@ -12,13 +13,13 @@ def unique_email(prefix: str = "user") -> str:
     return f"{prefix}_{uuid4().hex}@example.com"
 
 
-def test_create_user_endpoint() -> None:
+def test_create_user_endpoint(admin_headers: dict[str, str]) -> None:
     """Teste la création d'un utilisateur via POST /users/.
 
     - Vérifie que l'utilisateur est créé avec succès (201).
     - Vérifie que l'ID, l'email, le nom, le prénom et le role_id sont corrects.
     """
-    r = client.post("/roles/", json={"nom": "client"})
+    r = client.post("/roles/", json={"nom": "client"}, headers=admin_headers)
     assert r.status_code in (200, 201)
     role_id = r.json()["id"]
 
@@ -45,13 +46,14 @@ def test_create_user_endpoint() -> None:
     assert data["role_id"] == role_id
 
 
-def test_read_users_endpoint() -> None:
+def test_read_users_endpoint(admin_headers: dict[str, str]) -> None:
     """Teste la récupération de tous les utilisateurs via GET /users/.
 
-    - Crée deux utilisateurs distincts.
-    - Vérifie que la réponse contient les emails de ces utilisateurs.
+    - Crée deux utilisateurs distincts avec un rôle créé pour le test.
+    - Vérifie que la page filtrée sur ce rôle contient les emails de ces
+      utilisateurs.
     """
-    r = client.post("/roles/", json={"nom": "client"})
+    r = client.post("/roles/", json={"nom": "client"}, headers=admin_headers)
     assert r.status_code in (200, 201)
     role_id = r.json()["id"]
 
@@ -77,7 +79,7 @@ def test_read_users_endpoint() -> None:
     assert client.post("/users/", json=u1).status_code == 201
     assert client.post("/users/", json=u2).status_code == 201
 
-    resp = client.get("/users/")
+    resp = client.get("/users/", params={"role_id": role_id})
     assert resp.status_code == 200
     data = resp.json()
     emails = {u["email"] for u in data}
@@ -85,13 +87,13 @@ def test_read_users_endpoint() -> None:
     assert u2["email"] in emails
 
 
-def test_read_user_endpoint() -> None:
+def test_read_user_endpoint(admin_headers: dict[str, str]) -> None:
     """Teste la récupération d'un utilisateur via GET /users/{id}.
 
     - Vérifie que l'utilisateur créé est correctement récupéré.
     - Vérifie que l'accès à un utilisateur inexistant renvoie 404.
     """
-    r = client.post("/roles/", json={"nom": "client"})
+    r = client.post("/roles/", json={"nom": "client"}, headers=admin_headers)
     assert r.status_code in (200, 201)
     role_id = r.json()["id"]
 
@@ -123,13 +125,13 @@ def test_read_user_endpoint() -> None:
     assert resp_404.status_code == 404
 
 
-def test_update_user_endpoint() -> None:
+def test_update_user_endpoint(admin_headers: dict[str, str]) -> None:
     """Teste la mise à jour d'un utilisateur via PUT /users/{id}.
 
     - Vérifie que l'email et l'adresse peuvent être mises à jour.
     - Vérifie que la mise à jour d'un utilisateur inexistant renvoie 404.
     """
-    r = client.post("/roles/", json={"nom": "client"})
+    r = client.post("/roles/", json={"nom": "client"}, headers=admin_headers)
     assert r.status_code in (200, 201)
     role_id = r.json()["id"]
 
@@ -158,6 +160,7 @@ def test_update_user_endpoint() -> None:
             "email": new_email,
             "adresse": "Updated Address",
         },
+        headers=admin_headers,
     )
     assert resp.status_code == 200
     data = resp.json()
@@ -165,17 +168,19 @@ def test_update_user_endpoint() -> None:
     assert data["email"] == new_email
     assert data["adresse"] == "Updated Address"
 
-    resp_404 = client.put("/users/999999", json={"email": unique_email("nouveau")})
+    resp_404 = client.put(
+        "/users/999999", json={"email": unique_email("nouveau")}, headers=admin_headers
+    )
     assert resp_404.status_code == 404
 
 
-def test_delete_user_endpoint() -> None:
+def test_delete_user_endpoint(admin_headers: dict[str, str]) -> None:
     """Teste la suppression d'un utilisateur via DELETE /users/{id}.
 
     - Vérifie que la suppression renvoie 204.
     - Vérifie que l'utilisateur n'existe plus après suppression.
     """
-    r = client.post("/roles/", json={"nom": "client"})
+    r = client.post("/roles/", json={"nom": "client"}, headers=admin_headers)
     assert r.status_code in (200, 201)
     role_id = r.json()["id"]
 
@@ -196,8 +201,262 @@ def test_delete_user_endpoint() -> None:
     assert created.status_code == 201
     user_id = created.json()["id"]
 
-    resp = client.delete(f"/users/{user_id}")
+    resp = client.delete(f"/users/{user_id}", headers=admin_headers)
     assert resp.status_code == 204
 
     get_again = client.get(f"/users/{user_id}")
     assert get_again.status_code == 404
+
+
+def test_email_case_insensitive(admin_headers: dict[str, str]) -> None:
+    """Teste que l'email est normalisé et unique sans tenir compte de la casse.
+
+    - Vérifie que l'email est enregistré en minuscules.
+    - Vérifie qu'une inscription avec le même email dans une autre casse est
+      refusée (409).
+    - Vérifie que la connexion fonctionne quelle que soit la casse saisie.
+    - Vérifie qu'une modification vers l'email d'un autre compte est refusée (409).
+    """
+    email = unique_email("CaSsE")
+    payload = {
+        "nom": "Casse",
+        "prenom": "Tester",
+        "email": email,
+        "mot_de_passe": "securepassword123",
+    }
+    resp = client.post("/users/", json=payload)
+    assert resp.status_code == 201
+    assert resp.json()["email"] == email.lower()
+
+    resp = client.post("/users/", json={**payload, "email": email.upper()})
+    assert resp.status_code == 409
+
+    resp = client.post(
+        "/login", json={"email": email.upper(), "mot_de_passe": "securepassword123"}
+    )
+    assert resp.status_code == 200
+
+    autre = client.post("/users/", json={**payload, "email": unique_email("autre")})
+    resp = client.put(
+        f"/users/{autre.json()['id']}",
+        json={"email": email.upper()},
+        headers=admin_headers,
+    )
+    assert resp.status_code == 409
+
+
+def test_read_users_pagination_and_search() -> None:
+    """Teste la pagination par curseur et la recherche de GET /users/.
+
+    - Crée trois utilisateurs dont le nom commence par un préfixe unique.
+    - Vérifie la recherche par préfixe de nom (insensible à la casse), de
+      téléphone et d'email, et qu'un `%` est cherché littéralement.
+    - Vérifie la page de deux utilisateurs avec `X-Next-Cursor`, puis la page
+      suivante sans curseur.
+    - Vérifie que le hash du mot de passe n'est pas renvoyé.
+    """
+    prefixe = f"Annuaire{uuid4().hex[:8]}"
+    telephone = f"09{uuid4().int % 10**8:08d}"
+    ids = []
+    for i in range(3):
+        resp = client.post(
+            "/users/",
+            json={
+                "nom": f"{prefixe}{i}",
+                "prenom": "Page",
+                "email": unique_email(prefixe),
+                "telephone": f"{telephone}{i}",
+                "mot_de_passe": "securepassword123",
+            },
+        )
+        ids.append(resp.json()["id"])
+
+    resp = client.get("/users/", params={"q": prefixe.lower()})
+    assert [u["id"] for u in resp.json()] == ids
+    assert "X-Next-Cursor" not in resp.headers
+    assert "mot_de_passe" not in resp.json()[0]
+    resp = client.get("/users/", params={"q": telephone})
+    assert [u["id"] for u in resp.json()] == ids
+    resp = client.get("/users/", params={"q": f"{prefixe.lower()}_"})
+    assert [u["id"] for u in resp.json()] == ids
+    assert client.get("/users/", params={"q": f"{prefixe}%"}).json() == []
+
+    resp = client.get("/users/", params={"q": prefixe, "limit": 2})
+    assert [u["id"] for u in resp.json()] == ids[:2]
+    assert resp.headers["X-Next-Cursor"] == str(ids[1])
+
+    resp = client.get(
+        "/users/",
+        params={"q": prefixe, "limit": 2, "apres_id": resp.headers["X-Next-Cursor"]},
+    )
+    assert [u["id"] for u in resp.json()] == ids[2:]
+    assert "X-Next-Cursor" not in resp.headers
+
+
+def test_read_users_ids() -> None:
+    """Teste la récupération groupée GET /users/?ids=.
+
+    - Vérifie l'ordre de la requête, les doublons et `null` pour un ID
+      inexistant.
+    - Vérifie le refus d'un ID non entier ou hors des bornes d'une colonne
+      `integer`, et d'une liste trop longue (400).
+    """
+    ids = []
+    for i in range(2):
+        resp = client.post(
+            "/users/",
+            json={
+                "nom": f"Groupe{i}",
+                "prenom": "Ids",
+                "email": unique_email("ids"),
+                "mot_de_passe": "securepassword123",
+            },
+        )
+        ids.append(resp.json()["id"])
+
+    demandes = f"{ids[1]},-1,{ids[0]},{ids[1]}"
+    resp = client.get("/users/", params={"ids": demandes})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [u and u["id"] for u in data] == [ids[1], None, ids[0], ids[1]]
+    assert "mot_de_passe" not in data[0]
+
+    # Plus grand ID d'une colonne `integer` : inexistant, mais pas d'erreur
+    assert client.get("/users/", params={"ids": str(2**31 - 1)}).json() == [None]
+    for invalides in ("1,abc", f"1,{2**31}", f"{-(2**31) - 1}"):
+        assert client.get("/users/", params={"ids": invalides}).status_code == 400
+    trop = ",".join(str(i) for i in range(settings.MULTI_GET_IDS_MAX + 1))
+    assert client.get("/users/", params={"ids": trop}).status_code == 400
+
+
+def test_import_users_endpoint(admin_headers: dict[str, str]) -> None:
+    """Teste la création d'utilisateurs en masse via POST /users/import.
+
+    - Importe un fichier CSV mêlant lignes valides et lignes en erreur (email
+      déjà utilisé dans une autre casse, doublon dans le fichier, mot de passe
+      trop court, rôle inconnu).
+    - Vérifie le rapport ligne par ligne et que seuls les comptes valides sont
+      créés, avec un mot de passe utilisable pour se connecter.
+    """
+    existant = unique_email("existant")
+    client.post(
+        "/users/",
+        json={
+            "nom": "Existant",
+            "prenom": "Tester",
+            "email": existant,
+            "mot_de_passe": "securepassword123",
+        },
+    )
+    nouveau_1 = unique_email("import1")
+    nouveau_2 = unique_email("import2")
+    contenu = "\n".join(
+        [
+            "nom,prenom,email,telephone,role_id,mot_de_passe",
+            f"Un,Import,{nouveau_1.upper()},0600000001,,motdepasse-import",
+            f"Deux,Import,{existant.upper()},,,motdepasse-import",
+            f"Trois,Import,{nouveau_1},,,motdepasse-import",
+            f"Quatre,Import,{unique_email('court')},,,court",
+            f"Cinq,Import,{unique_email('role')},,999999,motdepasse-import",
+            f"Six,Import,{nouveau_2},,,motdepasse-import",
+        ]
+    )
+
+    resp = client.post(
+        "/users/import",
+        content=contenu.encode(),
+        headers={"Content-Type": "text/csv"},
+    )
+    assert resp.status_code == 401
+
+    resp = client.post(
+        "/users/import",
+        content=contenu.encode(),
+        headers={"Content-Type": "text/csv", **admin_headers},
+    )
+    assert resp.status_code == 200
+    rapport = resp.json()
+    assert rapport["inseres"] == 2
+    assert [erreur["ligne"] for erreur in rapport["erreurs"]] == [2, 3, 4, 5]
+    assert "déjà utilisé" in rapport["erreurs"][0]["erreur"]
+    assert "ligne 1" in rapport["erreurs"][1]["erreur"]
+
+    resp = client.get("/users/", params={"q": nouveau_1})
+    assert [u["telephone"] for u in resp.json()] == ["0600000001"]
+    resp = client.post(
+        "/login", json={"email": nouveau_2, "mot_de_passe": "motdepasse-import"}
+    )
+    assert resp.status_code == 200
+
+
+def test_import_users_trop_de_lignes(admin_headers: dict[str, str]) -> None:
+    """Teste le refus (413) d'un import dépassant `IMPORT_USERS_LIGNES_MAX` lignes.
+
+    Le refus a lieu avant tout hashage : aucun compte n'est créé.
+    """
+    email = unique_email("trop")
+    lignes = ["nom,prenom,email,mot_de_passe"] + [
+        f"Trop,Import,{i}{email},motdepasse-import"
+        for i in range(settings.IMPORT_USERS_LIGNES_MAX + 1)
+    ]
+    resp = client.post(
+        "/users/import",
+        content="\n".join(lignes).encode(),
+        headers={"Content-Type": "text/csv", **admin_headers},
+    )
+    assert resp.status_code == 413
+    assert "import_users" in resp.json()["detail"]
+    assert client.get("/users/", params={"q": f"0{email}"}).json() == []
+
+
+def test_escalade_de_role_refusee(admin_headers: dict[str, str]) -> None:
+    """Teste qu'un non-administrateur ne peut pas s'attribuer de rôle privilégié.
+
+    - Vérifie le refus (403) d'une inscription anonyme avec le rôle admin,
+      et l'inscription avec le rôle client.
+    - Vérifie qu'un client ne peut ni se donner le rôle admin, ni modifier
+      ou supprimer le compte d'un autre (403), ni rien modifier sans jeton
+      (401), mais peut modifier son propre compte.
+    - Vérifie qu'un administrateur peut attribuer le rôle admin.
+    """
+    admin_id = client.post(
+        "/roles/", json={"nom": "admin"}, headers=admin_headers
+    ).json()["id"]
+    client_id = client.post(
+        "/roles/", json={"nom": "client"}, headers=admin_headers
+    ).json()["id"]
+    payload = {"nom": "Mallory", "prenom": "Escalade", "mot_de_passe": "motdepasse-123"}
+
+    resp = client.post(
+        "/users/", json={**payload, "email": unique_email("m"), "role_id": admin_id}
+    )
+    assert resp.status_code == 403
+    email = unique_email("mallory")
+    resp = client.post(
+        "/users/", json={**payload, "email": email, "role_id": client_id}
+    )
+    assert resp.status_code == 201
+    user_id = resp.json()["id"]
+    autre_id = client.post(
+        "/users/", json={**payload, "email": unique_email("autre")}
+    ).json()["id"]
+
+    jeton = client.post(
+        "/login", json={"email": email, "mot_de_passe": payload["mot_de_passe"]}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {jeton}"}
+    url = f"/users/{user_id}"
+    assert (
+        client.put(url, json={"role_id": admin_id}, headers=headers).status_code == 403
+    )
+    assert client.put(url, json={"adresse": "Ici"}).status_code == 401
+    assert client.put(url, json={"adresse": "Ici"}, headers=headers).status_code == 200
+    resp = client.put(f"/users/{autre_id}", json={"adresse": "Ici"}, headers=headers)
+    assert resp.status_code == 403
+    assert client.delete(f"/users/{autre_id}", headers=headers).status_code == 403
+    assert client.delete(f"/users/{autre_id}").status_code == 401
+    assert client.get(url).json()["role_id"] == client_id
+
+    resp = client.put(url, json={"role_id": admin_id}, headers=admin_headers)
+    assert resp.status_code == 200
+    assert resp.json()["role_id"] == admin_id
@@ -1,9 +1,14 @@
 from collections.abc import Generator
 
 import pytest
+from sqlalchemy import text
 from sqlmodel import Session, create_engine
 
 from app.core.config import settings
+from app.core.security import create_token_pair
+from app.crud.role import role_creation
+from app.schemas.role import RoleCreate, RoleEnum
+from app.schemas.user import UserToken
 
 test_url = settings.DATABASE_URL
 engine = create_engine(test_url, echo=True)
@@ -28,3 +33,31 @@ def session() -> Generator[Session, None, None]:
 
     transaction.rollback()
     connection.close()
+
+
+@pytest.fixture(scope="session")
+def admin_headers() -> dict[str, str]:
+    """
+    Fixture pytest fournissant l'en-tête d'authentification d'un administrateur.
+
+    Crée un rôle "admin" et signe directement un jeton d'accès portant ce
+    rôle : les endpoints réservés ne consultent que le jeton et le cache des
+    rôles, l'utilisateur n'a pas besoin d'exister.
+    """
+    with Session(engine) as session:
+        role = role_creation(session, RoleCreate(nom=RoleEnum.admin))
+    user = UserToken(id=0, email="admin@example.com", role_id=role.id)
+    return {"Authorization": f"Bearer {create_token_pair(user).access_token}"}
+
+
+@pytest.fixture(scope="function")
+def produits_en_stock(session: Session) -> None:
+    """
+    Fixture pytest garantissant un stock suffisant sur les produits 1 et 2.
+
+    Le passage de commande décrémente le stock et refuse les quantités
+    indisponibles : les données fake ayant des stocks aléatoires, les tests de
+    commande partent d'un stock connu. La modification est annulée avec la
+    transaction du test.
+    """
+    session.execute(text("UPDATE produits SET stock = 100 WHERE id IN (1, 2)"))
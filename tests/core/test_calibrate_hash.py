@@ -0,0 +1,23 @@
+from app.core.calibrate_hash import BCRYPT_ROUNDS_MIN, calibrer
+
+
+def test_calibrer_retient_le_cout_le_plus_eleve_sous_la_cible() -> None:
+    """Teste le choix du coût bcrypt à partir de temps de hashage simulés.
+
+    - Le temps double à chaque incrément : le coût retenu est le dernier dont
+      le temps reste sous la cible, et la mesure s'arrête juste après.
+    """
+    mesures: list[int] = []
+
+    def mesurer(rounds: int) -> float:
+        mesures.append(rounds)
+        return float(2**rounds) / 10_000
+
+    assert calibrer(0.25, mesurer) == (11, 2048 / 10_000)
+    assert mesures[-1] == 12
+
+
+def test_calibrer_cible_inatteignable() -> None:
+    """Teste qu'une cible trop basse renvoie le coût minimal accepté par bcrypt."""
+    rounds, _ = calibrer(0.0, lambda rounds: 1.0)
+    assert rounds == BCRYPT_ROUNDS_MIN
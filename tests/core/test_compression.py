@@ -0,0 +1,65 @@
+import gzip
+
+import brotli
+from fastapi.testclient import TestClient
+
+from app.core.compression import choisir_encodage
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_choisir_encodage() -> None:
+    """Teste la négociation de l'encodage d'une réponse.
+
+    - Vérifie que brotli est préféré à gzip à qualité égale.
+    - Vérifie le respect des valeurs `q` (`q=0` exclut) et du joker `*`.
+    - Vérifie l'absence de compression sans en-tête ou sans encodage connu.
+    """
+    assert choisir_encodage("gzip, deflate, br") == "br"
+    assert choisir_encodage("br;q=0.5, gzip") == "gzip"
+    assert choisir_encodage("br;q=0, *") == "gzip"
+    assert choisir_encodage("gzip", ["br"]) is None
+    assert choisir_encodage("identity") is None
+    assert choisir_encodage(None) is None
+
+
+def test_liste_compressee_selon_accept_encoding() -> None:
+    """Teste la compression de GET /produits/ (liste au-delà du seuil).
+
+    - Vérifie les corps brotli et gzip, identiques une fois décompressés.
+    - Vérifie `Vary` et `Content-Length`, et la réponse non compressée sans
+      encodage accepté.
+    """
+    brut = client.get("/produits/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in brut.headers
+    assert len(brut.content) >= 1024
+
+    for encodage, decompresser in (
+        ("br", brotli.decompress),
+        ("gzip", gzip.decompress),
+    ):
+        with client.stream(
+            "GET", "/produits/", headers={"Accept-Encoding": encodage}
+        ) as resp:
+            compresse = b"".join(resp.iter_raw())
+        assert resp.headers["content-encoding"] == encodage
+        assert resp.headers["vary"] == "Accept-Encoding"
+        assert int(resp.headers["content-length"]) == len(compresse)
+        assert len(compresse) < len(brut.content)
+        assert decompresser(compresse) == brut.content
+
+
+def test_petite_reponse_non_compressee() -> None:
+    """Teste qu'une réponse JSON sous le seuil part sans compression."""
+    resp = client.get("/produits/1", headers={"Accept-Encoding": "br, gzip"})
+    assert resp.status_code == 200
+    assert "content-encoding" not in resp.headers
+    assert resp.headers["vary"] == "Accept-Encoding"
+
+
+def test_fichier_non_json_non_compresse() -> None:
+    """Teste que la page d'accueil (HTML) n'est pas compressée par le middleware."""
+    resp = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert "content-encoding" not in resp.headers
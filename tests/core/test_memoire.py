@@ -0,0 +1,111 @@
+from collections.abc import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.memoire import suivi_memoire
+from app.crud.categorie import get_all_categories
+from app.main import app
+
+client = TestClient(app)
+
+# Nom de ce fichier dans les rapports (chemin depuis la racine du projet)
+MODULE = "tests.core.test_memoire"
+
+# Objets gardés entre deux instantanés, comme une fuite
+_retenus: list[bytes] = []
+
+
+def retenir() -> None:
+    """Alloue et garde environ 1 Mo."""
+    _retenus.extend(bytes(1024) for _ in range(1024))
+
+
+@pytest.fixture
+def suivi() -> Generator[None, None, None]:
+    """Arrête le suivi des allocations à la fin du test."""
+    yield
+    suivi_memoire.arreter()
+    _retenus.clear()
+
+
+def test_croissance_entre_instantanes(
+    suivi: None, admin_headers: dict[str, str]
+) -> None:
+    """Teste le suivi des allocations, des instantanés à leur comparaison.
+
+    - Vérifie que la croissance est attribuée au module de l'allocation, à
+      son site et à son appelant dans la pile.
+    - Vérifie que l'arrêt du suivi oublie les instantanés.
+    """
+    resp = client.post("/admin/memoire/suivi", headers=admin_headers)
+    assert resp.status_code == 200
+    assert resp.json()["actif"] is True
+
+    url = "/admin/memoire/instantanes"
+    avant = client.post(url, headers=admin_headers).json()
+    retenir()
+    apres = client.post(url, headers=admin_headers).json()
+    assert apres["memoire_tracee"] - avant["memoire_tracee"] > 1_000_000
+    assert [i["id"] for i in client.get(url, headers=admin_headers).json()] == [
+        avant["id"],
+        apres["id"],
+    ]
+
+    params = {"avant": avant["id"], "apres": apres["id"], "limite": 5}
+    resp = client.get(
+        "/admin/memoire/comparaison", params=params, headers=admin_headers
+    )
+    assert resp.status_code == 200
+    comparaison = resp.json()
+    assert comparaison["par_module"][0]["module"] == "tests.core"
+    assert comparaison["par_module"][0]["taille_diff"] > 1_000_000
+    site = comparaison["sites"][0]
+    assert site["site"].startswith(f"{MODULE}:")
+    assert site["blocs_diff"] >= 1024
+    assert len(comparaison["sites"]) <= 5
+
+    assert (
+        client.delete("/admin/memoire/suivi", headers=admin_headers).json()["actif"]
+        is False
+    )
+    assert client.get(url, headers=admin_headers).json() == []
+    resp = client.get(
+        "/admin/memoire/comparaison", params=params, headers=admin_headers
+    )
+    assert resp.status_code == 404
+
+
+def test_appelant_dans_l_application(suivi: None, session: Session) -> None:
+    """Teste l'attribution à l'application des allocations de l'ORM.
+
+    Les objets chargés par sqlalchemy pour `get_all_categories` sont comptés
+    sous `sqlalchemy`, avec pour appelant la fonction CRUD.
+    """
+    suivi_memoire.demarrer(cadres=50)
+    avant = suivi_memoire.instantane()
+    categories = get_all_categories(session)
+    apres = suivi_memoire.instantane()
+    assert avant is not None and apres is not None and categories
+
+    comparaison = suivi_memoire.comparer(avant.id, apres.id, 500)
+    assert comparaison is not None
+    assert "sqlalchemy" in {g.module for g in comparaison.par_module}
+    assert "app.crud.categorie" in {g.module for g in comparaison.par_appelant}
+    assert any(
+        s.module == "sqlalchemy"
+        and (s.appelant or "").startswith("app.crud.categorie:")
+        for s in comparaison.sites
+    )
+
+
+def test_suivi_arrete(admin_headers: dict[str, str]) -> None:
+    """Teste qu'un instantané est refusé sans suivi, et l'accès réservé aux admins."""
+    assert (
+        client.get("/admin/memoire/suivi", headers=admin_headers).json()["actif"]
+        is False
+    )
+    resp = client.post("/admin/memoire/instantanes", headers=admin_headers)
+    assert resp.status_code == 409
+    assert client.post("/admin/memoire/suivi").status_code == 401
@@ -0,0 +1,128 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def valeur(nom: str, **labels: str) -> float:
+    """Renvoie la valeur d'une série du registre du worker, 0 si absente."""
+    echantillon: Optional[float] = REGISTRY.get_sample_value(nom, labels)
+    return echantillon or 0.0
+
+
+def test_requetes_par_modele_de_route() -> None:
+    """Teste la mesure des requêtes HTTP et SQL par modèle de route.
+
+    - Vérifie que deux commandes différentes comptent pour la même route,
+      avec leur statut.
+    - Vérifie qu'une URL inconnue est comptée sous `<inconnue>`, pas sous son
+      chemin, et un fichier statique sous le préfixe du montage.
+    - Vérifie l'attribution des requêtes SQL à la route.
+    """
+    route = "/commandes/{commande_id}"
+    ok = {"method": "GET", "route": route, "status": "200"}
+    absente = {"method": "GET", "route": route, "status": "404"}
+    avant = (
+        valeur("http_request_duration_seconds_count", **ok),
+        valeur("http_request_duration_seconds_count", **absente),
+        valeur("db_query_duration_seconds_count", route=route),
+        valeur(
+            "http_request_duration_seconds_count",
+            method="GET",
+            route="<inconnue>",
+            status="404",
+        ),
+    )
+
+    assert client.get("/commandes/1").status_code == 200
+    assert client.get("/commandes/2").status_code == 200
+    assert client.get("/commandes/999999").status_code == 404
+    assert client.get("/pas/de/route").status_code == 404
+    assert client.get("/static/logo.png").status_code == 200
+
+    assert valeur("http_request_duration_seconds_count", **ok) == avant[0] + 2
+    assert valeur("http_request_duration_seconds_count", **absente) == avant[1] + 1
+    assert valeur("db_query_duration_seconds_count", route=route) >= avant[2] + 3
+    assert (
+        valeur(
+            "http_request_duration_seconds_count",
+            method="GET",
+            route="<inconnue>",
+            status="404",
+        )
+        == avant[3] + 1
+    )
+    assert (
+        valeur(
+            "http_request_duration_seconds_count",
+            method="GET",
+            route="/static",
+            status="200",
+        )
+        >= 1
+    )
+    assert valeur("http_requests_in_progress", method="GET") == 0
+    assert valeur("db_pool_connections_checked_out") == 0
+
+
+def test_acces_cache() -> None:
+    """Teste le comptage des accès au cache des disponibilités."""
+    avant = valeur("cache_requests_total", cache="disponibilites", result="hit")
+    client.get("/produits/availability")
+    client.get("/produits/availability")
+    apres = valeur("cache_requests_total", cache="disponibilites", result="hit")
+    assert apres >= avant + 1
+
+
+def test_endpoint_metrics() -> None:
+    """Teste l'exposition au format texte de Prometheus sur /metrics."""
+    client.get("/produits/1")
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_request_duration_seconds_bucket{le="0.005",method="GET",'
+        'route="/produits/{produit_id}",status="200"}' in resp.text
+    )
+
+
+def test_agregation_entre_workers(tmp_path: Path) -> None:
+    """Teste l'agrégation des métriques de plusieurs processus.
+
+    - Deux processus, comme deux workers uvicorn, comptent chacun des accès
+      au même cache dans le dossier partagé.
+    - Vérifie que l'export d'un troisième processus en fait la somme.
+    """
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for n in (2, 3):
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "from app.core.metriques import compter_cache\n"
+                f"for _ in range({n}): compter_cache('test', True)",
+            ],
+            env=env,
+            check=True,
+        )
+    export = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "from app.core.metriques import exporter_metriques\n"
+            "sys.stdout.buffer.write(exporter_metriques())",
+        ],
+        env=env,
+        check=True,
+        capture_output=True,
+    ).stdout.decode()
+    assert 'cache_requests_total{cache="test",result="hit"} 5.0' in export
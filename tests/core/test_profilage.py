@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import profilage
+from app.core.config import settings
+from app.main import app
+
+client = TestClient(app)
+
+PROFILAGE = {"X-Profilage": "1"}
+
+
+def occuper(secondes: float) -> None:
+    """Occupe le processeur pendant la durée donnée."""
+    fin = time.perf_counter() + secondes
+    while time.perf_counter() < fin:
+        pass
+
+
+app_lente = FastAPI()
+
+
+@app_lente.get("/synchrone")
+def synchrone() -> None:
+    occuper(0.05)
+
+
+@app_lente.get("/asynchrone")
+async def asynchrone() -> None:
+    occuper(0.05)
+
+
+@pytest.fixture
+def dossier(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    """Enregistre les profils dans un dossier temporaire."""
+    monkeypatch.setattr(settings, "PROFILAGE_DOSSIER", str(tmp_path))
+    return tmp_path
+
+
+def test_profil_d_une_requete(dossier: Path, admin_headers: dict[str, str]) -> None:
+    """Teste le profilage d'une requête d'administrateur et sa lecture.
+
+    - Vérifie l'en-tête `X-Profil-Id` et les fichiers enregistrés.
+    - Vérifie la liste et le contenu (piles repliées) servis aux admins.
+    - Vérifie qu'un ID inconnu ou mal formé donne 404.
+    """
+    with TestClient(profilage.ProfilageMiddleware(app)) as client:
+        resp = client.get("/produits/", headers={**admin_headers, **PROFILAGE})
+        assert resp.status_code == 200
+        profil_id = resp.headers["x-profil-id"]
+        assert {p.name for p in dossier.iterdir()} == {
+            f"{profil_id}.folded",
+            f"{profil_id}.json",
+        }
+
+        liste = client.get("/admin/profils/", headers=admin_headers)
+        assert liste.status_code == 200
+        infos = liste.json()[0]
+        assert infos["id"] == profil_id
+        assert infos["route"] == "/produits/"
+        assert infos["statut"] == 200
+
+        texte = client.get(f"/admin/profils/{profil_id}", headers=admin_headers)
+        assert texte.status_code == 200
+        for ligne in texte.text.splitlines():
+            pile, _, nombre = ligne.rpartition(" ")
+            assert pile and int(nombre) > 0
+        for inconnu in ("0" * 32, "..%2F..%2Fetc"):
+            resp = client.get(f"/admin/profils/{inconnu}", headers=admin_headers)
+            assert resp.status_code == 404
+
+
+def test_profilage_ignore(dossier: Path, admin_headers: dict[str, str]) -> None:
+    """Teste que l'en-tête est ignoré sans jeton d'administrateur.
+
+    - Sans jeton, ou avec un jeton invalide : pas de profil.
+    - Sans l'en-tête : pas de profil, même pour un admin.
+    - La liste des profils reste réservée aux admins.
+    """
+    with TestClient(profilage.ProfilageMiddleware(app)) as client:
+        for headers in (
+            PROFILAGE,
+            {**PROFILAGE, "Authorization": "Bearer invalide"},
+            admin_headers,
+        ):
+            resp = client.get("/produits/", headers=headers)
+            assert resp.status_code == 200
+            assert "x-profil-id" not in resp.headers
+        assert client.get("/admin/profils/").status_code == 401
+    assert list(dossier.iterdir()) == []
+
+
+@pytest.mark.parametrize("chemin", ["/synchrone", "/asynchrone"])
+def test_piles_de_la_requete(
+    chemin: str, dossier: Path, admin_headers: dict[str, str]
+) -> None:
+    """Teste que les piles relevées sont celles de l'endpoint profilé.
+
+    L'endpoint synchrone s'exécute dans un thread du pool, l'asynchrone dans
+    la boucle d'événements : les deux sont attribués à la requête, et leurs
+    piles commencent après le middleware ou le marquage du thread.
+    """
+    client = TestClient(profilage.ProfilageMiddleware(app_lente))
+    resp = client.get(chemin, headers={**admin_headers, **PROFILAGE})
+    profil_id = resp.headers["x-profil-id"]
+    infos = {p.id: p for p in profilage.lister_profils()}[profil_id]
+    texte = profilage.lire_profil(profil_id)
+    assert texte is not None
+    piles = [ligne.rpartition(" ") for ligne in texte.splitlines()]
+    assert infos.echantillons > 0
+    assert sum(int(nombre) for _, _, nombre in piles) == infos.echantillons
+    assert f"{__name__}:occuper" in texte
+    assert f"{__name__}:{chemin[1:]}" in texte
+    assert not any("ProfilageMiddleware" in pile for pile, _, _ in piles)
+    if chemin == "/synchrone":
+        appel = f"{__name__}:synchrone;{__name__}:occuper"
+        assert any(pile.startswith(appel) for pile, _, _ in piles)
+
+
+def test_profils_max(
+    dossier: Path, admin_headers: dict[str, str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Teste que seuls les `PROFILAGE_PROFILS_MAX` derniers profils sont gardés."""
+    monkeypatch.setattr(settings, "PROFILAGE_PROFILS_MAX", 2)
+    client = TestClient(profilage.ProfilageMiddleware(app_lente))
+    ids = []
+    for _ in range(3):
+        resp = client.get("/asynchrone", headers={**admin_headers, **PROFILAGE})
+        ids.append(resp.headers["x-profil-id"])
+    assert {p.id for p in profilage.lister_profils()} == set(ids[1:])
+    assert len(list(dossier.iterdir())) == 4
+
+
+def test_profilage_continu(
+    tmp_path: Path, admin_headers: dict[str, str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Teste le profilage continu d'un worker et la lecture d'une période.
+
+    - Vérifie l'écriture d'une fenêtre par seconde, à l'arrêt compris.
+    - Vérifie que les piles portent le nom de leur thread et ses appels.
+    - Vérifie la fusion des fenêtres servie aux admins, et 404 hors période.
+    """
+    monkeypatch.setattr(settings, "PROFILAGE_CONTINU_DOSSIER", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILAGE_CONTINU_HZ", 200.0)
+    monkeypatch.setattr(settings, "PROFILAGE_CONTINU_FENETRE_SECONDES", 1)
+    debut = datetime.now(timezone.utc)
+    echantillonneur = profilage.EchantillonneurContinu()
+    echantillonneur.demarrer()
+    thread = threading.Thread(target=occuper, args=(1.5,), name="occupe")
+    thread.start()
+    thread.join()
+    echantillonneur.arreter()
+    assert len(list(tmp_path.glob("*.folded"))) >= 2
+
+    avant = debut - timedelta(seconds=1)
+    texte = profilage.fusionner_fenetres(avant, avant + timedelta(minutes=1))
+    assert "occupe;threading:Thread._bootstrap" in texte
+    assert f"{__name__}:occuper" in texte
+
+    url = "/admin/profils/continu"
+    resp = client.get(url, params={"debut": avant.isoformat()}, headers=admin_headers)
+    assert resp.status_code == 200
+    assert resp.text == texte
+    params = {"debut": (debut - timedelta(hours=1)).isoformat(), "minutes": "5"}
+    assert client.get(url, params=params, headers=admin_headers).status_code == 404
+
+
+def test_fenetres_expirees(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Teste la suppression des fenêtres plus anciennes que la rétention."""
+    monkeypatch.setattr(settings, "PROFILAGE_CONTINU_DOSSIER", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILAGE_CONTINU_FENETRE_SECONDES", 60)
+    monkeypatch.setattr(settings, "PROFILAGE_CONTINU_FENETRES_MAX", 10)
+    (tmp_path / "20200101T000000Z-1.folded").write_text("a;b 1\n")
+    (tmp_path / "notes.folded").write_text("")
+    maintenant = time.time() // 60 * 60
+    profilage.enregistrer_fenetre(maintenant - 60, Counter({"a;b": 2}))
+    profilage.enregistrer_fenetre(maintenant, Counter({"a;c": 1}))
+    noms = {p.name for p in tmp_path.iterdir()}
+    assert "20200101T000000Z-1.folded" not in noms
+    assert "notes.folded" in noms and len(noms) == 3
@@ -0,0 +1,122 @@
+import asyncio
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.core.rate_limit import (
+    LimiteConcurrence,
+    LimiteurDebit,
+    MemoireBackend,
+    SqliteBackend,
+    Surcharge,
+)
+
+
+def test_limiteur_debit_rafale_puis_attente() -> None:
+    """Teste le seau de jetons en mémoire.
+
+    - Vérifie que `capacite` tentatives passent en rafale, puis que la suivante
+      est refusée avec un délai cohérent avec le débit.
+    - Vérifie que les clés sont limitées indépendamment.
+    """
+    limiteur = LimiteurDebit(MemoireBackend(), "test", capacite=3, par_minute=60)
+
+    assert [limiteur.consommer("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+    attente = limiteur.consommer("a")
+    assert 0 < attente <= 1
+    assert limiteur.consommer("b") == 0.0
+
+
+def test_sqlite_backend_partage_entre_instances(tmp_path: Path) -> None:
+    """Teste que deux backends SQLite sur le même fichier partagent leurs seaux.
+
+    Simule deux workers : les tentatives de l'un sont décomptées pour l'autre.
+    """
+    chemin = str(tmp_path / "seaux.sqlite3")
+    worker_1 = LimiteurDebit(SqliteBackend(chemin), "test", capacite=2, par_minute=1)
+    worker_2 = LimiteurDebit(SqliteBackend(chemin), "test", capacite=2, par_minute=1)
+
+    assert worker_1.consommer("a") == 0.0
+    assert worker_2.consommer("a") == 0.0
+    assert worker_1.consommer("a") > 0
+    assert worker_2.consommer("a") > 0
+
+    worker_1.backend.vider()
+    assert worker_2.consommer("a") == 0.0
+
+
+def test_limite_concurrence_deleste_au_dela_du_maximum() -> None:
+    """Teste le rejet immédiat au-delà du nombre de places, et leur libération."""
+    limite = LimiteConcurrence(MemoireBackend(), "test", 1)
+
+    async def scenario() -> None:
+        async with limite.place():
+            with pytest.raises(Surcharge):
+                async with limite.place():
+                    pass
+        async with limite.place():
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_backend_places_partagees(tmp_path: Path) -> None:
+    """Teste que le nombre de places est partagé par les workers.
+
+    - Deux backends sur le même fichier (deux workers) : les places occupées
+      par l'un sont décomptées pour l'autre, puis libérées.
+    - Les places d'un processus arrêté sans les libérer sont récupérées une
+      fois le maximum atteint.
+    - Une libération faite pendant que le fichier est verrouillé est écrite
+      à la transaction suivante.
+    """
+    chemin = str(tmp_path / "seaux.sqlite3")
+    worker_1 = SqliteBackend(chemin)
+    worker_2 = SqliteBackend(chemin)
+
+    assert worker_1.occuper("places", 2)
+    assert worker_2.occuper("places", 2)
+    assert not worker_1.occuper("places", 2)
+    worker_2.liberer("places")
+    assert worker_1.occuper("places", 2)
+    worker_1.liberer("places")
+    worker_1.liberer("places")
+
+    arrete = subprocess.Popen([sys.executable, "-c", "pass"])
+    arrete.wait()
+    with sqlite3.connect(chemin) as connexion:
+        connexion.execute(
+            "INSERT INTO places (cle, pid, en_cours) VALUES ('places', ?, 2)",
+            (arrete.pid,),
+        )
+    assert worker_1.occuper("places", 2)
+    assert worker_2.occuper("places", 2)
+
+    autre_worker = sqlite3.connect(chemin, isolation_level=None)
+    autre_worker.execute("BEGIN IMMEDIATE")
+    try:
+        worker_1.liberer("places")
+    finally:
+        autre_worker.execute("ROLLBACK")
+    assert worker_1.occuper("places", 2)
+
+
+def test_sqlite_backend_verrouille(tmp_path: Path) -> None:
+    """Teste qu'un fichier de seaux resté verrouillé lève `Surcharge`.
+
+    Un autre worker garde le verrou d'écriture au-delà du délai d'attente :
+    la consommation est abandonnée, sans transaction laissée ouverte.
+    """
+    chemin = str(tmp_path / "seaux.sqlite3")
+    backend = SqliteBackend(chemin)
+    autre_worker = sqlite3.connect(chemin, isolation_level=None)
+    autre_worker.execute("BEGIN IMMEDIATE")
+    try:
+        with pytest.raises(Surcharge):
+            backend.consommer("test:a", 1, 1.0)
+    finally:
+        autre_worker.execute("ROLLBACK")
+    assert backend.consommer("test:a", 1, 1.0) == 0.0
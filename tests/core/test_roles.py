@@ -0,0 +1,67 @@
+import time
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.core.roles import CacheRoles
+from app.crud.role import delete_role, role_creation, update_role
+from app.db.session import engine
+from app.schemas.role import RoleCreate, RoleEnum, RoleUpdate
+
+
+def attendre(condition: Callable[[], bool], delai: float = 5.0) -> bool:
+    """Attend qu'une condition soit vraie, au plus `delai` secondes."""
+    fin = time.monotonic() + delai
+    while time.monotonic() < fin:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+
+def test_cache_roles_sans_requete() -> None:
+    """Teste qu'une fois chargé, le cache répond sans requête en base."""
+    requetes: list[str] = []
+
+    def compter(*args: Any) -> None:
+        requetes.append(args[2])
+
+    cache = CacheRoles()
+    cache.charger()
+    event.listen(engine, "before_cursor_execute", compter)
+    try:
+        for _ in range(100):
+            cache.nom(1)
+            cache.nom(999999)
+    finally:
+        event.remove(engine, "before_cursor_execute", compter)
+    assert requetes == []
+
+
+def test_cache_roles_suit_les_autres_workers() -> None:
+    """Teste la propagation des modifications de rôles entre workers.
+
+    - Un second cache, démarré comme dans un autre worker, écoute les
+      notifications.
+    - Vérifie qu'il voit la création, le renommage et la suppression d'un rôle
+      faits par les fonctions CRUD.
+    """
+    autre_worker = CacheRoles()
+    autre_worker.demarrer()
+    try:
+        assert attendre(lambda: autre_worker._noms is not None)
+        with Session(engine) as session:
+            role = role_creation(session, RoleCreate(nom=RoleEnum.serveur))
+            assert role.id is not None
+            role_id = role.id
+            assert attendre(lambda: autre_worker.nom(role_id) == "serveur")
+
+            update_role(session, role_id, RoleUpdate(nom=RoleEnum.admin))
+            assert attendre(lambda: autre_worker.nom(role_id) == "admin")
+
+            delete_role(session, role_id)
+            assert attendre(lambda: autre_worker.nom(role_id) is None)
+    finally:
+        autre_worker.arreter()
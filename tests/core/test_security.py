@@ -1,4 +1,27 @@
-from app.core.security import hash_password, password_checking
+import asyncio
+from datetime import timedelta
+
+import jwt
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import Settings, settings
+from app.core.security import (
+    ACCESS_TOKEN,
+    REFRESH_TOKEN,
+    create_password_context,
+    create_token,
+    create_token_pair,
+    decode_token,
+    hash_password,
+    hash_password_async,
+    password_checking,
+    password_checking_and_update,
+    password_checking_async,
+)
+from app.schemas.user import UserToken
+
+UTILISATEUR = UserToken(id=42, email="alice@example.com", role_id=2)
 
 
 def test_hash_and_password_checking_ok() -> None:
@@ -24,3 +47,96 @@ def test_failed_password_checking() -> None:
     other = "password-not-ok"
     hashed = hash_password(password)
     assert password_checking(other, hashed) is False
+
+
+def test_hash_and_password_checking_async() -> None:
+    """Teste le hashage et la vérification dans le pool de processus dédié.
+
+    - Vérifie qu'un hash produit dans le pool est vérifiable de façon synchrone.
+    - Vérifie que la vérification asynchrone distingue bon et mauvais mot de passe.
+    """
+
+    async def scenario() -> tuple[str, bool, bool]:
+        hashed = await hash_password_async("passwordok123456")
+        ok = await password_checking_async("passwordok123456", hashed)
+        ko = await password_checking_async("password-not-ok", hashed)
+        return hashed, ok, ko
+
+    hashed, ok, ko = asyncio.run(scenario())
+    assert password_checking("passwordok123456", hashed) is True
+    assert ok is True
+    assert ko is False
+
+
+def test_create_and_decode_token_pair() -> None:
+    """Teste l'aller-retour des jetons d'accès et de rafraîchissement.
+
+    - Vérifie que chaque jeton restitue l'utilisateur d'origine.
+    - Vérifie qu'un jeton n'est accepté que pour son propre type.
+    """
+    jetons = create_token_pair(UTILISATEUR)
+    assert jetons.token_type == "bearer"
+    assert decode_token(jetons.access_token, ACCESS_TOKEN) == UTILISATEUR
+    assert decode_token(jetons.refresh_token, REFRESH_TOKEN) == UTILISATEUR
+    with pytest.raises(jwt.InvalidTokenError):
+        decode_token(jetons.refresh_token, ACCESS_TOKEN)
+    with pytest.raises(jwt.InvalidTokenError):
+        decode_token(jetons.access_token, REFRESH_TOKEN)
+
+
+def test_decode_token_rejects_expired_and_tampered() -> None:
+    """Teste le rejet des jetons expirés ou altérés.
+
+    - Vérifie qu'un jeton expiré lève ExpiredSignatureError.
+    - Vérifie qu'un jeton dont la signature est modifiée est refusé.
+    """
+    expire = create_token(UTILISATEUR, ACCESS_TOKEN, timedelta(seconds=-1))
+    with pytest.raises(jwt.ExpiredSignatureError):
+        decode_token(expire, ACCESS_TOKEN)
+
+    jeton = create_token(UTILISATEUR, ACCESS_TOKEN, timedelta(minutes=1))
+    altere = jeton[:-2] + ("AA" if not jeton.endswith("AA") else "BB")
+    with pytest.raises(jwt.InvalidTokenError):
+        decode_token(altere, ACCESS_TOKEN)
+
+
+def test_password_checking_and_update_rehashes_outdated_cost() -> None:
+    """Teste le rehash d'un hash produit avec un autre coût bcrypt.
+
+    - Vérifie qu'un hash de coût différent est validé et remplacé par un hash
+      au coût configuré, lui-même vérifiable.
+    - Vérifie qu'un hash à jour n'est pas remplacé.
+    - Vérifie qu'un mauvais mot de passe ne produit pas de nouveau hash.
+    """
+    password = "passwordok123456"
+    ancien = create_password_context(["bcrypt"], 4).hash(password)
+
+    valide, nouveau = password_checking_and_update(password, ancien)
+    assert valide is True
+    assert nouveau is not None
+    assert nouveau.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+    assert password_checking_and_update(password, nouveau) == (True, None)
+    assert password_checking_and_update("password-not-ok", ancien) == (False, None)
+
+
+def test_password_context_migrates_deprecated_scheme() -> None:
+    """Teste la migration d'un hash d'un schéma secondaire vers le schéma principal.
+
+    - Vérifie qu'un hash pbkdf2 est accepté par un contexte bcrypt + pbkdf2
+      et remplacé par un hash bcrypt.
+    """
+    contexte = create_password_context(["bcrypt", "pbkdf2_sha256"], 4)
+    ancien = create_password_context(["pbkdf2_sha256"], 4).hash("passwordok123456")
+
+    valide, nouveau = contexte.verify_and_update("passwordok123456", ancien)
+    assert valide is True
+    assert nouveau is not None and nouveau.startswith("$2b$04$")
+
+
+@pytest.mark.parametrize(
+    "cle", ["court", "changer-cette-cle-secrete-en-production", "<secret_key>"]
+)
+def test_secret_key_refusee(cle: str) -> None:
+    """Teste qu'une clé de signature trop courte ou publiée empêche le démarrage."""
+    with pytest.raises(ValidationError, match="SECRET_KEY"):
+        Settings(SECRET_KEY=cle)
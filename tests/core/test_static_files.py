@@ -0,0 +1,118 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import brotli
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.precompression import precompresser
+from app.core.static_files import CACHE_IMMUABLE, CACHE_REVALIDE, StaticPrecompresses
+
+
+def creer_client(dossier: Path) -> tuple[TestClient, StaticPrecompresses]:
+    """Monte le dossier sur une application minimale."""
+    application = FastAPI()
+    statiques = StaticPrecompresses(directory=str(dossier))
+    application.mount("/static", statiques, name="static")
+    return TestClient(application), statiques
+
+
+def test_precompresser(tmp_path: Path) -> None:
+    """Teste l'écriture des copies `.br` et `.gz` des fichiers statiques.
+
+    - Vérifie les copies d'un fichier JSON, fidèles une fois décompressées.
+    - Vérifie que les images (déjà compressées) et les fichiers trop petits
+      pour gagner 10 % sont ignorés.
+    """
+    contenu = json.dumps([{"id": i, "nom": f"Produit {i}"} for i in range(200)])
+    (tmp_path / "menu.json").write_text(contenu)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" + b"\0" * 2000)
+    (tmp_path / "court.txt").write_text("ok")
+
+    copies = precompresser(tmp_path)
+
+    assert sorted(c.name for c in copies) == ["menu.json.br", "menu.json.gz"]
+    assert (
+        brotli.decompress((tmp_path / "menu.json.br").read_bytes()).decode() == contenu
+    )
+    assert gzip.decompress((tmp_path / "menu.json.gz").read_bytes()).decode() == contenu
+
+
+def test_copie_precompressee_servie(tmp_path: Path) -> None:
+    """Teste le service des copies précompressées et des en-têtes de cache.
+
+    - Vérifie la copie brotli ou gzip selon `Accept-Encoding`, avec le type du
+      fichier d'origine, et l'original sans encodage accepté.
+    - Vérifie `immutable` avec la bonne version, `no-cache` sinon.
+    - Vérifie la revalidation par ETag (304).
+    """
+    contenu = json.dumps([{"id": i, "nom": f"Produit {i}"} for i in range(200)])
+    (tmp_path / "menu.json").write_text(contenu)
+    precompresser(tmp_path)
+    client, statiques = creer_client(tmp_path)
+    url = statiques.url_statique("menu.json")
+    assert url.startswith("/static/menu.json?v=")
+
+    for encodage, suffixe in (("br", ".br"), ("gzip", ".gz")):
+        with client.stream("GET", url, headers={"Accept-Encoding": encodage}) as resp:
+            corps = b"".join(resp.iter_raw())
+        assert resp.headers["content-encoding"] == encodage
+        assert resp.headers["content-type"].startswith("application/json")
+        assert resp.headers["cache-control"] == CACHE_IMMUABLE
+        assert resp.headers["vary"] == "Accept-Encoding"
+        assert corps == (tmp_path / f"menu.json{suffixe}").read_bytes()
+
+    resp = client.get("/static/menu.json", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in resp.headers
+    assert resp.headers["cache-control"] == CACHE_REVALIDE
+    assert resp.text == contenu
+
+    resp = client.get("/static/menu.json?v=perimee")
+    assert resp.headers["cache-control"] == CACHE_REVALIDE
+
+    etag = resp.headers["etag"]
+    resp = client.get("/static/menu.json", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+
+def test_copie_obsolete_ignoree(tmp_path: Path) -> None:
+    """Teste qu'une copie plus ancienne que l'original n'est pas servie."""
+    fichier = tmp_path / "menu.json"
+    fichier.write_text(json.dumps(list(range(500))))
+    precompresser(tmp_path)
+    fichier.write_text(json.dumps(list(range(600))))
+    # Copies datées d'avant la modification de l'original
+    stat = fichier.stat()
+    for copie in tmp_path.glob("menu.json.*"):
+        os.utime(copie, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+
+    client, _ = creer_client(tmp_path)
+    resp = client.get("/static/menu.json", headers={"Accept-Encoding": "br, gzip"})
+    assert "content-encoding" not in resp.headers
+    assert resp.json() == list(range(600))
+
+
+def test_precompression_sans_configuration(tmp_path: Path) -> None:
+    """Teste la précompression en ligne de commande sans `SECRET_KEY` ni `.env`.
+
+    Comme à l'étape de build de l'image, le module ne doit pas charger la
+    configuration de l'application.
+    """
+    (tmp_path / "menu.json").write_text(json.dumps(list(range(2000))))
+    environnement = {
+        cle: valeur for cle, valeur in os.environ.items() if cle != "SECRET_KEY"
+    }
+    resultat = subprocess.run(
+        [sys.executable, "-m", "app.core.precompression", str(tmp_path)],
+        cwd=tmp_path,
+        env={**environnement, "PYTHONPATH": str(Path(__file__).parents[2])},
+        capture_output=True,
+        text=True,
+    )
+    assert resultat.returncode == 0, resultat.stderr
+    assert (tmp_path / "menu.json.br").exists()
+    assert (tmp_path / "menu.json.gz").exists()
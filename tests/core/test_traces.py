@@ -0,0 +1,146 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import pickle
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import traces
+from app.core.security import hash_password
+from app.main import app
+
+client = TestClient(app)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+TRACEPARENT = f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+
+
+class ExporteurMemoire:
+    """Garde les spans exportés en mémoire."""
+
+    def __init__(self) -> None:
+        self.spans: list[traces.Span] = []
+
+    def exporter(self, spans: Sequence[traces.Span]) -> None:
+        self.spans.extend(spans)
+
+
+@pytest.fixture
+def exportes(monkeypatch: pytest.MonkeyPatch) -> ExporteurMemoire:
+    """Remplace l'exporteur de traces par un exporteur en mémoire."""
+    memoire = ExporteurMemoire()
+    monkeypatch.setattr(traces, "exporteur", memoire)
+    return memoire
+
+
+def test_requete_tracee(exportes: ExporteurMemoire) -> None:
+    """Teste la trace d'une requête demandée par l'en-tête `traceparent`.
+
+    - Vérifie le span de la requête (route, statut), rattaché au parent reçu.
+    - Vérifie les spans des fonctions CRUD et du SQL, dans la même trace.
+    - Vérifie l'en-tête `traceparent` de la réponse.
+    """
+    resp = client.get("/commandes/1", headers={"traceparent": TRACEPARENT})
+    assert resp.status_code == 200
+
+    par_nom = {s.nom: s for s in exportes.spans}
+    requete = par_nom["GET /commandes/{commande_id}"]
+    crud = par_nom["crud.commande.get_commande_json"]
+    sql = [s for s in exportes.spans if s.nom == "sql"]
+    assert {s.trace_id for s in exportes.spans} == {TRACE_ID}
+    assert requete.parent_id == "00f067aa0ba902b7"
+    assert requete.attributs["http.status_code"] == 200
+    assert crud.parent_id == requete.span_id
+    assert any(s.parent_id == crud.span_id for s in sql)
+    assert all(s.attributs["db.statement"] for s in sql)
+    assert crud.debut_ns >= requete.debut_ns and crud.fin_ns <= requete.fin_ns
+    assert resp.headers["traceparent"] == f"00-{TRACE_ID}-{requete.span_id}-01"
+
+
+def test_requete_non_echantillonnee(exportes: ExporteurMemoire) -> None:
+    """Teste qu'une requête non échantillonnée ne produit aucun span."""
+    resp = client.get("/commandes/1", headers={"traceparent": TRACEPARENT[:-2] + "00"})
+    assert resp.status_code == 200
+    assert "traceparent" not in resp.headers
+    assert exportes.spans == []
+
+
+def test_erreur_dans_un_span(exportes: ExporteurMemoire) -> None:
+    """Teste qu'une exception marque le span en erreur avant de remonter."""
+    with traces.racine("test", echantillonner=True):
+        with pytest.raises(ValueError):
+            with traces.span("echec"):
+                raise ValueError
+    assert [(s.nom, s.erreur) for s in exportes.spans] == [
+        ("echec", "ValueError"),
+        ("test", None),
+    ]
+
+
+def test_tache_dans_la_trace(exportes: ExporteurMemoire) -> None:
+    """Teste la propagation de la trace dans une tâche d'arrière-plan.
+
+    - La tâche (`TacheTracee`) survit au pickle, comme pour le pool de processus.
+    - Exécutée hors du contexte de la requête, son span a pour parent le span
+      qui l'a créée ; il est renvoyé avec le résultat, sans être exporté.
+    """
+    with traces.racine("requete", echantillonner=True) as requete:
+        assert requete is not None
+        tache = pickle.loads(
+            pickle.dumps(
+                traces.TacheTracee(hash_password, (requete.trace_id, requete.span_id))
+            )
+        )
+    assert traces.span_courant() is None
+    exportes.spans.clear()
+
+    resultat, spans = tache("mot-de-passe")
+    assert resultat.startswith("$2")
+    assert [s.nom for s in spans] == ["tache.hash_password"]
+    assert spans[0].trace_id == requete.trace_id
+    assert spans[0].parent_id == requete.span_id
+    assert exportes.spans == []
+
+
+def test_tache_dans_un_processus(exportes: ExporteurMemoire) -> None:
+    """Teste qu'une tâche exécutée par le pool de processus rejoint la trace.
+
+    Son span, ouvert dans un autre processus, est exporté avec ceux de la
+    requête ; hors trace, la fonction est exécutée telle quelle.
+    """
+
+    async def scenario(pool: ProcessPoolExecutor) -> None:
+        assert await traces.executer_dans_la_trace(pool, len, "abc") == 3
+        with traces.racine("requete", echantillonner=True):
+            assert await traces.executer_dans_la_trace(pool, len, "abcd") == 4
+
+    contexte = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexte) as pool:
+        asyncio.run(scenario(pool))
+
+    tache, requete = exportes.spans
+    assert (tache.nom, requete.nom) == ("tache.len", "requete")
+    assert tache.parent_id == requete.span_id
+    assert tache.attributs["pid"] != os.getpid()
+
+
+def test_exporteur_fichier(tmp_path: Path) -> None:
+    """Teste l'écriture des spans en JSON lines, un span par ligne."""
+    chemin = tmp_path / "traces.jsonl"
+    memoire = ExporteurMemoire()
+    traces.ExporteurFichier(str(chemin)).exporter(memoire.spans)
+    span = traces.Span("test", TRACE_ID, None, memoire.spans)
+    span.attributs["cle"] = 1
+    span.terminer()
+    traces.ExporteurFichier(str(chemin)).exporter(memoire.spans)
+
+    lignes = [json.loads(ligne) for ligne in chemin.read_text().splitlines()]
+    assert len(lignes) == 1
+    assert lignes[0]["trace_id"] == TRACE_ID
+    assert lignes[0]["attributs"] == {"cle": 1}
+    assert lignes[0]["duree_ns"] >= 0
@@ -1,12 +1,24 @@
 from datetime import datetime
+from typing import Any
 
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
 from sqlmodel import Session
 
 from app.crud import commande as crud_commande
-from app.schemas.commande import CommandeCreate, CommandeUpdate, StatusEnum
+from app.models.commandes_et_produits import Commande, DetailCommande, Produit
+from app.schemas.commande import (
+    CommandeCreate,
+    CommandeRead,
+    CommandeUpdate,
+    StatusEnum,
+)
 from app.schemas.detail import DetailsCreate
 
 
+@pytest.mark.usefixtures("produits_en_stock")
 def test_create_commande(session: Session) -> None:
     """Teste la création d'une commande avec détails et vérifie la persistance.
 
@@ -33,12 +45,15 @@ def test_get_commande(session: Session) -> None:
 
 
 def test_update_commande(session: Session) -> None:
-    """Teste la mise à jour du statut d'une commande existante."""
-    update_data = CommandeUpdate(statut=StatusEnum.servie)
+    """Teste la mise à jour de la date d'une commande existante."""
+    date_commande = datetime(2024, 1, 1, 12, 0)
+    update_data = CommandeUpdate(date_commande=date_commande)
     updated = crud_commande.update_commande(session, 1, update_data)
     assert updated is not None
+    assert updated.date_commande == date_commande
 
 
+@pytest.mark.usefixtures("produits_en_stock")
 def test_delete_commande(session: Session) -> None:
     """Teste la suppression d'une commande.
 
@@ -55,3 +70,140 @@ def test_delete_commande(session: Session) -> None:
     deleted = crud_commande.delete_commande(session, commande.id)
     assert deleted is True
     assert crud_commande.get_commande(session, commande.id) is None
+
+
+@pytest.mark.usefixtures("produits_en_stock")
+def test_delete_commande_restaure_le_stock(session: Session) -> None:
+    """Teste que la suppression d'une commande rend ses quantités au stock."""
+    commande_data = CommandeCreate(
+        client_id=1,
+        details=[
+            DetailsCreate(produit_id=1, quantite=3),
+            DetailsCreate(produit_id=2, quantite=4),
+        ],
+    )
+    commande = crud_commande.create_commande(session, commande_data)
+    assert commande.id is not None
+
+    assert crud_commande.delete_commande(session, commande.id) is True
+    for produit_id in (1, 2):
+        produit = session.get(Produit, produit_id)
+        assert produit is not None
+        assert produit.stock == 100
+
+
+@pytest.mark.usefixtures("produits_en_stock")
+def test_create_commande_decremente_le_stock(session: Session) -> None:
+    """Teste que le passage de commande consomme le stock des produits."""
+    commande_data = CommandeCreate(
+        client_id=1,
+        details=[DetailsCreate(produit_id=1, quantite=3)],
+    )
+    crud_commande.create_commande(session, commande_data)
+
+    produit = session.get(Produit, 1)
+    assert produit is not None
+    assert produit.stock == 97
+
+
+@pytest.mark.usefixtures("produits_en_stock")
+def test_create_commande_stock_insuffisant(session: Session) -> None:
+    """Teste qu'une commande dépassant le stock est refusée (409)."""
+    commande_data = CommandeCreate(
+        client_id=1,
+        details=[
+            DetailsCreate(produit_id=1, quantite=1),
+            DetailsCreate(produit_id=2, quantite=101),
+        ],
+    )
+    with pytest.raises(HTTPException) as exc:
+        crud_commande.create_commande(session, commande_data)
+
+    assert exc.value.status_code == 409
+
+
+def test_get_commandes_json_identique_au_schema(session: Session) -> None:
+    """Teste que le JSON construit par Postgres est celui de `list[CommandeRead]`.
+
+    - Ajoute des commandes avec et sans détails, des dates avec et sans
+      microsecondes et des montants limites.
+    - Compare, octet pour octet et pour plusieurs filtres, `get_commandes_json`
+      à la réponse que FastAPI produirait à partir de `get_commandes`.
+    """
+    dates = [datetime(2031, 5, 4, 12, 30), datetime(2031, 5, 4, 8, 0, 0, 120)]
+    for i, montant in enumerate([42.0, 0.1 + 0.2, 1e15, 1e-05]):
+        commande = Commande(
+            client_id=1,
+            date_commande=dates[i % 2],
+            statut=StatusEnum.prete,
+            montant_total=montant,
+        )
+        session.add(commande)
+        session.flush()
+        session.add_all(
+            DetailCommande(
+                commande_id=commande.id,
+                produit_id=produit_id,
+                quantite=produit_id,
+                prix_unitaire=montant / 3,
+            )
+            for produit_id in range(i, 0, -1)
+        )
+    session.flush()
+    session.expire_all()
+
+    adaptateur = TypeAdapter(list[CommandeRead])
+    cas: list[dict[str, Any]] = [
+        {},
+        {"client_id": 1},
+        {"date_commande": dates[0]},
+        {"statut": StatusEnum.prete},
+    ]
+    for filtres in cas:
+        commandes = adaptateur.validate_python(
+            crud_commande.get_commandes(session, **filtres), from_attributes=True
+        )
+        attendu = ORJSONResponse(adaptateur.dump_python(commandes, mode="json")).body
+        texte = crud_commande.get_commandes_json(session, **filtres)
+        assert texte is not None
+        assert texte.encode() == attendu
+
+    assert crud_commande.get_commandes_json(session, client_id=-1) is None
+
+
+def test_get_commande_json_champs(session: Session) -> None:
+    """Teste le JSON d'une commande, complet puis limité à des champs.
+
+    - Compare `get_commande_json` à la réponse `CommandeRead` de FastAPI.
+    - Vérifie que la liste limitée à ("id", "statut", "details") suit le
+      schéma, et que sans "details" la sous-requête des détails disparaît.
+    """
+    commande = Commande(client_id=1, statut=StatusEnum.prete, montant_total=9.0)
+    session.add(commande)
+    session.flush()
+    assert commande.id is not None
+    session.add(
+        DetailCommande(
+            commande_id=commande.id, produit_id=1, quantite=2, prix_unitaire=4.5
+        )
+    )
+    session.flush()
+    session.expire_all()
+
+    lue = CommandeRead.model_validate(
+        crud_commande.get_commande(session, commande.id), from_attributes=True
+    )
+    attendu = ORJSONResponse(lue.model_dump(mode="json")).body
+    lue_json = crud_commande.get_commande_json(session, commande.id)
+    assert lue_json == (bytes(attendu).decode(), 1)
+
+    champs = ("id", "statut", "details")
+    attendu = ORJSONResponse([lue.model_dump(mode="json", include=set(champs))]).body
+    texte = crud_commande.get_commandes_json(session, client_id=1, champs=champs)
+    assert texte is not None
+    # La commande ajoutée est la dernière de la liste (triée par ID)
+    assert texte.encode().endswith(attendu[1:])
+
+    sql = str(crud_commande._liste_commandes_json(("id", "statut")))
+    assert "details_commandes" not in sql
+    assert "montant_total" not in sql
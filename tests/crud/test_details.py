@@ -1,10 +1,12 @@
+import pytest
 from sqlmodel import Session, select
 
-from app.crud.details import update_details_commande
-from app.models.commandes_et_produits import Commande
+from app.crud.details import get_chiffre_affaires, update_details_commande
+from app.models.commandes_et_produits import Commande, Produit
 from app.schemas.detail import DetailsUpdate
 
 
+@pytest.mark.usefixtures("produits_en_stock")
 def test_update_details_commande(session: Session) -> None:
     """Teste la mise à jour des détails d'une commande.
 
@@ -32,3 +34,42 @@ def test_update_details_commande(session: Session) -> None:
 
     produits_quantites = {(d.produit_id, d.quantite) for d in commande.details}
     assert produits_quantites == {(1, 2), (2, 3)}
+
+
+@pytest.mark.usefixtures("produits_en_stock")
+def test_update_details_commande_garde_le_prix_fige(session: Session) -> None:
+    """Teste que le prix figé d'un produit déjà commandé ne suit pas son prix actuel.
+
+    Vérifie aussi que le montant total est calculé depuis les seuls détails.
+    """
+    commande = session.exec(select(Commande)).first()
+    assert commande is not None
+    update_details_commande(
+        session, commande, [DetailsUpdate(produit_id=1, quantite=1)]
+    )
+    session.commit()
+    prix_fige = commande.details[0].prix_unitaire
+
+    produit = session.get(Produit, 1)
+    assert produit is not None
+    produit.prix = prix_fige + 10
+    update_details_commande(
+        session, commande, [DetailsUpdate(produit_id=1, quantite=2)]
+    )
+    session.commit()
+    session.refresh(commande)
+
+    assert commande.details[0].prix_unitaire == prix_fige
+    assert commande.montant_total == round(prix_fige * 2, 2)
+
+
+def test_get_chiffre_affaires(session: Session) -> None:
+    """Teste que le chiffre d'affaires par produit correspond aux détails."""
+    resultats = get_chiffre_affaires(session)
+
+    assert resultats
+    total = sum(r.montant for r in resultats)
+    commandes = session.exec(select(Commande)).all()
+    assert round(total, 2) == round(
+        sum(d.prix_unitaire * d.quantite for c in commandes for d in c.details), 2
+    )
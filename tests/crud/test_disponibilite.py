@@ -0,0 +1,54 @@
+import pytest
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.crud.disponibilite import (
+    get_disponibilites,
+    get_produits_stock_bas,
+    invalidate_disponibilites,
+)
+from app.crud.produit import update_stocks
+from app.schemas.produit import StockAjustement, StockMode
+
+
+@pytest.mark.usefixtures("produits_en_stock")
+def test_disponibilites_suivent_les_ajustements(session: Session) -> None:
+    """Teste que la carte des disponibilités est tenue à jour au commit.
+
+    Vérifie qu'un produit passé à 0 apparaît en rupture, qu'un produit passé
+    sous le seuil apparaît en stock bas, et que l'ETag change.
+    """
+    invalidate_disponibilites()
+    disponibilites, etag = get_disponibilites(session)
+    assert 1 not in disponibilites.rupture
+    assert 2 not in disponibilites.stock_bas
+
+    update_stocks(
+        session,
+        [
+            StockAjustement(produit_id=1, valeur=0, mode=StockMode.absolu),
+            StockAjustement(
+                produit_id=2, valeur=settings.STOCK_BAS_SEUIL, mode=StockMode.absolu
+            ),
+        ],
+    )
+    disponibilites, nouvel_etag = get_disponibilites(session)
+
+    assert 1 in disponibilites.rupture
+    assert 2 in disponibilites.stock_bas
+    assert nouvel_etag != etag
+    invalidate_disponibilites()
+
+
+@pytest.mark.usefixtures("produits_en_stock")
+def test_get_produits_stock_bas(session: Session) -> None:
+    """Teste la liste des produits sous un seuil, triée par stock croissant."""
+    # Le produit 1 passe de 100 à 1 en stock
+    update_stocks(session, [StockAjustement(produit_id=1, valeur=-99)])
+
+    produits = get_produits_stock_bas(session, 1)
+
+    assert 1 in [p.id for p in produits]
+    assert all(p.stock <= 1 for p in produits)
+    assert [p.stock for p in produits] == sorted(p.stock for p in produits)
+    invalidate_disponibilites()
@@ -0,0 +1,187 @@
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from sqlmodel import Session, create_engine, select
+
+from app.core.config import settings
+from app.crud.produit import (
+    _liste_produits_json,
+    get_all_produits,
+    get_produit_json,
+    get_produits_json,
+    import_produits,
+    update_stocks,
+)
+from app.models.commandes_et_produits import Categorie, Produit
+from app.schemas.import_donnees import FormatImport
+from app.schemas.produit import ProduitRead, StockAjustement, StockMode
+from app.utils.helpers import lire_lignes
+
+
+def test_import_produits_csv_insere_et_met_a_jour(session: Session) -> None:
+    """Teste l'import CSV : un produit nouveau est inséré, un produit existant
+    (même nom) est mis à jour.
+    """
+    categorie = session.exec(select(Categorie)).first()
+    assert categorie is not None
+    existant = session.exec(select(Produit)).first()
+    assert existant is not None
+    nouveau = f"Produit {uuid4().hex}"
+
+    contenu = (
+        "nom,description,prix,categorie_id,stock\n"
+        f"{nouveau},Nouveau,4.5,{categorie.id},10\n"
+        f"{existant.nom},,99.9,{categorie.id},3\n"
+    )
+    rapport = import_produits(session, lire_lignes(contenu, FormatImport.csv))
+
+    assert rapport.inseres == 1
+    assert rapport.mis_a_jour == 1
+    assert rapport.erreurs == []
+
+    session.refresh(existant)
+    assert existant.prix == 99.9
+    assert existant.description is None
+    cree = session.exec(select(Produit).where(Produit.nom == nouveau)).one()
+    assert cree.stock == 10
+
+
+def test_import_produits_jsonl_rapporte_les_erreurs(session: Session) -> None:
+    """Teste que les lignes invalides sont rapportées sans bloquer les autres.
+
+    Vérifie les erreurs de JSON, de validation, de catégorie inconnue et de
+    nom en double dans le même fichier.
+    """
+    nom = f"Produit {uuid4().hex}"
+    contenu = "\n".join(
+        [
+            f'{{"nom": "{nom}", "prix": 2.0, "stock": 1}}',
+            "{pas du json",
+            '{"nom": "Sans prix", "stock": 1}',
+            '{"nom": "Catégorie fantôme", "prix": 1, "stock": 1, '
+            '"categorie_id": 999999}',
+            f'{{"nom": "{nom}", "prix": 3.0, "stock": 1}}',
+        ]
+    )
+    rapport = import_produits(session, lire_lignes(contenu, FormatImport.jsonl))
+
+    assert rapport.inseres == 1
+    assert [e.ligne for e in rapport.erreurs] == [2, 3, 4, 5]
+    assert "prix" in rapport.erreurs[1].erreur
+    assert "999999" in rapport.erreurs[2].erreur
+
+
+@pytest.mark.usefixtures("produits_en_stock")
+def test_update_stocks_relatif_et_absolu(session: Session) -> None:
+    """Teste l'ajustement en masse : un ajout relatif et un inventaire absolu."""
+    resultat = update_stocks(
+        session,
+        [
+            StockAjustement(produit_id=2, valeur=-10),
+            StockAjustement(produit_id=1, valeur=7, mode=StockMode.absolu),
+        ],
+    )
+
+    assert [(r.id, r.stock) for r in resultat] == [(2, 90), (1, 7)]
+    produit = session.get(Produit, 1)
+    assert produit is not None
+    assert produit.stock == 7
+
+
+@pytest.mark.usefixtures("produits_en_stock")
+def test_update_stocks_refuse_un_stock_negatif(session: Session) -> None:
+    """Teste qu'un lot rendant un stock négatif est refusé entièrement (409)."""
+    with pytest.raises(HTTPException) as exc:
+        update_stocks(
+            session,
+            [
+                StockAjustement(produit_id=1, valeur=5),
+                StockAjustement(produit_id=2, valeur=-101),
+            ],
+        )
+
+    assert exc.value.status_code == 409
+
+
+def test_get_produits_json_identique_au_schema(session: Session) -> None:
+    """Teste que le JSON construit par Postgres est celui de `list[ProduitRead]`.
+
+    Compare, octet pour octet, `get_produits_json` à la réponse que FastAPI
+    produirait à partir de `get_all_produits` (validation par le schéma puis
+    encodage `ORJSONResponse`), avec des prix et des textes limites.
+    """
+    prix = [12.0, 0.1 + 0.2, 1e15, 1e16, 1.5e16, 1e-05, 0.0001, -0.0, 2.5, 1 / 3]
+    textes = ['guillemets " et \\', "ligne\nsuivante\t", "é 🍕", "\x01\x1f", None]
+    session.add_all(
+        Produit(
+            nom=f"Produit {uuid4().hex}",
+            description=textes[i % len(textes)],
+            prix=valeur,
+            categorie_id=None,
+            stock=-i,
+        )
+        for i, valeur in enumerate(prix)
+    )
+    session.flush()
+
+    adaptateur = TypeAdapter(list[ProduitRead])
+    produits = adaptateur.validate_python(
+        get_all_produits(session), from_attributes=True
+    )
+    attendu = ORJSONResponse(adaptateur.dump_python(produits, mode="json")).body
+    assert get_produits_json(session).encode() == attendu
+
+
+def test_get_produit_json_champs(session: Session) -> None:
+    """Teste le JSON d'un produit, complet puis limité à des champs.
+
+    - Compare `get_produit_json` à la réponse `ProduitRead` de FastAPI.
+    - Vérifie qu'avec `champs`, seuls ces champs sont écrits, dans l'ordre du
+      schéma, et que les autres colonnes ne sont pas lues.
+    """
+    produit = Produit(nom=f"Produit {uuid4().hex}", prix=4.5, stock=3)
+    session.add(produit)
+    session.flush()
+    assert produit.id is not None
+
+    lu = ProduitRead.model_validate(produit, from_attributes=True)
+    attendu = ORJSONResponse(lu.model_dump(mode="json")).body
+    assert get_produit_json(session, produit.id) == (bytes(attendu).decode(), 1)
+
+    champs = ("id", "nom", "prix")
+    attendu = ORJSONResponse(lu.model_dump(mode="json", include=set(champs))).body
+    assert get_produit_json(session, produit.id, champs) == (bytes(attendu).decode(), 1)
+    assert "description" not in str(_liste_produits_json(champs))
+
+    assert get_produit_json(session, -1) is None
+
+
+def test_get_produit_json_extra_float_digits() -> None:
+    """Teste le format des prix quand le serveur arrondit les `float8`.
+
+    La connexion démarre avec `extra_float_digits = 0` (réglage d'un rôle ou
+    d'un proxy) : l'application le remet à 1, et le prix garde tous ses
+    chiffres, comme dans la réponse de FastAPI.
+    """
+    engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args={"options": "-c extra_float_digits=0"},
+    )
+    try:
+        with Session(engine) as session:
+            connexion = session.connection()
+            assert connexion.exec_driver_sql("SHOW extra_float_digits").scalar() == "1"
+            produit = Produit(nom=f"Produit {uuid4().hex}", prix=0.1 + 0.2, stock=1)
+            session.add(produit)
+            session.flush()
+            assert produit.id is not None
+
+            lu = ProduitRead.model_validate(produit, from_attributes=True)
+            attendu = bytes(ORJSONResponse(lu.model_dump(mode="json")).body).decode()
+            assert get_produit_json(session, produit.id) == (attendu, 1)
+            session.rollback()
+    finally:
+        engine.dispose()
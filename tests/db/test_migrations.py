@@ -0,0 +1,31 @@
+from sqlmodel import Session, col, select
+
+from app.db.scripts.migrations import MIGRATIONS
+from app.models.commandes_et_produits import Produit
+
+
+def test_nom_de_produit_unique_renomme_les_doublons(session: Session) -> None:
+    """Teste la migration du nom unique sur une base ayant des noms en double.
+
+    L'index est supprimé le temps du test (annulé avec la transaction) : le
+    produit le plus ancien garde son nom, les doublons sont renommés et
+    l'index est recréé.
+    """
+    description, instructions = MIGRATIONS[0]
+    assert "Nom de produit unique" in description
+    existant = session.exec(select(Produit).order_by(col(Produit.id))).first()
+    assert existant is not None
+
+    connexion = session.connection()
+    connexion.exec_driver_sql("DROP INDEX ix_produits_nom")
+    doublons = [Produit(nom=existant.nom, prix=1.0, stock=0) for _ in range(2)]
+    session.add_all(doublons)
+    session.flush()
+    for instruction in instructions:
+        connexion.exec_driver_sql(instruction)
+    session.expire_all()
+
+    noms = dict(session.exec(select(Produit.id, Produit.nom)).all())
+    assert noms[existant.id] == existant.nom
+    for doublon in doublons:
+        assert noms[doublon.id] == f"{existant.nom} #{doublon.id}"
@@ -67,14 +67,22 @@ def test_commande_read_from_dict() -> None:
 def test_commande_update_partial() -> None:
     """
     Vérifie que CommandeUpdate peut être partiellement instancié.
-    Seule la valeur du statut est fournie, les autres champs restent None.
+    Seul le client est fourni, les autres champs restent None.
     """
-    payload = {"statut": "servie"}
-    update = CommandeUpdate(**payload)  # type: ignore[arg-type]
+    update = CommandeUpdate(client_id=2)
 
-    assert update.statut == StatusEnum.servie
-    assert update.client_id is None
+    assert update.client_id == 2
     assert update.date_commande is None
+    assert update.details is None
+
+
+def test_commande_update_sans_statut() -> None:
+    """
+    Vérifie que CommandeUpdate refuse le statut, qui ne change que par une
+    transition.
+    """
+    with pytest.raises(ValidationError):
+        CommandeUpdate.model_validate({"statut": "servie"})
 
 
 def test_commande_update_with_details() -> None: